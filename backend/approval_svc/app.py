@@ -9,13 +9,18 @@ root_dir = str(Path(__file__).parent.parent.parent)
 sys.path.append(root_dir)
 
 # 使用绝对导入
-from backend.approval_svc.routes import router
+from backend.approval_svc.routes import router, workflow_router, approval_router
+from db_config import get_pool_stats
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
 
+# 表结构由部署时执行的迁移创建（见 migrations.py 和根目录 db_migrate.py），启动时不再检查
+
 app = FastAPI(title="Approval Service", description="审批流管理服务", version="0.1.0")
 
 app.include_router(router)
+app.include_router(workflow_router)
+app.include_router(approval_router)
 
 @app.get("/", tags=["Root"], summary="Root endpoint for service health check")
 def read_root():
@@ -23,4 +28,8 @@ def read_root():
 
 @app.get("/health", tags=["Health"], summary="Health check endpoint")
 def health_check():
-    return {"status": "ok", "service": app.title}
\ No newline at end of file
+    return {"status": "ok", "service": app.title}
+
+@app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+def db_pool_stats():
+    return get_pool_stats("approval_svc")
@@ -0,0 +1,26 @@
+from sqlalchemy.ext.declarative import declarative_base
+
+from db_config import get_engine, get_sessionmaker
+
+SERVICE_NAME = "approval_svc"
+
+# 数据库连接信息与连接池参数统一由 db_config.py 管理，每个进程只创建一个引擎
+engine = get_engine(SERVICE_NAME)
+SessionLocal = get_sessionmaker(SERVICE_NAME)
+ReadSessionLocal = get_sessionmaker(SERVICE_NAME, replica=True)
+
+Base = declarative_base()
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
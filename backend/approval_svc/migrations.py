@@ -0,0 +1,100 @@
+"""
+审批服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import MetaData, Table, Column, BigInteger, DateTime, Enum, ForeignKey, Index, Integer, String, \
+    Text, TIMESTAMP
+
+from db_migrate import Migration, current_timestamp_default
+
+
+def _create_workflows(conn):
+    # 版本1的表结构；MySQL 下与原先的建表语句一致，SQLite 开发库也可以执行
+    metadata = MetaData()
+    Table(
+        "approval_workflow", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("workflow_name", String(100), nullable=False),
+        Column("description", Text),
+        Column("status", Enum("active", "inactive"), server_default="active"),
+        Column("created_at", TIMESTAMP, server_default=current_timestamp_default(conn)),
+        Column("updated_at", TIMESTAMP, server_default=current_timestamp_default(conn, on_update=True)),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+    )
+    Table(
+        "approval_step", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("workflow_id", Integer, ForeignKey("approval_workflow.id", ondelete="CASCADE"), nullable=False),
+        Column("step_name", String(100), nullable=False),
+        Column("step_order", Integer, nullable=False),
+        Column("approver_role", String(50), nullable=False),
+        Column("created_at", TIMESTAMP, server_default=current_timestamp_default(conn)),
+        Column("updated_at", TIMESTAMP, server_default=current_timestamp_default(conn, on_update=True)),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+    )
+    metadata.create_all(conn)
+
+
+def _create_instances(conn):
+    # 版本2的表结构，与当时的 models 一致
+    metadata = MetaData()
+    instance_id = BigInteger().with_variant(Integer, "sqlite")
+    Table(
+        "approval_instances", metadata,
+        Column("id", instance_id, primary_key=True),
+        Column("workflow_id", Integer, nullable=False),
+        Column("business_type", String(50), nullable=False),
+        Column("business_id", String(50), nullable=False),
+        Column("title", String(200), nullable=False),
+        Column("requester_id", String(36), nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("current_step_id", Integer),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        Column("finished_at", DateTime),
+        Index("ix_approval_instances_business", "business_type", "business_id"),
+        Index("ix_approval_instances_status_updated_at", "status", "updated_at"),
+    )
+    Table(
+        "approval_inbox", metadata,
+        Column("instance_id", instance_id, primary_key=True, autoincrement=False),
+        Column("approver_role", String(50), nullable=False),
+        Column("workflow_id", Integer, nullable=False),
+        Column("step_id", Integer, nullable=False),
+        Column("step_name", String(100), nullable=False),
+        Column("business_type", String(50), nullable=False),
+        Column("business_id", String(50), nullable=False),
+        Column("title", String(200), nullable=False),
+        Column("requester_id", String(36), nullable=False),
+        Column("submitted_at", DateTime, nullable=False),
+        Column("pending_since", DateTime, nullable=False),
+        Index("ix_approval_inbox_role_pending_since", "approver_role", "pending_since", "instance_id"),
+    )
+    Table(
+        "approval_actions", metadata,
+        Column("id", instance_id, primary_key=True),
+        Column("instance_id", instance_id, nullable=False),
+        Column("step_id", Integer),
+        Column("action", String(20), nullable=False),
+        Column("actor_id", String(36), nullable=False),
+        Column("comment", String(500)),
+        Column("status", String(20), nullable=False),
+        Column("next_step_id", Integer),
+        Column("created_at", DateTime, nullable=False),
+        Index("ix_approval_actions_instance_id", "instance_id"),
+    )
+    metadata.create_all(conn)
+
+
+MIGRATIONS = [
+    Migration(1, "create approval_workflow and approval_step", [_create_workflows]),
+    # 审批实例、按审批角色的待审批箱和审批记录
+    Migration(2, "add approval_step.on_reject, create approval_instances, approval_inbox and approval_actions", [
+        "ALTER TABLE approval_step ADD COLUMN on_reject VARCHAR(20) NOT NULL DEFAULT 'reject'",
+        "CREATE INDEX ix_approval_step_workflow_id_step_order ON approval_step (workflow_id, step_order)",
+        _create_instances,
+    ]),
+]
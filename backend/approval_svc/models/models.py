@@ -0,0 +1,117 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text
+
+from backend.approval_svc.database import Base
+
+# SQLite 只有 INTEGER PRIMARY KEY 才会自增
+InstanceId = BigInteger().with_variant(Integer, "sqlite")
+
+
+# 审批流程：步骤见 approval_step；修改步骤时同时更新 updated_at，各进程据此重新编译状态机
+class ApprovalWorkflow(Base):
+    __tablename__ = "approval_workflow"
+
+    id = Column(Integer, primary_key=True)
+    workflow_name = Column(String(100), nullable=False)
+    description = Column(Text)
+    # active / inactive，inactive 的流程不能提交新的审批
+    status = Column(String(20), default="active")
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ApprovalWorkflow(id={self.id}, workflow_name='{self.workflow_name}')>"
+
+
+# 审批步骤：按 step_order 依次审批，每步由 approver_role 角色的审批人处理；
+# on_reject 为 reject（拒绝即结束）或 previous（退回上一步，第一步退回即拒绝）
+class ApprovalStep(Base):
+    __tablename__ = "approval_step"
+    __table_args__ = (
+        Index("ix_approval_step_workflow_id_step_order", "workflow_id", "step_order"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    workflow_id = Column(Integer, nullable=False)
+    step_name = Column(String(100), nullable=False)
+    step_order = Column(Integer, nullable=False)
+    approver_role = Column(String(50), nullable=False)
+    on_reject = Column(String(20), nullable=False, default="reject")
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ApprovalStep(id={self.id}, workflow_id={self.workflow_id}, step_order={self.step_order})>"
+
+
+# 审批实例：一次提交的审批（如一张发货申请），current_step_id 为当前待审批的步骤，结束后为空
+class ApprovalInstance(Base):
+    __tablename__ = "approval_instances"
+    __table_args__ = (
+        Index("ix_approval_instances_business", "business_type", "business_id"),
+        Index("ix_approval_instances_status_updated_at", "status", "updated_at"),
+    )
+
+    id = Column(InstanceId, primary_key=True)
+    workflow_id = Column(Integer, nullable=False)
+    # 业务类型和单号，如 shipment / SH-20240603-001
+    business_type = Column(String(50), nullable=False)
+    business_id = Column(String(50), nullable=False)
+    title = Column(String(200), nullable=False)
+    requester_id = Column(String(36), nullable=False)
+    # pending / approved / rejected / cancelled
+    status = Column(String(20), nullable=False)
+    current_step_id = Column(Integer)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ApprovalInstance(id={self.id}, business_id='{self.business_id}', status='{self.status}')>"
+
+
+# 待审批箱：每个待审批的实例一行，冗余保存列表需要的字段，按审批角色一次索引查询即可读取，不需要联表；
+# 实例进入下一步时更新 approver_role 等字段，审批结束时删除
+class ApprovalInbox(Base):
+    __tablename__ = "approval_inbox"
+    __table_args__ = (
+        Index("ix_approval_inbox_role_pending_since", "approver_role", "pending_since", "instance_id"),
+    )
+
+    instance_id = Column(InstanceId, primary_key=True, autoincrement=False)
+    approver_role = Column(String(50), nullable=False)
+    workflow_id = Column(Integer, nullable=False)
+    step_id = Column(Integer, nullable=False)
+    step_name = Column(String(100), nullable=False)
+    business_type = Column(String(50), nullable=False)
+    business_id = Column(String(50), nullable=False)
+    title = Column(String(200), nullable=False)
+    requester_id = Column(String(36), nullable=False)
+    submitted_at = Column(DateTime, nullable=False)
+    # 进入当前步骤的时间
+    pending_since = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ApprovalInbox(instance_id={self.instance_id}, approver_role='{self.approver_role}')>"
+
+
+# 审批记录：提交、同意、拒绝、退回、撤回各一行
+class ApprovalAction(Base):
+    __tablename__ = "approval_actions"
+    __table_args__ = (
+        Index("ix_approval_actions_instance_id", "instance_id"),
+    )
+
+    id = Column(InstanceId, primary_key=True)
+    instance_id = Column(InstanceId, nullable=False)
+    step_id = Column(Integer)
+    # submit / approve / reject / return / cancel
+    action = Column(String(20), nullable=False)
+    actor_id = Column(String(36), nullable=False)
+    comment = Column(String(500))
+    # 操作后实例的状态和步骤
+    status = Column(String(20), nullable=False)
+    next_step_id = Column(Integer)
+    created_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ApprovalAction(instance_id={self.instance_id}, action='{self.action}')>"
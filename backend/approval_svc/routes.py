@@ -1,7 +1,131 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from backend.approval_svc.schemas import (
+    ApprovalBulkResult, ApprovalInstance, ApprovalSubmit, BatchDecision, CancelRequest, Decision, InboxItem,
+    StepCreate, Workflow, WorkflowCreate, WorkflowStatus,
+)
+from backend.approval_svc.services import approval_service
+from backend.approval_svc.database import get_db, get_read_db
 
 router = APIRouter()
 
 @router.get("/ping")
 def ping():
-    return {"msg": "approval_svc pong"}
\ No newline at end of file
+    return {"msg": "approval_svc pong"}
+
+
+workflow_router = APIRouter(
+    prefix="/api/v1/approval-workflows",
+    tags=["approval-workflows"],
+)
+
+@workflow_router.get("/", response_model=List[Workflow])
+def read_workflows(status: Optional[str] = Query(None, pattern="^(active|inactive)$"), skip: int = 0,
+                   limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    return approval_service.get_workflows(db, status=status, skip=skip, limit=limit)
+
+@workflow_router.post("/", response_model=Workflow)
+def create_workflow(workflow: WorkflowCreate, db: Session = Depends(get_db)):
+    return approval_service.create_workflow(db, workflow)
+
+@workflow_router.get("/{workflow_id}", response_model=Workflow)
+def read_workflow(workflow_id: int, db: Session = Depends(get_read_db)):
+    db_workflow = approval_service.get_workflow(db, workflow_id)
+    if db_workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return db_workflow
+
+# 替换全部步骤；流程还有待审批的实例时返回409
+@workflow_router.put("/{workflow_id}/steps", response_model=Workflow)
+def replace_steps(workflow_id: int, steps: List[StepCreate], db: Session = Depends(get_db)):
+    if not steps:
+        raise HTTPException(status_code=400, detail="A workflow needs at least one step")
+    try:
+        db_workflow = approval_service.replace_steps(db, workflow_id, steps)
+    except approval_service.WorkflowInUseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if db_workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return db_workflow
+
+@workflow_router.put("/{workflow_id}/status", response_model=Workflow)
+def update_workflow_status(workflow_id: int, status: WorkflowStatus, db: Session = Depends(get_db)):
+    db_workflow = approval_service.set_workflow_status(db, workflow_id, status.status)
+    if db_workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return db_workflow
+
+
+approval_router = APIRouter(
+    prefix="/api/v1/approvals",
+    tags=["approvals"],
+)
+
+@approval_router.get("/", response_model=List[ApprovalInstance])
+def read_approvals(business_type: Optional[str] = None, business_id: Optional[str] = None,
+                   status: Optional[str] = Query(None, pattern="^(pending|approved|rejected|cancelled)$"),
+                   skip: int = 0, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    return approval_service.get_instances(db, business_type=business_type, business_id=business_id, status=status,
+                                          skip=skip, limit=limit)
+
+@approval_router.post("/", response_model=ApprovalInstance)
+def submit_approval(approval: ApprovalSubmit, db: Session = Depends(get_db)):
+    result = approval_service.submit(db, [approval])
+    if result.errors:
+        raise HTTPException(status_code=400, detail=result.errors[0].detail)
+    return approval_service.get_instance(db, result.succeeded[0].id)
+
+# 批量提交，出错的条目在 errors 中按下标报告，不影响其余条目
+@approval_router.post("/bulk", response_model=ApprovalBulkResult)
+def submit_approvals(approvals: List[ApprovalSubmit], db: Session = Depends(get_db)):
+    if len(approvals) > approval_service.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {approval_service.MAX_BATCH_SIZE} approvals per request")
+    return approval_service.submit(db, approvals)
+
+# 审批角色的待审批列表，先进入当前步骤的在前
+@approval_router.get("/inbox", response_model=List[InboxItem])
+def read_inbox(approver_role: str, business_type: Optional[str] = None, skip: int = 0,
+               limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    return approval_service.get_inbox(db, approver_role, business_type=business_type, skip=skip, limit=limit)
+
+# 批量同意或拒绝（最多1000个），一个事务完成；不能处理的实例在 errors 中报告，不影响其余实例
+@approval_router.post("/batch", response_model=ApprovalBulkResult)
+def batch_decide(decision: BatchDecision, db: Session = Depends(get_db)):
+    return approval_service.batch_decide(db, decision)
+
+@approval_router.get("/{instance_id}", response_model=ApprovalInstance)
+def read_approval(instance_id: int, db: Session = Depends(get_read_db)):
+    db_instance = approval_service.get_instance(db, instance_id)
+    if db_instance is None:
+        raise HTTPException(status_code=404, detail="Approval not found")
+    return db_instance
+
+def _decide(db: Session, instance_id: int, action: str, decision: Decision):
+    try:
+        db_instance = approval_service.decide(db, instance_id, action, decision)
+    except approval_service.ApprovalStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if db_instance is None:
+        raise HTTPException(status_code=404, detail="Approval not found")
+    return db_instance
+
+@approval_router.post("/{instance_id}/approve", response_model=ApprovalInstance)
+def approve(instance_id: int, decision: Decision, db: Session = Depends(get_db)):
+    return _decide(db, instance_id, "approve", decision)
+
+@approval_router.post("/{instance_id}/reject", response_model=ApprovalInstance)
+def reject(instance_id: int, decision: Decision, db: Session = Depends(get_db)):
+    return _decide(db, instance_id, "reject", decision)
+
+# 提交人撤回
+@approval_router.post("/{instance_id}/cancel", response_model=ApprovalInstance)
+def cancel(instance_id: int, request: CancelRequest, db: Session = Depends(get_db)):
+    try:
+        db_instance = approval_service.cancel(db, instance_id, request)
+    except approval_service.ApprovalStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if db_instance is None:
+        raise HTTPException(status_code=404, detail="Approval not found")
+    return db_instance
@@ -0,0 +1,131 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import List, Optional
+
+class StepCreate(BaseModel):
+    step_name: str = Field(..., min_length=1, max_length=100)
+    approver_role: str = Field(..., min_length=1, max_length=50)
+    # reject：拒绝即结束；previous：退回上一步（第一步退回即拒绝）
+    on_reject: str = Field("reject", pattern="^(reject|previous)$")
+
+class Step(StepCreate):
+    id: int
+    step_order: int
+
+    class Config:
+        from_attributes = True
+
+class WorkflowCreate(BaseModel):
+    workflow_name: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = None
+    # 按列表顺序审批
+    steps: List[StepCreate] = Field(..., min_length=1, max_length=50)
+
+class WorkflowStatus(BaseModel):
+    status: str = Field(..., pattern="^(active|inactive)$")
+
+class Workflow(BaseModel):
+    id: int
+    workflow_name: str
+    description: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    steps: List[Step] = []
+
+    class Config:
+        from_attributes = True
+
+class ApprovalSubmit(BaseModel):
+    workflow_id: int
+    business_type: str = Field(..., min_length=1, max_length=50)
+    business_id: str = Field(..., min_length=1, max_length=50)
+    title: str = Field(..., min_length=1, max_length=200)
+    requester_id: str = Field(..., min_length=1, max_length=36)
+    comment: Optional[str] = Field(None, max_length=500)
+
+class ApprovalAction(BaseModel):
+    id: int
+    step_id: Optional[int] = None
+    action: str
+    actor_id: str
+    comment: Optional[str] = None
+    status: str
+    next_step_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ApprovalInstance(BaseModel):
+    id: int
+    workflow_id: int
+    business_type: str
+    business_id: str
+    title: str
+    requester_id: str
+    status: str
+    current_step_id: Optional[int] = None
+    # 当前步骤的名称和审批角色，审批结束后为空
+    current_step_name: Optional[str] = None
+    approver_role: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    actions: List[ApprovalAction] = []
+
+    class Config:
+        from_attributes = True
+
+class InboxItem(BaseModel):
+    instance_id: int
+    approver_role: str
+    workflow_id: int
+    step_id: int
+    step_name: str
+    business_type: str
+    business_id: str
+    title: str
+    requester_id: str
+    submitted_at: datetime
+    pending_since: datetime
+
+    class Config:
+        from_attributes = True
+
+class Decision(BaseModel):
+    actor_id: str = Field(..., min_length=1, max_length=36)
+    # 审批人的角色，须与实例当前步骤的审批角色一致
+    approver_role: str = Field(..., min_length=1, max_length=50)
+    comment: Optional[str] = Field(None, max_length=500)
+
+class BatchDecision(Decision):
+    action: str = Field(..., pattern="^(approve|reject)$")
+    instance_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+    @model_validator(mode="after")
+    def check_ids(self):
+        if len(set(self.instance_ids)) != len(self.instance_ids):
+            raise ValueError("instance_ids must be unique")
+        return self
+
+class CancelRequest(BaseModel):
+    # 只有提交人可以撤回
+    actor_id: str = Field(..., min_length=1, max_length=36)
+    comment: Optional[str] = Field(None, max_length=500)
+
+class ApprovalBulkItem(BaseModel):
+    index: int
+    id: int
+    status: str
+    current_step_id: Optional[int] = None
+    current_step_name: Optional[str] = None
+
+class ApprovalBulkError(BaseModel):
+    index: int
+    id: Optional[int] = None
+    detail: str
+
+class ApprovalBulkResult(BaseModel):
+    succeeded: List[ApprovalBulkItem] = []
+    errors: List[ApprovalBulkError] = []
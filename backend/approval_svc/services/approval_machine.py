@@ -0,0 +1,121 @@
+"""
+审批流程状态机
+
+每个审批流程的步骤编译成一张转移表：(当前步骤ID, 操作) -> 转移结果（下一步骤及其审批角色，或结束状态），
+审批时只查表，不再逐个实例读取和排序步骤。同一批中处于同一流程同一步骤的实例转移结果相同，
+由 approval_service.py 合并成一条 UPDATE。
+
+编译结果按流程缓存在进程内，以流程的 updated_at 为版本：修改步骤时更新流程的 updated_at，
+各进程读取实例时比较版本，不一致时重新编译。
+"""
+import threading
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ..models import models
+
+PENDING, APPROVED, REJECTED, CANCELLED = "pending", "approved", "rejected", "cancelled"
+APPROVE, REJECT = "approve", "reject"
+# 步骤的 on_reject：拒绝即结束、退回上一步
+REJECT_END, REJECT_PREVIOUS = "reject", "previous"
+
+
+class StepDef(NamedTuple):
+    id: int
+    name: str
+    order: int
+    role: str
+    on_reject: str
+
+
+class Transition(NamedTuple):
+    # 转移后的实例状态；为 pending 时 step 为下一步骤，否则为 None
+    status: str
+    step: Optional[StepDef]
+    # 记录到审批记录中的操作：approve / reject / return（退回上一步）
+    action: str
+
+
+class ApprovalMachine:
+    """
+    一个审批流程编译后的状态机
+    """
+
+    def __init__(self, workflow_id: int, version: Optional[datetime], steps: Iterable[StepDef]):
+        self.workflow_id = workflow_id
+        self.version = version
+        self.steps: List[StepDef] = sorted(steps, key=lambda step: (step.order, step.id))
+        self.by_id: Dict[int, StepDef] = {step.id: step for step in self.steps}
+        # 没有步骤的流程提交即通过
+        self.initial = Transition(PENDING, self.steps[0], "submit") if self.steps \
+            else Transition(APPROVED, None, "submit")
+        self.transitions: Dict[Tuple[int, str], Transition] = {}
+        for i, step in enumerate(self.steps):
+            following = self.steps[i + 1] if i + 1 < len(self.steps) else None
+            self.transitions[(step.id, APPROVE)] = Transition(PENDING, following, APPROVE) if following \
+                else Transition(APPROVED, None, APPROVE)
+            if step.on_reject == REJECT_PREVIOUS and i > 0:
+                self.transitions[(step.id, REJECT)] = Transition(PENDING, self.steps[i - 1], "return")
+            else:
+                self.transitions[(step.id, REJECT)] = Transition(REJECTED, None, REJECT)
+
+    def next(self, step_id: int, action: str) -> Transition:
+        """
+        Raises:
+            KeyError: 步骤不属于该流程（流程的步骤已被替换）
+        """
+        return self.transitions[(step_id, action)]
+
+
+class MachineCache:
+    """
+    各流程编译后的状态机，按流程的 updated_at 判断是否需要重新编译
+    """
+
+    def __init__(self):
+        self._machines: Dict[int, ApprovalMachine] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, workflow_ids: Iterable[int]) -> Dict[int, ApprovalMachine]:
+        """
+        读取流程的状态机，版本与数据库一致的直接使用缓存
+
+        Returns:
+            流程ID -> 状态机，不存在的流程不在结果中
+        """
+        workflow_ids = set(workflow_ids)
+        if not workflow_ids:
+            return {}
+        versions = dict(db.execute(
+            select(models.ApprovalWorkflow.id, models.ApprovalWorkflow.updated_at)
+            .where(models.ApprovalWorkflow.id.in_(workflow_ids))
+        ).all())
+        with self._lock:
+            result = {workflow_id: self._machines[workflow_id] for workflow_id, version in versions.items()
+                      if workflow_id in self._machines and self._machines[workflow_id].version == version}
+        stale = [workflow_id for workflow_id in versions if workflow_id not in result]
+        if stale:
+            steps: Dict[int, List[StepDef]] = {workflow_id: [] for workflow_id in stale}
+            for row in db.execute(
+                select(models.ApprovalStep.id, models.ApprovalStep.workflow_id, models.ApprovalStep.step_name,
+                       models.ApprovalStep.step_order, models.ApprovalStep.approver_role,
+                       models.ApprovalStep.on_reject)
+                .where(models.ApprovalStep.workflow_id.in_(stale))
+            ):
+                steps[row.workflow_id].append(StepDef(row.id, row.step_name, row.step_order, row.approver_role,
+                                                      row.on_reject or REJECT_END))
+            compiled = {workflow_id: ApprovalMachine(workflow_id, versions[workflow_id], steps[workflow_id])
+                        for workflow_id in stale}
+            with self._lock:
+                self._machines.update(compiled)
+            result.update(compiled)
+        return result
+
+    def invalidate(self, workflow_id: int) -> None:
+        with self._lock:
+            self._machines.pop(workflow_id, None)
+
+
+machines = MachineCache()
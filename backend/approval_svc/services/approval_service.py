@@ -0,0 +1,378 @@
+"""
+审批流程与审批实例
+
+- 流程的步骤编译成状态机（见 approval_machine.py），审批时按 (当前步骤, 操作) 查转移表；
+- 每个待审批的实例在 approval_inbox 中有一行，冗余保存列表需要的字段，待审批列表按审批角色一次索引查询读取；
+- 批量同意/拒绝在一个事务中完成：锁定实例后按 (流程, 当前步骤) 分组，同组的实例转移结果相同，
+  每组一条 UPDATE 更新实例、一条 UPDATE 移动待审批箱中的行，结束的实例一条 DELETE 移出待审批箱，
+  审批记录一条 INSERT 写入，语句数与实例数无关。
+"""
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+
+from ..models import models
+from .. import schemas
+from .approval_machine import CANCELLED, PENDING, ApprovalMachine, Transition, machines
+
+logger = logging.getLogger(__name__)
+
+# 一次批量审批的最多实例数
+MAX_BATCH_SIZE = 1000
+NOT_FOUND = "Approval not found"
+
+
+class WorkflowInUseError(ValueError):
+    def __init__(self, workflow_id: int):
+        self.workflow_id = workflow_id
+        super().__init__(f"Workflow {workflow_id} has pending approvals")
+
+
+class ApprovalStateError(ValueError):
+    pass
+
+
+def _workflow_out(workflow: models.ApprovalWorkflow, steps: List[models.ApprovalStep]) -> schemas.Workflow:
+    result = schemas.Workflow.model_validate(workflow)
+    result.steps = [schemas.Step.model_validate(step)
+                    for step in sorted(steps, key=lambda step: (step.step_order, step.id))]
+    return result
+
+def _insert_steps(db: Session, workflow_id: int, steps: List[schemas.StepCreate], now: datetime) -> None:
+    db.execute(insert(models.ApprovalStep.__table__), [
+        {"workflow_id": workflow_id, "step_name": step.step_name, "step_order": order,
+         "approver_role": step.approver_role, "on_reject": step.on_reject, "created_at": now, "updated_at": now}
+        for order, step in enumerate(steps, start=1)
+    ])
+
+def get_workflow(db: Session, workflow_id: int) -> Optional[schemas.Workflow]:
+    workflow = db.get(models.ApprovalWorkflow, workflow_id)
+    if workflow is None:
+        return None
+    steps = db.execute(
+        select(models.ApprovalStep).where(models.ApprovalStep.workflow_id == workflow_id)
+    ).scalars().all()
+    return _workflow_out(workflow, steps)
+
+def get_workflows(db: Session, status: Optional[str] = None, skip: int = 0,
+                  limit: int = 100) -> List[schemas.Workflow]:
+    stmt = select(models.ApprovalWorkflow)
+    if status is not None:
+        stmt = stmt.where(models.ApprovalWorkflow.status == status)
+    workflows = db.execute(stmt.order_by(models.ApprovalWorkflow.id).offset(skip).limit(limit)).scalars().all()
+    steps: Dict[int, List[models.ApprovalStep]] = {workflow.id: [] for workflow in workflows}
+    if steps:
+        for step in db.execute(
+            select(models.ApprovalStep).where(models.ApprovalStep.workflow_id.in_(list(steps)))
+        ).scalars():
+            steps[step.workflow_id].append(step)
+    return [_workflow_out(workflow, steps[workflow.id]) for workflow in workflows]
+
+def create_workflow(db: Session, workflow: schemas.WorkflowCreate) -> schemas.Workflow:
+    now = datetime.now().replace(microsecond=0)
+    db_workflow = models.ApprovalWorkflow(workflow_name=workflow.workflow_name, description=workflow.description,
+                                          status="active", created_at=now, updated_at=now)
+    db.add(db_workflow)
+    db.flush()
+    _insert_steps(db, db_workflow.id, workflow.steps, now)
+    db.commit()
+    return get_workflow(db, db_workflow.id)
+
+def _lock_workflow(db: Session, workflow_id: int) -> Optional[models.ApprovalWorkflow]:
+    return db.execute(
+        select(models.ApprovalWorkflow).where(models.ApprovalWorkflow.id == workflow_id).with_for_update()
+    ).scalar_one_or_none()
+
+def _touch(workflow: models.ApprovalWorkflow) -> None:
+    # updated_at 是状态机缓存的版本；MySQL DATETIME 只精确到秒，同一秒内两次修改时顺延一秒，保证版本变化
+    now = datetime.now().replace(microsecond=0)
+    if workflow.updated_at is not None and now <= workflow.updated_at:
+        now = workflow.updated_at + timedelta(seconds=1)
+    workflow.updated_at = now
+
+def replace_steps(db: Session, workflow_id: int, steps: List[schemas.StepCreate]) -> Optional[schemas.Workflow]:
+    """
+    替换流程的全部步骤
+
+    Raises:
+        WorkflowInUseError: 流程还有待审批的实例，这些实例的当前步骤会被删除
+    """
+    workflow = _lock_workflow(db, workflow_id)
+    if workflow is None:
+        return None
+    pending = db.execute(
+        select(models.ApprovalInbox.instance_id).where(models.ApprovalInbox.workflow_id == workflow_id).limit(1)
+    ).first()
+    if pending is not None:
+        db.rollback()
+        raise WorkflowInUseError(workflow_id)
+    _touch(workflow)
+    db.execute(delete(models.ApprovalStep).where(models.ApprovalStep.workflow_id == workflow_id))
+    _insert_steps(db, workflow_id, steps, workflow.updated_at)
+    db.commit()
+    machines.invalidate(workflow_id)
+    logger.info(f"审批流程 {workflow_id} 的步骤已替换为 {len(steps)} 步")
+    return get_workflow(db, workflow_id)
+
+def set_workflow_status(db: Session, workflow_id: int, status: str) -> Optional[schemas.Workflow]:
+    workflow = _lock_workflow(db, workflow_id)
+    if workflow is None:
+        return None
+    workflow.status = status
+    db.commit()
+    return get_workflow(db, workflow_id)
+
+
+def _insert_instance_rows(db: Session, rows: List[dict]) -> List[int]:
+    """
+    用一条语句插入多个实例并返回新主键
+    """
+    table = models.ApprovalInstance.__table__
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows)
+        return [row[0] for row in result]
+    # MySQL 不支持 RETURNING：多行 INSERT 的 LAST_INSERT_ID() 为第一行主键，同一条“简单插入”语句
+    # 分配的自增值是连续的——前提是 auto_increment_increment 为 1（主主复制等场景会调大），否则拒绝写入
+    increment = db.execute(text("SELECT @@auto_increment_increment")).scalar()
+    if increment != 1:
+        raise RuntimeError(f"Bulk insert requires auto_increment_increment = 1, got {increment}")
+    result = db.execute(table.insert().values(rows))
+    first_id = result.lastrowid
+    return list(range(first_id, first_id + len(rows)))
+
+def _inbox_row(instance_id: int, row: dict, transition: Transition, workflow_id: int, now: datetime) -> dict:
+    return {
+        "instance_id": instance_id, "approver_role": transition.step.role, "workflow_id": workflow_id,
+        "step_id": transition.step.id, "step_name": transition.step.name, "business_type": row["business_type"],
+        "business_id": row["business_id"], "title": row["title"], "requester_id": row["requester_id"],
+        "submitted_at": now, "pending_since": now,
+    }
+
+def submit(db: Session, items: List[schemas.ApprovalSubmit]) -> schemas.ApprovalBulkResult:
+    """
+    提交审批：在一个事务中写入实例、待审批箱和提交记录。流程不存在或已停用、
+    同一业务单据已有待审批的实例时该条目报错，不影响其余条目。
+    """
+    result = schemas.ApprovalBulkResult()
+    now = datetime.now()
+    workflow_ids = {item.workflow_id for item in items}
+    statuses = dict(db.execute(
+        select(models.ApprovalWorkflow.id, models.ApprovalWorkflow.status)
+        .where(models.ApprovalWorkflow.id.in_(workflow_ids))
+    ).all())
+    compiled = machines.get(db, workflow_ids)
+    pending = set(db.execute(
+        select(models.ApprovalInstance.business_type, models.ApprovalInstance.business_id)
+        .where(models.ApprovalInstance.business_id.in_({item.business_id for item in items}),
+               models.ApprovalInstance.status == PENDING)
+    ).all())
+
+    valid: List[Tuple[int, dict, ApprovalMachine, Optional[str]]] = []
+    for index, item in enumerate(items):
+        key = (item.business_type, item.business_id)
+        if item.workflow_id not in statuses:
+            detail = f"Workflow not found: {item.workflow_id}"
+        elif statuses[item.workflow_id] != "active":
+            detail = f"Workflow {item.workflow_id} is not active"
+        elif key in pending:
+            detail = f"Approval already pending for {item.business_type} {item.business_id}"
+        else:
+            pending.add(key)
+            machine = compiled[item.workflow_id]
+            first = machine.initial.step
+            row = item.model_dump(exclude={"comment"})
+            row.update(status=machine.initial.status, current_step_id=first.id if first else None,
+                       created_at=now, updated_at=now, finished_at=None if first else now)
+            valid.append((index, row, machine, item.comment))
+            continue
+        result.errors.append(schemas.ApprovalBulkError(index=index, detail=detail))
+
+    if valid:
+        ids = _insert_instance_rows(db, [row for _, row, _, _ in valid])
+        inbox, actions = [], []
+        for instance_id, (index, row, machine, comment) in zip(ids, valid):
+            initial = machine.initial
+            if initial.step is not None:
+                inbox.append(_inbox_row(instance_id, row, initial, machine.workflow_id, now))
+            actions.append({"instance_id": instance_id, "step_id": None, "action": "submit",
+                            "actor_id": row["requester_id"], "comment": comment, "status": initial.status,
+                            "next_step_id": row["current_step_id"], "created_at": now})
+            result.succeeded.append(schemas.ApprovalBulkItem(
+                index=index, id=instance_id, status=initial.status, current_step_id=row["current_step_id"],
+                current_step_name=initial.step.name if initial.step else None,
+            ))
+        if inbox:
+            db.execute(insert(models.ApprovalInbox.__table__), inbox)
+        db.execute(insert(models.ApprovalAction.__table__), actions)
+    db.commit()
+    result.succeeded.sort(key=lambda item: item.index)
+    return result
+
+def get_inbox(db: Session, approver_role: str, business_type: Optional[str] = None, skip: int = 0,
+              limit: int = 100) -> List[models.ApprovalInbox]:
+    """
+    审批角色的待审批列表，先提交到当前步骤的在前；只查 approval_inbox，走 (approver_role, pending_since) 索引
+    """
+    stmt = select(models.ApprovalInbox).where(models.ApprovalInbox.approver_role == approver_role)
+    if business_type is not None:
+        stmt = stmt.where(models.ApprovalInbox.business_type == business_type)
+    stmt = stmt.order_by(models.ApprovalInbox.pending_since, models.ApprovalInbox.instance_id)
+    return db.execute(stmt.offset(skip).limit(limit)).scalars().all()
+
+def get_instances(db: Session, business_type: Optional[str] = None, business_id: Optional[str] = None,
+                  status: Optional[str] = None, skip: int = 0,
+                  limit: int = 100) -> List[models.ApprovalInstance]:
+    stmt = select(models.ApprovalInstance)
+    if business_type is not None:
+        stmt = stmt.where(models.ApprovalInstance.business_type == business_type)
+    if business_id is not None:
+        stmt = stmt.where(models.ApprovalInstance.business_id == business_id)
+    if status is not None:
+        stmt = stmt.where(models.ApprovalInstance.status == status)
+    stmt = stmt.order_by(models.ApprovalInstance.id.desc())
+    return db.execute(stmt.offset(skip).limit(limit)).scalars().all()
+
+def get_instance(db: Session, instance_id: int) -> Optional[schemas.ApprovalInstance]:
+    """
+    实例及其全部审批记录
+    """
+    instance = db.get(models.ApprovalInstance, instance_id)
+    if instance is None:
+        return None
+    result = schemas.ApprovalInstance.model_validate(instance)
+    if instance.current_step_id is not None:
+        machine = machines.get(db, [instance.workflow_id]).get(instance.workflow_id)
+        step = machine.by_id.get(instance.current_step_id) if machine else None
+        if step is not None:
+            result.current_step_name, result.approver_role = step.name, step.role
+    result.actions = [schemas.ApprovalAction.model_validate(action) for action in db.execute(
+        select(models.ApprovalAction).where(models.ApprovalAction.instance_id == instance_id)
+        .order_by(models.ApprovalAction.id)
+    ).scalars()]
+    return result
+
+def batch_decide(db: Session, decision: schemas.BatchDecision) -> schemas.ApprovalBulkResult:
+    """
+    批量同意或拒绝，全部在一个事务中完成。实例不存在、已结束、当前步骤不属于 approver_role 时该条目报错，
+    其余条目照常处理。
+    """
+    result = schemas.ApprovalBulkResult()
+    ids = decision.instance_ids
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} instances per batch")
+    now = datetime.now()
+    # 按主键顺序加锁，并发的批量审批不会互相死锁
+    rows = {row.id: row for row in db.execute(
+        select(models.ApprovalInstance.id, models.ApprovalInstance.workflow_id,
+               models.ApprovalInstance.current_step_id, models.ApprovalInstance.status)
+        .where(models.ApprovalInstance.id.in_(sorted(ids)))
+        .order_by(models.ApprovalInstance.id)
+        .with_for_update()
+    )}
+    compiled = machines.get(db, {row.workflow_id for row in rows.values() if row.status == PENDING})
+
+    # (流程, 当前步骤) -> [(下标, 实例ID)]
+    groups: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for index, instance_id in enumerate(ids):
+        row = rows.get(instance_id)
+        if row is None:
+            detail = NOT_FOUND
+        elif row.status != PENDING:
+            detail = f"Approval is already {row.status}"
+        else:
+            machine = compiled.get(row.workflow_id)
+            step = machine.by_id.get(row.current_step_id) if machine else None
+            if step is None:
+                detail = f"Step {row.current_step_id} no longer exists in workflow {row.workflow_id}"
+            elif step.role != decision.approver_role:
+                detail = f"Approval is waiting for role {step.role}"
+            else:
+                groups.setdefault((row.workflow_id, step.id), []).append((index, instance_id))
+                continue
+        result.errors.append(schemas.ApprovalBulkError(index=index, id=instance_id, detail=detail))
+
+    finished: List[int] = []
+    actions = []
+    instance_table, inbox_table = models.ApprovalInstance.__table__, models.ApprovalInbox.__table__
+    for (workflow_id, step_id), members in groups.items():
+        transition = compiled[workflow_id].next(step_id, decision.action)
+        group_ids = [instance_id for _, instance_id in members]
+        next_step_id = transition.step.id if transition.step else None
+        db.execute(
+            update(instance_table)
+            .where(instance_table.c.id.in_(group_ids), instance_table.c.current_step_id == step_id)
+            .values(status=transition.status, current_step_id=next_step_id, updated_at=now,
+                    finished_at=None if transition.step else now)
+        )
+        if transition.step is not None:
+            db.execute(
+                update(inbox_table).where(inbox_table.c.instance_id.in_(group_ids))
+                .values(approver_role=transition.step.role, step_id=transition.step.id,
+                        step_name=transition.step.name, pending_since=now)
+            )
+        else:
+            finished.extend(group_ids)
+        for index, instance_id in members:
+            actions.append({"instance_id": instance_id, "step_id": step_id, "action": transition.action,
+                            "actor_id": decision.actor_id, "comment": decision.comment,
+                            "status": transition.status, "next_step_id": next_step_id, "created_at": now})
+            result.succeeded.append(schemas.ApprovalBulkItem(
+                index=index, id=instance_id, status=transition.status, current_step_id=next_step_id,
+                current_step_name=transition.step.name if transition.step else None,
+            ))
+    if finished:
+        db.execute(delete(inbox_table).where(inbox_table.c.instance_id.in_(finished)))
+    if actions:
+        db.execute(insert(models.ApprovalAction.__table__), actions)
+    db.commit()
+    if actions:
+        logger.info(f"{decision.actor_id} 批量{'同意' if decision.action == 'approve' else '拒绝'}了 "
+                    f"{len(actions)} 个审批，其中 {len(finished)} 个结束")
+    result.succeeded.sort(key=lambda item: item.index)
+    return result
+
+def decide(db: Session, instance_id: int, action: str,
+           decision: schemas.Decision) -> Optional[schemas.ApprovalInstance]:
+    """
+    同意或拒绝单个实例，与批量审批走同一流程
+
+    Raises:
+        ApprovalStateError: 实例已结束或当前步骤不属于 approver_role
+    """
+    result = batch_decide(db, schemas.BatchDecision(action=action, instance_ids=[instance_id],
+                                                    **decision.model_dump()))
+    if result.errors:
+        if result.errors[0].detail == NOT_FOUND:
+            return None
+        raise ApprovalStateError(result.errors[0].detail)
+    return get_instance(db, instance_id)
+
+def cancel(db: Session, instance_id: int, request: schemas.CancelRequest) -> Optional[schemas.ApprovalInstance]:
+    """
+    提交人撤回待审批的实例
+
+    Raises:
+        ApprovalStateError: 实例已结束或操作人不是提交人
+    """
+    instance = db.execute(
+        select(models.ApprovalInstance).where(models.ApprovalInstance.id == instance_id).with_for_update()
+    ).scalar_one_or_none()
+    if instance is None:
+        return None
+    if instance.status != PENDING:
+        db.rollback()
+        raise ApprovalStateError(f"Approval is already {instance.status}")
+    if instance.requester_id != request.actor_id:
+        db.rollback()
+        raise ApprovalStateError("Only the requester can cancel an approval")
+    now = datetime.now()
+    step_id = instance.current_step_id
+    instance.status, instance.current_step_id, instance.updated_at, instance.finished_at = CANCELLED, None, now, now
+    db.execute(delete(models.ApprovalInbox).where(models.ApprovalInbox.instance_id == instance_id))
+    db.add(models.ApprovalAction(instance_id=instance_id, step_id=step_id, action="cancel",
+                                 actor_id=request.actor_id, comment=request.comment, status=CANCELLED,
+                                 created_at=now))
+    db.commit()
+    return get_instance(db, instance_id)
@@ -0,0 +1,28 @@
+"""
+配置服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Text, TIMESTAMP
+
+from db_migrate import Migration, current_timestamp_default
+
+
+def _create_system_config(conn):
+    # 版本1的表结构；MySQL 下与原先的建表语句一致，SQLite 开发库也可以执行
+    Table(
+        "system_config", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("config_key", String(100), nullable=False, unique=True),
+        Column("config_value", Text),
+        Column("description", String(255)),
+        Column("created_at", TIMESTAMP, server_default=current_timestamp_default(conn)),
+        Column("updated_at", TIMESTAMP, server_default=current_timestamp_default(conn, on_update=True)),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+    ).create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    Migration(1, "create system_config", [_create_system_config]),
+]
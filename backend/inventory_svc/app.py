@@ -1,20 +1,86 @@
 import os
 import sys
+import asyncio
+import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
 # 设置项目根目录到PYTHONPATH
 root_dir = str(Path(__file__).parent.parent.parent)
 sys.path.append(root_dir)
 
+# 先加载 .env，导入 routes 时就会按环境变量创建数据库引擎
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
+
 # 使用绝对导入
-from backend.inventory_svc.routes import router
+from backend.inventory_svc.routes import router, ping_router
+from backend.inventory_svc.database import SessionLocal
+from backend.inventory_svc.services import inventory_service
+from backend.inventory_svc.services.alert_engine import low_stock_alerts
+from db_config import get_pool_stats
 
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
+logger = logging.getLogger(__name__)
+
+# 表结构由部署时执行的迁移创建（见 migrations.py 和根目录 db_migrate.py），启动时不再检查
+
+# 库存快照间隔（秒），0 表示不自动生成；多个 worker 同时到期时可能各生成一个快照，不影响报表结果
+SNAPSHOT_INTERVAL = float(os.environ.get("INVENTORY_SNAPSHOT_INTERVAL", 3600))
+# 读取其他进程库存流水、更新库存预警的间隔（秒）
+ALERT_POLL_INTERVAL = float(os.environ.get("INVENTORY_ALERT_POLL_INTERVAL", 2))
+
+
+def _snapshot_if_due():
+    db = SessionLocal()
+    try:
+        snapshot = inventory_service.create_snapshot_if_due(db, SNAPSHOT_INTERVAL)
+        if snapshot is not None:
+            logger.info(f"已生成库存快照 {snapshot.id}，共 {snapshot.item_count} 条库存")
+    finally:
+        db.close()
+
+
+async def _snapshot_loop():
+    while True:
+        try:
+            await run_in_threadpool(_snapshot_if_due)
+        except Exception as e:
+            logger.error(f"生成库存快照失败: {str(e)}")
+        await asyncio.sleep(min(SNAPSHOT_INTERVAL, 60))
 
-app = FastAPI(title="Inventory Service", description="库存管理服务", version="0.1.0")
+
+def _poll_alerts():
+    db = SessionLocal()
+    try:
+        low_stock_alerts.poll(db)
+    finally:
+        db.close()
+
+
+async def _alert_loop():
+    while True:
+        try:
+            await run_in_threadpool(_poll_alerts)
+        except Exception as e:
+            logger.error(f"更新库存预警失败: {str(e)}")
+        await asyncio.sleep(ALERT_POLL_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    tasks = [asyncio.create_task(_alert_loop())]
+    if SNAPSHOT_INTERVAL > 0:
+        tasks.append(asyncio.create_task(_snapshot_loop()))
+    yield
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(title="Inventory Service", description="库存管理服务", version="0.1.0", lifespan=lifespan)
 app.include_router(router)
+app.include_router(ping_router)
 
 @app.get("/", tags=["Root"], summary="Root endpoint for service health check")
 def read_root():
@@ -22,4 +88,8 @@ def read_root():
 
 @app.get("/health", tags=["Health"], summary="Health check endpoint")
 def health_check():
-    return {"status": "ok", "service": app.title}
\ No newline at end of file
+    return {"status": "ok", "service": app.title}
+
+@app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+def db_pool_stats():
+    return get_pool_stats("inventory_svc")
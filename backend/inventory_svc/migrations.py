@@ -0,0 +1,90 @@
+"""
+库存服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import (
+    MetaData, Table, Column, BigInteger, DateTime, Index, Integer, Numeric, String, Text, UniqueConstraint,
+)
+
+from db_migrate import Migration
+
+
+def _create_ledger(conn):
+    # 版本1的表结构，与当时的 models 一致
+    metadata = MetaData()
+    ledger_id = BigInteger().with_variant(Integer, "sqlite")
+    Table(
+        "inventories", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("material_id", String(36), nullable=False),
+        Column("warehouse_id", String(36), nullable=False),
+        Column("batch_no", String(50), nullable=False),
+        Column("quantity", Numeric(18, 4), nullable=False),
+        Column("unit", String(20)),
+        Column("version", Integer, nullable=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        UniqueConstraint("material_id", "warehouse_id", "batch_no", name="uq_inventories_key"),
+        Index("ix_inventories_warehouse_id", "warehouse_id"),
+    )
+    Table(
+        "inventory_transactions", metadata,
+        Column("id", ledger_id, primary_key=True, autoincrement=True),
+        Column("transaction_id", String(36), nullable=False),
+        Column("inventory_id", Integer, nullable=False),
+        Column("material_id", String(36), nullable=False),
+        Column("warehouse_id", String(36), nullable=False),
+        Column("batch_no", String(50), nullable=False),
+        Column("transaction_type", String(20), nullable=False),
+        Column("quantity", Numeric(18, 4), nullable=False),
+        Column("balance_after", Numeric(18, 4), nullable=False),
+        Column("balance_version", Integer, nullable=False),
+        Column("source_type", String(50)),
+        Column("source_id", String(36)),
+        Column("operator_id", String(36)),
+        Column("remark", Text),
+        Column("created_at", DateTime, nullable=False),
+        Index("ix_inventory_transactions_key_version", "material_id", "warehouse_id", "batch_no", "balance_version"),
+        Index("ix_inventory_transactions_created_at", "created_at"),
+        Index("ix_inventory_transactions_transaction_id", "transaction_id"),
+    )
+    Table(
+        "inventory_snapshots", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("snapshot_at", DateTime, nullable=False),
+        Column("item_count", Integer, nullable=False),
+        Index("ix_inventory_snapshots_snapshot_at", "snapshot_at"),
+    )
+    Table(
+        "inventory_snapshot_items", metadata,
+        Column("id", ledger_id, primary_key=True, autoincrement=True),
+        Column("snapshot_id", Integer, nullable=False),
+        Column("material_id", String(36), nullable=False),
+        Column("warehouse_id", String(36), nullable=False),
+        Column("batch_no", String(50), nullable=False),
+        Column("quantity", Numeric(18, 4), nullable=False),
+        Column("balance_version", Integer, nullable=False),
+        UniqueConstraint("snapshot_id", "material_id", "warehouse_id", "batch_no",
+                         name="uq_inventory_snapshot_items_key"),
+    )
+    metadata.create_all(conn)
+
+
+def _create_thresholds(conn):
+    Table(
+        "inventory_thresholds", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("material_id", String(36), nullable=False),
+        Column("warehouse_id", String(36), nullable=False),
+        Column("min_quantity", Numeric(18, 4), nullable=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        UniqueConstraint("material_id", "warehouse_id", name="uq_inventory_thresholds_key"),
+    ).create(conn)
+
+
+MIGRATIONS = [
+    Migration(1, "create inventory ledger", [_create_ledger]),
+    Migration(2, "create inventory_thresholds", [_create_thresholds]),
+]
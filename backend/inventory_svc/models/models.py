@@ -0,0 +1,106 @@
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Index, Integer, Numeric, String, Text, UniqueConstraint,
+)
+
+from backend.inventory_svc.database import Base
+
+# 数量统一保留4位小数
+Quantity = Numeric(18, 4)
+# SQLite 只有 INTEGER PRIMARY KEY 才会自增
+LedgerId = BigInteger().with_variant(Integer, "sqlite")
+
+
+# 按 (物料, 仓库, 批次) 物化的当前库存，与库存流水在同一事务中更新
+class Inventory(Base):
+    __tablename__ = "inventories"
+    __table_args__ = (
+        UniqueConstraint("material_id", "warehouse_id", "batch_no", name="uq_inventories_key"),
+        Index("ix_inventories_warehouse_id", "warehouse_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    material_id = Column(String(36), nullable=False)
+    warehouse_id = Column(String(36), nullable=False)
+    # 不分批次的库存使用空字符串，保证唯一键生效
+    batch_no = Column(String(50), nullable=False, default="")
+    quantity = Column(Quantity, nullable=False, default=0)
+    unit = Column(String(20))
+    # 每次变动加1，流水记录变动后的版本，用于快照与流水对齐
+    version = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<Inventory(id={self.id}, material_id='{self.material_id}', quantity={self.quantity})>"
+
+
+# 库存流水，只追加不修改
+class InventoryTransaction(Base):
+    __tablename__ = "inventory_transactions"
+    __table_args__ = (
+        Index("ix_inventory_transactions_key_version", "material_id", "warehouse_id", "batch_no", "balance_version"),
+        Index("ix_inventory_transactions_created_at", "created_at"),
+        Index("ix_inventory_transactions_transaction_id", "transaction_id"),
+    )
+
+    id = Column(LedgerId, primary_key=True, autoincrement=True)
+    # 同一次业务操作（如调拨的出、入两条流水）共用一个 transaction_id
+    transaction_id = Column(String(36), nullable=False)
+    inventory_id = Column(Integer, nullable=False)
+    material_id = Column(String(36), nullable=False)
+    warehouse_id = Column(String(36), nullable=False)
+    batch_no = Column(String(50), nullable=False, default="")
+    # in / out / transfer_in / transfer_out / adjust
+    transaction_type = Column(String(20), nullable=False)
+    # 带符号的变动数量，入库为正、出库为负
+    quantity = Column(Quantity, nullable=False)
+    balance_after = Column(Quantity, nullable=False)
+    balance_version = Column(Integer, nullable=False)
+    source_type = Column(String(50))
+    source_id = Column(String(36))
+    operator_id = Column(String(36))
+    remark = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+
+
+# 库存快照：snapshot_at 时刻全部库存的副本，明细在 inventory_snapshot_items
+class InventorySnapshot(Base):
+    __tablename__ = "inventory_snapshots"
+    __table_args__ = (
+        Index("ix_inventory_snapshots_snapshot_at", "snapshot_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    snapshot_at = Column(DateTime, nullable=False)
+    item_count = Column(Integer, nullable=False, default=0)
+
+
+class InventorySnapshotItem(Base):
+    __tablename__ = "inventory_snapshot_items"
+    __table_args__ = (
+        UniqueConstraint("snapshot_id", "material_id", "warehouse_id", "batch_no",
+                         name="uq_inventory_snapshot_items_key"),
+    )
+
+    id = Column(LedgerId, primary_key=True, autoincrement=True)
+    snapshot_id = Column(Integer, nullable=False)
+    material_id = Column(String(36), nullable=False)
+    warehouse_id = Column(String(36), nullable=False)
+    batch_no = Column(String(50), nullable=False, default="")
+    quantity = Column(Quantity, nullable=False)
+    balance_version = Column(Integer, nullable=False)
+
+
+# 安全库存：(物料, 仓库) 的各批次合计低于 min_quantity 时产生库存预警
+class InventoryThreshold(Base):
+    __tablename__ = "inventory_thresholds"
+    __table_args__ = (
+        UniqueConstraint("material_id", "warehouse_id", name="uq_inventory_thresholds_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    material_id = Column(String(36), nullable=False)
+    warehouse_id = Column(String(36), nullable=False)
+    min_quantity = Column(Quantity, nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
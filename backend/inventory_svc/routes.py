@@ -1,7 +1,175 @@
-from fastapi import APIRouter
+import json
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
 
-router = APIRouter()
+from backend.inventory_svc.schemas import (
+    Inventory, InventoryBalance, InventoryBalanceQuery, InventoryTransaction, InventoryReport, InventorySnapshot,
+    InventoryAlert, InventoryThreshold, InventoryThresholdSet,
+    StockIn, StockOut, StockTransfer, StockAdjust, StockMovementResult,
+)
+from backend.inventory_svc.services import inventory_service
+from backend.inventory_svc.services.alert_engine import low_stock_alerts
+from backend.inventory_svc.services.stock_coalescer import COALESCE_OUT, StockOutCoalescer
+from backend.inventory_svc.database import SessionLocal, get_db, get_read_db
 
-@router.get("/ping")
+router = APIRouter(
+    prefix="/api/v1/inventories",
+    tags=["inventories"],
+)
+
+# 同一库存行上并发的出库请求合并提交，见 services/stock_coalescer.py
+out_coalescer = StockOutCoalescer(SessionLocal) if COALESCE_OUT else None
+
+@router.get("/", response_model=List[Inventory])
+def read_inventories(
+    material_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    batch_no: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    return inventory_service.get_inventories(
+        db, material_id=material_id, warehouse_id=warehouse_id, batch_no=batch_no, skip=skip, limit=limit,
+    )
+
+# 按物料合计的库存，物料较多时用请求体传递物料列表（供物料需求计划等批量读取）
+@router.post("/balances", response_model=List[InventoryBalance])
+def read_balances(query: InventoryBalanceQuery, db: Session = Depends(get_read_db)):
+    return inventory_service.get_balances(db, material_ids=query.material_ids, warehouse_id=query.warehouse_id)
+
+# SSE 连接空闲时发送注释行的间隔（秒），防止代理断开连接
+ALERT_KEEPALIVE_SECONDS = 15
+
+def _movement_done(result: StockMovementResult) -> StockMovementResult:
+    # 本进程内的变动立即更新库存预警，其他进程的变动由 app.py 中的定时任务读取流水获得
+    low_stock_alerts.apply(result.transactions)
+    return result
+
+# 库存变动：更新物化库存并追加流水，库存不足等业务错误返回400
+@router.post("/in", response_model=StockMovementResult)
+def stock_in(request: StockIn, db: Session = Depends(get_db)):
+    return _movement_done(inventory_service.stock_in(db, request))
+
+@router.post("/out", response_model=StockMovementResult)
+def stock_out(request: StockOut, db: Session = Depends(get_db)):
+    try:
+        if out_coalescer is not None:
+            return _movement_done(out_coalescer.submit(request))
+        return _movement_done(inventory_service.stock_out(db, request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/transfer", response_model=StockMovementResult)
+def transfer_stock(request: StockTransfer, db: Session = Depends(get_db)):
+    try:
+        return _movement_done(inventory_service.transfer_stock(db, request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/adjust", response_model=StockMovementResult)
+def adjust_stock(request: StockAdjust, db: Session = Depends(get_db)):
+    return _movement_done(inventory_service.adjust_stock(db, request))
+
+@router.get("/movements", response_model=List[InventoryTransaction])
+def read_movements(
+    material_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    batch_no: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    return inventory_service.get_transactions(
+        db, material_id=material_id, warehouse_id=warehouse_id, batch_no=batch_no, after_id=after_id, limit=limit,
+    )
+
+@router.get("/report", response_model=InventoryReport)
+def read_report(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    material_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if date_from is not None and date_to is not None and date_to <= date_from:
+        raise HTTPException(status_code=400, detail="'date_to' must be later than 'date_from'")
+    return inventory_service.get_report(
+        db, date_to=date_to, date_from=date_from, material_id=material_id, warehouse_id=warehouse_id,
+    )
+
+@router.get("/alert", response_model=List[InventoryAlert])
+def read_alerts(material_id: Optional[str] = None, warehouse_id: Optional[str] = None):
+    if not low_stock_alerts.loaded:
+        raise HTTPException(status_code=503, detail="Inventory alerts are not loaded yet")
+    return low_stock_alerts.alerts(material_id=material_id, warehouse_id=warehouse_id)
+
+@router.get("/alert/stream", response_class=StreamingResponse)
+async def stream_alerts(request: Request):
+    """
+    以 server-sent events 推送库存预警变化：连接后先发送一次 snapshot（当前全部预警），
+    之后发送 raised / updated / cleared 事件；收到 resync 时应重新读取 /alert
+    """
+    queue = low_stock_alerts.subscribe()
+
+    async def events():
+        try:
+            alerts = [alert.model_dump(mode="json") for alert in low_stock_alerts.alerts()]
+            yield f"event: snapshot\ndata: {json.dumps(alerts, ensure_ascii=False)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=ALERT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+        finally:
+            low_stock_alerts.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/thresholds", response_model=List[InventoryThreshold])
+def read_thresholds(material_id: Optional[str] = None, warehouse_id: Optional[str] = None,
+                    db: Session = Depends(get_read_db)):
+    return inventory_service.get_thresholds(db, material_id=material_id, warehouse_id=warehouse_id)
+
+@router.put("/thresholds", response_model=InventoryThreshold)
+def set_threshold(request: InventoryThresholdSet, db: Session = Depends(get_db)):
+    threshold = inventory_service.set_threshold(db, request)
+    low_stock_alerts.refresh(db, request.material_id, request.warehouse_id)
+    return threshold
+
+@router.delete("/thresholds")
+def delete_threshold(material_id: str, warehouse_id: str, db: Session = Depends(get_db)):
+    if not inventory_service.delete_threshold(db, material_id, warehouse_id):
+        raise HTTPException(status_code=404, detail="Threshold not found")
+    low_stock_alerts.refresh(db, material_id, warehouse_id)
+    return {"deleted": True}
+
+@router.post("/snapshots", response_model=InventorySnapshot)
+def create_snapshot(db: Session = Depends(get_db)):
+    return inventory_service.create_snapshot(db)
+
+@router.get("/snapshots", response_model=List[InventorySnapshot])
+def read_snapshots(limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    return inventory_service.get_snapshots(db, limit=limit)
+
+@router.get("/{inventory_id}", response_model=Inventory)
+def read_inventory(inventory_id: int, db: Session = Depends(get_read_db)):
+    db_inventory = inventory_service.get_inventory(db, inventory_id)
+    if db_inventory is None:
+        raise HTTPException(status_code=404, detail="Inventory not found")
+    return db_inventory
+
+
+# 服务连通性检查（保留原有路径）
+ping_router = APIRouter()
+
+@ping_router.get("/ping")
 def ping():
-    return {"msg": "inventory_svc pong"}
\ No newline at end of file
+    return {"msg": "inventory_svc pong"}
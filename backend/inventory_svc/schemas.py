@@ -0,0 +1,132 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import List, Optional
+
+class StockRequestBase(BaseModel):
+    material_id: str = Field(..., max_length=36)
+    batch_no: str = Field("", max_length=50)
+    unit: Optional[str] = Field(None, max_length=20)
+    source_type: Optional[str] = Field(None, max_length=50)
+    source_id: Optional[str] = Field(None, max_length=36)
+    operator_id: Optional[str] = Field(None, max_length=36)
+    remark: Optional[str] = None
+
+class StockIn(StockRequestBase):
+    warehouse_id: str = Field(..., max_length=36)
+    quantity: float = Field(..., gt=0)
+
+class StockOut(StockRequestBase):
+    warehouse_id: str = Field(..., max_length=36)
+    quantity: float = Field(..., gt=0)
+
+class StockTransfer(StockRequestBase):
+    from_warehouse_id: str = Field(..., max_length=36)
+    to_warehouse_id: str = Field(..., max_length=36)
+    quantity: float = Field(..., gt=0)
+
+    @model_validator(mode="after")
+    def check_warehouses(self):
+        if self.from_warehouse_id == self.to_warehouse_id:
+            raise ValueError("from_warehouse_id and to_warehouse_id must differ")
+        return self
+
+class StockAdjust(StockRequestBase):
+    warehouse_id: str = Field(..., max_length=36)
+    # 盘点后的实际数量
+    quantity: float = Field(..., ge=0)
+
+class Inventory(BaseModel):
+    id: int
+    material_id: str
+    warehouse_id: str
+    batch_no: str
+    quantity: float
+    unit: Optional[str] = None
+    version: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class InventoryBalanceQuery(BaseModel):
+    # 为空时返回全部物料
+    material_ids: Optional[List[str]] = None
+    warehouse_id: Optional[str] = Field(None, max_length=36)
+
+class InventoryBalance(BaseModel):
+    material_id: str
+    # 各仓库、批次合计
+    quantity: float
+
+class InventoryTransaction(BaseModel):
+    id: int
+    transaction_id: str
+    inventory_id: int
+    material_id: str
+    warehouse_id: str
+    batch_no: str
+    transaction_type: str
+    quantity: float
+    balance_after: float
+    balance_version: int
+    source_type: Optional[str] = None
+    source_id: Optional[str] = None
+    operator_id: Optional[str] = None
+    remark: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StockMovementResult(BaseModel):
+    transaction_id: str
+    transactions: List[InventoryTransaction]
+    inventories: List[Inventory]
+
+class InventoryReportRow(BaseModel):
+    material_id: str
+    warehouse_id: str
+    batch_no: str
+    opening: Optional[float] = None
+    inbound: Optional[float] = None
+    outbound: Optional[float] = None
+    closing: float
+
+class InventoryReport(BaseModel):
+    date_from: Optional[datetime] = None
+    date_to: datetime
+    # 计算所用快照的时间，为空表示没有可用快照、由全部流水计算
+    snapshot_at: Optional[datetime] = None
+    rows: List[InventoryReportRow]
+
+class InventorySnapshot(BaseModel):
+    id: int
+    snapshot_at: datetime
+    item_count: int
+
+    class Config:
+        from_attributes = True
+
+class InventoryThresholdSet(BaseModel):
+    material_id: str = Field(..., max_length=36)
+    warehouse_id: str = Field(..., max_length=36)
+    min_quantity: float = Field(..., ge=0)
+
+class InventoryThreshold(InventoryThresholdSet):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class InventoryAlert(BaseModel):
+    material_id: str
+    warehouse_id: str
+    # 各批次合计
+    quantity: float
+    min_quantity: float
+    shortage: float
+    # 开始低于安全库存的时间（本进程观察到的时间）
+    since: datetime
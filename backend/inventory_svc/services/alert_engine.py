@@ -0,0 +1,250 @@
+"""
+库存预警
+
+维护低于安全库存的 (物料, 仓库) 集合，查询预警时直接读取，不再逐行比较全部库存与安全库存：
+- 启动时加载一次安全库存及对应库存行的数量和版本号；
+- 本进程内的库存变动提交后，立即用流水中的 balance_after 重新计算涉及的 (物料, 仓库)；
+- 定期按 id 增量读取库存流水，获取其他 worker 和服务实例的变动；安全库存表有变化时重新加载；
+- 预警集合变化时推送给订阅者（SSE，见 routes.py 的 /alert/stream）。
+
+只保存设置了安全库存的 (物料, 仓库) 的各批次数量；流水按 balance_version 判断新旧，
+重复应用或乱序到达都不会使数量回退。
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models import models
+from .. import schemas
+from .inventory_service import MAX_TRANSACTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+AlertKey = Tuple[str, str]
+
+# 每次增量读取的流水条数
+POLL_BATCH_SIZE = 1000
+# 订阅者积压的事件超过该数量时丢弃积压事件并发送 resync，客户端应重新读取 /alert
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def _offer(queue: asyncio.Queue, event: dict) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"event": "resync", "data": {}})
+
+
+class LowStockAlerts:
+    """
+    低于安全库存的 (物料, 仓库) 集合，各方法可在多个线程中调用
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._thresholds: Dict[AlertKey, Decimal] = {}
+        # (物料, 仓库) -> {批次: (数量, 版本号)}
+        self._batches: Dict[AlertKey, Dict[str, Tuple[Decimal, int]]] = {}
+        self._alerts: Dict[AlertKey, schemas.InventoryAlert] = {}
+        self._threshold_signature = None
+        # 已读取的最大流水 id，以及其之前尚未读到的 id（可能是未提交的事务）-> 发现时间
+        self._last_id: Optional[int] = None
+        self._missing: Dict[int, datetime] = {}
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+
+    @property
+    def loaded(self) -> bool:
+        return self._last_id is not None
+
+    def _read_signature(self, db: Session):
+        T = models.InventoryThreshold
+        return tuple(db.execute(select(func.count(), func.max(T.updated_at))).one())
+
+    def load(self, db: Session) -> None:
+        """
+        从数据库重新加载安全库存及对应的库存行，并重新计算全部预警
+        """
+        T = models.InventoryThreshold
+        I = models.Inventory
+        L = models.InventoryTransaction
+        # 先读流水位置再读库存，期间的变动会在之后的增量读取中按版本号补上
+        last_id = db.execute(select(func.coalesce(func.max(L.id), 0))).scalar()
+        signature = self._read_signature(db)
+        thresholds = {
+            (m, w): Decimal(min_quantity)
+            for m, w, min_quantity in db.execute(select(T.material_id, T.warehouse_id, T.min_quantity))
+        }
+        batches = defaultdict(dict)
+        rows = db.execute(
+            select(I.material_id, I.warehouse_id, I.batch_no, I.quantity, I.version)
+            .join(T, and_(T.material_id == I.material_id, T.warehouse_id == I.warehouse_id))
+        )
+        for m, w, b, quantity, version in rows:
+            batches[(m, w)][b] = (Decimal(quantity), version)
+
+        now = datetime.now()
+        with self._lock:
+            self._thresholds = thresholds
+            self._batches = {key: batches.get(key, {}) for key in thresholds}
+            self._threshold_signature = signature
+            if self._last_id is None:
+                self._last_id = last_id
+            for key in set(self._alerts) | set(thresholds):
+                self._evaluate(key, now)
+        logger.info(f"已加载 {len(thresholds)} 条安全库存，当前 {len(self._alerts)} 条库存预警")
+
+    def refresh(self, db: Session, material_id: str, warehouse_id: str) -> None:
+        """
+        重新读取一个 (物料, 仓库) 的安全库存和库存，用于本进程内修改安全库存后立即生效
+        """
+        T = models.InventoryThreshold
+        I = models.Inventory
+        key = (material_id, warehouse_id)
+        threshold = db.execute(
+            select(T.min_quantity).where(T.material_id == material_id, T.warehouse_id == warehouse_id)
+        ).scalar_one_or_none()
+        rows = db.execute(
+            select(I.batch_no, I.quantity, I.version).where(I.material_id == material_id, I.warehouse_id == warehouse_id)
+        ).all()
+        with self._lock:
+            if threshold is None:
+                self._thresholds.pop(key, None)
+                self._batches.pop(key, None)
+            else:
+                self._thresholds[key] = Decimal(threshold)
+                self._batches[key] = {b: (Decimal(quantity), version) for b, quantity, version in rows}
+            self._evaluate(key, datetime.now())
+
+    def apply(self, transactions: Iterable) -> None:
+        """
+        按库存流水更新库存并重新计算涉及的 (物料, 仓库)
+
+        Args:
+            transactions: 带 material_id、warehouse_id、batch_no、balance_after、balance_version 属性的流水
+        """
+        now = datetime.now()
+        with self._lock:
+            touched = set()
+            for transaction in transactions:
+                key = (transaction.material_id, transaction.warehouse_id)
+                batches = self._batches.get(key)
+                if batches is None:
+                    continue
+                current = batches.get(transaction.batch_no)
+                if current is not None and current[1] >= transaction.balance_version:
+                    continue
+                batches[transaction.batch_no] = (Decimal(str(transaction.balance_after)), transaction.balance_version)
+                touched.add(key)
+            for key in touched:
+                self._evaluate(key, now)
+
+    def poll(self, db: Session) -> None:
+        """
+        增量读取其他进程写入的流水；安全库存表有变化（或尚未加载）时重新加载
+        """
+        if not self.loaded or self._read_signature(db) != self._threshold_signature:
+            self.load(db)
+
+        L = models.InventoryTransaction
+        columns = (L.id, L.material_id, L.warehouse_id, L.batch_no, L.balance_after, L.balance_version)
+        now = datetime.now()
+        with self._lock:
+            missing = list(self._missing)
+        if missing:
+            # 之前跳过的 id 可能属于当时尚未提交的事务
+            rows = db.execute(select(*columns).where(L.id.in_(missing))).all()
+            self.apply(rows)
+            cutoff = now - timedelta(seconds=MAX_TRANSACTION_SECONDS)
+            with self._lock:
+                for row in rows:
+                    self._missing.pop(row.id, None)
+                # 超过最长事务时间仍未出现的 id 是回滚等原因留下的空号
+                for missing_id, noticed in list(self._missing.items()):
+                    if noticed < cutoff:
+                        del self._missing[missing_id]
+
+        while True:
+            rows = db.execute(
+                select(*columns).where(L.id > self._last_id).order_by(L.id).limit(POLL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            self.apply(rows)
+            with self._lock:
+                expected = self._last_id + 1
+                for row in rows:
+                    for missing_id in range(expected, row.id):
+                        self._missing[missing_id] = now
+                    expected = row.id + 1
+                self._last_id = rows[-1].id
+            if len(rows) < POLL_BATCH_SIZE:
+                break
+
+    def _evaluate(self, key: AlertKey, now: datetime) -> None:
+        # 调用方持有 self._lock
+        threshold = self._thresholds.get(key)
+        alert = self._alerts.get(key)
+        if threshold is not None:
+            quantity = sum((q for q, _ in self._batches.get(key, {}).values()), Decimal(0))
+            if quantity < threshold:
+                updated = schemas.InventoryAlert(
+                    material_id=key[0], warehouse_id=key[1],
+                    quantity=quantity, min_quantity=threshold, shortage=threshold - quantity,
+                    since=alert.since if alert is not None else now,
+                )
+                if alert is None or (alert.quantity, alert.min_quantity) != (updated.quantity, updated.min_quantity):
+                    self._alerts[key] = updated
+                    self._publish("raised" if alert is None else "updated", updated)
+                return
+        if alert is not None:
+            del self._alerts[key]
+            self._publish("cleared", alert)
+
+    def alerts(self, material_id: Optional[str] = None, warehouse_id: Optional[str] = None
+               ) -> List[schemas.InventoryAlert]:
+        """
+        当前的库存预警，按库存与安全库存的比例从低到高排列
+        """
+        with self._lock:
+            alerts = list(self._alerts.values())
+        if material_id is not None:
+            alerts = [alert for alert in alerts if alert.material_id == material_id]
+        if warehouse_id is not None:
+            alerts = [alert for alert in alerts if alert.warehouse_id == warehouse_id]
+        return sorted(alerts, key=lambda alert: (
+            alert.quantity / alert.min_quantity if alert.min_quantity else 0, alert.material_id, alert.warehouse_id,
+        ))
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        订阅预警变化，需在事件循环中调用；事件为 {"event": raised/updated/cleared/resync, "data": ...}
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    def _publish(self, event_type: str, alert: schemas.InventoryAlert) -> None:
+        event = {"event": event_type, "data": alert.model_dump(mode="json")}
+        for loop, queue in list(self._subscribers):
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # 订阅者所在的事件循环已关闭
+                self._subscribers.discard((loop, queue))
+
+
+# 进程内唯一的预警集合
+low_stock_alerts = LowStockAlerts()
@@ -0,0 +1,508 @@
+import os
+import uuid
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple, Union
+
+from ..models import models
+from .. import schemas
+
+logger = logging.getLogger(__name__)
+
+# 与 models.Quantity 的小数位数一致
+QUANTITY_EXP = Decimal("0.0001")
+
+# 快照时刻前仍可能未提交的流水的最长时间：计算快照之后的增量时，
+# 从 snapshot_at 往前多看这么久，再按 balance_version 过滤掉快照已包含的流水
+MAX_TRANSACTION_SECONDS = int(os.environ.get("INVENTORY_MAX_TRANSACTION_SECONDS", 300))
+
+# 超过保留天数的快照每天只保留最后一个
+SNAPSHOT_RETENTION_DAYS = int(os.environ.get("INVENTORY_SNAPSHOT_RETENTION_DAYS", 30))
+
+# IN 查询每批的物料数
+QUERY_CHUNK_SIZE = 1000
+
+StockKey = Tuple[str, str, str]
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, key: StockKey, available: Decimal, requested: Decimal):
+        self.key = key
+        self.available = available
+        self.requested = requested
+        material_id, warehouse_id, batch_no = key
+        super().__init__(
+            f"Insufficient stock for material {material_id} in warehouse {warehouse_id}"
+            f"{f' batch {batch_no}' if batch_no else ''}: available {available}, requested {requested}"
+        )
+
+
+def _to_quantity(value) -> Decimal:
+    return Decimal(str(value)).quantize(QUANTITY_EXP)
+
+
+def _key_filter(model, key: StockKey):
+    material_id, warehouse_id, batch_no = key
+    return and_(model.material_id == material_id, model.warehouse_id == warehouse_id, model.batch_no == batch_no)
+
+
+def _insert_missing(db: Session, key: StockKey, unit: Optional[str]) -> None:
+    """
+    库存行不存在时插入，并发请求已插入同一行时什么也不做（不报错，也不需要回滚到保存点）
+    """
+    material_id, warehouse_id, batch_no = key
+    now = datetime.now()
+    values = dict(material_id=material_id, warehouse_id=warehouse_id, batch_no=batch_no,
+                  quantity=Decimal(0), unit=unit, version=0, created_at=now, updated_at=now)
+    table = models.Inventory.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        db.execute(mysql.insert(table).values(**values).on_duplicate_key_update(id=table.c.id))
+    elif dialect == "sqlite":
+        db.execute(sqlite.insert(table).values(**values).on_conflict_do_nothing())
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(**values))
+        except IntegrityError:
+            pass
+
+
+def _lock_inventory(db: Session, key: StockKey, unit: Optional[str] = None,
+                    create: bool = True) -> Optional[models.Inventory]:
+    """
+    锁定 (物料, 仓库, 批次) 对应的库存行，不存在时按需创建
+    """
+    stmt = select(models.Inventory).where(_key_filter(models.Inventory, key)).with_for_update()
+    if create:
+        # 行不存在时，InnoDB 的 SELECT ... FOR UPDATE 只加间隙锁，两个请求同时创建同一行时都拿到间隙锁再插入，
+        # 其中一个会死锁（1213）。先不加锁地检查，不存在时插入（重复则忽略），之后锁定的一定是已存在的行；
+        # 不存在时才插入，避免每次都消耗自增值
+        exists = db.execute(select(models.Inventory.id).where(_key_filter(models.Inventory, key))).first()
+        if exists is None:
+            _insert_missing(db, key, unit)
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def _decrement(db: Session, key: StockKey, quantity: Decimal, now: datetime) -> Optional[models.Inventory]:
+    """
+    条件更新扣减库存：UPDATE ... WHERE quantity >= :n 在一条语句中完成检查和扣减，
+    不需要先 SELECT ... FOR UPDATE 再写回，也不会超卖
+
+    Returns:
+        扣减后的库存行（行锁由本事务持有），库存不足或库存行不存在时返回None
+    """
+    I = models.Inventory
+    result = db.execute(
+        update(I)
+        .where(_key_filter(I, key), I.quantity >= quantity)
+        .values(quantity=I.quantity - quantity, version=I.version + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return None
+    stmt = select(I).where(_key_filter(I, key)).execution_options(populate_existing=True)
+    return db.execute(stmt).scalar_one()
+
+
+def _insufficient(db: Session, key: StockKey, quantity: Decimal) -> InsufficientStockError:
+    I = models.Inventory
+    available = db.execute(select(I.quantity).where(_key_filter(I, key))).scalar_one_or_none()
+    db.rollback()
+    return InsufficientStockError(key, _to_quantity(available or 0), quantity)
+
+
+def _record(db: Session, inventory: models.Inventory, delta: Decimal, transaction_type: str,
+            transaction_id: str, request: schemas.StockRequestBase, now: datetime) -> models.InventoryTransaction:
+    # 按已更新的库存行追加一条流水
+    transaction = models.InventoryTransaction(
+        transaction_id=transaction_id,
+        inventory_id=inventory.id,
+        material_id=inventory.material_id,
+        warehouse_id=inventory.warehouse_id,
+        batch_no=inventory.batch_no,
+        transaction_type=transaction_type,
+        quantity=delta,
+        balance_after=inventory.quantity,
+        balance_version=inventory.version,
+        source_type=request.source_type,
+        source_id=request.source_id,
+        operator_id=request.operator_id,
+        remark=request.remark,
+        created_at=now,
+    )
+    db.add(transaction)
+    return transaction
+
+
+def _post(db: Session, inventory: models.Inventory, delta: Decimal, transaction_type: str,
+          transaction_id: str, request: schemas.StockRequestBase, now: datetime) -> models.InventoryTransaction:
+    # 调用方已锁定库存行：更新物化库存并追加一条流水
+    inventory.quantity = _to_quantity(inventory.quantity + delta)
+    inventory.version += 1
+    inventory.updated_at = now
+    if request.unit and not inventory.unit:
+        inventory.unit = request.unit
+    return _record(db, inventory, delta, transaction_type, transaction_id, request, now)
+
+
+def _result(db: Session, transaction_id: str, transactions: List[models.InventoryTransaction],
+            inventories: List[models.Inventory]) -> schemas.StockMovementResult:
+    db.flush()
+    result = schemas.StockMovementResult(
+        transaction_id=transaction_id,
+        transactions=[schemas.InventoryTransaction.model_validate(t) for t in transactions],
+        inventories=[schemas.Inventory.model_validate(i) for i in inventories],
+    )
+    db.commit()
+    return result
+
+
+def stock_in(db: Session, request: schemas.StockIn) -> schemas.StockMovementResult:
+    key = (request.material_id, request.warehouse_id, request.batch_no)
+    transaction_id = str(uuid.uuid4())
+    inventory = _lock_inventory(db, key, unit=request.unit)
+    transaction = _post(db, inventory, _to_quantity(request.quantity), "in", transaction_id, request, datetime.now())
+    return _result(db, transaction_id, [transaction], [inventory])
+
+
+def stock_out(db: Session, request: schemas.StockOut) -> schemas.StockMovementResult:
+    key = (request.material_id, request.warehouse_id, request.batch_no)
+    quantity = _to_quantity(request.quantity)
+    now = datetime.now()
+    inventory = _decrement(db, key, quantity, now)
+    if inventory is None:
+        raise _insufficient(db, key, quantity)
+    transaction_id = str(uuid.uuid4())
+    transaction = _record(db, inventory, -quantity, "out", transaction_id, request, now)
+    return _result(db, transaction_id, [transaction], [inventory])
+
+
+def stock_out_batch(db: Session, requests: List[schemas.StockOut]
+                    ) -> List[Union[schemas.StockMovementResult, InsufficientStockError]]:
+    """
+    合并同一库存行上的多个出库请求：只锁定一次库存行，按请求顺序逐个判断库存是否足够，
+    扣减合计数量（一条 UPDATE）并批量写入流水，库存不足的请求不影响其他请求
+
+    Args:
+        requests: 物料、仓库、批次都相同的出库请求
+
+    Returns:
+        与 requests 一一对应的出库结果，库存不足的请求对应 InsufficientStockError
+    """
+    key = (requests[0].material_id, requests[0].warehouse_id, requests[0].batch_no)
+    inventory = _lock_inventory(db, key, create=False)
+    available = inventory.quantity if inventory is not None else Decimal(0)
+    now = datetime.now()
+    outcomes = []
+    for request in requests:
+        quantity = _to_quantity(request.quantity)
+        if available < quantity:
+            outcomes.append(InsufficientStockError(key, available, quantity))
+            continue
+        available -= quantity
+        outcomes.append(_post(db, inventory, -quantity, "out", str(uuid.uuid4()), request, now))
+    if inventory is None:
+        db.rollback()
+        return outcomes
+
+    db.flush()
+    current = schemas.Inventory.model_validate(inventory)
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, InsufficientStockError):
+            results.append(outcome)
+            continue
+        # 每个请求返回扣减到该请求时的库存
+        results.append(schemas.StockMovementResult(
+            transaction_id=outcome.transaction_id,
+            transactions=[schemas.InventoryTransaction.model_validate(outcome)],
+            inventories=[current.model_copy(update={
+                "quantity": float(outcome.balance_after), "version": outcome.balance_version,
+            })],
+        ))
+    db.commit()
+    return results
+
+
+def transfer_stock(db: Session, request: schemas.StockTransfer) -> schemas.StockMovementResult:
+    source_key = (request.material_id, request.from_warehouse_id, request.batch_no)
+    target_key = (request.material_id, request.to_warehouse_id, request.batch_no)
+    quantity = _to_quantity(request.quantity)
+
+    now = datetime.now()
+
+    # 始终按键的顺序加锁，相反方向的并发调拨不会互相死锁；调出行用条件更新同时加锁和扣减
+    locked = {}
+    for key in sorted((source_key, target_key)):
+        if key == source_key:
+            locked[key] = _decrement(db, key, quantity, now)
+            if locked[key] is None:
+                raise _insufficient(db, key, quantity)
+        else:
+            locked[key] = _lock_inventory(db, key, unit=request.unit)
+
+    source = locked[source_key]
+    target = locked[target_key]
+    if target.unit is None:
+        target.unit = source.unit
+    transaction_id = str(uuid.uuid4())
+    transactions = [
+        _record(db, source, -quantity, "transfer_out", transaction_id, request, now),
+        _post(db, target, quantity, "transfer_in", transaction_id, request, now),
+    ]
+    return _result(db, transaction_id, transactions, [source, target])
+
+
+def adjust_stock(db: Session, request: schemas.StockAdjust) -> schemas.StockMovementResult:
+    key = (request.material_id, request.warehouse_id, request.batch_no)
+    inventory = _lock_inventory(db, key, unit=request.unit)
+    transaction_id = str(uuid.uuid4())
+    delta = _to_quantity(request.quantity) - inventory.quantity
+    transaction = _post(db, inventory, delta, "adjust", transaction_id, request, datetime.now())
+    return _result(db, transaction_id, [transaction], [inventory])
+
+
+def get_inventory(db: Session, inventory_id: int) -> Optional[models.Inventory]:
+    return db.get(models.Inventory, inventory_id)
+
+
+def get_inventories(db: Session, material_id: Optional[str] = None, warehouse_id: Optional[str] = None,
+                    batch_no: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[models.Inventory]:
+    stmt = select(models.Inventory).order_by(models.Inventory.id)
+    if material_id is not None:
+        stmt = stmt.where(models.Inventory.material_id == material_id)
+    if warehouse_id is not None:
+        stmt = stmt.where(models.Inventory.warehouse_id == warehouse_id)
+    if batch_no is not None:
+        stmt = stmt.where(models.Inventory.batch_no == batch_no)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def get_balances(db: Session, material_ids: Optional[List[str]] = None, warehouse_id: Optional[str] = None
+                 ) -> List[schemas.InventoryBalance]:
+    """
+    按物料合计各仓库、批次的库存，只返回数量不为0的物料
+    """
+    I = models.Inventory
+    stmt = select(I.material_id, func.sum(I.quantity)).where(I.quantity != 0).group_by(I.material_id)
+    if warehouse_id is not None:
+        stmt = stmt.where(I.warehouse_id == warehouse_id)
+    if material_ids is None:
+        rows = db.execute(stmt).all()
+    else:
+        rows = []
+        for begin in range(0, len(material_ids), QUERY_CHUNK_SIZE):
+            chunk = material_ids[begin:begin + QUERY_CHUNK_SIZE]
+            rows.extend(db.execute(stmt.where(I.material_id.in_(chunk))).all())
+    return [schemas.InventoryBalance(material_id=m, quantity=quantity) for m, quantity in rows]
+
+
+def get_transactions(db: Session, material_id: Optional[str] = None, warehouse_id: Optional[str] = None,
+                     batch_no: Optional[str] = None, after_id: Optional[int] = None,
+                     limit: int = 100) -> List[models.InventoryTransaction]:
+    stmt = select(models.InventoryTransaction).order_by(models.InventoryTransaction.id)
+    if material_id is not None:
+        stmt = stmt.where(models.InventoryTransaction.material_id == material_id)
+    if warehouse_id is not None:
+        stmt = stmt.where(models.InventoryTransaction.warehouse_id == warehouse_id)
+    if batch_no is not None:
+        stmt = stmt.where(models.InventoryTransaction.batch_no == batch_no)
+    if after_id is not None:
+        stmt = stmt.where(models.InventoryTransaction.id > after_id)
+    return list(db.execute(stmt.limit(limit)).scalars())
+
+
+# ---- 快照与报表 ----
+
+def _apply_filters(stmt, model, material_id: Optional[str], warehouse_id: Optional[str]):
+    if material_id is not None:
+        stmt = stmt.where(model.material_id == material_id)
+    if warehouse_id is not None:
+        stmt = stmt.where(model.warehouse_id == warehouse_id)
+    return stmt
+
+
+def latest_snapshot(db: Session, at: Optional[datetime] = None) -> Optional[models.InventorySnapshot]:
+    stmt = select(models.InventorySnapshot).order_by(models.InventorySnapshot.snapshot_at.desc()).limit(1)
+    if at is not None:
+        stmt = stmt.where(models.InventorySnapshot.snapshot_at <= at)
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def stock_at(db: Session, at: datetime, material_id: Optional[str] = None, warehouse_id: Optional[str] = None
+             ) -> Tuple[Dict[StockKey, Decimal], Optional[models.InventorySnapshot]]:
+    """
+    计算指定时刻的库存：取该时刻之前最近的快照，再加上快照之后的流水。
+
+    快照按库存行复制了数量和版本号，流水只需比较 balance_version，
+    即使流水的提交顺序与时间顺序不一致也不会重复或遗漏。
+
+    Returns:
+        ({(物料, 仓库, 批次): 数量}, 使用的快照；没有快照时为None)
+    """
+    snapshot = latest_snapshot(db, at)
+    stock: Dict[StockKey, Decimal] = defaultdict(Decimal)
+    T = models.InventoryTransaction
+    stmt = (
+        select(T.material_id, T.warehouse_id, T.batch_no, func.sum(T.quantity))
+        .where(T.created_at <= at)
+        .group_by(T.material_id, T.warehouse_id, T.batch_no)
+    )
+
+    if snapshot is not None:
+        S = models.InventorySnapshotItem
+        items = _apply_filters(
+            select(S.material_id, S.warehouse_id, S.batch_no, S.quantity).where(S.snapshot_id == snapshot.id),
+            S, material_id, warehouse_id,
+        )
+        for m, w, b, quantity in db.execute(items):
+            stock[(m, w, b)] += Decimal(quantity)
+        stmt = (
+            stmt.outerjoin(S, and_(
+                S.snapshot_id == snapshot.id,
+                S.material_id == T.material_id,
+                S.warehouse_id == T.warehouse_id,
+                S.batch_no == T.batch_no,
+            ))
+            .where(T.created_at > snapshot.snapshot_at - timedelta(seconds=MAX_TRANSACTION_SECONDS))
+            .where(or_(S.id.is_(None), T.balance_version > S.balance_version))
+        )
+
+    for m, w, b, delta in db.execute(_apply_filters(stmt, T, material_id, warehouse_id)):
+        stock[(m, w, b)] += Decimal(delta)
+    return {key: _to_quantity(quantity) for key, quantity in stock.items()}, snapshot
+
+
+def get_report(db: Session, date_to: Optional[datetime] = None, date_from: Optional[datetime] = None,
+               material_id: Optional[str] = None, warehouse_id: Optional[str] = None) -> schemas.InventoryReport:
+    """
+    库存报表：date_to 时刻的结存；指定 date_from 时同时给出期初结存和期间出入库数量
+    """
+    date_to = date_to or datetime.now()
+    closing, snapshot = stock_at(db, date_to, material_id, warehouse_id)
+    opening: Dict[StockKey, Decimal] = {}
+    flows: Dict[StockKey, Tuple[Decimal, Decimal]] = {}
+    if date_from is not None:
+        opening, _ = stock_at(db, date_from, material_id, warehouse_id)
+        T = models.InventoryTransaction
+        stmt = _apply_filters(
+            select(
+                T.material_id, T.warehouse_id, T.batch_no,
+                func.sum(case((T.quantity > 0, T.quantity), else_=0)),
+                func.sum(case((T.quantity < 0, -T.quantity), else_=0)),
+            )
+            .where(T.created_at > date_from, T.created_at <= date_to)
+            .group_by(T.material_id, T.warehouse_id, T.batch_no),
+            T, material_id, warehouse_id,
+        )
+        flows = {(m, w, b): (_to_quantity(i or 0), _to_quantity(o or 0)) for m, w, b, i, o in db.execute(stmt)}
+
+    rows = []
+    for key in sorted(set(closing) | set(opening) | set(flows)):
+        row = {"material_id": key[0], "warehouse_id": key[1], "batch_no": key[2],
+               "closing": closing.get(key, Decimal(0))}
+        if date_from is not None:
+            inbound, outbound = flows.get(key, (Decimal(0), Decimal(0)))
+            row.update(opening=opening.get(key, Decimal(0)), inbound=inbound, outbound=outbound)
+        rows.append(schemas.InventoryReportRow(**row))
+    return schemas.InventoryReport(
+        date_from=date_from, date_to=date_to,
+        snapshot_at=snapshot.snapshot_at if snapshot is not None else None,
+        rows=rows,
+    )
+
+
+def create_snapshot(db: Session) -> models.InventorySnapshot:
+    """
+    复制当前全部库存（数量和版本号）生成快照，并清理过期快照
+    """
+    snapshot = models.InventorySnapshot(snapshot_at=datetime.now(), item_count=0)
+    db.add(snapshot)
+    db.flush()
+    I = models.Inventory
+    S = models.InventorySnapshotItem
+    result = db.execute(insert(S).from_select(
+        ["snapshot_id", "material_id", "warehouse_id", "batch_no", "quantity", "balance_version"],
+        select(literal(snapshot.id), I.material_id, I.warehouse_id, I.batch_no, I.quantity, I.version),
+    ))
+    snapshot.item_count = result.rowcount
+    # 时间取复制完成之后：快照中的每条流水都早于该时间，之后的按版本号计入增量
+    snapshot.snapshot_at = datetime.now()
+    _prune_snapshots(db, snapshot.snapshot_at)
+    db.commit()
+    return snapshot
+
+
+def _prune_snapshots(db: Session, now: datetime) -> None:
+    cutoff = now - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+    old = db.execute(
+        select(models.InventorySnapshot.id, models.InventorySnapshot.snapshot_at)
+        .where(models.InventorySnapshot.snapshot_at < cutoff)
+    ).all()
+    last_per_day: Dict[object, Tuple[datetime, int]] = {}
+    for snapshot_id, snapshot_at in old:
+        day = snapshot_at.date()
+        if day not in last_per_day or snapshot_at > last_per_day[day][0]:
+            last_per_day[day] = (snapshot_at, snapshot_id)
+    keep = {snapshot_id for _, snapshot_id in last_per_day.values()}
+    expired = [snapshot_id for snapshot_id, _ in old if snapshot_id not in keep]
+    if expired:
+        db.execute(delete(models.InventorySnapshotItem).where(models.InventorySnapshotItem.snapshot_id.in_(expired)))
+        db.execute(delete(models.InventorySnapshot).where(models.InventorySnapshot.id.in_(expired)))
+
+
+def create_snapshot_if_due(db: Session, interval: float) -> Optional[models.InventorySnapshot]:
+    latest = latest_snapshot(db)
+    if latest is not None and (datetime.now() - latest.snapshot_at).total_seconds() < interval:
+        return None
+    return create_snapshot(db)
+
+
+def get_snapshots(db: Session, limit: int = 100) -> List[models.InventorySnapshot]:
+    stmt = select(models.InventorySnapshot).order_by(models.InventorySnapshot.snapshot_at.desc()).limit(limit)
+    return list(db.execute(stmt).scalars())
+
+
+# ---- 安全库存 ----
+
+def get_thresholds(db: Session, material_id: Optional[str] = None, warehouse_id: Optional[str] = None
+                   ) -> List[models.InventoryThreshold]:
+    stmt = _apply_filters(select(models.InventoryThreshold), models.InventoryThreshold, material_id, warehouse_id)
+    return list(db.execute(stmt.order_by(models.InventoryThreshold.id)).scalars())
+
+
+def set_threshold(db: Session, request: schemas.InventoryThresholdSet) -> models.InventoryThreshold:
+    """
+    设置 (物料, 仓库) 的安全库存，已存在时更新
+    """
+    T = models.InventoryThreshold
+    now = datetime.now()
+    stmt = select(T).where(T.material_id == request.material_id, T.warehouse_id == request.warehouse_id)
+    threshold = db.execute(stmt).scalar_one_or_none()
+    if threshold is None:
+        try:
+            with db.begin_nested():
+                threshold = T(material_id=request.material_id, warehouse_id=request.warehouse_id,
+                              min_quantity=_to_quantity(request.min_quantity), created_at=now, updated_at=now)
+                db.add(threshold)
+        except IntegrityError:
+            threshold = db.execute(stmt).scalar_one()
+    threshold.min_quantity = _to_quantity(request.min_quantity)
+    threshold.updated_at = now
+    db.commit()
+    db.refresh(threshold)
+    return threshold
+
+
+def delete_threshold(db: Session, material_id: str, warehouse_id: str) -> bool:
+    T = models.InventoryThreshold
+    result = db.execute(delete(T).where(T.material_id == material_id, T.warehouse_id == warehouse_id))
+    db.commit()
+    return result.rowcount > 0
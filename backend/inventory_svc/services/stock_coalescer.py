@@ -0,0 +1,97 @@
+"""
+出库请求合并
+
+热门物料被多个拣货员同时出库时，每个请求各自锁定同一库存行，只能排队串行执行。
+开启合并（INVENTORY_COALESCE_OUT=true）后，同一进程内同一库存行上并发的出库请求
+由第一个到达的请求稍等片刻后一起提交：锁定一次库存行、执行一条 UPDATE、批量写入流水。
+合并只在单个进程内生效，多个 worker 之间仍依靠数据库行锁保证不超卖。
+"""
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from . import inventory_service
+
+COALESCE_OUT = os.environ.get("INVENTORY_COALESCE_OUT", "false").lower() in ("1", "true", "yes")
+# 首个请求等待后续请求的时间（毫秒）和每批最多合并的请求数
+COALESCE_WINDOW_MS = float(os.environ.get("INVENTORY_COALESCE_WINDOW_MS", 2))
+COALESCE_MAX_BATCH = int(os.environ.get("INVENTORY_COALESCE_MAX_BATCH", 64))
+
+
+class _Batch:
+    __slots__ = ("requests", "futures", "full")
+
+    def __init__(self):
+        self.requests: List[schemas.StockOut] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+
+class StockOutCoalescer:
+    """
+    按 (物料, 仓库, 批次) 合并并发的出库请求
+
+    Args:
+        session_factory: 创建数据库会话的函数，整批请求在首个请求所在线程中用新会话提交
+        window: 首个请求等待后续请求的最长时间（秒）
+        max_batch: 每批最多合并的请求数，达到后立即提交
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], window: float = COALESCE_WINDOW_MS / 1000,
+                 max_batch: int = COALESCE_MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: Dict[inventory_service.StockKey, _Batch] = {}
+
+    def submit(self, request: schemas.StockOut) -> schemas.StockMovementResult:
+        """
+        提交出库请求并等待所在批次执行完成，结果与 inventory_service.stock_out 相同
+
+        Raises:
+            InsufficientStockError: 库存不足
+        """
+        key = (request.material_id, request.warehouse_id, request.batch_no)
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.requests.append(request)
+            batch.futures.append(future)
+            if len(batch.requests) >= self.max_batch:
+                # 批次已满，之后到达的请求进入新批次
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            self._execute(batch)
+
+        outcome = future.result()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _execute(self, batch: _Batch) -> None:
+        db = self.session_factory()
+        try:
+            outcomes = inventory_service.stock_out_batch(db, batch.requests)
+        except Exception as e:
+            # 数据库错误时整批失败，各请求都收到同一异常
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        finally:
+            db.close()
+        for future, outcome in zip(batch.futures, outcomes):
+            future.set_result(outcome)
@@ -1,12 +1,26 @@
 import os
 import sys
+import copy
+import json
+import heapq
+import queue
+import signal
+import argparse
 import subprocess
 import logging
 import time
 import socket
+import selectors
+import http.client
+import http.server
+import importlib.util
+import threading
 import requests
 from pathlib import Path
-from typing import Dict, List, Optional
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from requests.exceptions import RequestException
 
 # 配置日志
@@ -58,315 +72,1380 @@ except ImportError:
     }
 
 # 服务配置
+# depends_on: 启动前必须就绪的服务，无依赖关系的服务并行启动
+# workers: 生产模式（--mode prod）下的 uvicorn 工作进程数
+# standby: 使用 --standby 时为该服务预先启动热备进程，主进程退出后立即接管
 SERVICES = {
     'plan_svc': {
         'port': 8001,
-        'description': '生产计划服务'
+        'description': '生产计划服务',
+        'depends_on': ['material_svc', 'scheduler_svc'],
+        'workers': 4
     },
     'order_svc': {
         'port': 8002,
-        'description': '订单服务'
+        'description': '订单服务',
+        'depends_on': ['approval_svc', 'inventory_svc'],
+        'workers': 2
     },
     'approval_svc': {
         'port': 8003,
-        'description': '审批服务'
+        'description': '审批服务',
+        'depends_on': ['config_svc'],
+        'workers': 2,
+        'standby': True
     },
     'inventory_svc': {
         'port': 8004,
-        'description': '库存服务'
+        'description': '库存服务',
+        'depends_on': ['material_svc'],
+        'workers': 4
     },
     'material_svc': {
         'port': 8005,
-        'description': '物料服务'
+        'description': '物料服务',
+        'depends_on': ['config_svc'],
+        'workers': 2
     },
     'config_svc': {
         'port': 8006,
-        'description': '配置服务'
+        'description': '配置服务',
+        'depends_on': [],
+        'workers': 1,
+        'standby': True
     },
     'scheduler_svc': {
         'port': 8007,
-        'description': '调度服务'
+        'description': '调度服务',
+        'depends_on': ['config_svc'],
+        'workers': 1
     },
     'shift_svc': {
         'port': 8008,
-        'description': '班次服务'
+        'description': '班次服务',
+        'depends_on': ['scheduler_svc'],
+        'workers': 1
     }
 }
 
+# 单进程合并部署（--monolith）：全部服务挂载在一个应用中，见 monolith.py
+MONOLITH_SERVICES = {
+    'monolith': {
+        'port': 8000,
+        'description': '全部服务（单进程合并部署）',
+        'depends_on': [],
+        'workers': 1,
+        'module': 'backend.monolith:app'
+    }
+}
+
+
+def build_uvicorn_command(service_name: str, port: int, mode: str = 'dev', workers: int = 1,
+                          limit_concurrency: Optional[int] = None, backlog: Optional[int] = None,
+                          uds: Optional[str] = None, module_path: Optional[str] = None,
+                          fd: Optional[int] = None) -> List[str]:
+    """
+    构建启动服务的 uvicorn 命令行
+
+    开发模式使用 --reload 单进程；生产模式不监听文件变化，按 workers 启动多个工作进程，
+    并在已安装时使用 uvloop / httptools
+    """
+    # 使用模块路径格式启动，避免相对导入问题
+    module_path = module_path or f'backend.{service_name}.app:app'
+    cmd = [sys.executable, '-m', 'uvicorn', module_path]
+    if fd is not None:
+        # 监听套接字由启动器创建并继承给子进程
+        cmd.append(f'--fd={fd}')
+    elif uds:
+        cmd.append(f'--uds={uds}')
+    else:
+        cmd.append(f'--port={port}')
+    if mode == 'dev':
+        cmd.append('--reload')
+        return cmd
+
+    cmd.append(f'--workers={max(workers, 1)}')
+    if importlib.util.find_spec('uvloop') is not None:
+        cmd.append('--loop=uvloop')
+    if importlib.util.find_spec('httptools') is not None:
+        cmd.append('--http=httptools')
+    if limit_concurrency:
+        cmd.append(f'--limit-concurrency={limit_concurrency}')
+    if backlog:
+        cmd.append(f'--backlog={backlog}')
+    return cmd
+
+
+def _remove_stale_socket(uds: str) -> bool:
+    """
+    删除无人监听的遗留 Unix 套接字文件
+
+    Returns:
+        bool: 套接字路径可以使用时返回True，已有进程在监听时返回False
+    """
+    if not os.path.exists(uds):
+        return True
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(uds)
+        return False
+    except OSError:
+        os.unlink(uds)
+        return True
+    finally:
+        sock.close()
+
+
+def _port_in_use(port: int) -> bool:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name != 'nt':
+        # 与 uvicorn 一致允许复用 TIME_WAIT 状态的端口，服务退出后可以立即重启
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind(('localhost', port))
+        return False
+    except socket.error:
+        return True
+    finally:
+        sock.close()
+
+
+# 服务进程以新会话启动，成为进程组组长（进程组号即其 pid）。生产模式下 uvicorn 的工作进程与主进程同组，
+# 按进程组发送信号才能一起停止；主进程意外退出后，仍在监听端口的遗留工作进程也能按进程组找到
+_NEW_SESSION = {'start_new_session': True} if os.name != 'nt' else {}
+
+
+def signal_process_group(pgid: int, sig: int) -> bool:
+    """
+    向进程组发送信号
+
+    Returns:
+        bool: 进程组中还有进程时返回True
+    """
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def kill_service(process: subprocess.Popen) -> None:
+    """
+    强制结束服务进程及其全部工作进程。正常停止时只向主进程发送 SIGTERM，由它通知工作进程并等待退出——
+    工作进程同时收到进程组的信号会被视为第二次中断而跳过优雅关闭
+    """
+    if os.name == 'nt':
+        process.kill()
+    else:
+        signal_process_group(process.pid, signal.SIGKILL)
+
+
+def _service_process_env(service_name: str, port: int, warn: bool = True) -> Dict[str, str]:
+    # 子进程环境变量
+    env = os.environ.copy()
+    env['PYTHONPATH'] = f"{root_dir}{os.pathsep}{env.get('PYTHONPATH', '')}"
+    env['SERVICE_PORT'] = str(port)
+
+    # 设置服务特定的数据库名称
+    if service_name in SERVICE_DB_NAMES:
+        env['DB_NAME'] = SERVICE_DB_NAMES[service_name]
+        logger.info(f"为服务 {service_name} 设置数据库名称: {SERVICE_DB_NAMES[service_name]}")
+    elif warn:
+        logger.warning(f"服务 {service_name} 没有配置特定的数据库名称，使用默认值")
+    return env
 
-def start_service(service_name: str, port: int) -> Optional[subprocess.Popen]:
+
+def start_service(service_name: str, port: int, mode: str = 'dev', workers: int = 1,
+                  limit_concurrency: Optional[int] = None, backlog: Optional[int] = None,
+                  uds: Optional[str] = None, module_path: Optional[str] = None,
+                  fd: Optional[int] = None) -> Optional[subprocess.Popen]:
     """
     启动指定的微服务
     
     Args:
         service_name: 服务名称
         port: 服务端口
+        mode: 'dev'（--reload 单进程）或 'prod'（多工作进程）
+        workers: 生产模式下的工作进程数
+        limit_concurrency: 每个工作进程允许的最大并发连接数
+        backlog: 监听队列长度
+        uds: 绑定的 Unix 套接字路径，为空时监听端口
+        module_path: uvicorn 应用路径，为空时使用 backend.<服务名>.app:app
+        fd: 启动器已创建的监听套接字，传入时不再检查端口
         
     Returns:
         subprocess.Popen: 启动的进程对象，如果启动失败则返回None
     """
-    service_dir = os.path.join(os.path.dirname(__file__), service_name)
-    
-    if not os.path.exists(service_dir):
-        logger.error(f"服务目录不存在: {service_dir}")
-        return None
-        
-    app_path = os.path.join(service_dir, 'app.py')
-    if not os.path.exists(app_path):
-        logger.error(f"服务入口文件不存在: {app_path}")
-        return None
+    if module_path:
+        service_dir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        service_dir = os.path.join(os.path.dirname(__file__), service_name)
+
+        if not os.path.exists(service_dir):
+            logger.error(f"服务目录不存在: {service_dir}")
+            return None
+
+        app_path = os.path.join(service_dir, 'app.py')
+        if not os.path.exists(app_path):
+            logger.error(f"服务入口文件不存在: {app_path}")
+            return None
     
-    # 检查端口是否被占用
-    import socket
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        sock.bind(('localhost', port))
-    except socket.error:
+    if fd is not None:
+        # 监听套接字由启动器持有，无需检查
+        pass
+    elif uds:
+        if not _remove_stale_socket(uds):
+            logger.error(f"Unix套接字 {uds} 已被占用，无法启动服务 {service_name}")
+            return None
+    elif _port_in_use(port):
         logger.error(f"端口 {port} 已被占用，无法启动服务 {service_name}")
         return None
-    finally:
-        sock.close()
     
     try:
-        # 设置环境变量
-        env = os.environ.copy()
-        env['PYTHONPATH'] = f"{root_dir};{env.get('PYTHONPATH', '')}"
-        env['SERVICE_PORT'] = str(port)
-        
-        # 设置服务特定的数据库名称
-        if service_name in SERVICE_DB_NAMES:
-            env['DB_NAME'] = SERVICE_DB_NAMES[service_name]
-            logger.info(f"为服务 {service_name} 设置数据库名称: {SERVICE_DB_NAMES[service_name]}")
-        else:
-            logger.warning(f"服务 {service_name} 没有配置特定的数据库名称，使用默认值")
+        env = _service_process_env(service_name, port, warn=not module_path)
+        if uds:
+            # 合并部署时调度服务的执行进程经该套接字访问合并应用（见 monolith.py）
+            env['SERVICE_UDS'] = uds
         
         # 检查依赖文件
         requirements_path = os.path.join(service_dir, 'requirements.txt')
-        if os.path.exists(requirements_path):
+        if not module_path and os.path.exists(requirements_path):
             logger.info(f"检查 {service_name} 的依赖项...")
             # 这里可以添加依赖检查逻辑，但为了简化，暂不实现
         
-        # 启动服务 - 使用模块路径格式启动，避免相对导入问题
-        module_path = f'backend.{service_name}.app:app'
-        cmd = [sys.executable, '-m', 'uvicorn', module_path, '--reload', f'--port={port}']
+        cmd = build_uvicorn_command(service_name, port, mode=mode, workers=workers,
+                                    limit_concurrency=limit_concurrency, backlog=backlog, uds=uds,
+                                    module_path=module_path, fd=fd)
         process = subprocess.Popen(
             cmd,
             cwd=service_dir,
             env=env,
+            # 以二进制方式读取，由 LogMultiplexer 负责按行切分和解码
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+            pass_fds=(fd,) if fd is not None else (),
+            **_NEW_SESSION
         )
         
-        # 等待短暂时间，检查进程是否立即退出（表示启动失败）
-        import time
-        time.sleep(0.5)
-        if process.poll() is not None:
-            logger.error(f"服务 {service_name} 启动失败，进程立即退出，退出码: {process.returncode}")
-            return None
-        
-        logger.info(f"已启动服务 {service_name} 在端口 {port}")
+        # 是否启动成功由 wait_for_service_ready 轮询判断，这里不再固定等待
+        logger.info(f"已启动服务 {service_name} 在{f'Unix套接字 {uds}' if uds else f'端口 {port}'}"
+                    f"（{mode} 模式{f'，{workers} 个工作进程' if mode == 'prod' else ''}）")
         return process
     except Exception as e:
         logger.error(f"启动服务 {service_name} 失败: {str(e)}")
         return None
 
 
-def monitor_processes(processes: Dict[str, subprocess.Popen]) -> None:
+def start_standby(service_name: str, port: int, fd: int, module_path: Optional[str] = None,
+                  limit_concurrency: Optional[int] = None, backlog: Optional[int] = None, workers: int = 1
+                  ) -> Optional[subprocess.Popen]:
     """
-    监控所有服务进程的输出
-    
+    启动热备进程：预先导入服务代码并建立数据库连接，然后等待接管指令（见 standby.py）
+
     Args:
-        processes: 服务名称到进程对象的映射
+        service_name: 服务名称
+        port: 服务端口（仅用于设置环境变量）
+        fd: 启动器持有的监听套接字，接管后在其上提供服务
+        module_path: 应用路径，为空时使用 backend.<服务名>.app:app
+        workers: 接管后的工作进程数，与主进程一致
+
+    Returns:
+        subprocess.Popen: 热备进程对象，通过其标准输入发送接管指令；启动失败返回None
     """
-    import time
-    import threading
-    import queue
+    module_path = module_path or f'backend.{service_name}.app:app'
+    cmd = [sys.executable, '-m', 'backend.standby', module_path, f'--fd={fd}']
+    if limit_concurrency:
+        cmd.append(f'--limit-concurrency={limit_concurrency}')
+    if backlog:
+        cmd.append(f'--backlog={backlog}')
+    if workers > 1:
+        cmd.append(f'--workers={workers}')
+    try:
+        process = subprocess.Popen(
+            cmd,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=_service_process_env(service_name, port, warn=False),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=(fd,),
+            **_NEW_SESSION
+        )
+    except Exception as e:
+        logger.error(f"启动服务 {service_name} 的热备进程失败: {str(e)}")
+        return None
+    logger.info(f"已启动服务 {service_name} 的热备进程")
+    return process
+
+
+class _OutputStream:
+    """
+    单个子进程输出管道（stdout 或 stderr）的读取状态
+    """
+
+    def __init__(self, service_name: str, stream_name: str, pipe):
+        self.service_name = service_name
+        self.stream_name = stream_name
+        self.pipe = pipe
+        self.fd = pipe.fileno()
+        self.partial = b''
+        self.eof = False
+        self.registered = False
+        # Windows 下管道不能用于 select，由读线程转发数据，暂停时阻塞读线程
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+
+
+class LogMultiplexer:
+    """
+    单线程、事件驱动的子进程输出多路复用器
+
+    - POSIX 下通过 selectors 直接监听所有子进程的 stdout/stderr 管道，空闲时不占用 CPU；
+      Windows 的 select 不支持管道，改由每个管道一个阻塞读线程转发数据，处理逻辑相同
+    - 每次读取最多 64KB，按服务和流成批输出，每行都带服务名，可选 JSON 格式
+    - 按服务做令牌桶限速：overflow='drop' 时丢弃超出的行并计数，
+      overflow='block' 时暂停读取该服务的管道，使子进程在写满管道后阻塞（背压）
+    - 同一个线程负责发现子进程退出
+    """
+
+    READ_SIZE = 65536
+    DROP_REPORT_INTERVAL = 5.0
+
+    def __init__(self, json_format: bool = False, rate_limit: float = 2000.0, burst: float = 10000.0,
+                 overflow: str = 'drop', exit_poll_interval: float = 1.0,
+                 on_exit: Optional[Callable[[str, subprocess.Popen], None]] = None):
+        if overflow not in ('drop', 'block'):
+            raise ValueError(f"不支持的溢出策略: {overflow}")
+        self.json_format = json_format
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.overflow = overflow
+        self.exit_poll_interval = exit_poll_interval
+        self.on_exit = on_exit
+
+        self.processes: Dict[str, subprocess.Popen] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._streams: Dict[str, List[_OutputStream]] = {}
+        self._tokens: Dict[str, float] = {}
+        self._refilled_at: Dict[str, float] = {}
+        self._paused: set = set()
+        self._unreported_drops: Dict[str, int] = {}
+        self._last_drop_report = time.monotonic()
+
+        self._use_selector = os.name != 'nt'
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._inbox = queue.SimpleQueue()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._output_logger = logger
+        if json_format:
+            # JSON 行直接写入，不再加日志前缀
+            self._output_logger = logging.getLogger('backend_starter.output')
+            self._output_logger.propagate = False
+            for handler in logger.handlers or logging.getLogger().handlers:
+                clone = copy.copy(handler)
+                clone.setFormatter(logging.Formatter('%(message)s'))
+                self._output_logger.addHandler(clone)
 
-    def enqueue_output(out, q, service_name, stream_name):
+    # ---- 供其他线程调用的接口 ----
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='log-multiplexer', daemon=True)
+        self._thread.start()
+
+    def add_process(self, service_name: str, process: subprocess.Popen) -> None:
+        """
+        登记一个新启动的子进程，之后其输出和退出都由多路复用线程处理
+        """
+        self._inbox.put(('add', service_name, process))
+        self._wake()
+
+    def rename_process(self, old_name: str, new_name: str) -> None:
+        """
+        修改已登记进程的服务名（如热备进程接管服务后改用服务名输出日志）
+        """
+        self._inbox.put(('rename', old_name, new_name))
+        self._wake()
+
+    def close(self) -> None:
+        """
+        不再登记新进程；已登记的进程全部退出后线程结束
+        """
+        self._inbox.put(('close', None, None))
+        self._wake()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # 唤醒缓冲区已满，线程必然会被唤醒
+
+    # ---- 多路复用线程 ----
+
+    def _run(self) -> None:
         try:
-            for line in iter(out.readline, ''):
-                if not line: # Check for empty line which might indicate EOF
-                    break
-                q.put((service_name, stream_name, line))
-        except ValueError: # Handle cases where the stream is closed
-            pass # Stream closed, exiting thread
+            while not (self._closing and not self.processes):
+                for key, _ in self._selector.select(self._next_timeout()):
+                    if key.data is None:
+                        self._drain_inbox()
+                    else:
+                        self._read(key.data)
+                self._resume_paused()
+                self._check_exits()
+                self._report_drops()
         finally:
-            out.close()
-    
-    output_queue = queue.Queue()
-    threads = []
-
-    for service_name, process in processes.items():
-        # stdout thread
-        t_stdout = threading.Thread(target=enqueue_output, args=(process.stdout, output_queue, service_name, 'stdout'))
-        t_stdout.daemon = True
-        t_stdout.start()
-        threads.append(t_stdout)
-
-        # stderr thread
-        t_stderr = threading.Thread(target=enqueue_output, args=(process.stderr, output_queue, service_name, 'stderr'))
-        t_stderr.daemon = True
-        t_stderr.start()
-        threads.append(t_stderr)
+            self._report_drops(force=True)
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
 
-    try:
-        while processes:
-            # 检查所有进程是否仍在运行
-            active_processes = {}
-            for service_name, process in list(processes.items()):
-                if process.poll() is None:
-                    active_processes[service_name] = process
-                else:
-                    logger.warning(f"服务 {service_name} 已退出，退出码: {process.returncode}")
-                    # 确保所有输出都被读取
-                    while not output_queue.empty():
-                        try:
-                            s_name, stream_name, line = output_queue.get_nowait()
-                            line = line.strip()
-                            if line:
-                                if s_name == service_name: # Log output for the exited process
-                                    if stream_name == 'stdout':
-                                        logger.info(f"{s_name}: {line}")
-                                    else:
-                                        logger.error(f"{s_name} 错误: {line}")
-                        except queue.Empty:
-                            break # Queue is empty
-            processes = active_processes
-            if not processes and output_queue.empty(): # All processes exited and queue is empty
-                break
-
-            # 处理队列中的输出
+    def _next_timeout(self) -> float:
+        timeout = self.exit_poll_interval
+        for service_name in self._paused:
+            # 令牌恢复到非负所需的时间
+            timeout = min(timeout, max(-self._tokens[service_name] / self.rate_limit, 0.001))
+        return timeout
+
+    def _drain_inbox(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        while True:
             try:
-                service_name, stream_name, line = output_queue.get(timeout=0.1)
-                line = line.strip()
-                if line:
-                    if stream_name == 'stdout':
-                        logger.info(f"{service_name}: {line}")
-                    else:
-                        logger.error(f"{service_name} 错误: {line}")
+                kind, first, second = self._inbox.get_nowait()
             except queue.Empty:
-                pass # No output in queue, continue
-            
-            time.sleep(0.01) # Shorter sleep to be more responsive
+                return
+            if kind == 'add':
+                self._register_process(first, second)
+            elif kind == 'rename':
+                self._rename_process(first, second)
+            elif kind == 'data':
+                self._consume(first, second)
+            elif kind == 'close':
+                self._closing = True
+
+    def _register_process(self, service_name: str, process: subprocess.Popen) -> None:
+        self.processes[service_name] = process
+        self.stats.setdefault(service_name, {'lines': 0, 'dropped': 0, 'paused': 0})
+        self._tokens[service_name] = self.burst
+        self._refilled_at[service_name] = time.monotonic()
+        streams = []
+        for stream_name, pipe in (('stdout', process.stdout), ('stderr', process.stderr)):
+            if pipe is None:
+                continue
+            stream = _OutputStream(service_name, stream_name, pipe)
+            streams.append(stream)
+            if self._use_selector:
+                os.set_blocking(stream.fd, False)
+                self._selector.register(stream.fd, selectors.EVENT_READ, stream)
+                stream.registered = True
+            else:
+                threading.Thread(target=self._pipe_reader, args=(stream,), daemon=True,
+                                 name=f'log-reader-{service_name}-{stream_name}').start()
+        self._streams[service_name] = streams
+
+    def _rename_process(self, old_name: str, new_name: str) -> None:
+        process = self.processes.pop(old_name, None)
+        if process is None:
+            return  # 进程已退出
+        self.processes[new_name] = process
+        self.stats.setdefault(new_name, {'lines': 0, 'dropped': 0, 'paused': 0})
+        self._tokens[new_name] = self._tokens.pop(old_name)
+        self._refilled_at[new_name] = self._refilled_at.pop(old_name)
+        if old_name in self._paused:
+            self._paused.discard(old_name)
+            self._paused.add(new_name)
+        streams = self._streams.pop(old_name, [])
+        for stream in streams:
+            stream.service_name = new_name
+        self._streams[new_name] = streams
+
+    def _pipe_reader(self, stream: _OutputStream) -> None:
+        # 仅用于 Windows：阻塞读取管道并转交给多路复用线程
+        while True:
+            stream.resume_event.wait()
+            try:
+                chunk = os.read(stream.fd, self.READ_SIZE)
+            except OSError:
+                chunk = b''
+            self._inbox.put(('data', stream, chunk))
+            self._wake()
+            if not chunk:
+                return
+
+    def _read(self, stream: _OutputStream) -> None:
+        try:
+            chunk = os.read(stream.fd, self.READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+        self._consume(stream, chunk)
+
+    def _consume(self, stream: _OutputStream, chunk: bytes) -> None:
+        if not chunk:
+            stream.eof = True
+            self._unregister(stream)
+            lines = [stream.partial] if stream.partial else []
+            stream.partial = b''
+        else:
+            data = stream.partial + chunk
+            lines = data.split(b'\n')
+            stream.partial = lines.pop()
+        lines = [line.decode('utf-8', errors='replace').rstrip('\r') for line in lines]
+        lines = [line for line in lines if line.strip()]
+        if lines:
+            self._emit(stream.service_name, stream.stream_name, self._throttle(stream.service_name, lines))
+
+    def _unregister(self, stream: _OutputStream) -> None:
+        if stream.registered:
+            self._selector.unregister(stream.fd)
+            stream.registered = False
+
+    def _throttle(self, service_name: str, lines: List[str]) -> List[str]:
+        now = time.monotonic()
+        tokens = min(self.burst, self._tokens[service_name] + (now - self._refilled_at[service_name]) * self.rate_limit)
+        self._refilled_at[service_name] = now
+        stats = self.stats[service_name]
+        if self.overflow == 'drop' and len(lines) > tokens:
+            allowed = max(int(tokens), 0)
+            dropped = len(lines) - allowed
+            stats['dropped'] += dropped
+            self._unreported_drops[service_name] = self._unreported_drops.get(service_name, 0) + dropped
+            lines = lines[:allowed]
+        tokens -= len(lines)
+        self._tokens[service_name] = tokens
+        stats['lines'] += len(lines)
+        if self.overflow == 'block' and tokens < 0 and service_name not in self._paused:
+            # 超出限速：暂停读取该服务的管道，直到令牌恢复
+            self._paused.add(service_name)
+            stats['paused'] += 1
+            for stream in self._streams.get(service_name, []):
+                self._unregister(stream)
+                stream.resume_event.clear()
+        return lines
+
+    def _resume_paused(self) -> None:
+        now = time.monotonic()
+        for service_name in list(self._paused):
+            tokens = self._tokens[service_name] + (now - self._refilled_at[service_name]) * self.rate_limit
+            if tokens < 0:
+                continue
+            self._tokens[service_name] = min(self.burst, tokens)
+            self._refilled_at[service_name] = now
+            self._paused.discard(service_name)
+            for stream in self._streams.get(service_name, []):
+                if not stream.eof:
+                    if self._use_selector:
+                        self._selector.register(stream.fd, selectors.EVENT_READ, stream)
+                        stream.registered = True
+                    stream.resume_event.set()
+
+    def _emit(self, service_name: str, stream_name: str, lines: List[str]) -> None:
+        if not lines:
+            return
+        if self.json_format:
+            timestamp = datetime.now().isoformat(timespec='milliseconds')
+            self._output_logger.info('\n'.join(
+                json.dumps({'time': timestamp, 'service': service_name, 'stream': stream_name, 'line': line},
+                           ensure_ascii=False)
+                for line in lines
+            ))
+        elif stream_name == 'stdout':
+            self._output_logger.info('\n'.join(f"{service_name}: {line}" for line in lines))
+        else:
+            self._output_logger.error('\n'.join(f"{service_name} 错误: {line}" for line in lines))
+
+    def _check_exits(self) -> None:
+        for service_name, process in list(self.processes.items()):
+            if process.poll() is None:
+                continue
+            # 进程已退出：读完管道中剩余的输出再报告
+            for stream in self._streams.pop(service_name, []):
+                if self._use_selector and not stream.eof:
+                    while not stream.eof:
+                        try:
+                            chunk = os.read(stream.fd, self.READ_SIZE)
+                        except BlockingIOError:
+                            break
+                        except OSError:
+                            chunk = b''
+                        self._consume(stream, chunk)
+                self._unregister(stream)
+                stream.resume_event.set()
+            self._paused.discard(service_name)
+            del self.processes[service_name]
+            logger.warning(f"服务 {service_name} 已退出，退出码: {process.returncode}")
+            if self.on_exit is not None:
+                self.on_exit(service_name, process)
+
+    def _report_drops(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not self._unreported_drops or (not force and now - self._last_drop_report < self.DROP_REPORT_INTERVAL):
+            return
+        for service_name, dropped in self._unreported_drops.items():
+            logger.warning(f"服务 {service_name} 输出过快，已丢弃 {dropped} 行日志"
+                           f"（累计 {self.stats[service_name]['dropped']} 行）")
+        self._unreported_drops.clear()
+        self._last_drop_report = now
+
+
+def describe_exit(returncode: Optional[int]) -> str:
+    """
+    把进程退出码转换为可读的退出原因
+    """
+    if returncode is None:
+        return '运行中'
+    if returncode == 0:
+        return '正常退出'
+    if returncode < 0:
+        try:
+            return f'被信号 {signal.Signals(-returncode).name} 终止'
+        except ValueError:
+            return f'被信号 {-returncode} 终止'
+    return f'异常退出，退出码 {returncode}'
+
+
+class _SupervisedService:
+    """
+    单个受监管服务的运行状态
+    """
+
+    def __init__(self, service_name: str, config: dict, options: dict):
+        self.service_name = service_name
+        self.config = config
+        self.options = options
+        self.process: Optional[subprocess.Popen] = None
+        self.standby: Optional[subprocess.Popen] = None
+        # 最近一个主进程的进程组，重启前等待其中遗留的工作进程退出
+        self.pgid: Optional[int] = None
+        self.listen_socket: Optional[socket.socket] = None
+        # starting | running | backoff | crash_loop | stopped
+        self.status = 'starting'
+        self.started_at: Optional[float] = None
+        self.restarts = 0
+        self.failovers = 0
+        self.consecutive_failures = 0
+        self.recent_exits: deque = deque()
+        self.last_exit_code: Optional[int] = None
+        self.last_exit_reason: Optional[str] = None
+        self.last_exit_at: Optional[str] = None
+        self.next_restart_at: Optional[float] = None
+
+    @property
+    def standby_label(self) -> str:
+        return f'{self.service_name}:standby'
+
+
+class ServiceSupervisor:
+    """
+    服务进程监管器
+
+    - 服务异常退出后按指数退避自动重启；进程运行超过 stable_after 秒后才退出的，退避从头计算。
+      退出码为 0 视为主动停止（如 Ctrl+C），不再重启
+    - crash_loop_window 秒内异常退出 crash_loop_threshold 次判定为崩溃循环，停止重启
+    - 主进程退出后向其进程组发送 SIGTERM，让遗留的工作进程退出；重启前等待进程组退出
+      （超过 group_stop_timeout 秒强制结束）和端口释放，端口仍被其他进程占用时每 port_retry_delay 秒重试，
+      不计入失败次数
+    - 启用热备时，配置了 standby 的服务由监管器创建并持有监听套接字，主进程和热备进程都继承它。
+      热备进程预先导入代码并建立数据库连接，主进程退出后直接在同一套接字上接管，
+      期间到达的连接在监听队列中等待，不会被拒绝
+    - 运行状态通过 status() 或 serve_status() 启动的 GET /status 查看
+    """
+
+    def __init__(self, services: Dict[str, dict], multiplexer: LogMultiplexer,
+                 args: Optional[argparse.Namespace] = None, enable_standby: bool = False,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, stable_after: float = 60.0,
+                 crash_loop_window: float = 300.0, crash_loop_threshold: int = 5,
+                 standby_delay: float = 5.0, group_stop_timeout: float = 10.0,
+                 port_retry_delay: float = 5.0):
+        self.multiplexer = multiplexer
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.crash_loop_window = crash_loop_window
+        self.crash_loop_threshold = crash_loop_threshold
+        self.standby_delay = standby_delay
+        self.group_stop_timeout = group_stop_timeout
+        self.port_retry_delay = port_retry_delay
+
+        self.states: Dict[str, _SupervisedService] = {
+            name: _SupervisedService(name, config, service_launch_options(name, config, args))
+            for name, config in services.items()
+        }
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[float, str, str]] = []
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._status_server: Optional[http.server.ThreadingHTTPServer] = None
+
+        if enable_standby:
+            if os.name == 'nt':
+                logger.warning("Windows 下不支持继承监听套接字，已忽略热备配置")
+            else:
+                for state in self.states.values():
+                    if state.config.get('standby'):
+                        self._bind_listen_socket(state)
+
+        multiplexer.on_exit = self.on_exit
+
+    # ---- 供主线程调用的接口 ----
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='supervisor', daemon=True)
+        self._thread.start()
+
+    def start_process(self, service_name: str) -> Optional[subprocess.Popen]:
+        """
+        启动（或重启）服务进程并登记到日志多路复用器；启动失败时按退避策略安排重试
+        """
+        state = self.states[service_name]
+        options = dict(state.options)
+        if state.listen_socket is not None:
+            options['fd'] = state.listen_socket.fileno()
+        process = start_service(service_name, state.config['port'], **options)
+        with self._cond:
+            if process is None:
+                self._handle_failure(state, '启动失败', uptime=0.0)
+                return None
+            state.process = process
+            state.pgid = process.pid
+            state.started_at = time.monotonic()
+            state.status = 'starting'
+        self.multiplexer.add_process(service_name, process)
+        return process
+
+    def mark_ready(self, service_name: str) -> None:
+        """
+        服务就绪后调用：更新状态，并在需要时创建热备进程
+        """
+        state = self.states[service_name]
+        with self._cond:
+            if state.status == 'starting':
+                state.status = 'running'
+            if state.listen_socket is not None and state.standby is None:
+                self._schedule(state, 'standby', 0.0)
+
+    def stop(self) -> None:
+        """
+        停止监管：取消待执行的重启，之后退出的进程不再重启
+        """
+        with self._cond:
+            self._stopping = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        self.stop()
+        if self._status_server is not None:
+            self._status_server.shutdown()
+            self._status_server.server_close()
+        for state in self.states.values():
+            if state.listen_socket is not None:
+                state.listen_socket.close()
+                state.listen_socket = None
+
+    def status(self) -> Dict[str, dict]:
+        """
+        获取各服务的运行状态、重启次数和最近一次退出原因
+        """
+        now = time.monotonic()
+        with self._cond:
+            return {
+                name: {
+                    'status': state.status,
+                    'pid': state.process.pid if state.process is not None else None,
+                    'uptime_seconds': round(now - state.started_at, 1)
+                    if state.process is not None and state.started_at is not None else None,
+                    'restarts': state.restarts,
+                    'failovers': state.failovers,
+                    'consecutive_failures': state.consecutive_failures,
+                    'last_exit_code': state.last_exit_code,
+                    'last_exit_reason': state.last_exit_reason,
+                    'last_exit_at': state.last_exit_at,
+                    'next_restart_in': round(max(state.next_restart_at - now, 0.0), 1)
+                    if state.status == 'backoff' and state.next_restart_at is not None else None,
+                    'standby_pid': state.standby.pid if state.standby is not None else None,
+                }
+                for name, state in self.states.items()
+            }
+
+    def serve_status(self, port: int, host: str = '127.0.0.1') -> None:
+        """
+        在后台线程中提供状态接口：GET /status 返回全部服务，GET /status/<服务名> 返回单个服务
+        """
+        supervisor = self
+
+        class StatusHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0].rstrip('/')
+                status = supervisor.status()
+                if path == '/status':
+                    body = status
+                elif path.startswith('/status/') and path[len('/status/'):] in status:
+                    body = status[path[len('/status/'):]]
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._status_server = http.server.ThreadingHTTPServer((host, port), StatusHandler)
+        self._status_server.daemon_threads = True
+        threading.Thread(target=self._status_server.serve_forever, name='supervisor-status', daemon=True).start()
+        logger.info(f"监管状态接口: http://{host}:{port}/status")
+
+    # ---- 由多路复用线程调用 ----
+
+    def on_exit(self, label: str, process: subprocess.Popen) -> None:
+        with self._cond:
+            state = next((s for s in self.states.values() if process in (s.process, s.standby)), None)
+            if state is None:
+                return
+            reason = describe_exit(process.returncode)
+
+            if process is state.standby:
+                state.standby = None
+                if not self._stopping and state.status != 'crash_loop':
+                    logger.warning(f"服务 {state.service_name} 的热备进程已退出（{reason}），"
+                                   f"{self.standby_delay:.0f} 秒后重新创建")
+                    self._schedule(state, 'standby', self.standby_delay)
+                self._close_if_finished()
+                return
+
+            uptime = time.monotonic() - state.started_at if state.started_at is not None else 0.0
+            state.process = None
+            if os.name != 'nt' and signal_process_group(process.pid, signal.SIGTERM):
+                logger.warning(f"服务 {state.service_name} 的主进程已退出，正在停止遗留的工作进程")
+            state.last_exit_code = process.returncode
+            state.last_exit_reason = reason
+            state.last_exit_at = datetime.now().isoformat(timespec='seconds')
+            if self._stopping or process.returncode == 0:
+                state.status = 'stopped'
+                self._stop_standby(state)
+                self._close_if_finished()
+                return
+            self._handle_failure(state, reason, uptime)
+
+    # ---- 以下方法在持有 self._cond 时调用 ----
+
+    def _handle_failure(self, state: _SupervisedService, reason: str, uptime: float) -> None:
+        now = time.monotonic()
+        if uptime >= self.stable_after:
+            state.consecutive_failures = 0
+        state.consecutive_failures += 1
+        state.recent_exits.append(now)
+        while state.recent_exits and now - state.recent_exits[0] > self.crash_loop_window:
+            state.recent_exits.popleft()
+
+        if len(state.recent_exits) >= self.crash_loop_threshold:
+            state.status = 'crash_loop'
+            logger.error(f"服务 {state.service_name} 在 {self.crash_loop_window:.0f} 秒内退出 "
+                         f"{len(state.recent_exits)} 次（最近一次: {reason}），判定为崩溃循环，停止重启")
+            self._stop_standby(state)
+            self._close_if_finished()
+            return
+
+        if state.standby is not None and self._promote(state):
+            logger.warning(f"服务 {state.service_name} {reason}，已由热备进程接管")
+            return
+
+        delay = min(self.backoff_base * 2 ** (state.consecutive_failures - 1), self.backoff_max)
+        state.status = 'backoff'
+        state.next_restart_at = now + delay
+        self._schedule(state, 'restart', delay)
+        logger.warning(f"服务 {state.service_name} {reason}，{delay:.1f} 秒后重启"
+                       f"（连续失败 {state.consecutive_failures} 次）")
+
+    def _promote(self, state: _SupervisedService) -> bool:
+        standby = state.standby
+        state.standby = None
+        if standby.poll() is not None:
+            return False
+        try:
+            standby.stdin.write(b'serve\n')
+            standby.stdin.flush()
+        except OSError:
+            return False
+        state.process = standby
+        state.pgid = standby.pid
+        state.started_at = time.monotonic()
+        state.status = 'running'
+        state.restarts += 1
+        state.failovers += 1
+        self.multiplexer.rename_process(state.standby_label, state.service_name)
+        self._schedule(state, 'standby', self.standby_delay)
+        return True
+
+    def _stop_standby(self, state: _SupervisedService) -> None:
+        if state.standby is not None and state.standby.poll() is None:
+            # 关闭标准输入后热备进程自行退出
+            try:
+                state.standby.stdin.close()
+            except OSError:
+                state.standby.terminate()
+
+    def _schedule(self, state: _SupervisedService, action: str, delay: float) -> None:
+        heapq.heappush(self._pending, (time.monotonic() + delay, action, state.service_name))
+        self._cond.notify()
+
+    def _close_if_finished(self) -> None:
+        # 没有运行中的进程、也没有待执行的重启时结束日志多路复用器，启动器随之退出
+        if self._pending:
+            return
+        for state in self.states.values():
+            if state.process is not None or state.standby is not None or state.status in ('starting', 'backoff'):
+                return
+        self.multiplexer.close()
+
+    # ---- 监管线程 ----
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping and (not self._pending or self._pending[0][0] > time.monotonic()):
+                    self._cond.wait(self._pending[0][0] - time.monotonic() if self._pending else None)
+                if self._stopping:
+                    return
+                _, action, service_name = heapq.heappop(self._pending)
+                state = self.states[service_name]
+            # 重启需要等待服务就绪，放到单独的线程中，避免阻塞其他服务的重启
+            target = self._restart if action == 'restart' else self._spawn_standby
+            threading.Thread(target=target, args=(state,), name=f'supervisor-{action}-{service_name}',
+                             daemon=True).start()
+
+    def _restart(self, state: _SupervisedService) -> None:
+        with self._cond:
+            if self._stopping or state.status != 'backoff':
+                return
+        if not self._wait_released(state):
+            # 端口被其他进程占用不是服务本身的故障，稍后重试，不计入失败次数
+            with self._cond:
+                if self._stopping or state.status != 'backoff':
+                    return
+                state.next_restart_at = time.monotonic() + self.port_retry_delay
+                self._schedule(state, 'restart', self.port_retry_delay)
+            logger.warning(f"服务 {state.service_name} 的{self._address(state)} 仍被占用，"
+                           f"{self.port_retry_delay:.0f} 秒后重试启动")
+            return
+        with self._cond:
+            if self._stopping or state.status != 'backoff':
+                return
+            state.restarts += 1
+            state.next_restart_at = None
+        logger.info(f"正在重启服务 {state.service_name}（第 {state.restarts} 次）...")
+        process = self.start_process(state.service_name)
+        if process is None:
+            return
+        ready_at = wait_for_service_ready(state.service_name, state.config['port'], process,
+                                          uds=state.options.get('uds'))
+        if ready_at is not None:
+            logger.info(f"服务 {state.service_name} 重启完成，{ready_at:.2f} 秒就绪")
+            self.mark_ready(state.service_name)
+
+    @staticmethod
+    def _address(state: _SupervisedService) -> str:
+        uds = state.options.get('uds')
+        return f"Unix套接字 {uds}" if uds else f"端口 {state.config['port']}"
+
+    def _wait_released(self, state: _SupervisedService) -> bool:
+        """
+        等待上一个进程组退出、端口释放；遗留的工作进程在 group_stop_timeout 秒内没有退出时强制结束
+
+        Returns:
+            bool: 端口（或 Unix 套接字）可以使用时返回True
+        """
+        pgid = state.pgid
+        if pgid is not None and os.name != 'nt':
+            deadline = time.monotonic() + self.group_stop_timeout
+            while signal_process_group(pgid, 0) and time.monotonic() < deadline:
+                time.sleep(0.2)
+            if signal_process_group(pgid, signal.SIGKILL):
+                logger.warning(f"服务 {state.service_name} 遗留的工作进程 {self.group_stop_timeout:.0f} 秒内"
+                               f"没有退出，已强制结束")
+            state.pgid = None
+        if state.listen_socket is not None:
+            # 监听套接字由监管器持有，不会被占用
+            return True
+        uds = state.options.get('uds')
+        deadline = time.monotonic() + self.group_stop_timeout
+        while True:
+            if _remove_stale_socket(uds) if uds else not _port_in_use(state.config['port']):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.2)
+
+    def _spawn_standby(self, state: _SupervisedService) -> None:
+        with self._cond:
+            if (self._stopping or state.listen_socket is None or state.standby is not None
+                    or state.status in ('crash_loop', 'stopped')):
+                return
+        process = start_standby(state.service_name, state.config['port'], state.listen_socket.fileno(),
+                                module_path=state.options.get('module_path'),
+                                limit_concurrency=state.options.get('limit_concurrency'),
+                                backlog=state.options.get('backlog'),
+                                workers=state.options.get('workers', 1))
+        with self._cond:
+            if process is None:
+                self._schedule(state, 'standby', self.backoff_max)
+                return
+            state.standby = process
+            if self._stopping:
+                self._stop_standby(state)
+        self.multiplexer.add_process(state.standby_label, process)
+
+    def _bind_listen_socket(self, state: _SupervisedService) -> None:
+        uds = state.options.get('uds')
+        try:
+            if uds:
+                if not _remove_stale_socket(uds):
+                    raise OSError(f"Unix套接字 {uds} 已被占用")
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.bind(uds)
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind(('127.0.0.1', state.config['port']))
+            sock.listen(state.options.get('backlog') or 2048)
+            sock.set_inheritable(True)
+        except OSError as e:
+            logger.error(f"无法为服务 {state.service_name} 创建监听套接字，不启用热备: {str(e)}")
+            return
+        state.listen_socket = sock
+
+
+def monitor_processes(multiplexer: LogMultiplexer, supervisor: Optional[ServiceSupervisor] = None) -> None:
+    """
+    阻塞等待所有服务进程退出，输出与退出检测由多路复用线程完成；收到中断信号时关闭所有服务
+
+    Args:
+        multiplexer: 已登记所有服务进程的日志多路复用器
+        supervisor: 服务监管器，为空时服务退出后不再重启
+    """
+    if supervisor is None:
+        multiplexer.close()
+    try:
+        while multiplexer.is_alive():
+            # 带超时等待，保证 Windows 下也能及时响应 Ctrl+C
+            multiplexer.join(timeout=1.0)
     except KeyboardInterrupt:
         logger.info("接收到中断信号，正在关闭所有服务...")
-        for service_name, process in processes.items():
+        if supervisor is not None:
+            supervisor.stop()
+        for service_name, process in list(multiplexer.processes.items()):
             logger.info(f"正在关闭服务 {service_name}...")
+            # 服务进程在单独的会话中，收不到终端的 Ctrl+C，需要逐个通知
             process.terminate()
+        for service_name, process in list(multiplexer.processes.items()):
             try:
                 process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 logger.warning(f"服务 {service_name} 未能在5秒内关闭，强制终止")
-                process.kill()
+                kill_service(process)
+        multiplexer.close()
+        multiplexer.join(timeout=2.0)
         logger.info("所有服务已关闭")
+    finally:
+        if supervisor is not None:
+            supervisor.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    # 通过 Unix 套接字发送 HTTP 请求，用于检查以 --uds 启动的服务
+    def __init__(self, uds: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.uds = uds
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.uds)
+
+
+def _probe_health(port: int, uds: Optional[str], timeout: float) -> bool:
+    if not uds:
+        try:
+            return requests.get(f"http://localhost:{port}/health", timeout=timeout).status_code == 200
+        except RequestException:
+            return False  # 服务尚未开始监听端口
+    conn = _UnixHTTPConnection(uds, timeout)
+    try:
+        conn.request('GET', '/health')
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        conn.close()
 
 
-def check_service_health(service_name: str, port: int) -> bool:
+def wait_for_service_ready(service_name: str, port: int, process: subprocess.Popen,
+                           timeout: float = 60.0, initial_delay: float = 0.05,
+                           max_delay: float = 1.0, uds: Optional[str] = None) -> Optional[float]:
     """
-    检查服务健康状态
-    
+    以指数退避方式轮询服务的 /health 端点，直到服务就绪
+
     Args:
         service_name: 服务名称
         port: 服务端口
-        
+        process: 服务进程对象
+        timeout: 最长等待秒数
+        initial_delay: 首次轮询间隔（秒），之后每次翻倍
+        max_delay: 最大轮询间隔（秒）
+        uds: 服务绑定的 Unix 套接字路径，为空时通过端口检查
+
     Returns:
-        bool: 服务是否健康
+        float: 从开始等待到服务就绪的秒数，超时或进程退出时返回None
     """
-    try:
-        # 尝试访问服务的健康检查端点
-        url = f"http://localhost:{port}/health"
-        response = requests.get(url, timeout=2)
-        if response.status_code == 200:
-            logger.info(f"服务 {service_name} 健康检查通过")
-            return True
-        elif response.status_code == 404:
-            # 如果健康检查端点不存在（404），尝试访问根路径
-            logger.info(f"服务 {service_name} 没有健康检查端点，尝试访问根路径")
-            root_url = f"http://localhost:{port}/"
-            root_response = requests.get(root_url, timeout=2)
-            if root_response.status_code < 500:  # 任何非服务器错误都视为服务在运行
-                logger.info(f"服务 {service_name} 根路径可访问，视为健康")
-                return True
-            else:
-                logger.warning(f"服务 {service_name} 返回服务器错误，状态码: {root_response.status_code}")
-                return False
+    begin = time.monotonic()
+    delay = initial_delay
+    while True:
+        if process.poll() is not None:
+            logger.error(f"服务 {service_name} 启动失败，进程已退出，退出码: {process.returncode}")
+            return None
+        if _probe_health(port, uds, timeout=max(delay, 0.5)):
+            return time.monotonic() - begin
+        elapsed = time.monotonic() - begin
+        if elapsed >= timeout:
+            logger.warning(f"服务 {service_name} 在 {timeout:.0f} 秒内未就绪")
+            return None
+        time.sleep(min(delay, timeout - elapsed))
+        delay = min(delay * 2, max_delay)
+
+
+def resolve_start_order(services: Dict[str, dict]) -> List[str]:
+    """
+    根据 depends_on 对服务做拓扑排序
+
+    Returns:
+        List[str]: 依赖在前的服务名称列表
+
+    Raises:
+        ValueError: 依赖了未配置的服务或存在循环依赖
+    """
+    for service_name, config in services.items():
+        for dependency in config.get('depends_on', []):
+            if dependency not in services:
+                raise ValueError(f"服务 {service_name} 依赖的服务 {dependency} 未在SERVICES配置中找到")
+
+    remaining = {name: set(config.get('depends_on', [])) for name, config in services.items()}
+    order = []
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError(f"服务之间存在循环依赖: {', '.join(sorted(remaining))}")
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def service_launch_options(service_name: str, config: dict, args: Optional[argparse.Namespace]) -> dict:
+    """
+    根据命令行参数和服务配置生成 start_service 的启动参数
+    """
+    options = {'module_path': config['module']} if config.get('module') else {}
+    if args is None:
+        return options
+    options['mode'] = args.mode
+    if args.mode == 'prod':
+        options['workers'] = args.workers or config.get('workers', 1)
+        options['limit_concurrency'] = args.limit_concurrency
+        options['backlog'] = args.backlog
+    if args.uds_dir:
+        options['uds'] = os.path.join(args.uds_dir, f'{service_name}.sock')
+    return options
+
+
+def launch_services(services: Dict[str, dict],
+                    on_started: Optional[Callable[[str, subprocess.Popen], None]] = None,
+                    args: Optional[argparse.Namespace] = None,
+                    supervisor: Optional[ServiceSupervisor] = None
+                    ) -> Tuple[Dict[str, subprocess.Popen], Dict[str, Optional[float]]]:
+    """
+    按依赖关系并行启动服务：每个服务在其依赖全部就绪后立即启动，并等待自身就绪
+
+    Args:
+        services: 服务配置
+        on_started: 进程启动后立即调用的回调（如登记到日志多路复用器，避免就绪前管道写满）
+        args: 命令行参数（启动模式、工作进程数等），为空时按开发模式启动
+        supervisor: 服务监管器，传入时由它启动进程并登记到日志多路复用器（忽略 on_started）
+
+    Returns:
+        (服务名称到进程对象的映射, 服务名称到就绪耗时（秒）的映射；未就绪为None)
+    """
+    order = resolve_start_order(services)
+    launch_begin = time.monotonic()
+    futures = {}
+
+    def launch(service_name):
+        config = services[service_name]
+        for dependency in config.get('depends_on', []):
+            if futures[dependency].result()[1] is None:
+                logger.warning(f"服务 {service_name} 依赖的服务 {dependency} 未就绪，仍继续启动")
+        options = service_launch_options(service_name, config, args)
+        logger.info(f"正在启动 {service_name} ({config['description']}) 在端口 {config['port']}...")
+        if supervisor is not None:
+            process = supervisor.start_process(service_name)
         else:
-            logger.warning(f"服务 {service_name} 健康检查失败，状态码: {response.status_code}")
-            return False
-    except RequestException as e:
-        # 如果服务没有健康检查端点或无法连接，尝试访问根路径
-        logger.info(f"访问服务 {service_name} 健康检查端点失败: {str(e)}，尝试访问根路径")
-        try:
-            url = f"http://localhost:{port}/"
-            response = requests.get(url, timeout=2)
-            if response.status_code < 500:  # 任何非服务器错误都视为服务在运行
-                logger.info(f"服务 {service_name} 可访问，视为健康")
-                return True
-            else:
-                logger.warning(f"服务 {service_name} 返回服务器错误，状态码: {response.status_code}")
-                return False
-        except RequestException as e:
-            logger.warning(f"服务 {service_name} 不可访问: {str(e)}")
-            return False
+            process = start_service(service_name, config['port'], **options)
+            if process is not None and on_started is not None:
+                on_started(service_name, process)
+        if process is None:
+            return None, None
+        if wait_for_service_ready(service_name, config['port'], process, uds=options.get('uds')) is None:
+            return (process if process.poll() is None else None), None
+        ready_at = time.monotonic() - launch_begin
+        logger.info(f"服务 {service_name} 已就绪，启动后 {ready_at:.2f} 秒")
+        if supervisor is not None:
+            supervisor.mark_ready(service_name)
+        return process, ready_at
+
+    # 线程数等于服务数，依赖按拓扑顺序先提交，等待依赖结果不会造成死锁
+    with ThreadPoolExecutor(max_workers=max(len(order), 1), thread_name_prefix='launcher') as executor:
+        for service_name in order:
+            futures[service_name] = executor.submit(launch, service_name)
+        results = {service_name: future.result() for service_name, future in futures.items()}
+
+    processes = {name: process for name, (process, _) in results.items() if process is not None}
+    ready_times = {name: ready_at for name, (_, ready_at) in results.items()}
+    return processes, ready_times
+
+
+def run_migrations(service_names: List[str]) -> bool:
+    """
+    启动服务前执行一次数据库迁移（见根目录 db_migrate.py），服务启动时不再检查表结构
+
+    Returns:
+        bool: 全部迁移成功时返回True；失败时只记录错误，仍继续启动服务
+    """
+    try:
+        from db_migrate import migrate_all
+    except ImportError as e:
+        logger.warning(f"无法导入迁移工具，跳过数据库迁移: {str(e)}")
+        return False
+    results = migrate_all([name for name in service_names if name in SERVICE_DB_NAMES])
+    return all(error is None for _, _, error in results.values())
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="启动 mERP 后端全部微服务")
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='dev',
+                        help="dev: 单进程并监听代码变化自动重载；prod: 多工作进程，不重载")
+    parser.add_argument('--monolith', action='store_true',
+                        help="单进程合并部署：全部服务运行在一个进程中，监听 8000 端口")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="生产模式下每个服务的工作进程数，默认使用 SERVICES 中的 workers")
+    parser.add_argument('--limit-concurrency', type=int, default=None,
+                        help="生产模式下每个工作进程的最大并发连接数，超出时返回503")
+    parser.add_argument('--backlog', type=int, default=2048,
+                        help="生产模式下的监听队列长度")
+    parser.add_argument('--uds-dir', default=None,
+                        help="通过 Unix 套接字 <目录>/<服务名>.sock 监听（供本机反向代理使用），不再监听端口")
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text',
+                        help="服务输出的日志格式（json 为每行一个 JSON 对象）")
+    parser.add_argument('--log-rate', type=float, default=2000.0,
+                        help="每个服务每秒最多转发的日志行数")
+    parser.add_argument('--log-burst', type=float, default=10000.0,
+                        help="每个服务允许的突发日志行数")
+    parser.add_argument('--log-overflow', choices=['drop', 'block'], default='drop',
+                        help="超出限速时丢弃日志行（drop）或暂停读取、对服务施加背压（block）")
+    parser.add_argument('--skip-migrate', action='store_true',
+                        help="启动前不执行数据库迁移")
+    parser.add_argument('--no-restart', action='store_true',
+                        help="服务退出后不自动重启")
+    parser.add_argument('--standby', action='store_true',
+                        help="为 SERVICES 中标记 standby 的服务预先启动热备进程（不支持 Windows）")
+    parser.add_argument('--status-port', type=int, default=8099,
+                        help="监管状态接口端口（GET /status），0 表示不启用")
+    return parser.parse_args(argv)
+
 
 def main():
     """
     主函数，启动所有微服务
     """
+    args = parse_args()
     logger.info("开始启动后端服务...")
-    
-    # 定义服务启动顺序（优先启动基础服务）
-    service_order = [
-        'config_svc',      # 配置服务优先启动
-        'scheduler_svc',   # 调度服务
-        'approval_svc',    # 审批服务
-        'material_svc',    # 物料服务
-        'inventory_svc',   # 库存服务
-        'order_svc',       # 订单服务
-        'plan_svc',        # 计划服务
-        'shift_svc'        # 班次服务
-    ]
-    
-    # 验证所有服务都在配置中
-    for service_name in service_order:
-        if service_name not in SERVICES:
-            logger.error(f"服务 {service_name} 在启动顺序中定义但未在SERVICES配置中找到")
+
+    if args.uds_dir:
+        if not hasattr(socket, 'AF_UNIX'):
+            logger.error("当前平台不支持 Unix 套接字，请去掉 --uds-dir 参数")
             return
-    
-    # 检查是否有未在启动顺序中定义的服务
-    for service_name in SERVICES:
-        if service_name not in service_order:
-            logger.warning(f"服务 {service_name} 在SERVICES配置中但未在启动顺序中定义，将在最后启动")
-            service_order.append(service_name)
-    
-    # 按顺序启动服务
-    processes = {}
-    for service_name in service_order:
-        config = SERVICES[service_name]
-        logger.info(f"正在启动 {service_name} ({config['description']}) 在端口 {config['port']}...")
-        process = start_service(service_name, config['port'])
-        if process:
-            processes[service_name] = process
-            # 给关键服务一些启动时间
-            if service_name in ['config_svc', 'scheduler_svc', 'approval_svc']:
-                logger.info(f"等待 {service_name} 完全启动...")
-                time.sleep(3)
-                # 进行健康检查
-                health_status = check_service_health(service_name, config['port'])
-                if not health_status:
-                    logger.warning(f"服务 {service_name} 可能未正常启动，但将继续启动其他服务")
-    
+        os.makedirs(args.uds_dir, exist_ok=True)
+
+    if not args.skip_migrate:
+        run_migrations(list(SERVICES))
+
+    multiplexer = LogMultiplexer(
+        json_format=args.log_format == 'json',
+        rate_limit=args.log_rate,
+        burst=args.log_burst,
+        overflow=args.log_overflow,
+    )
+    multiplexer.start()
+
+    services = MONOLITH_SERVICES if args.monolith else SERVICES
+    supervisor = None
+    if not args.no_restart:
+        supervisor = ServiceSupervisor(services, multiplexer, args=args, enable_standby=args.standby)
+        supervisor.start()
+        if args.status_port:
+            try:
+                supervisor.serve_status(args.status_port)
+            except OSError as e:
+                logger.warning(f"监管状态接口端口 {args.status_port} 不可用: {str(e)}")
+
+    try:
+        processes, ready_times = launch_services(services, on_started=multiplexer.add_process, args=args,
+                                                 supervisor=supervisor)
+    except ValueError as e:
+        logger.error(str(e))
+        if supervisor is not None:
+            supervisor.close()
+        multiplexer.close()
+        return
+
     if not processes:
         logger.error("没有成功启动任何服务，退出程序")
+        if supervisor is not None:
+            supervisor.close()
+        multiplexer.close()
         return
-    
+
+    # 输出各服务就绪耗时
+    for service_name, ready_at in sorted(ready_times.items(), key=lambda item: (item[1] is None, item[1] or 0)):
+        if ready_at is None:
+            logger.warning(f"  {service_name}: 未就绪")
+        else:
+            logger.info(f"  {service_name}: {ready_at:.2f} 秒就绪")
     logger.info(f"成功启动了 {len(processes)} 个服务")
     
     # 监控所有进程
-    monitor_processes(processes)
+    monitor_processes(multiplexer, supervisor)
 
 
 if __name__ == "__main__":
@@ -1,20 +1,64 @@
 import os
 import sys
+import asyncio
+import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
 # 设置项目根目录到PYTHONPATH
 root_dir = str(Path(__file__).parent.parent.parent)
 sys.path.append(root_dir)
 
+# 先加载 .env，导入 routes 时就会按环境变量创建数据库引擎
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
+
 # 使用绝对导入
-from backend.material_svc.routes import router
+from backend.material_svc.routes import router, bom_router, material_router, mrp_router
+from backend.material_svc.database import ReadSessionLocal
+from backend.material_svc.services.material_index import material_index
+from db_config import get_pool_stats
+
+logger = logging.getLogger(__name__)
+
+# 读取其他进程修改的物料、更新搜索索引的间隔（秒）
+INDEX_POLL_INTERVAL = float(os.environ.get("MATERIAL_INDEX_POLL_INTERVAL", 5))
+
+
+def _refresh_index():
+    db = ReadSessionLocal()
+    try:
+        material_index.poll(db)
+    finally:
+        db.close()
 
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
 
-app = FastAPI(title="Material Service", description="物料管理服务", version="0.1.0")
+async def _index_loop():
+    # 首次执行时建立索引，之后增量更新；建立完成前 /search 返回503
+    while True:
+        try:
+            await run_in_threadpool(_refresh_index)
+        except Exception as e:
+            logger.error(f"更新物料搜索索引失败: {str(e)}")
+        await asyncio.sleep(INDEX_POLL_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    task = asyncio.create_task(_index_loop())
+    yield
+    task.cancel()
+
+
+app = FastAPI(title="Material Service", description="物料管理服务", version="0.1.0", lifespan=lifespan)
 app.include_router(router)
+app.include_router(material_router)
+app.include_router(bom_router)
+app.include_router(mrp_router)
+
+# 表结构由部署时执行的迁移创建（见 migrations.py 和根目录 db_migrate.py），启动时不再检查
 
 @app.get("/", tags=["Root"], summary="Root endpoint for service health check")
 def read_root():
@@ -22,4 +66,8 @@ def read_root():
 
 @app.get("/health", tags=["Health"], summary="Health check endpoint")
 def health_check():
-    return {"status": "ok", "service": app.title}
\ No newline at end of file
+    return {"status": "ok", "service": app.title}
+
+@app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+def db_pool_stats():
+    return get_pool_stats("material_svc")
@@ -1,18 +1,18 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
 
-DB_USER = os.getenv("DB_USER", "root")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_NAME = os.getenv("DB_NAME", "merp_material_svc")
-DB_PORT = os.getenv("DB_PORT", "3306")
+from db_config import get_engine, get_async_engine, get_sessionmaker, get_async_sessionmaker
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SERVICE_NAME = "material_svc"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 数据库连接信息与连接池参数统一由 db_config.py 管理，每个进程只创建一个引擎
+engine = get_engine(SERVICE_NAME)
+SessionLocal = get_sessionmaker(SERVICE_NAME)
+ReadSessionLocal = get_sessionmaker(SERVICE_NAME, replica=True)
+
+# 异步引擎，供 async def 路由使用
+async_engine = get_async_engine(SERVICE_NAME)
+AsyncSessionLocal = get_async_sessionmaker(SERVICE_NAME)
+AsyncReadSessionLocal = get_async_sessionmaker(SERVICE_NAME, replica=True)
 
 Base = declarative_base()
 
@@ -21,4 +21,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
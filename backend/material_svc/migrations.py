@@ -0,0 +1,97 @@
+"""
+物料服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import (
+    MetaData, Table, Column, DateTime, Index, Integer, Numeric, String, Text, UniqueConstraint,
+)
+
+from db_migrate import Migration
+
+
+def _create_boms(conn):
+    # 版本1的表结构，与当时的 models 一致
+    metadata = MetaData()
+    Table(
+        "boms", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("material_id", String(36), nullable=False, unique=True),
+        Column("version", Integer, nullable=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+    Table(
+        "bom_items", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("parent_material_id", String(36), nullable=False),
+        Column("child_material_id", String(36), nullable=False),
+        Column("quantity", Numeric(18, 6), nullable=False),
+        Column("scrap_rate", Numeric(6, 4), nullable=False),
+        Column("unit", String(20)),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        UniqueConstraint("parent_material_id", "child_material_id", name="uq_bom_items_parent_child"),
+        Index("ix_bom_items_child_material_id", "child_material_id"),
+    )
+    metadata.create_all(conn)
+
+
+def _create_materials(conn):
+    Table(
+        "materials", MetaData(),
+        Column("id", String(36), primary_key=True),
+        Column("code", String(64), nullable=False, unique=True),
+        Column("name", String(255), nullable=False),
+        Column("spec", String(255)),
+        Column("unit", String(20)),
+        Column("category", String(100)),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime, nullable=False),
+        Column("deleted_at", DateTime),
+        Index("ix_materials_updated_at", "updated_at"),
+    ).create(conn)
+
+
+def _create_mrp(conn):
+    metadata = MetaData()
+    Table(
+        "mrp_runs", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("mode", String(20), nullable=False),
+        Column("window_start", DateTime, nullable=False),
+        Column("window_end", DateTime, nullable=False),
+        Column("bucket_days", Integer, nullable=False),
+        Column("plans", Integer, nullable=False),
+        Column("changed_plans", Integer, nullable=False),
+        Column("materials", Integer, nullable=False),
+        Column("orders", Integer, nullable=False),
+        Column("note", Text),
+        Column("started_at", DateTime, nullable=False),
+        Column("finished_at", DateTime),
+    )
+    Table(
+        "planned_orders", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("run_id", Integer, nullable=False),
+        Column("material_id", String(36), nullable=False),
+        Column("quantity", Numeric(18, 6), nullable=False),
+        Column("due_date", DateTime, nullable=False),
+        Column("release_date", DateTime, nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        Index("ix_planned_orders_status_material_id", "status", "material_id"),
+        Index("ix_planned_orders_material_id_due_date", "material_id", "due_date"),
+    )
+    metadata.create_all(conn)
+
+
+MIGRATIONS = [
+    Migration(1, "create boms", [_create_boms]),
+    Migration(2, "create materials", [_create_materials]),
+    Migration(3, "add material lead time, create mrp runs and planned orders", [
+        "ALTER TABLE materials ADD COLUMN lead_time_days INTEGER NOT NULL DEFAULT 0",
+        _create_mrp,
+    ]),
+]
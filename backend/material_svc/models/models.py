@@ -0,0 +1,102 @@
+from sqlalchemy import Column, DateTime, Index, Integer, Numeric, String, Text, UniqueConstraint
+
+from backend.material_svc.database import Base
+
+
+# 物料主数据；删除时只设置 deleted_at，库存、物料清单等仍可引用已删除的物料
+class Material(Base):
+    __tablename__ = "materials"
+    __table_args__ = (
+        # 各进程按 updated_at 增量更新物料搜索索引
+        Index("ix_materials_updated_at", "updated_at"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    code = Column(String(64), nullable=False, unique=True)
+    name = Column(String(255), nullable=False)
+    spec = Column(String(255))
+    unit = Column(String(20))
+    category = Column(String(100))
+    # 采购或生产提前期（天），物料需求计划按此从需求日期倒推下达日期
+    lead_time_days = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime, nullable=False)
+    deleted_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<Material(code='{self.code}', name='{self.name}')>"
+
+
+# 物料清单表头：每个有下级物料的物料一行，version 在本物料或任一下级物料的清单变化时加1，
+# 用作展开结果缓存的版本号
+class Bom(Base):
+    __tablename__ = "boms"
+
+    id = Column(Integer, primary_key=True)
+    material_id = Column(String(36), nullable=False, unique=True)
+    version = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<Bom(material_id='{self.material_id}', version={self.version})>"
+
+
+# 物料清单明细：生产1个上级物料需要 quantity 个下级物料，另按 scrap_rate 计损耗
+class BomItem(Base):
+    __tablename__ = "bom_items"
+    __table_args__ = (
+        UniqueConstraint("parent_material_id", "child_material_id", name="uq_bom_items_parent_child"),
+        # 反查上级物料（循环检查、版本号传递）
+        Index("ix_bom_items_child_material_id", "child_material_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    parent_material_id = Column(String(36), nullable=False)
+    child_material_id = Column(String(36), nullable=False)
+    quantity = Column(Numeric(18, 6), nullable=False)
+    scrap_rate = Column(Numeric(6, 4), nullable=False, default=0)
+    unit = Column(String(20))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+
+# 物料需求计划的一次计算，full 为全量计算，incremental 只重算变化的计划涉及的物料
+class MrpRun(Base):
+    __tablename__ = "mrp_runs"
+
+    id = Column(Integer, primary_key=True)
+    mode = Column(String(20), nullable=False)
+    window_start = Column(DateTime, nullable=False)
+    window_end = Column(DateTime, nullable=False)
+    bucket_days = Column(Integer, nullable=False)
+    plans = Column(Integer, nullable=False, default=0)
+    changed_plans = Column(Integer, nullable=False, default=0)
+    # 本次重新计算的物料数和生成的计划订单数
+    materials = Column(Integer, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
+    # 无法对应到物料的计划产品名称、改为全量计算的原因等
+    note = Column(Text)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+
+
+# 计划订单：planned 由每次计算重新生成；released 已下达（在途），作为后续计算的预计到货，不再被替换
+class PlannedOrder(Base):
+    __tablename__ = "planned_orders"
+    __table_args__ = (
+        Index("ix_planned_orders_status_material_id", "status", "material_id"),
+        Index("ix_planned_orders_material_id_due_date", "material_id", "due_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, nullable=False)
+    material_id = Column(String(36), nullable=False)
+    quantity = Column(Numeric(18, 6), nullable=False)
+    # 需求日期（时间段开始）和按提前期倒推的下达日期
+    due_date = Column(DateTime, nullable=False)
+    release_date = Column(DateTime, nullable=False)
+    # planned / released / closed
+    status = Column(String(20), nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
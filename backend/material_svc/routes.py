@@ -1,7 +1,167 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+
+from backend.material_svc.schemas import (
+    Bom, BomItem, BomItemSet, Explosion, ExplosionRequest, ExplosionResult,
+    Material, MaterialCreate, MaterialUpdate, MaterialSearchHit, MrpRun, MrpRunRequest, PlannedOrder,
+)
+from backend.material_svc.services import bom_service, material_service, mrp_service
+from backend.material_svc.services.material_index import material_index
+from backend.material_svc.database import get_db, get_read_db
 
 router = APIRouter()
 
 @router.get("/ping")
 def ping():
-    return {"msg": "material_svc pong"}
\ No newline at end of file
+    return {"msg": "material_svc pong"}
+
+
+material_router = APIRouter(
+    prefix="/api/v1/materials",
+    tags=["materials"],
+)
+
+@material_router.get("/", response_model=List[Material])
+def read_materials(category: Optional[str] = None, skip: int = 0, limit: int = Query(100, ge=1, le=1000),
+                   db: Session = Depends(get_read_db)):
+    return material_service.get_materials(db, category=category, skip=skip, limit=limit)
+
+# 输入联想：由进程内索引回答，不查询数据库（见 services/material_index.py）
+@material_router.get("/search", response_model=List[MaterialSearchHit])
+def search_materials(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(20, ge=1, le=100)):
+    if not material_index.ready:
+        raise HTTPException(status_code=503, detail="Material search index is not ready yet")
+    return material_index.search(q, limit=limit)
+
+@material_router.get("/search/index")
+def read_search_index_stats():
+    return material_index.stats()
+
+@material_router.post("/", response_model=Material)
+def create_material(material: MaterialCreate, db: Session = Depends(get_db)):
+    try:
+        db_material = material_service.create_material(db, material)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    material_index.upsert(db_material)
+    return db_material
+
+@material_router.get("/{material_id}", response_model=Material)
+def read_material(material_id: str, db: Session = Depends(get_read_db)):
+    db_material = material_service.get_material(db, material_id)
+    if db_material is None:
+        raise HTTPException(status_code=404, detail="Material not found")
+    return db_material
+
+@material_router.put("/{material_id}", response_model=Material)
+def update_material(material_id: str, material: MaterialUpdate, db: Session = Depends(get_db)):
+    try:
+        db_material = material_service.update_material(db, material_id, material)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_material is None:
+        raise HTTPException(status_code=404, detail="Material not found")
+    material_index.upsert(db_material)
+    return db_material
+
+@material_router.delete("/{material_id}", response_model=Material)
+def delete_material(material_id: str, db: Session = Depends(get_db)):
+    db_material = material_service.delete_material(db, material_id)
+    if db_material is None:
+        raise HTTPException(status_code=404, detail="Material not found")
+    material_index.upsert(db_material)
+    return db_material
+
+
+bom_router = APIRouter(
+    prefix="/api/v1/boms",
+    tags=["boms"],
+)
+
+# 批量展开：多个物料一次读取物料清单，共用的子装配只展开一次
+@bom_router.post("/explosion", response_model=ExplosionResult)
+def explode_boms(request: ExplosionRequest, db: Session = Depends(get_read_db)):
+    return bom_service.explode(db, request)
+
+@bom_router.get("/explosion/cache")
+def read_explosion_cache_stats():
+    return bom_service.explosion_cache.stats()
+
+@bom_router.get("/{material_id}", response_model=Bom)
+def read_bom(material_id: str, db: Session = Depends(get_read_db)):
+    return bom_service.get_bom(db, material_id)
+
+@bom_router.get("/{material_id}/explosion", response_model=Explosion)
+def explode_bom(material_id: str, quantity: float = Query(1, gt=0), db: Session = Depends(get_read_db)):
+    request = ExplosionRequest(items=[{"material_id": material_id, "quantity": quantity}])
+    return bom_service.explode(db, request).explosions[0]
+
+@bom_router.put("/{material_id}/items", response_model=BomItem)
+def set_bom_item(material_id: str, request: BomItemSet, db: Session = Depends(get_db)):
+    try:
+        return bom_service.set_bom_item(db, material_id, request)
+    except bom_service.BomCycleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@bom_router.delete("/{material_id}/items/{child_material_id}")
+def delete_bom_item(material_id: str, child_material_id: str, db: Session = Depends(get_db)):
+    if not bom_service.delete_bom_item(db, material_id, child_material_id):
+        raise HTTPException(status_code=404, detail="BOM item not found")
+    return {"deleted": True}
+
+
+mrp_router = APIRouter(
+    prefix="/api/v1/mrp",
+    tags=["mrp"],
+)
+
+# 同步执行计算，数据量大时需要数秒；计划订单在同一事务中替换
+@mrp_router.post("/runs", response_model=MrpRun)
+def run_mrp(request: MrpRunRequest, db: Session = Depends(get_db)):
+    try:
+        return mrp_service.run_mrp(db, request)
+    except mrp_service.MrpSourceError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@mrp_router.get("/runs", response_model=List[MrpRun])
+def read_runs(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_read_db)):
+    return mrp_service.get_runs(db, limit=limit)
+
+@mrp_router.get("/runs/{run_id}", response_model=MrpRun)
+def read_run(run_id: int, db: Session = Depends(get_read_db)):
+    run = mrp_service.get_run(db, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="MRP run not found")
+    return run
+
+@mrp_router.get("/orders", response_model=List[PlannedOrder])
+def read_planned_orders(
+    material_id: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern="^(planned|released|closed)$"),
+    due_before: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    return mrp_service.get_planned_orders(db, material_id=material_id, status=status, due_before=due_before,
+                                          skip=skip, limit=limit)
+
+# 下达后作为在途到货参与之后的计算，到货后关闭
+@mrp_router.post("/orders/{order_id}/release", response_model=PlannedOrder)
+def release_planned_order(order_id: int, db: Session = Depends(get_db)):
+    return _set_order_status(db, order_id, "planned", "released")
+
+@mrp_router.post("/orders/{order_id}/close", response_model=PlannedOrder)
+def close_planned_order(order_id: int, db: Session = Depends(get_db)):
+    return _set_order_status(db, order_id, "released", "closed")
+
+def _set_order_status(db: Session, order_id: int, from_status: str, to_status: str):
+    try:
+        order = mrp_service.set_order_status(db, order_id, from_status, to_status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if order is None:
+        raise HTTPException(status_code=404, detail="Planned order not found")
+    return order
@@ -0,0 +1,129 @@
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import List, Literal, Optional
+
+class MaterialBase(BaseModel):
+    code: str = Field(..., min_length=1, max_length=64)
+    name: str = Field(..., min_length=1, max_length=255)
+    spec: Optional[str] = Field(None, max_length=255)
+    unit: Optional[str] = Field(None, max_length=20)
+    category: Optional[str] = Field(None, max_length=100)
+    lead_time_days: int = Field(0, ge=0, le=3650)
+
+class MaterialCreate(MaterialBase):
+    pass
+
+class MaterialUpdate(MaterialBase):
+    code: Optional[str] = Field(None, min_length=1, max_length=64)
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    lead_time_days: Optional[int] = Field(None, ge=0, le=3650)
+
+class Material(MaterialBase):
+    id: str
+    created_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MaterialSearchHit(BaseModel):
+    id: str
+    code: str
+    name: str
+    spec: Optional[str] = None
+    unit: Optional[str] = None
+    # 命中的字段：code / name / spec
+    matched: str
+
+class BomItemSet(BaseModel):
+    child_material_id: str = Field(..., max_length=36)
+    quantity: float = Field(..., gt=0)
+    # 损耗率，实际用量 = quantity * (1 + scrap_rate)
+    scrap_rate: float = Field(0, ge=0, lt=10)
+    unit: Optional[str] = Field(None, max_length=20)
+
+class BomItem(BomItemSet):
+    id: int
+    parent_material_id: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class Bom(BaseModel):
+    material_id: str
+    # 没有下级物料时为0
+    version: int
+    items: List[BomItem]
+
+class ExplosionRequestItem(BaseModel):
+    material_id: str = Field(..., max_length=36)
+    quantity: float = Field(1, gt=0)
+
+class ExplosionRequest(BaseModel):
+    items: List[ExplosionRequestItem] = Field(..., min_length=1, max_length=1000)
+    # 为真时另外返回全部物料合计的末级需求
+    merge: bool = False
+
+class ExplosionLine(BaseModel):
+    material_id: str
+    quantity: float
+
+class Explosion(BaseModel):
+    material_id: str
+    quantity: float
+    version: int
+    # 物料清单层数，没有下级物料时为0
+    levels: int
+    items: List[ExplosionLine]
+
+class ExplosionResult(BaseModel):
+    explosions: List[Explosion]
+    merged: Optional[List[ExplosionLine]] = None
+
+class MrpRunRequest(BaseModel):
+    # 计划开始时间在 [window_start, window_end) 内的计划计入需求
+    window_start: datetime
+    window_end: datetime
+    bucket_days: int = Field(1, ge=1, le=31)
+    mode: Literal["full", "incremental"] = "full"
+
+    @model_validator(mode="after")
+    def check_window(self):
+        if self.window_end <= self.window_start:
+            raise ValueError("window_end must be later than window_start")
+        if (self.window_end - self.window_start).days > 3660:
+            raise ValueError("window must not exceed 10 years")
+        return self
+
+class MrpRun(BaseModel):
+    id: int
+    mode: str
+    window_start: datetime
+    window_end: datetime
+    bucket_days: int
+    plans: int
+    changed_plans: int
+    materials: int
+    orders: int
+    note: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class PlannedOrder(BaseModel):
+    id: int
+    run_id: int
+    material_id: str
+    quantity: float
+    due_date: datetime
+    release_date: datetime
+    status: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
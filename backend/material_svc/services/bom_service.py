@@ -0,0 +1,360 @@
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models import models
+from .. import schemas
+from db_config import get_service_db_name
+
+# 末级物料 -> 每单位上级物料的用量
+Leaves = Dict[str, Decimal]
+
+# 展开结果缓存的物料数
+EXPLOSION_CACHE_SIZE = int(os.environ.get("MATERIAL_BOM_CACHE_SIZE", 10000))
+# IN 查询每批的物料数
+QUERY_CHUNK_SIZE = 1000
+# 修改物料清单时获取全局锁的超时时间（秒）
+BOM_LOCK_TIMEOUT = 10
+
+
+class BomCycleError(ValueError):
+    def __init__(self, path: List[str]):
+        self.path = path
+        super().__init__(f"BOM cycle: {' -> '.join(path)}")
+
+
+class ExplosionCache:
+    """
+    按 (物料, 清单版本号) 缓存每单位物料展开到末级的用量，超过容量时淘汰最久未使用的物料
+
+    版本号在物料或任一下级物料的清单变化时加1（见 _bump_versions），
+    其他进程修改清单后版本号不同，本进程的旧缓存不会被使用。
+    """
+
+    def __init__(self, maxsize: int = EXPLOSION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        # 物料 -> (版本号, 末级用量, 层数)
+        self._entries: "OrderedDict[str, Tuple[int, Leaves, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, material_id: str, version: int) -> Optional[Tuple[Leaves, int]]:
+        with self._lock:
+            entry = self._entries.get(material_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(material_id)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, material_id: str, version: int, leaves: Leaves, levels: int) -> None:
+        with self._lock:
+            current = self._entries.get(material_id)
+            if current is not None and current[0] > version:
+                return
+            self._entries[material_id] = (version, leaves, levels)
+            self._entries.move_to_end(material_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, material_ids: Iterable[str]) -> None:
+        with self._lock:
+            for material_id in material_ids:
+                self._entries.pop(material_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+# 进程内唯一的展开结果缓存
+explosion_cache = ExplosionCache()
+
+
+def _chunks(values: Iterable[str]):
+    values = list(values)
+    for begin in range(0, len(values), QUERY_CHUNK_SIZE):
+        yield values[begin:begin + QUERY_CHUNK_SIZE]
+
+
+@contextmanager
+def named_lock(db: Session, suffix: str, timeout: int):
+    """
+    在单独的连接上持有按服务库命名的 MySQL GET_LOCK，直到退出上下文（调用方应在退出前提交事务）；
+    SQLite 开发库只在本机使用，不加锁
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "mysql":
+        yield
+        return
+    name = f"{get_service_db_name('material_svc')}_{suffix}"
+    with bind.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}).scalar()
+        if acquired != 1:
+            raise RuntimeError(f"{timeout} 秒内未获取到锁 {name}")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+
+def _bom_write_lock(db: Session):
+    # 修改物料清单串行执行，否则两个并发修改（如 A->B 与 B->A）各自检查都不成环，提交后却形成循环
+    return named_lock(db, "bom", BOM_LOCK_TIMEOUT)
+
+
+def _find_path(db: Session, start: str, target: str) -> Optional[List[str]]:
+    # 从 start 逐层向下查找 target，返回 start -> ... -> target 的路径
+    if start == target:
+        return [start]
+    previous = {start: None}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for chunk in _chunks(frontier):
+            rows = db.execute(
+                select(models.BomItem.parent_material_id, models.BomItem.child_material_id)
+                .where(models.BomItem.parent_material_id.in_(chunk))
+            )
+            for parent, child in rows:
+                if child in previous:
+                    continue
+                previous[child] = parent
+                if child == target:
+                    path = [child]
+                    while previous[path[-1]] is not None:
+                        path.append(previous[path[-1]])
+                    return path[::-1]
+                next_frontier.append(child)
+        frontier = next_frontier
+    return None
+
+
+def _ancestors(db: Session, material_id: str) -> Set[str]:
+    # 物料本身及其全部上级物料
+    found = {material_id}
+    frontier = [material_id]
+    while frontier:
+        next_frontier = []
+        for chunk in _chunks(frontier):
+            rows = db.execute(
+                select(models.BomItem.parent_material_id).where(models.BomItem.child_material_id.in_(chunk))
+            ).scalars()
+            for parent in rows:
+                if parent not in found:
+                    found.add(parent)
+                    next_frontier.append(parent)
+        frontier = next_frontier
+    return found
+
+
+def _bump_versions(db: Session, material_ids: Set[str], now: datetime) -> None:
+    for chunk in _chunks(material_ids):
+        db.execute(
+            update(models.Bom)
+            .where(models.Bom.material_id.in_(chunk))
+            .values(version=models.Bom.version + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def get_bom(db: Session, material_id: str) -> schemas.Bom:
+    version = db.execute(
+        select(models.Bom.version).where(models.Bom.material_id == material_id)
+    ).scalar_one_or_none()
+    items = db.execute(
+        select(models.BomItem).where(models.BomItem.parent_material_id == material_id).order_by(models.BomItem.id)
+    ).scalars()
+    return schemas.Bom(
+        material_id=material_id,
+        version=version or 0,
+        items=[schemas.BomItem.model_validate(item) for item in items],
+    )
+
+
+def set_bom_item(db: Session, parent_material_id: str, request: schemas.BomItemSet) -> models.BomItem:
+    """
+    新增或修改物料清单中的一个下级物料
+
+    Raises:
+        BomCycleError: 下级物料已直接或间接包含上级物料
+    """
+    child_material_id = request.child_material_id
+    with _bom_write_lock(db):
+        path = _find_path(db, child_material_id, parent_material_id)
+        if path is not None:
+            db.rollback()
+            raise BomCycleError([parent_material_id] + path)
+
+        now = datetime.now()
+        header = db.execute(
+            select(models.Bom).where(models.Bom.material_id == parent_material_id)
+        ).scalar_one_or_none()
+        if header is None:
+            db.add(models.Bom(material_id=parent_material_id, version=0, created_at=now, updated_at=now))
+
+        item = db.execute(
+            select(models.BomItem).where(
+                models.BomItem.parent_material_id == parent_material_id,
+                models.BomItem.child_material_id == child_material_id,
+            )
+        ).scalar_one_or_none()
+        if item is None:
+            item = models.BomItem(parent_material_id=parent_material_id, child_material_id=child_material_id,
+                                  created_at=now)
+            db.add(item)
+        item.quantity = Decimal(str(request.quantity))
+        item.scrap_rate = Decimal(str(request.scrap_rate))
+        item.unit = request.unit
+        item.updated_at = now
+        db.flush()
+
+        ancestors = _ancestors(db, parent_material_id)
+        _bump_versions(db, ancestors, now)
+        db.commit()
+    explosion_cache.invalidate(ancestors)
+    db.refresh(item)
+    return item
+
+
+def delete_bom_item(db: Session, parent_material_id: str, child_material_id: str) -> bool:
+    with _bom_write_lock(db):
+        result = db.execute(
+            delete(models.BomItem).where(
+                models.BomItem.parent_material_id == parent_material_id,
+                models.BomItem.child_material_id == child_material_id,
+            )
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            return False
+        ancestors = _ancestors(db, parent_material_id)
+        _bump_versions(db, ancestors, datetime.now())
+        db.commit()
+    explosion_cache.invalidate(ancestors)
+    return True
+
+
+def _children_first(nodes: Dict[str, int], children: Dict[str, List[Tuple[str, Decimal]]]) -> List[str]:
+    # 深度优先的后序遍历，下级物料排在上级物料之前
+    order = []
+    state = {}
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = "visiting"
+        stack = [(root, iter(children.get(root, ())))]
+        while stack:
+            node, remaining = stack[-1]
+            for child, _ in remaining:
+                if child not in nodes:
+                    continue
+                if child not in state:
+                    state[child] = "visiting"
+                    stack.append((child, iter(children.get(child, ()))))
+                    break
+                if state[child] == "visiting":
+                    raise BomCycleError([n for n, _ in stack] + [child])
+            else:
+                stack.pop()
+                state[node] = "done"
+                order.append(node)
+    return order
+
+
+def expand(db: Session, material_ids: Iterable[str]) -> Dict[str, Tuple[int, Leaves, int]]:
+    """
+    计算各物料每单位展开到末级物料的用量
+
+    按层读取物料清单，缓存中版本号相同的物料不再读取其下级；多个物料共用的子装配只展开一次。
+    读取完成后按下级在前的拓扑顺序自底向上合并，并把每个子装配的结果放入缓存。
+
+    Returns:
+        物料 -> (清单版本号, 末级用量, 层数)，没有物料清单的物料展开为其本身
+    """
+    results: Dict[str, Tuple[int, Leaves, int]] = {}
+    versions: Dict[str, int] = {}
+    children: Dict[str, List[Tuple[str, Decimal]]] = defaultdict(list)
+    frontier = set(material_ids)
+    seen = set(frontier)
+    while frontier:
+        header_versions = {}
+        for chunk in _chunks(frontier):
+            header_versions.update(db.execute(
+                select(models.Bom.material_id, models.Bom.version).where(models.Bom.material_id.in_(chunk))
+            ).all())
+
+        to_load = []
+        for material_id in frontier:
+            version = header_versions.get(material_id, 0)
+            cached = explosion_cache.get(material_id, version) if version else None
+            if not version:
+                results[material_id] = (0, {material_id: Decimal(1)}, 0)
+            elif cached is not None:
+                results[material_id] = (version, cached[0], cached[1])
+            else:
+                versions[material_id] = version
+                to_load.append(material_id)
+
+        frontier = set()
+        for chunk in _chunks(to_load):
+            rows = db.execute(
+                select(models.BomItem.parent_material_id, models.BomItem.child_material_id,
+                       models.BomItem.quantity, models.BomItem.scrap_rate)
+                .where(models.BomItem.parent_material_id.in_(chunk))
+            )
+            for parent, child, quantity, scrap_rate in rows:
+                children[parent].append((child, Decimal(quantity) * (1 + Decimal(scrap_rate))))
+                if child not in seen:
+                    seen.add(child)
+                    frontier.add(child)
+
+    for material_id in _children_first(versions, children):
+        items = children.get(material_id)
+        if not items:
+            # 下级物料已全部删除
+            leaves, levels = {material_id: Decimal(1)}, 0
+        else:
+            merged = defaultdict(Decimal)
+            levels = 0
+            for child, quantity in items:
+                _, child_leaves, child_levels = results[child]
+                for leaf, leaf_quantity in child_leaves.items():
+                    merged[leaf] += leaf_quantity * quantity
+                levels = max(levels, child_levels + 1)
+            leaves = dict(merged)
+        results[material_id] = (versions[material_id], leaves, levels)
+        explosion_cache.put(material_id, versions[material_id], leaves, levels)
+    return results
+
+
+def explode(db: Session, request: schemas.ExplosionRequest) -> schemas.ExplosionResult:
+    """
+    把多个物料及其数量展开到末级物料需求
+    """
+    results = expand(db, {item.material_id for item in request.items})
+    explosions = []
+    merged = defaultdict(Decimal)
+    for item in request.items:
+        version, leaves, levels = results[item.material_id]
+        quantity = Decimal(str(item.quantity))
+        lines = []
+        for leaf, per_unit in sorted(leaves.items()):
+            lines.append(schemas.ExplosionLine(material_id=leaf, quantity=per_unit * quantity))
+            merged[leaf] += per_unit * quantity
+        explosions.append(schemas.Explosion(
+            material_id=item.material_id, quantity=item.quantity, version=version, levels=levels, items=lines,
+        ))
+    return schemas.ExplosionResult(
+        explosions=explosions,
+        merged=[schemas.ExplosionLine(material_id=m, quantity=q) for m, q in sorted(merged.items())]
+        if request.merge else None,
+    )
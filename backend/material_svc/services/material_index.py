@@ -0,0 +1,274 @@
+"""
+物料搜索索引
+
+前端物料选择框按编码、名称、规格输入联想。MySQL 的 LIKE '%x%' 无法使用索引，
+这里在进程内维护搜索索引：
+- 编码：按小写编码排序的数组，前缀查询用二分查找定位；
+- 名称、规格：单字、相邻两字（bigram）和三字的倒排索引，中文没有空格分词，按字切分。
+  查询时取查询词各个 n-gram 中最短的倒排列表作为候选，再用子串匹配确认。
+
+启动时以流式查询读取全部物料建立索引；本进程内的物料修改立即更新索引，
+其他进程的修改按 updated_at 定期增量读取。修改过的物料在倒排列表中追加新的文档编号，
+旧编号标记删除，删除的编号过多时重新建立索引。
+"""
+import os
+import time
+import logging
+import threading
+from array import array
+from itertools import islice
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import models
+from .. import schemas
+
+logger = logging.getLogger(__name__)
+
+# 名称、规格匹配时最多确认的命中数（limit 的倍数），命中更多时只在这些命中中排序
+CANDIDATE_FACTOR = int(os.environ.get("MATERIAL_INDEX_CANDIDATE_FACTOR", 8))
+# 每次查询最多检查的候选文档数，保证常见字词的查询延迟有上限（从最新的文档开始检查）
+MAX_SCAN = int(os.environ.get("MATERIAL_INDEX_MAX_SCAN", 20000))
+# 删除的文档编号超过有效文档的该比例时重建索引
+COMPACT_RATIO = 0.25
+COMPACT_MIN_DEAD = 10000
+# 增量读取时 updated_at 往前重叠的时间（秒），覆盖读取时尚未提交的修改
+POLL_OVERLAP_SECONDS = 300
+BUILD_BATCH_SIZE = 10000
+
+
+def normalize(text: Optional[str]) -> str:
+    return "".join((text or "").lower().split())
+
+
+def _grams(text: str):
+    # 单字、两字、三字
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    grams.update(text[i:i + 3] for i in range(len(text) - 2))
+    return grams
+
+
+def _query_grams(q: str):
+    # 查询词最长的 n-gram（最多三字），文档必须包含查询词的全部这些 n-gram
+    n = min(len(q), 3)
+    return {q[i:i + n] for i in range(len(q) - n + 1)}
+
+
+class _IndexData:
+    # 一份完整的索引，重建时整体替换
+
+    def __init__(self):
+        # 按编码排序的 (小写编码, 物料ID)
+        self.codes: List[str] = []
+        self.code_ids: List[str] = []
+        # 文档编号 -> 物料ID / "小写名称\0小写规格" / 是否有效
+        self.doc_ids: List[str] = []
+        self.doc_texts: List[str] = []
+        self.alive = bytearray()
+        self.dead = 0
+        self.postings: Dict[str, array] = {}
+        # 物料ID -> (文档编号, 编码, 名称, 规格, 单位, 修改时间)
+        self.materials: Dict[str, Tuple[int, str, str, Optional[str], Optional[str], datetime]] = {}
+
+    def add_document(self, material) -> None:
+        doc = len(self.doc_ids)
+        name, spec = normalize(material.name), normalize(material.spec)
+        self.doc_ids.append(material.id)
+        self.doc_texts.append(f"{name}\0{spec}")
+        self.alive.append(1)
+        for gram in _grams(name) | _grams(spec):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array("I")
+            posting.append(doc)
+        self.materials[material.id] = (doc, material.code, material.name, material.spec, material.unit,
+                                       material.updated_at)
+
+    def hit(self, material_id: str, matched: str) -> schemas.MaterialSearchHit:
+        _, code, name, spec, unit, _ = self.materials[material_id]
+        return schemas.MaterialSearchHit(id=material_id, code=code, name=name, spec=spec, unit=unit, matched=matched)
+
+    def remove(self, material_id: str) -> None:
+        entry = self.materials.pop(material_id, None)
+        if entry is None:
+            return
+        self.alive[entry[0]] = 0
+        self.dead += 1
+        code = entry[1].lower()
+        position = bisect_left(self.codes, code)
+        while position < len(self.codes) and self.codes[position] == code:
+            if self.code_ids[position] == material_id:
+                del self.codes[position]
+                del self.code_ids[position]
+                break
+            position += 1
+
+
+class MaterialIndex:
+    """
+    物料搜索索引，各方法可在多个线程中调用
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Optional[_IndexData] = None
+        self._watermark: Optional[datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    def build(self, rows: Iterable) -> None:
+        """
+        由物料行（带 id、code、name、spec、unit、updated_at 属性，不含已删除的物料）建立完整索引并替换当前索引
+        """
+        begin = time.perf_counter()
+        data = _IndexData()
+        codes = []
+        watermark = None
+        for row in rows:
+            data.add_document(row)
+            codes.append((row.code.lower(), row.id))
+            if watermark is None or row.updated_at > watermark:
+                watermark = row.updated_at
+        codes.sort()
+        data.codes = [code for code, _ in codes]
+        data.code_ids = [material_id for _, material_id in codes]
+        with self._lock:
+            self._data = data
+            if watermark is not None and (self._watermark is None or watermark > self._watermark):
+                self._watermark = watermark
+        logger.info(f"物料搜索索引已建立：{len(data.materials)} 个物料，{len(data.postings)} 个索引词，"
+                    f"耗时 {(time.perf_counter() - begin) * 1000:.0f}ms")
+
+    def load(self, db: Session) -> None:
+        """
+        以流式查询读取全部物料建立索引
+        """
+        M = models.Material
+        started_at = datetime.now()
+        rows = db.execute(
+            select(M.id, M.code, M.name, M.spec, M.unit, M.updated_at)
+            .where(M.deleted_at.is_(None))
+            .execution_options(yield_per=BUILD_BATCH_SIZE)
+        )
+        with self._lock:
+            # 建立期间的修改由之后的增量读取补上
+            self._watermark = min(self._watermark or started_at, started_at)
+        self.build(rows)
+
+    def upsert(self, material) -> None:
+        """
+        新增或更新一个物料；已删除的物料（deleted_at 不为空）从索引中移除
+        """
+        with self._lock:
+            data = self._data
+            if data is None:
+                return
+            current = data.materials.get(material.id)
+            if current is not None and current[5] >= material.updated_at:
+                return
+            data.remove(material.id)
+            if material.deleted_at is None:
+                data.add_document(material)
+                code = material.code.lower()
+                position = bisect_left(data.codes, code)
+                data.codes.insert(position, code)
+                data.code_ids.insert(position, material.id)
+
+    def poll(self, db: Session) -> None:
+        """
+        读取其他进程修改过的物料；删除的文档编号过多时重新建立索引
+        """
+        data = self._data
+        if data is None or (data.dead > COMPACT_MIN_DEAD and data.dead > len(data.materials) * COMPACT_RATIO):
+            self.load(db)
+            return
+        M = models.Material
+        since = self._watermark - timedelta(seconds=POLL_OVERLAP_SECONDS)
+        rows = db.execute(
+            select(M.id, M.code, M.name, M.spec, M.unit, M.updated_at, M.deleted_at).where(M.updated_at > since)
+        ).all()
+        for row in rows:
+            self.upsert(row)
+        with self._lock:
+            for row in rows:
+                if row.updated_at > self._watermark:
+                    self._watermark = row.updated_at
+
+    def search(self, query: str, limit: int = 20) -> List[schemas.MaterialSearchHit]:
+        """
+        按编码前缀、名称或规格中的子串查询物料
+
+        排序：编码完全相同、编码前缀、名称前缀、名称包含、规格包含；同一类中名称短的在前
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        with self._lock:
+            data = self._data
+            if data is None:
+                return []
+            hits = []
+            seen = set()
+            position = bisect_left(data.codes, q)
+            while position < len(data.codes) and len(hits) < limit and data.codes[position].startswith(q):
+                material_id = data.code_ids[position]
+                hits.append(data.hit(material_id, "code"))
+                seen.add(material_id)
+                position += 1
+            if len(hits) >= limit:
+                return hits
+
+            postings = []
+            for gram in _query_grams(q):
+                posting = data.postings.get(gram)
+                if posting is None:
+                    return hits
+                postings.append(posting)
+            matches = []
+            wanted = (limit - len(hits)) * CANDIDATE_FACTOR
+            texts, alive, doc_ids = data.doc_texts, data.alive, data.doc_ids
+            # 文档编号越大越新，优先确认最近新增或修改的物料
+            for doc in islice(reversed(min(postings, key=len)), MAX_SCAN):
+                text = texts[doc]
+                position = text.find(q)
+                if position < 0 or not alive[doc]:
+                    continue
+                material_id = doc_ids[doc]
+                if material_id in seen:
+                    continue
+                name_length = text.index("\0")
+                if position < name_length:
+                    rank, matched = (0 if position == 0 else 1), "name"
+                else:
+                    rank, matched = 2, "spec"
+                matches.append((rank, name_length, data.materials[material_id][1], material_id, matched))
+                if len(matches) >= wanted:
+                    break
+            matches.sort()
+            for rank, _, _, material_id, matched in matches[:limit - len(hits)]:
+                hits.append(data.hit(material_id, matched))
+            return hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = self._data
+            if data is None:
+                return {"ready": False}
+            return {
+                "ready": True,
+                "materials": len(data.materials),
+                "documents": len(data.doc_ids),
+                "dead_documents": data.dead,
+                "grams": len(data.postings),
+                "watermark": self._watermark,
+            }
+
+
+# 进程内唯一的物料搜索索引
+material_index = MaterialIndex()
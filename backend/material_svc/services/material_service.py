@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from ..models import models
+from .. import schemas
+
+
+class DuplicateMaterialCodeError(ValueError):
+    def __init__(self, code: str):
+        self.code = code
+        super().__init__(f"Material code already exists: {code}")
+
+
+def get_material(db: Session, material_id: str) -> Optional[models.Material]:
+    material = db.get(models.Material, material_id)
+    return material if material is not None and material.deleted_at is None else None
+
+
+def get_materials(db: Session, category: Optional[str] = None, skip: int = 0, limit: int = 100
+                  ) -> List[models.Material]:
+    stmt = select(models.Material).where(models.Material.deleted_at.is_(None)).order_by(models.Material.code)
+    if category is not None:
+        stmt = stmt.where(models.Material.category == category)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def create_material(db: Session, material: schemas.MaterialCreate) -> models.Material:
+    now = datetime.now()
+    db_material = models.Material(id=str(uuid.uuid4()), created_at=now, updated_at=now, **material.model_dump())
+    db.add(db_material)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise DuplicateMaterialCodeError(material.code)
+    db.refresh(db_material)
+    return db_material
+
+
+def update_material(db: Session, material_id: str, material: schemas.MaterialUpdate) -> Optional[models.Material]:
+    db_material = get_material(db, material_id)
+    if db_material is None:
+        return None
+    for key, value in material.model_dump(exclude_unset=True).items():
+        setattr(db_material, key, value)
+    db_material.updated_at = datetime.now()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise DuplicateMaterialCodeError(material.code)
+    db.refresh(db_material)
+    return db_material
+
+
+def delete_material(db: Session, material_id: str) -> Optional[models.Material]:
+    db_material = get_material(db, material_id)
+    if db_material is None:
+        return None
+    now = datetime.now()
+    db_material.deleted_at = now
+    db_material.updated_at = now
+    db.commit()
+    db.refresh(db_material)
+    return db_material
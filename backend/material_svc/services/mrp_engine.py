@@ -0,0 +1,187 @@
+"""
+物料需求计划（MRP）计算核心
+
+全部计算在 NumPy 数组上完成，不逐行循环：
+- 物料编号为 0..n-1 的整数，物料清单保存为按上级物料排序的边数组（CSR），
+  低层码（物料在任一物料清单中出现的最深层次）由逐层传递求得；
+- 需求、预计到货、计划订单都是 (物料, 时间段, 数量) 三个等长数组；
+- 按低层码从上到下逐层计算：一层的毛需求汇总成 物料 × 时间段 的矩阵，
+  预计可用量 = 现有库存 + 累计(到货 - 毛需求)，按批对批（lot-for-lot）补足历史最低点的缺口得到计划订单；
+  计划订单按提前期倒推下达时间段，乘以用量后成为下级物料的毛需求。
+
+增量计算只重算受影响的物料（变化的计划所涉及产品及其全部下级物料）：
+其余物料的计划订单保持不变，其对受影响下级物料的需求在开始时一次展开。
+"""
+import numpy as np
+from typing import Optional, Tuple
+
+# (物料编号, 时间段, 数量)
+Entries = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# 小于该数量的缺口视为浮点误差，不生成计划订单
+EPSILON = 1e-6
+# 每次汇总成矩阵的物料数，限制 物料 × 时间段 矩阵的内存
+ROW_BLOCK = 20000
+# 低层码的上限，超过时说明物料清单有循环
+MAX_LEVELS = 1000
+
+
+def empty_entries() -> Entries:
+    return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64)
+
+
+def concat_entries(*parts: Entries) -> Entries:
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+
+def select_entries(entries: Entries, mask: np.ndarray) -> Entries:
+    return tuple(column[mask] for column in entries)
+
+
+class BomStructure:
+    """
+    物料清单结构：物料编号、提前期、按上级物料排序的边和低层码
+    """
+
+    def __init__(self, material_ids, lead_times: np.ndarray, parents: np.ndarray, children: np.ndarray,
+                 quantities: np.ndarray, codes=None):
+        """
+        Args:
+            material_ids: 物料ID列表，下标即物料编号
+            lead_times: 各物料的提前期（天）
+            parents, children, quantities: 每条边的上级物料编号、下级物料编号、每单位上级物料的用量（含损耗）
+            codes: 物料编码列表（可选），用于把计划的产品名称对应到物料
+        """
+        self.material_ids = list(material_ids)
+        self.size = len(self.material_ids)
+        self.index = {material_id: i for i, material_id in enumerate(self.material_ids)}
+        self.code_index = {code: i for i, code in enumerate(codes or ()) if code is not None}
+        self.lead_times = np.asarray(lead_times, dtype=np.int64)
+        order = np.argsort(parents, kind="stable")
+        self.edge_parent = np.asarray(parents, dtype=np.int64)[order]
+        self.edge_child = np.asarray(children, dtype=np.int64)[order]
+        self.edge_quantity = np.asarray(quantities, dtype=np.float64)[order]
+        self.offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_parent, minlength=self.size), out=self.offsets[1:])
+        self.levels = self._low_level_codes()
+        self.max_level = int(self.levels.max()) if self.size else 0
+
+    def _low_level_codes(self) -> np.ndarray:
+        levels = np.zeros(self.size, dtype=np.int64)
+        for _ in range(MAX_LEVELS):
+            updated = levels.copy()
+            np.maximum.at(updated, self.edge_child, levels[self.edge_parent] + 1)
+            if np.array_equal(updated, levels):
+                return levels
+            levels = updated
+        raise ValueError("BOM structure contains a cycle")
+
+    def resolve(self, product: str) -> Optional[int]:
+        """
+        计划的产品名称按物料编码、物料ID的顺序对应到物料编号
+        """
+        index = self.code_index.get(product)
+        return index if index is not None else self.index.get(product)
+
+    def explode(self, orders: Entries, lead_buckets: np.ndarray) -> Entries:
+        """
+        计划订单按提前期倒推到下达时间段，展开为直接下级物料的毛需求
+        """
+        materials, buckets, quantities = orders
+        counts = self.offsets[materials + 1] - self.offsets[materials]
+        total = int(counts.sum())
+        if total == 0:
+            return empty_entries()
+        owner = np.repeat(np.arange(len(materials)), counts)
+        # 每个订单的边在输出中连续排列，边序号 = 上级物料的第一条边 + 在该订单中的序号
+        first = np.repeat(self.offsets[materials] - (np.cumsum(counts) - counts), counts)
+        edges = first + np.arange(total)
+        release = np.maximum(buckets - lead_buckets[materials], 0)
+        return self.edge_child[edges], release[owner], quantities[owner] * self.edge_quantity[edges]
+
+    def descendants(self, roots: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            布尔数组，roots 及其全部下级物料为真
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        frontier = np.unique(roots)
+        mask[frontier] = True
+        while len(frontier):
+            counts = self.offsets[frontier + 1] - self.offsets[frontier]
+            total = int(counts.sum())
+            first = np.repeat(self.offsets[frontier] - (np.cumsum(counts) - counts), counts)
+            children = np.unique(self.edge_child[first + np.arange(total)])
+            frontier = children[~mask[children]]
+            mask[frontier] = True
+        return mask
+
+
+def _net_rows(rows: np.ndarray, demand: Entries, receipts: Entries, on_hand: np.ndarray, buckets: int) -> Entries:
+    # rows 已排序；demand、receipts 只包含 rows 中的物料
+    gross = np.zeros((len(rows), buckets))
+    np.add.at(gross, (np.searchsorted(rows, demand[0]), demand[1]), demand[2])
+    supply = np.zeros((len(rows), buckets))
+    np.add.at(supply, (np.searchsorted(rows, receipts[0]), receipts[1]), receipts[2])
+    projected = np.maximum(on_hand[rows], 0)[:, None] + np.cumsum(supply - gross, axis=1)
+    # 到每个时间段为止累计需要补充的数量 = 预计可用量历史最低点的缺口
+    shortage = np.maximum(-np.minimum.accumulate(projected, axis=1), 0)
+    orders = np.diff(shortage, axis=1, prepend=0)
+    r, b = np.nonzero(orders > EPSILON)
+    return rows[r], b.astype(np.int64), orders[r, b]
+
+
+def plan_orders(structure: BomStructure, buckets: int, bucket_days: int, demand: Entries, on_hand: np.ndarray,
+                receipts: Entries, affected: Optional[np.ndarray] = None,
+                kept_orders: Optional[Entries] = None) -> Entries:
+    """
+    逐层计算净需求并生成计划订单（批对批）
+
+    Args:
+        structure: 物料清单结构
+        buckets: 时间段个数
+        bucket_days: 每个时间段的天数，用于把提前期换算为时间段
+        demand: 独立需求（计划的产品数量，按开始时间所在时间段）
+        on_hand: 各物料的现有库存
+        receipts: 预计到货（已下达的计划订单）
+        affected: 需要计算的物料（布尔数组），为空时计算全部物料
+        kept_orders: 不重新计算的物料的现有计划订单，其对受影响物料的需求参与计算
+
+    Returns:
+        受影响物料的计划订单 (物料编号, 到期时间段, 数量)
+    """
+    if affected is None:
+        affected = np.ones(structure.size, dtype=bool)
+    lead_buckets = -(-structure.lead_times // bucket_days)
+    pending = select_entries(demand, affected[demand[0]])
+    if kept_orders is not None and len(kept_orders[0]):
+        dependent = structure.explode(kept_orders, lead_buckets)
+        pending = concat_entries(pending, select_entries(dependent, affected[dependent[0]]))
+    receipts = select_entries(receipts, affected[receipts[0]])
+    receipts = select_entries(receipts, np.argsort(receipts[0], kind="stable"))
+
+    results = []
+    for level in range(structure.max_level + 1):
+        if not len(pending[0]):
+            break
+        at_level = structure.levels[pending[0]] == level
+        current = select_entries(pending, at_level)
+        pending = select_entries(pending, ~at_level)
+        if not len(current[0]):
+            continue
+        current = select_entries(current, np.argsort(current[0], kind="stable"))
+        rows = np.unique(current[0])
+        for begin in range(0, len(rows), ROW_BLOCK):
+            block = rows[begin:begin + ROW_BLOCK]
+            lo = np.searchsorted(current[0], block[0], side="left")
+            hi = np.searchsorted(current[0], block[-1], side="right")
+            block_receipts = select_entries(receipts, slice(
+                np.searchsorted(receipts[0], block[0], side="left"),
+                np.searchsorted(receipts[0], block[-1], side="right"),
+            ))
+            block_receipts = select_entries(block_receipts, np.isin(block_receipts[0], block))
+            orders = _net_rows(block, select_entries(current, slice(lo, hi)), block_receipts, on_hand, buckets)
+            results.append(orders)
+            dependent = structure.explode(orders, lead_buckets)
+            pending = concat_entries(pending, select_entries(dependent, affected[dependent[0]]))
+    return concat_entries(empty_entries(), *results) if results else empty_entries()
@@ -0,0 +1,327 @@
+"""
+物料需求计划（MRP）
+
+需求来自 plan_svc 的生产计划（产品、数量、开始时间），按物料清单逐层展开，
+与 inventory_svc 的现有库存、已下达（在途）的计划订单逐时间段冲减，生成计划订单。
+计算本身见 mrp_engine.py。
+
+- 全量计算：读取时间窗口内的全部计划，替换全部 planned 状态的计划订单；
+- 增量计算：与本进程上一次计算的计划逐条比较，只重算变化的计划涉及的产品及其全部下级物料，
+  只替换这些物料的 planned 订单。本进程没有可用的上一次计算（重启、其他 worker 执行、窗口或时间段不同、
+  物料或物料清单已修改）时改为全量计算。
+"""
+import math
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models import models
+from .. import schemas
+from .bom_service import named_lock, _chunks
+from .mrp_engine import BomStructure, Entries, concat_entries, empty_entries, plan_orders, select_entries
+from backend.service_client import service_client
+
+logger = logging.getLogger(__name__)
+
+# 同一时间只执行一次计算（多个进程之间用 MySQL GET_LOCK）
+MRP_LOCK_TIMEOUT = 60
+# 写入计划订单时每条 INSERT 的行数
+INSERT_CHUNK_SIZE = 5000
+# 运行记录中最多列出的无法识别的产品名称数
+MAX_NOTED_PRODUCTS = 20
+
+# 计划ID -> (产品物料编号, 时间段, 数量)
+PlanEntry = Tuple[int, int, float]
+
+
+class MrpSourceError(RuntimeError):
+    """
+    读取计划或库存的服务调用失败
+    """
+
+
+class _MrpState:
+    # 上一次计算的输入和结果，供增量计算使用
+    def __init__(self, run_id: int, structure: BomStructure, signature: tuple, window_start: datetime,
+                 buckets: int, bucket_days: int, plans: Dict[int, PlanEntry], on_hand: np.ndarray, orders: Entries):
+        # 产生该结果的运行记录；数据库中有更新的运行记录说明其他 worker 已重写计划订单
+        self.run_id = run_id
+        self.structure = structure
+        self.signature = signature
+        self.window_start = window_start
+        self.buckets = buckets
+        self.bucket_days = bucket_days
+        self.plans = plans
+        self.on_hand = on_hand
+        self.orders = orders
+
+
+_lock = threading.Lock()
+_state: Optional[_MrpState] = None
+# 最近一次读取的物料清单结构，物料和物料清单没有变化时复用
+_structure: Optional[Tuple[tuple, BomStructure]] = None
+
+
+def _structure_signature(db: Session) -> tuple:
+    M, B, I = models.Material, models.Bom, models.BomItem
+    return (
+        tuple(db.execute(select(func.count(), func.max(M.updated_at))).one()),
+        tuple(db.execute(select(func.count(), func.max(B.updated_at))).one()),
+        db.execute(select(func.count()).select_from(I)).scalar(),
+    )
+
+
+def _load_structure(db: Session, signature: tuple) -> BomStructure:
+    global _structure
+    if _structure is not None and _structure[0] == signature:
+        return _structure[1]
+    begin = time.perf_counter()
+    M, I = models.Material, models.BomItem
+    materials = db.execute(select(M.id, M.code, M.lead_time_days).where(M.deleted_at.is_(None))).all()
+    ids = [row.id for row in materials]
+    codes = [row.code for row in materials]
+    lead_times = [row.lead_time_days or 0 for row in materials]
+    index = {material_id: i for i, material_id in enumerate(ids)}
+    parents, children, quantities = [], [], []
+    rows = db.execute(select(I.parent_material_id, I.child_material_id, I.quantity, I.scrap_rate))
+    for parent, child, quantity, scrap_rate in rows:
+        # 物料清单可以引用物料主数据中没有（或已删除）的物料，提前期按0处理
+        for material_id in (parent, child):
+            if material_id not in index:
+                index[material_id] = len(ids)
+                ids.append(material_id)
+                codes.append(None)
+                lead_times.append(0)
+        parents.append(index[parent])
+        children.append(index[child])
+        quantities.append(float(quantity) * (1 + float(scrap_rate)))
+    structure = BomStructure(ids, np.array(lead_times), np.array(parents, dtype=np.int64),
+                             np.array(children, dtype=np.int64), np.array(quantities), codes=codes)
+    _structure = (signature, structure)
+    logger.info(f"已读取物料清单结构：{structure.size} 个物料，{len(parents)} 条物料清单明细，"
+                f"最大低层码 {structure.max_level}，耗时 {(time.perf_counter() - begin) * 1000:.0f}ms")
+    return structure
+
+
+def _fetch_plans(window_start: datetime, window_end: datetime) -> List[dict]:
+    response = service_client.request('plan_svc', 'GET', '/api/v1/plans/overlap', params={
+        "from": window_start.isoformat(), "to": window_end.isoformat(),
+    })
+    if response.status_code != 200:
+        raise MrpSourceError(f"plan_svc returned {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+
+def _fetch_on_hand(structure: BomStructure, material_ids: Optional[List[str]] = None) -> np.ndarray:
+    response = service_client.request('inventory_svc', 'POST', '/api/v1/inventories/balances',
+                                      json={"material_ids": material_ids})
+    if response.status_code != 200:
+        raise MrpSourceError(f"inventory_svc returned {response.status_code}: {response.text[:200]}")
+    on_hand = np.zeros(structure.size)
+    for balance in response.json():
+        index = structure.index.get(balance["material_id"])
+        if index is not None:
+            on_hand[index] = balance["quantity"]
+    return on_hand
+
+
+def _plan_entries(structure: BomStructure, plans: List[dict], window_start: datetime, buckets: int,
+                  bucket_days: int) -> Tuple[Dict[int, PlanEntry], List[str]]:
+    # 已开始的计划的物料已经领用，反映在现有库存中，不再计入需求
+    entries = {}
+    unresolved = set()
+    bucket_seconds = bucket_days * 86400
+    for plan in plans:
+        start_time = datetime.fromisoformat(plan["start_time"])
+        if start_time < window_start or not plan["quantity"]:
+            continue
+        material = structure.resolve(plan["product_name"])
+        if material is None:
+            unresolved.add(plan["product_name"])
+            continue
+        bucket = min(int((start_time - window_start).total_seconds() // bucket_seconds), buckets - 1)
+        entries[plan["id"]] = (material, bucket, float(plan["quantity"]))
+    return entries, sorted(unresolved)
+
+
+def _to_entries(plans: Dict[int, PlanEntry]) -> Entries:
+    if not plans:
+        return empty_entries()
+    columns = list(zip(*plans.values()))
+    return np.array(columns[0], dtype=np.int64), np.array(columns[1], dtype=np.int64), np.array(columns[2])
+
+
+def _receipts(db: Session, structure: BomStructure, window_start: datetime, window_end: datetime,
+              buckets: int, bucket_days: int, material_ids: Optional[List[str]] = None) -> Entries:
+    # 已下达的计划订单按到期时间段计为预计到货，已过期未关闭的计入第一个时间段
+    P = models.PlannedOrder
+    stmt = select(P.material_id, P.due_date, P.quantity).where(P.status == "released", P.due_date < window_end)
+    rows = []
+    for chunk in (_chunks(material_ids) if material_ids is not None else [None]):
+        rows.extend(db.execute(stmt if chunk is None else stmt.where(P.material_id.in_(chunk))).all())
+    materials, bucket_list, quantities = [], [], []
+    for material_id, due_date, quantity in rows:
+        index = structure.index.get(material_id)
+        if index is None:
+            continue
+        materials.append(index)
+        bucket_list.append(max(int((due_date - window_start).total_seconds() // (bucket_days * 86400)), 0))
+        quantities.append(float(quantity))
+    if not materials:
+        return empty_entries()
+    return np.array(materials, dtype=np.int64), np.array(bucket_list, dtype=np.int64), np.array(quantities)
+
+
+def _save_orders(db: Session, run: models.MrpRun, structure: BomStructure, orders: Entries,
+                 material_ids: Optional[List[str]], now: datetime) -> None:
+    P = models.PlannedOrder
+    if material_ids is None:
+        db.execute(delete(P).where(P.status == "planned"))
+    else:
+        for chunk in _chunks(material_ids):
+            db.execute(delete(P).where(P.status == "planned", P.material_id.in_(chunk)))
+    bucket = timedelta(days=run.bucket_days)
+    rows = []
+    for material, bucket_index, quantity in zip(orders[0].tolist(), orders[1].tolist(), orders[2].tolist()):
+        due_date = run.window_start + bucket * bucket_index
+        rows.append({
+            "run_id": run.id, "material_id": structure.material_ids[material],
+            "quantity": round(quantity, 6), "due_date": due_date,
+            "release_date": due_date - timedelta(days=int(structure.lead_times[material])),
+            "status": "planned", "created_at": now, "updated_at": now,
+        })
+    for begin in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert(P), rows[begin:begin + INSERT_CHUNK_SIZE])
+
+
+def run_mrp(db: Session, request: schemas.MrpRunRequest) -> models.MrpRun:
+    """
+    执行一次物料需求计划计算并保存计划订单
+
+    Raises:
+        MrpSourceError: 读取计划或库存失败
+    """
+    global _state
+    with _lock, named_lock(db, "mrp", MRP_LOCK_TIMEOUT):
+        begin = time.perf_counter()
+        started_at = datetime.now()
+        # 数据库中保存的是不带时区的服务器本地时间，带时区的窗口先换算成本地时间
+        window_start, window_end = (value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+                                    for value in (request.window_start, request.window_end))
+        bucket_days = request.bucket_days
+        buckets = math.ceil((window_end - window_start).total_seconds() / (bucket_days * 86400))
+
+        signature = _structure_signature(db)
+        structure = _load_structure(db, signature)
+        plans, unresolved = _plan_entries(structure, _fetch_plans(window_start, window_end), window_start,
+                                          buckets, bucket_days)
+        demand = _to_entries(plans)
+        notes = []
+        if unresolved:
+            notes.append(f"{len(unresolved)} unresolved products: {', '.join(unresolved[:MAX_NOTED_PRODUCTS])}")
+
+        base = _state
+        mode = request.mode
+        if mode == "incremental" and (
+            base is None or base.signature != signature or base.window_start != window_start
+            or base.buckets != buckets or base.bucket_days != bucket_days
+            or base.run_id != db.execute(select(func.max(models.MrpRun.id))).scalar()
+        ):
+            mode = "full"
+            notes.append("no matching previous run in this process, ran full")
+
+        if mode == "incremental":
+            changed = {plan_id for plan_id in plans.keys() | base.plans.keys()
+                       if plans.get(plan_id) != base.plans.get(plan_id)}
+            products = [entry[0] for plan_id in changed for entry in (plans.get(plan_id), base.plans.get(plan_id))
+                        if entry is not None]
+            affected = structure.descendants(np.array(products, dtype=np.int64))
+            affected_ids = [structure.material_ids[i] for i in np.flatnonzero(affected)]
+            on_hand = base.on_hand.copy()
+            if affected_ids:
+                fetched = _fetch_on_hand(structure, affected_ids)
+                on_hand[affected] = fetched[affected]
+            receipts = _receipts(db, structure, window_start, window_end, buckets, bucket_days, affected_ids)
+            kept = select_entries(base.orders, ~affected[base.orders[0]])
+            orders = plan_orders(structure, buckets, bucket_days, demand, on_hand, receipts,
+                                 affected=affected, kept_orders=kept)
+            all_orders = concat_entries(kept, orders)
+        else:
+            changed = set(plans)
+            affected_ids = None
+            on_hand = _fetch_on_hand(structure)
+            receipts = _receipts(db, structure, window_start, window_end, buckets, bucket_days)
+            orders = plan_orders(structure, buckets, bucket_days, demand, on_hand, receipts)
+            all_orders = orders
+        computed_ms = (time.perf_counter() - begin) * 1000
+
+        now = datetime.now()
+        run = models.MrpRun(
+            mode=mode, window_start=window_start, window_end=window_end, bucket_days=bucket_days,
+            plans=len(plans), changed_plans=len(changed),
+            materials=structure.size if affected_ids is None else len(affected_ids), orders=len(orders[0]),
+            note="; ".join(notes) or None, started_at=started_at,
+        )
+        db.add(run)
+        db.flush()
+        _save_orders(db, run, structure, orders, affected_ids, now)
+        run.finished_at = datetime.now()
+        db.commit()
+        db.refresh(run)
+        _state = _MrpState(run.id, structure, signature, window_start, buckets, bucket_days, plans, on_hand,
+                           all_orders)
+        logger.info(f"物料需求计划计算完成（{mode}）：{len(plans)} 个计划，变化 {len(changed)} 个，"
+                    f"重算 {run.materials} 个物料，生成 {run.orders} 个计划订单，"
+                    f"计算耗时 {computed_ms:.0f}ms，总耗时 {(time.perf_counter() - begin) * 1000:.0f}ms")
+        return run
+
+
+def get_runs(db: Session, limit: int = 20) -> List[models.MrpRun]:
+    return list(db.execute(
+        select(models.MrpRun).order_by(models.MrpRun.id.desc()).limit(limit)
+    ).scalars())
+
+
+def get_run(db: Session, run_id: int) -> Optional[models.MrpRun]:
+    return db.get(models.MrpRun, run_id)
+
+
+def get_planned_orders(db: Session, material_id: Optional[str] = None, status: Optional[str] = None,
+                       due_before: Optional[datetime] = None, skip: int = 0, limit: int = 100
+                       ) -> List[models.PlannedOrder]:
+    P = models.PlannedOrder
+    stmt = select(P).order_by(P.due_date, P.id)
+    if material_id is not None:
+        stmt = stmt.where(P.material_id == material_id)
+    if status is not None:
+        stmt = stmt.where(P.status == status)
+    if due_before is not None:
+        stmt = stmt.where(P.due_date < due_before)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def set_order_status(db: Session, order_id: int, from_status: str, to_status: str
+                     ) -> Optional[models.PlannedOrder]:
+    """
+    计划订单状态变更：planned -> released（下达，之后作为在途到货参与计算）、released -> closed（已到货）
+
+    Raises:
+        ValueError: 订单当前不是 from_status 状态
+    """
+    order = db.get(models.PlannedOrder, order_id, with_for_update=True)
+    if order is None:
+        return None
+    if order.status != from_status:
+        db.rollback()
+        raise ValueError(f"Planned order {order_id} is {order.status}, expected {from_status}")
+    order.status = to_status
+    order.updated_at = datetime.now()
+    db.commit()
+    db.refresh(order)
+    return order
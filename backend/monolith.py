@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+mERP 单进程合并部署入口
+
+把全部微服务的 FastAPI 应用挂载到同一个 ASGI 应用中，在一个进程、一个事件循环内运行，
+适合只有几个用户的小型部署：
+- 每个服务挂载在 /<服务名> 下（如 /plan_svc/health、/plan_svc/api/v1/plans）；
+- 各服务 /api 开头的接口同时注册到根路径，前端可直接访问 /api/v1/plans；
+- 默认开启 DB_SHARED_POOL，全部服务共用一个数据库连接池；
+- 服务间调用（service_client）在进程内直接处理，不经过网络；调度服务的执行进程经 HTTP 访问本应用
+  （<服务名>_URL 默认设为 MONOLITH_URL 或 http://localhost:<SERVICE_PORT>/<服务名>，以 --uds-dir 启动时经同一 Unix 套接字）。
+
+启动方式：
+    python backend/main.py --monolith
+    或 uvicorn backend.monolith:app --port 8000
+"""
+import os
+import sys
+import logging
+import importlib
+from pathlib import Path
+from contextlib import AsyncExitStack, asynccontextmanager
+
+# 设置项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+# 必须在导入各服务（创建数据库引擎）之前设置
+os.environ.setdefault('DB_SHARED_POOL', 'true')
+
+from fastapi import FastAPI
+
+from backend.service_client import service_client
+from db_config import get_pool_stats
+
+logger = logging.getLogger('monolith')
+
+# 合并部署的服务，可通过 MONOLITH_SERVICES 环境变量（逗号分隔）只启用部分服务
+MONOLITH_SERVICES = [
+    'config_svc',
+    'scheduler_svc',
+    'approval_svc',
+    'material_svc',
+    'inventory_svc',
+    'plan_svc',
+    'order_svc',
+    'shift_svc',
+]
+
+
+def load_service_apps(service_names=None):
+    """
+    导入各服务的 FastAPI 应用
+
+    Args:
+        service_names: 服务名称列表，为空时使用 MONOLITH_SERVICES 环境变量或全部服务
+
+    Returns:
+        dict: 服务名 -> FastAPI 应用，按启动顺序排列
+    """
+    if service_names is None:
+        env = os.environ.get('MONOLITH_SERVICES')
+        service_names = [name.strip() for name in env.split(',') if name.strip()] if env else MONOLITH_SERVICES
+    return {
+        name: importlib.import_module(f"backend.{name}.app").app
+        for name in service_names
+    }
+
+
+def monolith_address():
+    """
+    合并应用的地址，返回 (HTTP 地址, Unix 套接字路径)：MONOLITH_URL 环境变量优先；
+    main.py 以 --uds-dir 启动时经其设置的 SERVICE_UDS 套接字访问；否则为 localhost 加 SERVICE_PORT（默认8000）
+    """
+    url = os.environ.get('MONOLITH_URL')
+    if url:
+        return url.rstrip('/'), None
+    uds = os.environ.get('SERVICE_UDS')
+    if uds:
+        return "http://localhost", uds
+    return f"http://localhost:{os.environ.get('SERVICE_PORT', 8000)}", None
+
+
+def _api_prefix(path):
+    # /api/v1/plans/{plan_id} -> /api/v1/plans
+    return '/'.join(path.split('/')[:4])
+
+
+class ApiDispatcher:
+    """
+    按 /api/<版本>/<资源> 前缀把根路径下的接口请求直接转给对应服务的应用，
+    其余请求（/、/health、/<服务名>/...）交给合并应用处理
+    """
+
+    def __init__(self, app, service_apps):
+        self.app = app
+        self.routes = {}
+        for name, service_app in service_apps.items():
+            for path in service_app.openapi().get('paths', {}):
+                if not path.startswith('/api/'):
+                    continue
+                prefix = _api_prefix(path)
+                owner = self.routes.setdefault(prefix, (name, service_app))[0]
+                if owner != name:
+                    logger.warning(f"服务 {name} 的接口前缀 {prefix} 已由 {owner} 注册，根路径下由 {owner} 处理")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] in ('http', 'websocket') and scope['path'].startswith('/api/'):
+            target = self.routes.get(_api_prefix(scope['path']))
+            if target is not None:
+                await target[1](scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def create_app(service_names=None):
+    """
+    创建合并部署的 ASGI 应用
+    """
+    service_apps = load_service_apps(service_names)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # 挂载的子应用不会自动执行各自的 startup/shutdown，这里按顺序统一执行
+        async with AsyncExitStack() as stack:
+            for name, service_app in service_apps.items():
+                await stack.enter_async_context(service_app.router.lifespan_context(service_app))
+            logger.info(f"已在进程内启动服务: {', '.join(service_apps)}")
+            yield
+
+    app = FastAPI(
+        title="mERP",
+        description="mERP 单进程合并部署",
+        version="0.1.0",
+        lifespan=lifespan,
+    )
+
+    @app.get("/", tags=["Root"], summary="Root endpoint for service health check")
+    def read_root():
+        return {"message": f"Hello from {app.title}!", "services": list(service_apps)}
+
+    @app.get("/health", tags=["Health"], summary="Health check endpoint")
+    def health_check():
+        return {"status": "ok", "service": app.title, "services": list(service_apps)}
+
+    @app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+    def db_pool_stats():
+        return get_pool_stats()
+
+    base_url, uds = monolith_address()
+    for name, service_app in service_apps.items():
+        app.mount(f"/{name}", service_app, name=name)
+        service_client.register_local(name, service_app)
+        # 调度服务的执行进程（spawn 启动）中没有登记进程内的服务，按 <服务名>_URL（和 _UDS）经 HTTP 访问
+        # 挂载在本应用下的服务；须在 lifespan 启动执行进程之前设置，已配置的地址不覆盖
+        if f"{name.upper()}_URL" not in os.environ:
+            os.environ[f"{name.upper()}_URL"] = f"{base_url}/{name}"
+            if uds:
+                os.environ[f"{name.upper()}_UDS"] = uds
+
+    return ApiDispatcher(app, service_apps)
+
+
+app = create_app()
@@ -10,6 +10,7 @@ sys.path.append(root_dir)
 
 # 使用绝对导入
 from backend.order_svc.routes import router
+from db_config import get_pool_stats
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
 
@@ -23,4 +24,8 @@ def read_root():
 
 @app.get("/health", tags=["Health"], summary="Health check endpoint")
 def health_check():
-    return {"status": "ok", "service": app.title}
\ No newline at end of file
+    return {"status": "ok", "service": app.title}
+
+@app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+def db_pool_stats():
+    return get_pool_stats("order_svc")
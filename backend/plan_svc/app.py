@@ -9,13 +9,12 @@ root_dir = str(Path(__file__).parent.parent.parent)
 sys.path.append(root_dir)
 
 # 导入本地模块
-from backend.plan_svc.database import SessionLocal, engine
-from backend.plan_svc.models.models import Base
+from backend.plan_svc.database import SessionLocal
 from backend.plan_svc.routes import router as plan_router
 from backend.plan_svc.schemas import Plan
+from db_config import get_pool_stats
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# 表结构由部署时执行的迁移创建（见 migrations.py 和根目录 db_migrate.py），启动时不再检查
 
 app = FastAPI(
     title="Plan Service API",
@@ -42,6 +41,10 @@ def read_root():
 def health_check():
     return {"status": "ok", "service": "plan_service"}
 
+@app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+def db_pool_stats():
+    return get_pool_stats("plan_svc")
+
 # The following is for running with uvicorn directly, e.g., uvicorn plan_svc.app:app --reload --port 5001
 # Ensure uvicorn is installed: pip install uvicorn[standard]
 # if __name__ == '__main__':
@@ -1,32 +1,20 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
-
-# 从环境变量或默认值获取数据库连接信息
-DB_USER = os.getenv("DB_USER", "your_db_user")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "your_db_password")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_NAME = os.getenv("DB_NAME", "merp_plan_svc")
-DB_PORT = os.getenv("DB_PORT", "3306") # Default MySQL port
-
-# 在开发环境中使用SQLite以避免数据库连接问题
-# 如果需要使用MySQL，可以取消下面的注释并注释SQLite连接
-# SQLALCHEMY_DATABASE_URL = "sqlite:///./plan_svc.db"
-
-# 使用SQLite作为开发环境数据库
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-# 根据数据库类型决定是否添加 connect_args
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+from db_config import get_engine, get_async_engine, get_sessionmaker, get_async_sessionmaker
+
+SERVICE_NAME = "plan_svc"
+
+# 数据库连接信息、连接池参数和只读副本统一由 db_config.py 管理，每个进程只创建一个引擎
+# 开发环境可通过 PLAN_SVC_DATABASE_URL=sqlite:///./plan_svc.db 使用SQLite
+engine = get_engine(SERVICE_NAME)
+SessionLocal = get_sessionmaker(SERVICE_NAME)
+# 只读副本会话，供 GET 路由使用；未配置副本时与主库相同
+ReadSessionLocal = get_sessionmaker(SERVICE_NAME, replica=True)
+
+# 异步引擎（MySQL 下为 aiomysql 驱动，SQLite 下为 aiosqlite），供 async def 路由使用
+async_engine = get_async_engine(SERVICE_NAME)
+AsyncSessionLocal = get_async_sessionmaker(SERVICE_NAME)
+AsyncReadSessionLocal = get_async_sessionmaker(SERVICE_NAME, replica=True)
 
 Base = declarative_base()
 
@@ -36,4 +24,22 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get read-only DB session
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency to get async read-only DB session
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,46 @@
+"""
+计划服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, Float, Index, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from db_migrate import Migration
+
+
+def _create_plans(conn):
+    # 版本1的表结构，与当时的 models.Plan 一致；兼容此前由 create_all 建表、
+    # 但缺少后来新增的列和索引的数据库
+    plans = Table(
+        "plans", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("name", String(255)),
+        Column("product_name", String(255)),
+        Column("notes", String(1024)),
+        Column("start_time", DateTime),
+        Column("end_time", DateTime),
+        Column("quantity", Float),
+    )
+    existing = inspect(conn)
+    if existing.has_table("plans"):
+        columns = {column["name"] for column in existing.get_columns("plans")}
+        for column in plans.columns:
+            if column.name not in columns:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE plans ADD COLUMN {ddl}"))
+    else:
+        plans.create(conn)
+    for index in (
+        Index("ix_plans_id", plans.c.id),
+        Index("ix_plans_name", plans.c.name),
+        Index("ix_plans_start_time_id", plans.c.start_time, plans.c.id),
+        Index("ix_plans_start_time_end_time", plans.c.start_time, plans.c.end_time),
+        Index("ix_plans_product_name_start_time", plans.c.product_name, plans.c.start_time),
+    ):
+        index.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    Migration(1, "create plans", [_create_plans]),
+]
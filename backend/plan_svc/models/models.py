@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
 class Plan(Base):
     __tablename__ = "plans"
+    __table_args__ = (
+        # 游标分页按 (start_time, id) 排序，需要对应的复合索引
+        Index("ix_plans_start_time_id", "start_time", "id"),
+        # 时间段重叠查询：start_time < :to AND end_time > :from
+        Index("ix_plans_start_time_end_time", "start_time", "end_time"),
+        Index("ix_plans_product_name_start_time", "product_name", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), index=True)
@@ -15,4 +22,4 @@ class Plan(Base):
     quantity = Column(Float)
 
     def __repr__(self):
-        return f"<Plan(id={self.id}, name='{self.name}')>"
\ No newline at end of file
+        return f"<Plan(id={self.id}, name='{self.name}')>"
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from backend.plan_svc.schemas import Plan, PlanCreate, PlanUpdate
+from backend.plan_svc.schemas import Plan, PlanCreate, PlanUpdate, PlanPage, PlanBulkDelete, PlanBulkResult
 from backend.plan_svc.services import plan_service
 from backend.plan_svc.models import models
-from backend.plan_svc.database import get_db
+from backend.plan_svc.database import get_db, get_read_db, get_async_db, get_async_read_db, ReadSessionLocal
 
 router = APIRouter(
     prefix="/api/v1/plans",
@@ -13,31 +16,82 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=Plan)
-def create_new_plan(plan: PlanCreate, db: Session = Depends(get_db)):
-    return plan_service.create_plan(db=db, plan=plan)
+async def create_new_plan(plan: PlanCreate, db: AsyncSession = Depends(get_async_db)):
+    return await plan_service.create_plan(db=db, plan=plan)
+
+# 批量接口逐条校验请求体，单条不合法时只在结果中报告该条，不拒绝整个请求
+@router.post("/bulk", response_model=PlanBulkResult)
+def bulk_create_plans(items: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    return plan_service.bulk_create_plans(db, items)
+
+@router.patch("/bulk", response_model=PlanBulkResult)
+def bulk_update_plans(items: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    return plan_service.bulk_update_plans(db, items)
+
+@router.delete("/bulk", response_model=PlanBulkResult)
+def bulk_delete_plans(payload: PlanBulkDelete, db: Session = Depends(get_db)):
+    return plan_service.bulk_delete_plans(db, payload.ids)
 
 @router.get("/", response_model=List[Plan])
-def read_plans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    plans = plan_service.get_plans(db, skip=skip, limit=limit)
+async def read_plans(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    plans = await plan_service.get_plans(db, skip=skip, limit=limit)
     return plans
 
+@router.get("/page", response_model=PlanPage)
+async def read_plans_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    order_by: str = Query("id", pattern="^(id|start_time)$"),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        plans, next_cursor = await plan_service.get_plans_page(db, cursor=cursor, limit=limit, order_by=order_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PlanPage(items=plans, next_cursor=next_cursor)
+
+@router.get("/export", response_class=StreamingResponse)
+def export_plans(batch_size: int = Query(1000, ge=1, le=10000)):
+    # 流式响应在处理函数返回后才开始迭代，因此自行管理会话生命周期
+    def generate():
+        db = ReadSessionLocal()
+        try:
+            for db_plan in plan_service.iter_plans(db, batch_size=batch_size):
+                yield Plan.model_validate(db_plan).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@router.get("/overlap", response_model=List[Plan])
+def read_overlapping_plans(
+    from_time: datetime = Query(..., alias="from"),
+    to_time: datetime = Query(..., alias="to"),
+    product_name: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    try:
+        return plan_service.get_overlapping_plans(db, start=from_time, end=to_time, product_name=product_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{plan_id}", response_model=Plan)
-def read_plan(plan_id: int, db: Session = Depends(get_db)):
-    db_plan = plan_service.get_plan(db, plan_id=plan_id)
+async def read_plan(plan_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    db_plan = await plan_service.get_plan(db, plan_id=plan_id)
     if db_plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
     return db_plan
 
 @router.put("/{plan_id}", response_model=Plan)
-def update_existing_plan(plan_id: int, plan_update: PlanUpdate, db: Session = Depends(get_db)):
-    db_plan = plan_service.update_plan(db, plan_id=plan_id, plan_update=plan_update)
+async def update_existing_plan(plan_id: int, plan_update: PlanUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_plan = await plan_service.update_plan(db, plan_id=plan_id, plan_update=plan_update)
     if db_plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
     return db_plan
 
 @router.delete("/{plan_id}", response_model=Plan)
-def delete_existing_plan(plan_id: int, db: Session = Depends(get_db)):
-    db_plan = plan_service.delete_plan(db, plan_id=plan_id)
+async def delete_existing_plan(plan_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_plan = await plan_service.delete_plan(db, plan_id=plan_id)
     if db_plan is None:
         raise HTTPException(status_code=404, detail="Plan not found")
-    return db_plan
\ No newline at end of file
+    return db_plan
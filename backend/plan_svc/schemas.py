@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class PlanBase(BaseModel):
     name: str
@@ -31,4 +31,27 @@ class Plan(PlanInDBBase):
     pass
 
 class PlanInDB(PlanInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+class PlanPage(BaseModel):
+    items: List[Plan]
+    next_cursor: Optional[str] = None
+
+class PlanBulkUpdateItem(PlanUpdate):
+    id: int
+
+class PlanBulkDelete(BaseModel):
+    ids: List[int]
+
+class PlanBulkItem(BaseModel):
+    index: int
+    id: int
+
+class PlanBulkError(BaseModel):
+    index: int
+    id: Optional[int] = None
+    detail: str
+
+class PlanBulkResult(BaseModel):
+    succeeded: List[PlanBulkItem] = []
+    errors: List[PlanBulkError] = []
@@ -0,0 +1,147 @@
+import bisect
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import models
+from .. import schemas
+
+# 热点时间窗口：以当前时间为中心，向前/向后覆盖的天数
+PLAN_INDEX_PAST_DAYS = int(os.getenv("PLAN_INDEX_PAST_DAYS", "30"))
+PLAN_INDEX_FUTURE_DAYS = int(os.getenv("PLAN_INDEX_FUTURE_DAYS", "90"))
+# 索引最长存活秒数，超时后整体重建（用于吸收其他进程写入的数据）
+PLAN_INDEX_MAX_AGE = float(os.getenv("PLAN_INDEX_MAX_AGE", "300"))
+
+
+def _naive(value: datetime) -> datetime:
+    # 数据库中保存的是不带时区的服务器本地时间（DATETIME），带时区的值先换算成本地时间再去掉时区信息
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+class PlanIntervalIndex:
+    """
+    热点时间窗口内计划的进程内区间索引。
+
+    计划按 (start_time, id) 保存在有序数组中，并记录窗口内最长的计划时长。
+    查询 [from, to) 时只需二分定位 start_time 位于 [from - 最长时长, to) 的区间，
+    再按 end_time 过滤，不必访问数据库。
+    """
+
+    def __init__(self, past_days: int = PLAN_INDEX_PAST_DAYS, future_days: int = PLAN_INDEX_FUTURE_DAYS,
+                 max_age: float = PLAN_INDEX_MAX_AGE):
+        self.past = timedelta(days=past_days)
+        self.future = timedelta(days=future_days)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # 重建在锁外查询数据库，单独用一把锁保证同一时间只有一个请求在重建
+        self._rebuild_lock = threading.Lock()
+        self._keys: List[Tuple[datetime, int]] = []
+        self._plans: Dict[int, schemas.Plan] = {}
+        self._max_duration = timedelta(0)
+        self._window: Optional[Tuple[datetime, datetime]] = None
+        self._loaded_at = 0.0
+
+    def _is_fresh(self) -> bool:
+        return self._window is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    def _covers(self, start: datetime, end: datetime) -> bool:
+        return self._window is not None and self._window[0] <= start and end <= self._window[1]
+
+    def _add(self, plan: schemas.Plan) -> None:
+        key = (plan.start_time, plan.id)
+        self._keys.insert(bisect.bisect_left(self._keys, key), key)
+        self._plans[plan.id] = plan
+        self._max_duration = max(self._max_duration, plan.end_time - plan.start_time)
+
+    def _discard(self, plan_id: int) -> None:
+        plan = self._plans.pop(plan_id, None)
+        if plan is not None:
+            key = (plan.start_time, plan.id)
+            pos = bisect.bisect_left(self._keys, key)
+            if pos < len(self._keys) and self._keys[pos] == key:
+                del self._keys[pos]
+
+    def _in_window(self, plan: schemas.Plan) -> bool:
+        if plan.start_time is None or plan.end_time is None:
+            return False
+        return plan.start_time < self._window[1] and plan.end_time > self._window[0]
+
+    def rebuild(self, db: Session) -> None:
+        now = datetime.now()
+        window = (now - self.past, now + self.future)
+        rows = (
+            db.query(models.Plan)
+            .filter(models.Plan.start_time < window[1], models.Plan.end_time > window[0])
+            .order_by(models.Plan.start_time, models.Plan.id)
+            .all()
+        )
+        plans = [schemas.Plan.model_validate(row) for row in rows]
+        with self._lock:
+            self._keys = [(plan.start_time, plan.id) for plan in plans]
+            self._plans = {plan.id: plan for plan in plans}
+            self._max_duration = max((plan.end_time - plan.start_time for plan in plans), default=timedelta(0))
+            self._window = window
+            self._loaded_at = time.monotonic()
+
+    def query_or_rebuild(self, db: Session, start: datetime, end: datetime,
+                         product_name: Optional[str] = None) -> Optional[List[schemas.Plan]]:
+        """
+        未命中时重建后再查询。并发未命中的请求只有第一个重建，其余等它完成后直接使用重建的结果。
+        """
+        with self._rebuild_lock:
+            plans = self.query(start, end, product_name)
+            if plans is None:
+                self.rebuild(db)
+                plans = self.query(start, end, product_name)
+            return plans
+
+    def would_cover(self, start: datetime, end: datetime) -> bool:
+        now = datetime.now()
+        return now - self.past <= _naive(start) and _naive(end) <= now + self.future
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._window = None
+            self._keys = []
+            self._plans = {}
+            self._max_duration = timedelta(0)
+
+    def upsert(self, plans: Iterable) -> None:
+        with self._lock:
+            if self._window is None:
+                return
+            for db_plan in plans:
+                plan = schemas.Plan.model_validate(db_plan)
+                if plan.start_time is not None and plan.end_time is not None:
+                    plan.start_time, plan.end_time = _naive(plan.start_time), _naive(plan.end_time)
+                self._discard(plan.id)
+                if self._in_window(plan):
+                    self._add(plan)
+
+    def remove(self, plan_ids: Iterable[int]) -> None:
+        with self._lock:
+            for plan_id in plan_ids:
+                self._discard(plan_id)
+
+    def query(self, start: datetime, end: datetime, product_name: Optional[str] = None) -> Optional[List[schemas.Plan]]:
+        """
+        返回与 [start, end) 有交集的计划；查询范围不在已加载窗口内或索引已过期时返回 None。
+        """
+        start, end = _naive(start), _naive(end)
+        with self._lock:
+            if not self._is_fresh() or not self._covers(start, end):
+                return None
+            lo = bisect.bisect_left(self._keys, (start - self._max_duration, -1))
+            hi = bisect.bisect_left(self._keys, (end, -1))
+            result = []
+            for _, plan_id in self._keys[lo:hi]:
+                plan = self._plans[plan_id]
+                if plan.end_time > start and (product_name is None or plan.product_name == product_name):
+                    result.append(plan)
+            return result
+
+
+plan_index = PlanIntervalIndex()
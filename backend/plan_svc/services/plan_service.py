@@ -1,40 +1,303 @@
+import base64
+import json
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, delete, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ..models import models
 from .. import schemas
+from .plan_index import _naive, plan_index
 
-def get_plan(db: Session, plan_id: int) -> Optional[models.Plan]:
-    return db.query(models.Plan).filter(models.Plan.id == plan_id).first()
+# 游标分页支持的排序键
+CURSOR_ORDERS = ("id", "start_time")
 
-def get_plans(db: Session, skip: int = 0, limit: int = 100) -> List[models.Plan]:
-    return db.query(models.Plan).offset(skip).limit(limit).all()
+# 批量写入时每条 INSERT/UPDATE/DELETE 语句处理的行数
+BULK_CHUNK_SIZE = 1000
 
-def create_plan(db: Session, plan: schemas.PlanCreate) -> models.Plan:
-    db_plan = models.Plan(
-        name=plan.name,
-        start_time=plan.start_time,
-        end_time=plan.end_time,
-        quantity=plan.quantity
-    )
+async def get_plan(db: AsyncSession, plan_id: int) -> Optional[models.Plan]:
+    return await db.get(models.Plan, plan_id)
+
+async def get_plans(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Plan]:
+    result = await db.execute(select(models.Plan).offset(skip).limit(limit))
+    return list(result.scalars())
+
+def _encode_cursor(order_by: str, plan: models.Plan) -> str:
+    payload = {"o": order_by, "i": plan.id}
+    if order_by == "start_time":
+        payload["s"] = plan.start_time.isoformat() if plan.start_time else None
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str, order_by: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload.get("o") != order_by or not isinstance(payload.get("i"), int):
+            raise ValueError("cursor does not match order_by")
+        if order_by == "start_time":
+            # 按 start_time 排序的游标必须带 s，为 null 表示上一页停在 start_time 为空的行
+            if "s" not in payload:
+                raise ValueError("cursor is missing start_time")
+            if payload["s"] is not None:
+                payload["s"] = datetime.fromisoformat(payload["s"])
+        return payload
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+
+async def get_plans_page(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    order_by: str = "id",
+) -> Tuple[List[models.Plan], Optional[str]]:
+    """
+    基于游标（keyset）的分页查询，避免深分页时 OFFSET 扫描并丢弃前面的所有行。
+
+    Returns:
+        (当前页计划列表, 下一页游标；没有更多数据时为 None)
+    """
+    if order_by not in CURSOR_ORDERS:
+        raise ValueError(f"Unsupported order_by: {order_by}")
+
+    stmt = select(models.Plan)
+    if order_by == "start_time":
+        # MySQL 和 SQLite 升序时 NULL 都排在最前（MySQL 不支持 NULLS FIRST 语法），即 (NULL..., (start_time, id)...)
+        stmt = stmt.order_by(models.Plan.start_time, models.Plan.id)
+    else:
+        stmt = stmt.order_by(models.Plan.id)
+
+    if cursor:
+        key = _decode_cursor(cursor, order_by)
+        if order_by == "start_time" and key["s"] is not None:
+            # start_time 为空的行排在最前，已全部读过；比较运算本身也会排除它们
+            stmt = stmt.where(or_(
+                models.Plan.start_time > key["s"],
+                and_(models.Plan.start_time == key["s"], models.Plan.id > key["i"]),
+            ))
+        elif order_by == "start_time":
+            # 上一页停在 start_time 为空的行：先读剩余的空行，再读全部非空行
+            stmt = stmt.where(or_(
+                and_(models.Plan.start_time.is_(None), models.Plan.id > key["i"]),
+                models.Plan.start_time.is_not(None),
+            ))
+        else:
+            stmt = stmt.where(models.Plan.id > key["i"])
+
+    # 多取一行用于判断是否还有下一页
+    plans = list((await db.execute(stmt.limit(limit + 1))).scalars())
+    if len(plans) <= limit:
+        return plans, None
+    plans = plans[:limit]
+    return plans, _encode_cursor(order_by, plans[-1])
+
+def get_overlapping_plans(
+    db: Session, start: datetime, end: datetime, product_name: Optional[str] = None
+) -> List[schemas.Plan]:
+    """
+    查询与 [start, end) 时间段有交集的计划，可按产品过滤。
+    热点窗口内的查询由进程内区间索引直接回答，其余查询走复合索引。
+
+    Raises:
+        ValueError: end 不晚于 start
+    """
+    # 数据库中保存的是不带时区的时间，一个带时区、一个不带时区时也能比较
+    start, end = _naive(start), _naive(end)
+    if end <= start:
+        raise ValueError("'to' must be later than 'from'")
+    plans = plan_index.query(start, end, product_name)
+    if plans is None and plan_index.would_cover(start, end):
+        plans = plan_index.query_or_rebuild(db, start, end, product_name)
+    if plans is not None:
+        return plans
+
+    query = db.query(models.Plan)
+    if product_name is not None:
+        query = query.filter(models.Plan.product_name == product_name)
+    query = query.filter(models.Plan.start_time < end, models.Plan.end_time > start)
+    return [schemas.Plan.model_validate(row) for row in query.order_by(models.Plan.start_time, models.Plan.id)]
+
+def iter_plans(db: Session, batch_size: int = 1000) -> Iterator[models.Plan]:
+    """
+    使用服务端游标逐批读取全部计划，供导出等场景使用，不在内存中构建完整列表。
+    """
+    # yield_per 会启用 stream_results（MySQL 下为 SSCursor），按批从服务端拉取
+    return iter(db.query(models.Plan).order_by(models.Plan.id).yield_per(batch_size))
+
+async def create_plan(db: AsyncSession, plan: schemas.PlanCreate) -> models.Plan:
+    db_plan = models.Plan(**plan.model_dump())
     db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    await db.refresh(db_plan)
+    plan_index.upsert([db_plan])
     return db_plan
 
-def update_plan(db: Session, plan_id: int, plan_update: schemas.PlanUpdate) -> Optional[models.Plan]:
-    db_plan = get_plan(db, plan_id)
+async def update_plan(db: AsyncSession, plan_id: int, plan_update: schemas.PlanUpdate) -> Optional[models.Plan]:
+    db_plan = await get_plan(db, plan_id)
     if db_plan:
         update_data = plan_update.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_plan, key, value)
-        db.commit()
-        db.refresh(db_plan)
+        await db.commit()
+        await db.refresh(db_plan)
+        plan_index.upsert([db_plan])
     return db_plan
 
-def delete_plan(db: Session, plan_id: int) -> Optional[models.Plan]:
-    db_plan = get_plan(db, plan_id)
+async def delete_plan(db: AsyncSession, plan_id: int) -> Optional[models.Plan]:
+    db_plan = await get_plan(db, plan_id)
     if db_plan:
-        db.delete(db_plan)
-        db.commit()
-    return db_plan
\ No newline at end of file
+        await db.delete(db_plan)
+        await db.commit()
+        plan_index.remove([plan_id])
+    return db_plan
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _insert_plan_rows(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    用一条语句插入多行计划并返回新主键，不逐行 refresh。
+    """
+    table = models.Plan.__table__
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows)
+        return [row[0] for row in result]
+    # MySQL 不支持 RETURNING：多行 INSERT 的 LAST_INSERT_ID() 为第一行主键，同一条“简单插入”语句
+    # 分配的自增值是连续的——前提是 auto_increment_increment 为 1（主主复制等场景会调大），否则拒绝写入
+    increment = db.execute(text("SELECT @@auto_increment_increment")).scalar()
+    if increment != 1:
+        raise RuntimeError(f"Bulk insert requires auto_increment_increment = 1, got {increment}")
+    result = db.execute(table.insert().values(rows))
+    first_id = result.lastrowid
+    return list(range(first_id, first_id + len(rows)))
+
+def bulk_create_plans(
+    db: Session, items: List[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE
+) -> schemas.PlanBulkResult:
+    """
+    在一个事务中分块批量创建计划。校验失败或写入失败的条目单独报告，不影响其余条目。
+    """
+    result = schemas.PlanBulkResult()
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schemas.PlanCreate.model_validate(item).model_dump()))
+        except ValidationError as e:
+            result.errors.append(schemas.PlanBulkError(index=index, detail=_format_validation_error(e)))
+
+    for chunk in _chunks(valid, chunk_size):
+        try:
+            with db.begin_nested():
+                ids = _insert_plan_rows(db, [row for _, row in chunk])
+            result.succeeded.extend(
+                schemas.PlanBulkItem(index=index, id=plan_id) for (index, _), plan_id in zip(chunk, ids)
+            )
+        except SQLAlchemyError:
+            # 整块失败时逐行重试，定位出错的条目
+            for index, row in chunk:
+                try:
+                    with db.begin_nested():
+                        plan_id = _insert_plan_rows(db, [row])[0]
+                    result.succeeded.append(schemas.PlanBulkItem(index=index, id=plan_id))
+                except SQLAlchemyError as e:
+                    result.errors.append(schemas.PlanBulkError(index=index, detail=str(e.orig or e)))
+
+    db.commit()
+    rows_by_index = dict(valid)
+    plan_index.upsert({**rows_by_index[item.index], "id": item.id} for item in result.succeeded)
+    result.errors.sort(key=lambda err: err.index)
+    result.succeeded.sort(key=lambda item: item.index)
+    return result
+
+def _existing_plan_ids(db: Session, ids: List[int]) -> set:
+    return set(db.execute(select(models.Plan.id).where(models.Plan.id.in_(ids))).scalars())
+
+def bulk_update_plans(
+    db: Session, items: List[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE
+) -> schemas.PlanBulkResult:
+    """
+    在一个事务中按主键批量更新计划，相同字段集合的条目合并为一次 executemany。
+    重复出现的主键与批量删除一样作为条目错误返回，只更新第一次出现的条目。
+    """
+    result = schemas.PlanBulkResult()
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    seen = set()
+    for index, item in enumerate(items):
+        try:
+            row = schemas.PlanBulkUpdateItem.model_validate(item).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            plan_id = item.get("id") if isinstance(item, dict) else None
+            result.errors.append(schemas.PlanBulkError(
+                index=index, id=plan_id if isinstance(plan_id, int) else None, detail=_format_validation_error(e)
+            ))
+            continue
+        if row["id"] in seen:
+            result.errors.append(schemas.PlanBulkError(index=index, id=row["id"], detail="Duplicate id"))
+        else:
+            seen.add(row["id"])
+            valid.append((index, row))
+
+    for chunk in _chunks(valid, chunk_size):
+        existing = _existing_plan_ids(db, [row["id"] for _, row in chunk])
+        groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]] = {}
+        for index, row in chunk:
+            if row["id"] not in existing:
+                result.errors.append(schemas.PlanBulkError(index=index, id=row["id"], detail="Plan not found"))
+            elif len(row) == 1:
+                # 没有需要更新的字段
+                result.succeeded.append(schemas.PlanBulkItem(index=index, id=row["id"]))
+            else:
+                groups.setdefault(tuple(sorted(row)), []).append((index, row))
+
+        for group in groups.values():
+            try:
+                with db.begin_nested():
+                    # ORM 按主键批量更新：以 executemany 方式执行
+                    db.execute(update(models.Plan), [row for _, row in group])
+                result.succeeded.extend(schemas.PlanBulkItem(index=index, id=row["id"]) for index, row in group)
+            except SQLAlchemyError as e:
+                result.errors.extend(
+                    schemas.PlanBulkError(index=index, id=row["id"], detail=str(e.orig or e)) for index, row in group
+                )
+
+    db.commit()
+    # 部分字段更新可能把计划移入热点窗口，直接让区间索引下次查询时重建
+    plan_index.invalidate()
+    result.errors.sort(key=lambda err: err.index)
+    result.succeeded.sort(key=lambda item: item.index)
+    return result
+
+def bulk_delete_plans(db: Session, ids: List[int], chunk_size: int = BULK_CHUNK_SIZE) -> schemas.PlanBulkResult:
+    """
+    在一个事务中按主键批量删除计划，不存在的主键和重复出现的主键作为条目错误返回。
+    """
+    result = schemas.PlanBulkResult()
+    indexed, seen = [], set()
+    for index, plan_id in enumerate(ids):
+        if plan_id in seen:
+            result.errors.append(schemas.PlanBulkError(index=index, id=plan_id, detail="Duplicate id"))
+        else:
+            seen.add(plan_id)
+            indexed.append((index, plan_id))
+    for chunk in _chunks(indexed, chunk_size):
+        existing = _existing_plan_ids(db, [plan_id for _, plan_id in chunk])
+        if existing:
+            db.execute(delete(models.Plan).where(models.Plan.id.in_(existing)))
+        for index, plan_id in chunk:
+            if plan_id in existing:
+                result.succeeded.append(schemas.PlanBulkItem(index=index, id=plan_id))
+            else:
+                result.errors.append(schemas.PlanBulkError(index=index, id=plan_id, detail="Plan not found"))
+    db.commit()
+    plan_index.remove(item.id for item in result.succeeded)
+    result.errors.sort(key=lambda err: err.index)
+    return result
@@ -1,21 +1,89 @@
 import os
 import sys
+import time
+import asyncio
+import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
 # 设置项目根目录到PYTHONPATH
 root_dir = str(Path(__file__).parent.parent.parent)
 sys.path.append(root_dir)
 
+# 先加载 .env，导入 routes 时 job_service 就会读取调度相关的环境变量
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
+
 # 使用绝对导入
-from backend.scheduler_svc.routes import router
+from backend.scheduler_svc.routes import router, job_router
+from backend.scheduler_svc.database import SessionLocal
+from backend.scheduler_svc.services.job_service import runtime
+from db_config import get_pool_stats
+
+logger = logging.getLogger(__name__)
+
+# 表结构由部署时执行的迁移创建（见 migrations.py 和根目录 db_migrate.py），启动时不再检查
+
+# 是否在本进程中领取和执行任务；多个进程按租约领取，同一次执行只由一个进程执行
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# 读取其他进程修改的任务的间隔（秒），用于更新本进程调度器的唤醒时间
+SCHEDULER_POLL_INTERVAL = float(os.environ.get("SCHEDULER_POLL_INTERVAL", 2))
+# 移除其他进程删除、暂停的任务的间隔（秒）
+SCHEDULER_RECONCILE_INTERVAL = float(os.environ.get("SCHEDULER_RECONCILE_INTERVAL", 60))
+
+
+def _with_session(action):
+    db = SessionLocal()
+    try:
+        return action(db)
+    finally:
+        db.close()
 
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), override=True)
 
-app = FastAPI(title="Scheduler Service", description="调度服务", version="0.1.0")
+def _sync(reconcile: bool):
+    def action(db):
+        runtime.poll(db)
+        if reconcile:
+            runtime.reconcile(db)
+    _with_session(action)
+
+
+async def _sync_loop():
+    reconciled_at = time.monotonic()
+    while True:
+        await asyncio.sleep(SCHEDULER_POLL_INTERVAL)
+        reconcile = time.monotonic() - reconciled_at >= SCHEDULER_RECONCILE_INTERVAL
+        try:
+            await run_in_threadpool(_sync, reconcile)
+            if reconcile:
+                reconciled_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"读取定时任务修改失败: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if not SCHEDULER_ENABLED:
+        yield
+        return
+    try:
+        await run_in_threadpool(_with_session, runtime.load)
+    except Exception as e:
+        # 数据库暂时不可用时由同步循环重试加载
+        logger.error(f"加载定时任务失败: {str(e)}")
+    runtime.start(SessionLocal)
+    task = asyncio.create_task(_sync_loop())
+    yield
+    task.cancel()
+    await run_in_threadpool(runtime.stop)
+
+
+app = FastAPI(title="Scheduler Service", description="调度服务", version="0.1.0", lifespan=lifespan)
 
 app.include_router(router)
+app.include_router(job_router)
 
 @app.get("/", tags=["Root"], summary="Root endpoint for service health check")
 def read_root():
@@ -23,4 +91,8 @@ def read_root():
 
 @app.get("/health", tags=["Health"], summary="Health check endpoint")
 def health_check():
-    return {"status": "ok", "service": app.title}
\ No newline at end of file
+    return {"status": "ok", "service": app.title}
+
+@app.get("/health/db-pool", tags=["Health"], summary="Database connection pool statistics")
+def db_pool_stats():
+    return get_pool_stats("scheduler_svc")
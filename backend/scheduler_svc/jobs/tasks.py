@@ -0,0 +1,129 @@
+"""
+可调度的任务函数
+
+scheduled_job.job_function 为这里登记的名称，执行时传入 job_args、job_kwargs。
+任务通过 service_client 调用其他服务的接口完成，返回值（可转换为 JSON）作为执行结果。
+登记时指定执行方式（见 services/job_executor.py）：thread 在线程中执行，process 在独立的执行进程中执行。
+"""
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.service_client import service_client
+
+# 任务名称 -> 函数
+JOB_FUNCTIONS: Dict[str, Callable] = {}
+# 任务名称 -> (执行方式, 默认超时秒数)
+JOB_OPTIONS: Dict[str, Tuple[str, Optional[float]]] = {}
+
+# 当前线程中执行的任务的截止时间（时间戳）
+_context = threading.local()
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def job_function(name: str, executor: str = "thread", timeout: Optional[float] = None):
+    """
+    登记任务函数的装饰器
+
+    Args:
+        executor: thread 或 process
+        timeout: 默认超时（秒），任务的 timeout_seconds 优先
+    """
+    def register(func):
+        JOB_FUNCTIONS[name] = func
+        JOB_OPTIONS[name] = (executor, timeout)
+        return func
+    return register
+
+
+def executor_of(name: str) -> str:
+    return JOB_OPTIONS.get(name, ("thread", None))[0]
+
+
+def default_timeout(name: str) -> Optional[float]:
+    return JOB_OPTIONS.get(name, ("thread", None))[1]
+
+
+def run(name: str, args: list, kwargs: dict, deadline: Optional[float] = None):
+    """
+    执行登记的任务函数
+
+    Args:
+        deadline: 截止时间（时间戳），任务调用其他服务时检查
+
+    Raises:
+        KeyError: 任务函数未登记
+        JobTimeout: 超过截止时间
+    """
+    _context.deadline = deadline
+    try:
+        return JOB_FUNCTIONS[name](*args, **kwargs)
+    finally:
+        _context.deadline = None
+
+
+def remaining() -> Optional[float]:
+    """
+    距截止时间的秒数，没有截止时间时返回 None；耗时长的任务应在循环中调用，及时结束
+
+    Raises:
+        JobTimeout: 已超过截止时间
+    """
+    deadline = getattr(_context, "deadline", None)
+    if deadline is None:
+        return None
+    left = deadline - time.time()
+    if left <= 0:
+        raise JobTimeout("Job exceeded its timeout")
+    return left
+
+
+def _call(service_name: str, method: str, path: str, **kwargs):
+    left = remaining()
+    if left is not None:
+        kwargs.setdefault("timeout", min(left, service_client.timeout))
+    response = service_client.request(service_name, method, path, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+@job_function("noop")
+def noop(*args, **kwargs):
+    # 不做任何事，用于测试调度
+    return None
+
+
+@job_function("inventory_snapshot")
+def inventory_snapshot():
+    snapshot = _call('inventory_svc', 'POST', '/api/v1/inventories/snapshots')
+    return {"snapshot_id": snapshot["id"], "item_count": snapshot["item_count"]}
+
+
+# 全部库存的盘点报表可能很大，在执行进程中汇总，不占用 API 进程
+@job_function("inventory_check", executor="process", timeout=1800)
+def inventory_check(scope: str = "all", detailed: bool = False):
+    # 库存盘点：读取当前结存，scope 为 all 或仓库ID
+    params = {} if scope == "all" else {"warehouse_id": scope}
+    report = _call('inventory_svc', 'GET', '/api/v1/inventories/report', params=params)
+    rows = report["rows"]
+    result = {"rows": len(rows), "quantity": sum(row["closing"] for row in rows)}
+    if detailed:
+        result["negative"] = [row for row in rows if row["closing"] < 0]
+    return result
+
+
+@job_function("mrp_run")
+def mrp_run(horizon_days: int = 30, bucket_days: int = 1, mode: str = "full"):
+    # 物料需求计划：从今天0点开始计算 horizon_days 天
+    window_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    run = _call('material_svc', 'POST', '/api/v1/mrp/runs', json={
+        "window_start": window_start.isoformat(),
+        "window_end": (window_start + timedelta(days=horizon_days)).isoformat(),
+        "bucket_days": bucket_days,
+        "mode": mode,
+    })
+    return {"run_id": run["id"], "orders": run["orders"]}
@@ -0,0 +1,115 @@
+"""
+调度服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import MetaData, Table, Column, BigInteger, DateTime, Enum, Float, Index, Integer, String, Text, \
+    TIMESTAMP, UniqueConstraint
+
+from db_migrate import Migration, current_timestamp_default
+
+
+def _create_scheduled_job(conn):
+    # 版本1的表结构；MySQL 下与原先的建表语句一致，SQLite 开发库也可以执行
+    Table(
+        "scheduled_job", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("job_id", String(100), nullable=False, unique=True),
+        Column("job_name", String(100), nullable=False),
+        Column("job_function", String(100), nullable=False),
+        Column("cron_expression", String(100)),
+        Column("interval_seconds", Integer),
+        Column("job_args", Text),
+        Column("job_kwargs", Text),
+        Column("next_run_time", TIMESTAMP, nullable=True),
+        Column("status", Enum("active", "paused", "completed", "error"), server_default="active"),
+        Column("created_at", TIMESTAMP, server_default=current_timestamp_default(conn)),
+        Column("updated_at", TIMESTAMP, server_default=current_timestamp_default(conn, on_update=True)),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+    ).create(conn, checkfirst=True)
+
+
+def _create_job_executions(conn):
+    Table(
+        "job_executions", MetaData(),
+        Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+        Column("job_id", String(100), nullable=False),
+        Column("job_function", String(100), nullable=False),
+        Column("trigger", String(20), nullable=False),
+        Column("executor", String(20), nullable=False),
+        Column("worker_id", String(100)),
+        Column("scheduled_at", DateTime),
+        Column("queued_at", DateTime, nullable=False),
+        Column("started_at", DateTime),
+        Column("finished_at", DateTime),
+        Column("queue_wait_ms", Float, nullable=False),
+        Column("run_ms", Float, nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("result", Text),
+        Column("error", Text),
+        Index("ix_job_executions_job_id_queued_at", "job_id", "queued_at"),
+        Index("ix_job_executions_queued_at", "queued_at"),
+    ).create(conn)
+
+
+def _create_job_dependencies(conn):
+    Table(
+        "job_dependencies", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("job_id", String(100), nullable=False),
+        Column("depends_on_job_id", String(100), nullable=False),
+        Column("created_at", DateTime),
+        UniqueConstraint("job_id", "depends_on_job_id", name="uq_job_dependencies_job_id_depends_on_job_id"),
+        Index("ix_job_dependencies_depends_on_job_id", "depends_on_job_id"),
+    ).create(conn)
+
+
+def _create_job_dag_runs(conn):
+    Table(
+        "job_dag_runs", MetaData(),
+        Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+        Column("root_job_id", String(100), nullable=False),
+        Column("trigger", String(20), nullable=False),
+        Column("worker_id", String(100)),
+        Column("status", String(20), nullable=False),
+        Column("started_at", DateTime, nullable=False),
+        Column("finished_at", DateTime),
+        Column("jobs_total", Integer, nullable=False),
+        Column("jobs_succeeded", Integer),
+        Column("jobs_failed", Integer),
+        Column("jobs_skipped", Integer),
+        Column("makespan_ms", Float),
+        Column("critical_path_ms", Float),
+        Column("critical_path", Text),
+        Column("total_run_ms", Float),
+        Index("ix_job_dag_runs_root_job_id_started_at", "root_job_id", "started_at"),
+        Index("ix_job_dag_runs_started_at", "started_at"),
+    ).create(conn)
+
+MIGRATIONS = [
+    Migration(1, "create scheduled_job", [_create_scheduled_job]),
+    # 启动时读取活跃任务、按 updated_at 读取其他进程修改的任务
+    Migration(2, "index scheduled_job by status and updated_at", [
+        "CREATE INDEX ix_scheduled_job_status_next_run_time ON scheduled_job (status, next_run_time)",
+        "CREATE INDEX ix_scheduled_job_updated_at ON scheduled_job (updated_at)",
+    ]),
+    # 多个进程按租约领取到期任务
+    Migration(3, "add scheduled_job lease columns", [
+        "ALTER TABLE scheduled_job ADD COLUMN lease_owner VARCHAR(100) NULL",
+        "ALTER TABLE scheduled_job ADD COLUMN lease_expires_at DATETIME NULL",
+        "ALTER TABLE scheduled_job ADD COLUMN fencing_token BIGINT NOT NULL DEFAULT 0",
+    ]),
+    Migration(4, "add scheduled_job priority and timeout, create job_executions", [
+        "ALTER TABLE scheduled_job ADD COLUMN priority INT NOT NULL DEFAULT 5",
+        "ALTER TABLE scheduled_job ADD COLUMN timeout_seconds INT NULL",
+        _create_job_executions,
+    ]),
+    # 任务依赖和依赖执行
+    Migration(5, "create job_dependencies and job_dag_runs", [
+        _create_job_dependencies,
+        _create_job_dag_runs,
+        "ALTER TABLE job_executions ADD COLUMN dag_run_id BIGINT NULL",
+        "CREATE INDEX ix_job_executions_dag_run_id ON job_executions (dag_run_id)",
+    ]),
+]
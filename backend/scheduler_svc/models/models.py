@@ -0,0 +1,132 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Index, Integer, String, Text, UniqueConstraint
+
+from backend.scheduler_svc.database import Base
+
+# SQLite 只有 INTEGER PRIMARY KEY 才会自增
+ExecutionId = BigInteger().with_variant(Integer, "sqlite")
+
+
+# 定时任务：cron_expression、interval_seconds 二选一，都为空时只在 next_run_time 执行一次；
+# job_args、job_kwargs 为 JSON 文本，执行时传给 jobs/tasks.py 中登记的 job_function；
+# 有前置任务（job_dependencies）的任务不按时间执行，next_run_time 为空，在前置任务执行成功后执行
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_job"
+    __table_args__ = (
+        Index("ix_scheduled_job_status_next_run_time", "status", "next_run_time"),
+        Index("ix_scheduled_job_updated_at", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(100), nullable=False, unique=True)
+    job_name = Column(String(100), nullable=False)
+    job_function = Column(String(100), nullable=False)
+    cron_expression = Column(String(100))
+    interval_seconds = Column(Integer)
+    job_args = Column(Text)
+    job_kwargs = Column(Text)
+    next_run_time = Column(DateTime)
+    # active / paused / completed / error
+    status = Column(String(20), default="active")
+    # 排队时数字小的先执行（0~9）
+    priority = Column(Integer, nullable=False, default=5)
+    # 超时（秒），为空时使用任务函数登记的默认值
+    timeout_seconds = Column(Integer)
+    # 租约：领取任务的进程和租约到期时间，执行完成后清空（见 services/job_service.py）
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    # 每次领取、重新安排执行时间时加1，执行结果只在令牌未变时回写
+    fencing_token = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ScheduledJob(job_id='{self.job_id}', job_function='{self.job_function}')>"
+
+
+# 任务的每次执行：排队等待时间和执行时间用于判断执行能力是否不足
+class JobExecution(Base):
+    __tablename__ = "job_executions"
+    __table_args__ = (
+        Index("ix_job_executions_job_id_queued_at", "job_id", "queued_at"),
+        Index("ix_job_executions_queued_at", "queued_at"),
+        Index("ix_job_executions_dag_run_id", "dag_run_id"),
+    )
+
+    id = Column(ExecutionId, primary_key=True)
+    job_id = Column(String(100), nullable=False)
+    job_function = Column(String(100), nullable=False)
+    # scheduled（定时执行）/ manual（立即执行）/ dependency（前置任务执行成功后执行）
+    trigger = Column(String(20), nullable=False)
+    # trigger 为 dependency 时所属的依赖执行（job_dag_runs.id）
+    dag_run_id = Column(ExecutionId)
+    # thread / process
+    executor = Column(String(20), nullable=False)
+    worker_id = Column(String(100))
+    # 定时执行的计划执行时间
+    scheduled_at = Column(DateTime)
+    queued_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    queue_wait_ms = Column(Float, nullable=False)
+    run_ms = Column(Float, nullable=False)
+    # success / failed / timeout / cancelled
+    status = Column(String(20), nullable=False)
+    # 返回值的 JSON 文本（截断）
+    result = Column(Text)
+    error = Column(Text)
+
+    def __repr__(self):
+        return f"<JobExecution(job_id='{self.job_id}', status='{self.status}')>"
+
+
+# 任务依赖：job_id 在 depends_on_job_id 执行成功后执行，依赖关系不能成环
+class JobDependency(Base):
+    __tablename__ = "job_dependencies"
+    __table_args__ = (
+        UniqueConstraint("job_id", "depends_on_job_id", name="uq_job_dependencies_job_id_depends_on_job_id"),
+        Index("ix_job_dependencies_depends_on_job_id", "depends_on_job_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(100), nullable=False)
+    depends_on_job_id = Column(String(100), nullable=False)
+    created_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<JobDependency(job_id='{self.job_id}', depends_on_job_id='{self.depends_on_job_id}')>"
+
+
+# 依赖执行：根任务执行成功后执行其全部后继任务，结束时记录各任务的结果和关键路径
+class JobDagRun(Base):
+    __tablename__ = "job_dag_runs"
+    __table_args__ = (
+        Index("ix_job_dag_runs_root_job_id_started_at", "root_job_id", "started_at"),
+        Index("ix_job_dag_runs_started_at", "started_at"),
+    )
+
+    id = Column(ExecutionId, primary_key=True)
+    root_job_id = Column(String(100), nullable=False)
+    # 根任务的 trigger：scheduled / manual
+    trigger = Column(String(20), nullable=False)
+    # 协调本次依赖执行的进程
+    worker_id = Column(String(100))
+    # running / success / failed
+    status = Column(String(20), nullable=False)
+    # 根任务开始执行的时间
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+    # 包括根任务
+    jobs_total = Column(Integer, nullable=False)
+    jobs_succeeded = Column(Integer)
+    jobs_failed = Column(Integer)
+    jobs_skipped = Column(Integer)
+    # 从根任务开始执行到最后一个任务结束
+    makespan_ms = Column(Float)
+    # 执行时间之和最长的依赖链及其执行时间之和
+    critical_path_ms = Column(Float)
+    critical_path = Column(Text)
+    # 各任务执行时间之和
+    total_run_ms = Column(Float)
+
+    def __repr__(self):
+        return f"<JobDagRun(id={self.id}, root_job_id='{self.root_job_id}', status='{self.status}')>"
@@ -1,7 +1,139 @@
-from fastapi import APIRouter
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from backend.scheduler_svc.schemas import (
+    Job, JobCreate, JobDag, JobDagRun, JobDependencies, JobDependencyCreate, JobExecution, JobUpdate,
+)
+from backend.scheduler_svc.services import job_service
+from backend.scheduler_svc.services.job_executor import ExecutorStoppedError, QueueFullError
+from backend.scheduler_svc.database import get_db, get_read_db
 
 router = APIRouter()
 
 @router.get("/ping")
 def ping():
-    return {"msg": "scheduler_svc pong"}
\ No newline at end of file
+    return {"msg": "scheduler_svc pong"}
+
+
+job_router = APIRouter(
+    prefix="/api/v1/jobs",
+    tags=["jobs"],
+)
+
+@job_router.get("/", response_model=List[Job])
+def read_jobs(status: Optional[str] = None, skip: int = 0, limit: int = Query(100, ge=1, le=1000),
+              db: Session = Depends(get_read_db)):
+    return job_service.get_jobs(db, status=status, skip=skip, limit=limit)
+
+@job_router.post("/", response_model=Job)
+def create_job(job: JobCreate, db: Session = Depends(get_db)):
+    try:
+        return job_service.create_job(db, job)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# 本进程调度器的状态：任务数、唤醒延迟、领取和执行的次数等
+@job_router.get("/scheduler")
+def read_scheduler_stats():
+    return {**job_service.runtime.scheduler.stats(), **job_service.runtime.stats(),
+            "loaded": job_service.runtime.loaded}
+
+# 执行记录：每次执行的触发方式、执行方式、排队等待时间、执行时间和结果，新的在前
+@job_router.get("/history", response_model=List[JobExecution])
+def read_executions(job_id: Optional[str] = None, status: Optional[str] = None, since: Optional[datetime] = None,
+                    dag_run_id: Optional[int] = None, skip: int = 0, limit: int = Query(100, ge=1, le=1000),
+                    db: Session = Depends(get_read_db)):
+    return job_service.get_executions(db, job_id=job_id, status=status, since=since, dag_run_id=dag_run_id,
+                                      skip=skip, limit=limit)
+
+# 全部依赖关系，按层拓扑排序
+@job_router.get("/dag", response_model=JobDag)
+def read_dag(db: Session = Depends(get_read_db)):
+    try:
+        return job_service.get_dag(db)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+# 依赖执行：各任务的结果、总耗时和关键路径，新的在前
+@job_router.get("/dag-runs", response_model=List[JobDagRun])
+def read_dag_runs(root_job_id: Optional[str] = None, status: Optional[str] = None, skip: int = 0,
+                  limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    return job_service.get_dag_runs(db, root_job_id=root_job_id, status=status, skip=skip, limit=limit)
+
+@job_router.get("/{job_id}", response_model=Job)
+def read_job(job_id: str, db: Session = Depends(get_read_db)):
+    db_job = job_service.get_job(db, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@job_router.put("/{job_id}", response_model=Job)
+def update_job(job_id: str, job: JobUpdate, db: Session = Depends(get_db)):
+    try:
+        db_job = job_service.update_job(db, job_id, job)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@job_router.delete("/{job_id}", response_model=Job)
+def delete_job(job_id: str, db: Session = Depends(get_db)):
+    db_job = job_service.delete_job(db, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@job_router.post("/{job_id}/execute")
+def execute_job(job_id: str, priority: Optional[int] = Query(None, ge=0, le=9), with_dependents: bool = False,
+                db: Session = Depends(get_read_db)):
+    db_job = job_service.get_job(db, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        job_service.execute_job(db_job, priority=priority, with_dependents=with_dependents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (QueueFullError, ExecutorStoppedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"job_id": job_id, "submitted": True}
+
+@job_router.post("/{job_id}/pause", response_model=Job)
+def pause_job(job_id: str, db: Session = Depends(get_db)):
+    db_job = job_service.set_job_status(db, job_id, "paused")
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@job_router.post("/{job_id}/resume", response_model=Job)
+def resume_job(job_id: str, db: Session = Depends(get_db)):
+    db_job = job_service.set_job_status(db, job_id, "active")
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@job_router.get("/{job_id}/dependencies", response_model=JobDependencies)
+def read_dependencies(job_id: str, db: Session = Depends(get_read_db)):
+    dependencies = job_service.get_dependencies(db, job_id)
+    if dependencies is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return dependencies
+
+@job_router.post("/{job_id}/dependencies", response_model=JobDependencies)
+def add_dependency(job_id: str, dependency: JobDependencyCreate, db: Session = Depends(get_db)):
+    try:
+        dependencies = job_service.add_dependency(db, job_id, dependency.depends_on)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if dependencies is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return dependencies
+
+@job_router.delete("/{job_id}/dependencies/{depends_on}", response_model=JobDependencies)
+def remove_dependency(job_id: str, depends_on: str, db: Session = Depends(get_db)):
+    dependencies = job_service.remove_dependency(db, job_id, depends_on)
+    if dependencies is None:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+    return dependencies
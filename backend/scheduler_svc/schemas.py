@@ -0,0 +1,136 @@
+import json
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+class JobBase(BaseModel):
+    job_name: str = Field(..., min_length=1, max_length=100)
+    job_function: str = Field(..., min_length=1, max_length=100)
+    # cron_expression、interval_seconds 二选一，都为空时只在 next_run_time 执行一次
+    cron_expression: Optional[str] = Field(None, max_length=100)
+    interval_seconds: Optional[int] = Field(None, ge=1)
+    job_args: List[Any] = []
+    job_kwargs: Dict[str, Any] = {}
+    # 排队时数字小的先执行
+    priority: int = Field(5, ge=0, le=9)
+    # 超时（秒），为空时使用任务函数登记的默认值
+    timeout_seconds: Optional[int] = Field(None, ge=1)
+
+class JobCreate(JobBase):
+    # 为空时自动生成
+    job_id: Optional[str] = Field(None, min_length=1, max_length=100)
+    # 首次执行时间：cron 任务为空时按表达式计算，间隔任务为空时为当前时间加间隔
+    next_run_time: Optional[datetime] = None
+    # 前置任务：不为空时不按时间执行，在前置任务都执行成功后执行
+    depends_on: List[str] = []
+
+    @model_validator(mode="after")
+    def check_trigger(self):
+        if self.cron_expression and self.interval_seconds:
+            raise ValueError("cron_expression and interval_seconds are mutually exclusive")
+        if self.depends_on:
+            return self
+        if not self.cron_expression and not self.interval_seconds and self.next_run_time is None:
+            raise ValueError("one-off jobs require next_run_time")
+        return self
+
+class JobUpdate(BaseModel):
+    job_name: Optional[str] = Field(None, min_length=1, max_length=100)
+    job_function: Optional[str] = Field(None, min_length=1, max_length=100)
+    cron_expression: Optional[str] = Field(None, max_length=100)
+    interval_seconds: Optional[int] = Field(None, ge=1)
+    job_args: Optional[List[Any]] = None
+    job_kwargs: Optional[Dict[str, Any]] = None
+    priority: Optional[int] = Field(None, ge=0, le=9)
+    timeout_seconds: Optional[int] = Field(None, ge=1)
+    next_run_time: Optional[datetime] = None
+
+class Job(JobBase):
+    id: int
+    job_id: str
+    next_run_time: Optional[datetime] = None
+    status: str
+    # 正在执行该任务的进程及其租约到期时间
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("job_args", "job_kwargs", mode="before")
+    @classmethod
+    def parse_json(cls, value, info):
+        # 数据库中保存为 JSON 文本
+        if value is None:
+            return [] if info.field_name == "job_args" else {}
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
+
+class JobExecution(BaseModel):
+    id: int
+    job_id: str
+    job_function: str
+    trigger: str
+    executor: str
+    worker_id: Optional[str] = None
+    scheduled_at: Optional[datetime] = None
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_wait_ms: float
+    run_ms: float
+    status: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    dag_run_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class JobDependencyCreate(BaseModel):
+    depends_on: str = Field(..., min_length=1, max_length=100)
+
+class JobDependencies(BaseModel):
+    job_id: str
+    # 前置任务
+    depends_on: List[str]
+    # 后继任务
+    dependents: List[str]
+
+class JobDependencyEdge(BaseModel):
+    job_id: str
+    depends_on: str
+
+class JobDag(BaseModel):
+    # 按层拓扑排序，每层的任务只依赖之前各层的任务；只包括有依赖关系的任务
+    levels: List[List[str]]
+    edges: List[JobDependencyEdge]
+
+class JobDagRun(BaseModel):
+    id: int
+    root_job_id: str
+    trigger: str
+    worker_id: Optional[str] = None
+    status: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    jobs_total: int
+    jobs_succeeded: Optional[int] = None
+    jobs_failed: Optional[int] = None
+    jobs_skipped: Optional[int] = None
+    makespan_ms: Optional[float] = None
+    critical_path_ms: Optional[float] = None
+    critical_path: List[str] = []
+    total_run_ms: Optional[float] = None
+
+    @field_validator("critical_path", mode="before")
+    @classmethod
+    def parse_path(cls, value):
+        # 数据库中保存为 JSON 文本
+        if value is None:
+            return []
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,177 @@
+"""
+cron 表达式编译
+
+支持标准的5个字段（分 时 日 月 周）：*、列表（1,15）、范围（1-5）、步长（*/10、8-18/2）、
+月份和星期的英文缩写（jan、mon），以及 @yearly、@monthly、@weekly、@daily、@hourly。
+日和周都不是 * 时，满足其中之一即触发（与 crontab 相同）。时间为服务器本地时间。
+
+表达式编译后按字符串缓存，同一表达式的任务共用一个 CronSchedule。
+CronSchedule 批量预先计算之后的触发时间（时间戳的有序数组），查询下一次触发时间只需二分查找；
+数组用完时再向后计算一批。大量任务使用少数几种表达式时，计算下一次触发时间几乎没有开销。
+"""
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, time as dtime, timedelta
+from functools import lru_cache
+from typing import List, Optional
+
+# 每次预先计算的触发次数
+PRECOMPUTE_COUNT = 1024
+# 超过该年数仍找不到触发时间的表达式（如 2月30日）视为无效
+MAX_SEARCH_YEARS = 5
+
+ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+WEEKDAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# (最小值, 最大值, 名称)
+FIELDS = [
+    (0, 59, None),
+    (0, 23, None),
+    (1, 31, None),
+    (1, 12, MONTH_NAMES),
+    (0, 7, WEEKDAY_NAMES),
+]
+
+
+class CronError(ValueError):
+    def __init__(self, expression: str, reason: str):
+        self.expression = expression
+        super().__init__(f"Invalid cron expression '{expression}': {reason}")
+
+
+def _parse_value(text: str, names, expression: str) -> int:
+    if names is not None and text.lower() in names:
+        return names[text.lower()]
+    if not text.isdigit():
+        raise CronError(expression, f"bad value '{text}'")
+    return int(text)
+
+
+def _parse_field(text: str, low: int, high: int, names, expression: str) -> set:
+    values = set()
+    for part in text.split(","):
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise CronError(expression, f"bad step '{step_text}'")
+            step = int(step_text)
+        else:
+            step = 1
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = _parse_value(start_text, names, expression), _parse_value(end_text, names, expression)
+        else:
+            start = _parse_value(part, names, expression)
+            # 5/15 表示从5开始每15
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise CronError(expression, f"'{part}' out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    编译后的 cron 表达式，各方法可在多个线程中调用
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        text = ALIASES.get(expression.strip().lower(), expression)
+        parts = text.split()
+        if len(parts) != 5:
+            raise CronError(expression, "expected 5 fields: minute hour day month weekday")
+        fields = [_parse_field(part, low, high, names, expression)
+                  for part, (low, high, names) in zip(parts, FIELDS)]
+        self.minutes = sorted(fields[0])
+        self.hours = sorted(fields[1])
+        self.days = fields[2]
+        self.months = fields[3]
+        # 7 与 0 都表示星期日；转换为 Python 的 weekday()（星期一为0）
+        self.weekdays = {(value - 1) % 7 for value in fields[4]}
+        self.day_restricted = parts[2] != "*"
+        self.weekday_restricted = parts[4] != "*"
+        self._lock = threading.Lock()
+        # 预先计算的触发时间（时间戳，升序），包含 _computed_from 之后的全部触发时间
+        self._times: List[float] = []
+        self._computed_from = float("inf")
+        if self.next_after(datetime.now().timestamp()) is None:
+            raise CronError(expression, f"never fires within {MAX_SEARCH_YEARS} years")
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        in_weekdays = day.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def _compute(self, after: float, count: int) -> List[float]:
+        # 从 after 之后的整分钟开始，逐日列出满足条件的日期中的各个时刻
+        start = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        last_day = day + timedelta(days=366 * MAX_SEARCH_YEARS)
+        times = []
+        while day <= last_day and len(times) < count:
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        moment = datetime.combine(day, dtime(hour, minute))
+                        if moment >= start:
+                            times.append(moment.timestamp())
+            day += timedelta(days=1)
+        return times
+
+    def next_after(self, after: float) -> Optional[float]:
+        """
+        严格晚于 after（时间戳）的下一次触发时间，找不到时返回 None
+        """
+        with self._lock:
+            if after >= self._computed_from:
+                position = bisect_right(self._times, after)
+                if position < len(self._times):
+                    return self._times[position]
+            # 超出已计算的范围，或早于计算的起点（如修改了系统时间）
+            self._times = self._compute(after, PRECOMPUTE_COUNT)
+            self._computed_from = after
+            return self._times[0] if self._times else None
+
+    def next_times(self, after: float, count: int) -> List[float]:
+        """
+        after 之后的 count 次触发时间
+        """
+        times = []
+        while len(times) < count:
+            moment = self.next_after(times[-1] if times else after)
+            if moment is None:
+                break
+            times.append(moment)
+        return times
+
+
+def compile_cron(expression: str) -> CronSchedule:
+    """
+    编译 cron 表达式，同一表达式返回同一个 CronSchedule
+
+    Raises:
+        CronError: 表达式无效
+    """
+    return _compile(" ".join(expression.split()))
+
+
+@lru_cache(maxsize=4096)
+def _compile(expression: str) -> CronSchedule:
+    return CronSchedule(expression)
@@ -0,0 +1,219 @@
+"""
+任务依赖图
+
+job_dependencies 中的一行表示 job_id 依赖 depends_on_job_id：前置任务执行成功后才执行。
+依赖关系构成有向无环图，添加依赖时检查不能成环。
+
+一次依赖执行（DagRun）从一个执行成功的任务（根任务）开始，包括它的全部后继任务：
+- 后继任务的前置任务（只计本次依赖执行中的任务）全部成功后立即进入就绪集，不等下一次定时触发；
+- 就绪集中的任务按 priority、拓扑顺序依次开始，同时执行的任务数不超过 parallelism；
+- 前置任务失败、超时或取消时，后继任务不执行（skipped），其他分支继续执行；
+- 结束时按实际执行时间计算关键路径（执行时间之和最长的依赖链），是不限并发时完成本次依赖执行所需的最短时间。
+"""
+import heapq
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 一个任务的执行参数：(job_function, args, kwargs, priority, timeout)
+JobParams = Tuple[str, list, dict, int, Optional[float]]
+
+
+def successors_of(edges: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """
+    Args:
+        edges: (job_id, depends_on_job_id)
+
+    Returns:
+        前置任务 -> 后继任务列表
+    """
+    successors: Dict[str, List[str]] = {}
+    for job_id, depends_on in edges:
+        successors.setdefault(depends_on, []).append(job_id)
+    return successors
+
+
+def descendants(successors: Dict[str, List[str]], root: str) -> Set[str]:
+    """
+    root 的全部后继任务（不含 root）
+    """
+    found: Set[str] = set()
+    stack = list(successors.get(root, ()))
+    while stack:
+        job_id = stack.pop()
+        if job_id not in found:
+            found.add(job_id)
+            stack.extend(successors.get(job_id, ()))
+    return found
+
+
+def creates_cycle(successors: Dict[str, List[str]], job_id: str, depends_on: str) -> bool:
+    """
+    添加 job_id 依赖 depends_on 后是否成环：depends_on 是 job_id 自身或 job_id 的后继任务时成环
+    """
+    return depends_on == job_id or depends_on in descendants(successors, job_id)
+
+
+def topological_levels(nodes: Iterable[str], edges: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    """
+    按层拓扑排序：每层的任务只依赖之前各层的任务，同一层的任务可以同时执行
+
+    Args:
+        nodes: 全部任务
+        edges: (job_id, depends_on_job_id)，两端都应在 nodes 中
+
+    Raises:
+        ValueError: 依赖关系成环
+    """
+    indegree = {node: 0 for node in nodes}
+    successors = successors_of(edges)
+    for targets in successors.values():
+        for job_id in targets:
+            indegree[job_id] += 1
+    level = sorted(node for node, count in indegree.items() if count == 0)
+    levels = []
+    visited = 0
+    while level:
+        levels.append(level)
+        visited += len(level)
+        following = []
+        for node in level:
+            for job_id in successors.get(node, ()):
+                indegree[job_id] -= 1
+                if indegree[job_id] == 0:
+                    following.append(job_id)
+        level = sorted(following)
+    if visited != len(indegree):
+        raise ValueError("Job dependencies contain a cycle")
+    return levels
+
+
+class DagRun:
+    """
+    一次依赖执行的调度状态，不加锁，由调用方串行调用
+
+    Args:
+        run_id: job_dag_runs.id
+        root: 根任务
+        root_timing: 根任务的 (开始时间, 结束时间)，时间戳
+        edges: 本次依赖执行中的 (job_id, depends_on_job_id)，包括依赖根任务的
+        jobs: 根任务之外各任务的执行参数；不在其中的后继任务（已暂停、已删除）不执行，其后继任务也不执行
+        parallelism: 同时执行的任务数上限
+    """
+
+    def __init__(self, run_id: int, root: str, root_timing: Tuple[float, float], edges: List[Tuple[str, str]],
+                 jobs: Dict[str, JobParams], parallelism: int):
+        self.run_id = run_id
+        self.root = root
+        self.jobs = jobs
+        self.parallelism = parallelism
+        self.successors = successors_of(edges)
+        self.predecessors: Dict[str, List[str]] = {}
+        for job_id, depends_on in edges:
+            self.predecessors.setdefault(job_id, []).append(depends_on)
+        nodes = {root} | descendants(self.successors, root)
+        # 拓扑顺序，用于就绪集中同优先级任务的先后和计算关键路径
+        self.order = [node for level in topological_levels(nodes, edges) for node in level]
+        self._rank = {node: i for i, node in enumerate(self.order)}
+        # 尚未成功的前置任务数
+        self._waiting = {node: len(self.predecessors.get(node, ())) for node in nodes}
+        # 任务 -> pending / running / success / failed / timeout / cancelled / skipped
+        self.status = {node: "pending" for node in nodes}
+        # 任务 -> (开始时间, 结束时间)
+        self.timing: Dict[str, Tuple[float, float]] = {}
+        self._ready: List[Tuple[int, int, str]] = []
+        self.running = 0
+        self.finish(root, "success", *root_timing)
+
+    def finish(self, job_id: str, status: str, started_at: Optional[float], finished_at: float) -> None:
+        """
+        记录一个任务执行结束，成功时把前置任务都已成功的后继任务放入就绪集，否则跳过全部后继任务
+        """
+        if job_id != self.root:
+            self.running -= 1
+        self.status[job_id] = status
+        self.timing[job_id] = (started_at if started_at is not None else finished_at, finished_at)
+        for successor in self.successors.get(job_id, ()):
+            if status != "success":
+                self._skip(successor)
+                continue
+            self._waiting[successor] -= 1
+            if self._waiting[successor] == 0 and self.status[successor] == "pending":
+                if successor in self.jobs:
+                    heapq.heappush(self._ready, (self.jobs[successor][3], self._rank[successor], successor))
+                else:
+                    self._skip(successor)
+
+    def _skip(self, job_id: str) -> None:
+        queue = deque([job_id])
+        while queue:
+            node = queue.popleft()
+            if self.status[node] != "pending":
+                continue
+            self.status[node] = "skipped"
+            queue.extend(self.successors.get(node, ()))
+
+    def take(self) -> List[str]:
+        """
+        取出可以开始执行的就绪任务，调用方执行后对每个任务调用 finish
+        """
+        started = []
+        while self._ready and self.running < self.parallelism:
+            _, _, job_id = heapq.heappop(self._ready)
+            self.status[job_id] = "running"
+            self.running += 1
+            started.append(job_id)
+        return started
+
+    @property
+    def done(self) -> bool:
+        return self.running == 0 and not self._ready
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        按实际执行时间计算执行时间之和最长的依赖链
+
+        Returns:
+            (依赖链上的任务，执行时间之和（秒）)
+        """
+        best: Dict[str, Tuple[float, Optional[str]]] = {}
+        for node in self.order:
+            if node not in self.timing:
+                continue
+            started_at, finished_at = self.timing[node]
+            previous = max((p for p in self.predecessors.get(node, ()) if p in best),
+                           key=lambda p: best[p][0], default=None)
+            base = best[previous][0] if previous is not None else 0.0
+            best[node] = (base + finished_at - started_at, previous)
+        end = max(best, key=lambda node: best[node][0])
+        path = []
+        node: Optional[str] = end
+        while node is not None:
+            path.append(node)
+            node = best[node][1]
+        return path[::-1], best[end][0]
+
+    def report(self) -> dict:
+        """
+        结束后写入 job_dag_runs 的字段
+        """
+        counts = {"success": 0, "failed": 0, "skipped": 0}
+        for status in self.status.values():
+            key = status if status in counts else "failed"
+            counts[key] += 1
+        path, length = self.critical_path()
+        started_at = self.timing[self.root][0]
+        finished_at = max(finished for _, finished in self.timing.values())
+        return {
+            "status": "success" if counts["success"] == len(self.status) else "failed",
+            "jobs_succeeded": counts["success"],
+            "jobs_failed": counts["failed"],
+            "jobs_skipped": counts["skipped"],
+            "finished_at": finished_at,
+            # 从根任务开始执行到最后一个任务结束
+            "makespan_ms": round((finished_at - started_at) * 1000, 3),
+            "critical_path_ms": round(length * 1000, 3),
+            "critical_path": json.dumps(path, ensure_ascii=False),
+            # 各任务执行时间之和，即串行执行所需的时间
+            "total_run_ms": round(sum(finished - started for started, finished in self.timing.values()) * 1000, 3),
+        }
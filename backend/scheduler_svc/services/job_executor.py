@@ -0,0 +1,308 @@
+"""
+任务执行层
+
+领取的定时任务和立即执行的任务都先进入有界的优先级队列（priority 小的先执行，同优先级先进先出），
+再按任务函数登记的执行方式（见 jobs/tasks.py 的 job_function）执行：
+- thread：在线程中执行，适合调用其他服务接口等以等待为主的任务；线程无法强制结束，超时靠截止时间协作取消
+  （任务调用其他服务前检查截止时间，HTTP 超时不超过剩余时间）；
+- process：在独立的执行进程中执行，不占用 API 进程的 GIL，适合计算量大、耗时长的任务；
+  每个执行进程同时只执行一个任务，超时时结束该进程，下一个任务启动新的进程。
+每次执行记录排队等待时间和执行时间，由 on_done 回调交给调用方保存。
+"""
+import heapq
+import itertools
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from ..jobs import tasks
+
+logger = logging.getLogger(__name__)
+
+# 统计排队和执行耗时的最近次数
+DURATION_SAMPLES = 10000
+# 停止时等待执行中的线程任务完成的时间（秒），超过后不再等待
+STOP_GRACE_SECONDS = 30
+
+EXECUTORS = ("thread", "process")
+
+
+class QueueFullError(RuntimeError):
+    def __init__(self, size: int):
+        super().__init__(f"Job queue is full ({size} queued)")
+
+
+class ExecutorStoppedError(RuntimeError):
+    def __init__(self):
+        super().__init__("Job executor is not running")
+
+
+class JobRun:
+    """
+    一次执行：提交时填写任务和回调，执行后填写开始、结束时间和结果
+    """
+    __slots__ = ("job_id", "job_function", "args", "kwargs", "priority", "timeout", "trigger", "scheduled_at",
+                 "on_done", "executor", "queued_at", "started_at", "finished_at", "status", "result", "error")
+
+    def __init__(self, job_id: str, job_function: str, args: list, kwargs: dict, priority: int,
+                 timeout: Optional[float], trigger: str, scheduled_at=None,
+                 on_done: Optional[Callable[["JobRun"], None]] = None):
+        self.job_id = job_id
+        self.job_function = job_function
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        # 超时（秒），为空时不限制
+        self.timeout = timeout
+        # scheduled（定时执行）/ manual（立即执行）
+        self.trigger = trigger
+        self.scheduled_at = scheduled_at
+        self.on_done = on_done
+        self.executor = tasks.executor_of(job_function)
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # success / failed / timeout / cancelled（停止时尚未执行完）
+        self.status: Optional[str] = None
+        self.result = None
+        self.error: Optional[str] = None
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or self.finished_at) - self.queued_at
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at if self.started_at is not None else 0.0
+
+
+def _process_main(conn) -> None:
+    # 执行进程：逐个接收 (任务函数, args, kwargs, 截止时间) 执行，把 (状态, 结果或错误) 发回
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            job_function, args, kwargs, deadline = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = ("success", tasks.run(job_function, args, kwargs, deadline=deadline))
+        except tasks.JobTimeout as e:
+            reply = ("timeout", str(e))
+        except Exception as e:
+            reply = ("failed", f"{type(e).__name__}: {str(e)}")
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send(("failed", f"Result cannot be returned: {str(e)}"))
+
+
+class _ProcessLost(Exception):
+    pass
+
+
+class _ProcessSlot:
+    """
+    一个执行进程，由一个执行线程独占使用
+    """
+
+    def __init__(self, context):
+        self._context = context
+        self._process = None
+        self._conn = None
+
+    def run(self, run: JobRun, deadline: Optional[float]):
+        if self._process is None or not self._process.is_alive():
+            self._conn, child_conn = self._context.Pipe()
+            self._process = self._context.Process(target=_process_main, args=(child_conn,),
+                                                  name="job-process", daemon=True)
+            self._process.start()
+            child_conn.close()
+        conn = self._conn
+        try:
+            conn.send((run.job_function, run.args, run.kwargs, deadline))
+            if not conn.poll(run.timeout):
+                self.kill()
+                return "timeout", f"Timed out after {run.timeout:g}s, process terminated"
+            return conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise _ProcessLost()
+
+    def kill(self) -> None:
+        process, self._process = self._process, None
+        if process is not None and process.is_alive():
+            process.terminate()
+            process.join(5)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class JobExecutor:
+    """
+    有界优先级队列加线程、进程两种执行方式，各方法可在多个线程中调用
+
+    Args:
+        thread_workers: 执行 thread 任务的线程数
+        process_workers: 执行进程数，同时执行的 process 任务不超过该数
+        queue_size: 两种任务合计的排队上限，超出时 submit 抛出 QueueFullError
+    """
+
+    def __init__(self, thread_workers: int, process_workers: int, queue_size: int):
+        self.workers = {"thread": thread_workers, "process": process_workers}
+        self.queue_size = queue_size
+        self._cond = threading.Condition()
+        self._queues: Dict[str, list] = {executor: [] for executor in EXECUTORS}
+        self._running_runs: Dict[str, int] = {executor: 0 for executor in EXECUTORS}
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._slots: List[_ProcessSlot] = []
+        self._running = False
+        self._stopping = False
+        self._waits = deque(maxlen=DURATION_SAMPLES)
+        self._durations = deque(maxlen=DURATION_SAMPLES)
+        self.submitted = 0
+        self.rejected = 0
+        self.finished = {"success": 0, "failed": 0, "timeout": 0, "cancelled": 0}
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._stopping = False
+        # 执行进程用 spawn 启动：API 进程中有多个线程，fork 可能复制到被其他线程持有的锁
+        context = multiprocessing.get_context("spawn")
+        self._threads = []
+        for executor, count in self.workers.items():
+            for i in range(count):
+                slot = _ProcessSlot(context) if executor == "process" else None
+                if slot is not None:
+                    self._slots.append(slot)
+                thread = threading.Thread(target=self._work, args=(executor, slot),
+                                          name=f"job-{executor}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        停止执行：排队的任务记为 cancelled，结束执行进程（其中的任务记为 cancelled），
+        最多等待 STOP_GRACE_SECONDS 秒让执行中的线程任务完成
+        """
+        with self._cond:
+            self._running = False
+            self._stopping = True
+            queued = [run for queue in self._queues.values() for _, _, run in queue]
+            for queue in self._queues.values():
+                queue.clear()
+            self._cond.notify_all()
+        for run in queued:
+            run.status = "cancelled"
+            run.finished_at = time.time()
+            self._done(run)
+        for slot in self._slots:
+            slot.kill()
+        deadline = time.monotonic() + STOP_GRACE_SECONDS
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads, self._slots = [], []
+
+    def free_slots(self) -> int:
+        with self._cond:
+            return self.queue_size - sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, run: JobRun) -> None:
+        """
+        Raises:
+            QueueFullError: 排队的任务已达上限
+            ExecutorStoppedError: 执行层未启动或已停止
+        """
+        with self._cond:
+            if not self._running:
+                raise ExecutorStoppedError()
+            queued = sum(len(queue) for queue in self._queues.values())
+            if queued >= self.queue_size:
+                self.rejected += 1
+                raise QueueFullError(queued)
+            heapq.heappush(self._queues[run.executor], (run.priority, next(self._seq), run))
+            self.submitted += 1
+            self._cond.notify_all()
+
+    def _work(self, executor: str, slot: Optional[_ProcessSlot]) -> None:
+        queue = self._queues[executor]
+        while True:
+            with self._cond:
+                while self._running and not queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                _, _, run = heapq.heappop(queue)
+                self._running_runs[executor] += 1
+            try:
+                self._execute(run, slot)
+            finally:
+                with self._cond:
+                    self._running_runs[executor] -= 1
+            self._done(run)
+
+    def _execute(self, run: JobRun, slot: Optional[_ProcessSlot]) -> None:
+        run.started_at = time.time()
+        deadline = run.started_at + run.timeout if run.timeout else None
+        try:
+            if slot is None:
+                run.status, run.result = "success", tasks.run(run.job_function, run.args, run.kwargs,
+                                                                deadline=deadline)
+            else:
+                run.status, value = slot.run(run, deadline)
+                if run.status == "success":
+                    run.result = value
+                else:
+                    run.error = value
+        except tasks.JobTimeout as e:
+            run.status, run.error = "timeout", str(e)
+        except _ProcessLost:
+            # 停止时结束了执行进程，或执行进程异常退出
+            run.status = "cancelled" if self._stopping else "failed"
+            run.error = "Job process exited before returning a result"
+        except Exception as e:
+            run.status, run.error = "failed", f"{type(e).__name__}: {str(e)}"
+        run.finished_at = time.time()
+        with self._cond:
+            self._waits.append(run.queue_wait)
+            self._durations.append(run.duration)
+        if run.status != "success":
+            logger.error(f"任务 {run.job_id}（{run.job_function}）执行{run.status}: {run.error}")
+
+    def _done(self, run: JobRun) -> None:
+        with self._cond:
+            self.finished[run.status] += 1
+        if run.on_done is not None:
+            try:
+                run.on_done(run)
+            except Exception as e:
+                logger.error(f"处理任务 {run.job_id} 的执行结果失败: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits, durations = sorted(self._waits), sorted(self._durations)
+            stats = {
+                "workers": dict(self.workers),
+                "queue_size": self.queue_size,
+                "queued": {executor: len(queue) for executor, queue in self._queues.items()},
+                "running": dict(self._running_runs),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "finished": dict(self.finished),
+            }
+
+        def percentile(values, p):
+            return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 3) if values else None
+
+        # 排队等待时间持续增长说明执行能力不足
+        stats.update(queue_wait_ms_p50=percentile(waits, 0.5), queue_wait_ms_p99=percentile(waits, 0.99),
+                     run_ms_p50=percentile(durations, 0.5), run_ms_p99=percentile(durations, 0.99))
+        return stats
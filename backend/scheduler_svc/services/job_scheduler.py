@@ -0,0 +1,200 @@
+"""
+进程内定时任务调度器
+
+全部任务按下一次执行时间放在最小堆中，调度线程只在堆顶任务到期时唤醒一次
+（Condition.wait 到堆顶的执行时间，新增更早的任务时提前唤醒），不按秒轮询全部任务：
+- 到期任务出堆后立即计算下一次执行时间（cron 表达式查预先计算的触发时间，见 cron.py）并重新入堆；
+- 修改、删除任务时不在堆中查找旧条目，旧条目在出堆时按版本丢弃（惰性删除），
+  丢弃的条目过多时重建堆；
+- 调度线程只负责把到期任务交给 dispatch 回调，任务本身在其他线程中执行。
+"""
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .cron import CronSchedule
+
+logger = logging.getLogger(__name__)
+
+# 统计调度延迟的最近次数
+LAG_SAMPLES = 10000
+# 调度线程一次最多取出的到期任务数，取出后在锁外逐个交给 dispatch
+DISPATCH_BATCH = 256
+
+
+class JobSpec:
+    """
+    调度器中的一个任务
+    """
+    __slots__ = ("job_id", "job_function", "args", "kwargs", "cron", "interval", "next_run", "definition")
+
+    def __init__(self, job_id: str, job_function: str, args: list, kwargs: dict, cron: Optional[CronSchedule],
+                 interval: Optional[int], next_run: float, definition: tuple = ()):
+        self.job_id = job_id
+        self.job_function = job_function
+        self.args = args
+        self.kwargs = kwargs
+        self.cron = cron
+        self.interval = interval
+        # 下一次执行时间（时间戳）
+        self.next_run = next_run
+        # 任务定义，用于判断其他进程是否修改了任务
+        self.definition = definition
+
+    def following(self, scheduled_at: float, now: float) -> Optional[float]:
+        """
+        scheduled_at 这次执行之后的下一次执行时间；错过的执行（调度器停止或过载期间）只补一次，不逐次补
+        """
+        if self.cron is not None:
+            return self.cron.next_after(max(scheduled_at, now))
+        if self.interval:
+            following = scheduled_at + self.interval
+            if following <= now:
+                following += math.ceil((now - following) / self.interval) * self.interval
+                if following <= now:
+                    following += self.interval
+            return following
+        return None
+
+
+class JobScheduler:
+    """
+    最小堆调度器，各方法可在多个线程中调用
+
+    Args:
+        dispatch: 任务到期时调用 dispatch(spec, scheduled_at, next_run)，next_run 为空表示任务已结束；
+            在调度线程中执行，不能阻塞
+    """
+
+    def __init__(self, dispatch: Callable[[JobSpec, float, Optional[float]], None]):
+        self._dispatch = dispatch
+        self._cond = threading.Condition()
+        # (执行时间, 序号, 任务)；任务已修改、删除或执行时间已变化的条目出堆时丢弃
+        self._heap: List[Tuple[float, int, JobSpec]] = []
+        self._jobs: Dict[str, JobSpec] = {}
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._lags = deque(maxlen=LAG_SAMPLES)
+        self.fired = 0
+
+    def _push(self, spec: JobSpec) -> None:
+        # 调用方持有 self._cond
+        heapq.heappush(self._heap, (spec.next_run, next(self._seq), spec))
+        if len(self._heap) > 2 * len(self._jobs) + 1000:
+            self._heap = [(job.next_run, next(self._seq), job) for job in self._jobs.values()]
+            heapq.heapify(self._heap)
+
+    def load(self, specs: Iterable[JobSpec]) -> None:
+        """
+        用 specs 替换全部任务
+        """
+        with self._cond:
+            self._jobs = {spec.job_id: spec for spec in specs}
+            self._heap = [(spec.next_run, next(self._seq), spec) for spec in self._jobs.values()]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def upsert(self, spec: JobSpec) -> None:
+        with self._cond:
+            self._jobs[spec.job_id] = spec
+            self._push(spec)
+            if self._heap[0][2] is spec:
+                self._cond.notify()
+
+    def remove(self, job_id: str) -> Optional[JobSpec]:
+        with self._cond:
+            return self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[JobSpec]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def job_ids(self) -> List[str]:
+        with self._cond:
+            return list(self._jobs)
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _take_due(self) -> List[Tuple[JobSpec, float, Optional[float]]]:
+        # 等待到堆顶任务到期，取出全部已到期的任务；停止时返回空列表
+        due = []
+        with self._cond:
+            while self._running and len(due) < DISPATCH_BATCH:
+                if not self._heap:
+                    if due:
+                        break
+                    self._cond.wait()
+                    continue
+                scheduled_at, _, spec = self._heap[0]
+                if self._jobs.get(spec.job_id) is not spec or spec.next_run != scheduled_at:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = scheduled_at - time.time()
+                if delay > 0:
+                    if due:
+                        break
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                following = spec.following(scheduled_at, time.time())
+                if following is None:
+                    del self._jobs[spec.job_id]
+                else:
+                    spec.next_run = following
+                    self._push(spec)
+                due.append((spec, scheduled_at, following))
+        return due
+
+    def _run(self) -> None:
+        while True:
+            due = self._take_due()
+            if not due:
+                return
+            for spec, scheduled_at, following in due:
+                self._lags.append(time.time() - scheduled_at)
+                self.fired += 1
+                try:
+                    self._dispatch(spec, scheduled_at, following)
+                except Exception as e:
+                    logger.error(f"分派任务 {spec.job_id} 失败: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._cond:
+            lags = sorted(self._lags)
+            next_run = self._heap[0][0] if self._heap else None
+            jobs, heap_size = len(self._jobs), len(self._heap)
+
+        def percentile(p):
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))] * 1000, 3) if lags else None
+
+        return {
+            "running": self._running,
+            "jobs": jobs,
+            "heap_size": heap_size,
+            "fired": self.fired,
+            "next_run": next_run,
+            # 实际分派时间与计划执行时间之差（毫秒），最近 LAG_SAMPLES 次
+            "lag_ms_p50": percentile(0.5),
+            "lag_ms_p99": percentile(0.99),
+            "lag_ms_max": round(lags[-1] * 1000, 3) if lags else None,
+        }
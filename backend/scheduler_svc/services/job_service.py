@@ -0,0 +1,950 @@
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, case, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ..models import models
+from .. import schemas
+from ..jobs import tasks
+from .cron import compile_cron
+from .job_dag import DagRun, creates_cycle, descendants, successors_of, topological_levels
+from .job_executor import ExecutorStoppedError, JobExecutor, JobRun, QueueFullError
+from .job_scheduler import JobScheduler, JobSpec
+
+logger = logging.getLogger(__name__)
+
+# 执行 thread 任务的线程数
+MAX_WORKERS = int(os.environ.get("SCHEDULER_MAX_WORKERS", 8))
+# 执行 process 任务的进程数
+PROCESS_WORKERS = int(os.environ.get("SCHEDULER_PROCESS_WORKERS", 2))
+# 排队等待执行的任务数上限，超出时立即执行的请求返回503
+QUEUE_SIZE = int(os.environ.get("SCHEDULER_QUEUE_SIZE", 1000))
+# 任务和任务函数都没有指定超时时的超时（秒）
+DEFAULT_TIMEOUT = float(os.environ.get("SCHEDULER_JOB_TIMEOUT", 3600))
+# 一次依赖执行中同时执行的后继任务数上限
+DAG_PARALLELISM = int(os.environ.get("SCHEDULER_DAG_PARALLELISM", 4))
+# 租约时长（秒）：持有租约的进程崩溃后，超过该时间其他进程才能重新领取任务；执行中的任务每隔三分之一时长续约
+LEASE_SECONDS = float(os.environ.get("SCHEDULER_LEASE_SECONDS", 60))
+# 没有任务到期时也每隔该时间（秒）领取一次，领取其他进程修改、释放的任务和租约过期的任务
+CLAIM_INTERVAL = float(os.environ.get("SCHEDULER_CLAIM_INTERVAL", 1))
+# 已领取未执行完的任务数上限为线程数与执行进程数之和的该倍数，超出的到期任务留给其他进程领取
+CLAIM_AHEAD = 4
+# 增量读取其他进程修改的任务时 updated_at 往前重叠的时间（秒），覆盖读取时尚未提交的修改
+POLL_OVERLAP_SECONDS = 300
+# 回写执行结果时每条 UPDATE 的行数
+FLUSH_CHUNK_SIZE = 1000
+# 统计调度延迟的最近次数
+LAG_SAMPLES = 10000
+# 执行记录中返回值 JSON 文本的最大长度
+RESULT_MAX_LENGTH = 4000
+
+
+class DuplicateJobError(ValueError):
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        super().__init__(f"Job already exists: {job_id}")
+
+
+def _timestamp(value: datetime) -> float:
+    return value.timestamp()
+
+
+def _datetime(value: float) -> datetime:
+    return datetime.fromtimestamp(value)
+
+
+def _definition(job: models.ScheduledJob) -> tuple:
+    return (job.job_function, job.cron_expression, job.interval_seconds, job.job_args, job.job_kwargs,
+            job.next_run_time if not job.cron_expression and not job.interval_seconds else None)
+
+
+def _to_spec(job: models.ScheduledJob) -> JobSpec:
+    return JobSpec(
+        job_id=job.job_id,
+        job_function=job.job_function,
+        args=json.loads(job.job_args) if job.job_args else [],
+        kwargs=json.loads(job.job_kwargs) if job.job_kwargs else {},
+        cron=compile_cron(job.cron_expression) if job.cron_expression else None,
+        interval=job.interval_seconds,
+        next_run=_timestamp(job.next_run_time),
+        definition=_definition(job),
+    )
+
+
+def _first_run(cron_expression: Optional[str], interval_seconds: Optional[int],
+               requested: Optional[datetime], now: datetime) -> datetime:
+    # 计算首次执行时间，同时校验 cron 表达式（无效时抛出 CronError）
+    if cron_expression:
+        cron = compile_cron(cron_expression)
+        start = max(requested, now) if requested is not None else now
+        # 指定的时间本身满足表达式时从该时间开始
+        return _datetime(cron.next_after(_timestamp(start) - 1e-6))
+    if requested is not None:
+        return requested
+    return now + timedelta(seconds=interval_seconds)
+
+
+def _check_function(job_function: str) -> None:
+    if job_function not in tasks.JOB_FUNCTIONS:
+        raise ValueError(f"Unknown job_function: {job_function}")
+
+
+def _timeout_of(job: models.ScheduledJob) -> float:
+    return job.timeout_seconds or tasks.default_timeout(job.job_function) or DEFAULT_TIMEOUT
+
+
+def _params(job: models.ScheduledJob) -> tuple:
+    # 依赖执行中执行该任务的参数，见 job_dag.JobParams
+    return (job.job_function, json.loads(job.job_args) if job.job_args else [],
+            json.loads(job.job_kwargs) if job.job_kwargs else {}, job.priority, _timeout_of(job))
+
+
+def _edges(db: Session) -> List[Tuple[str, str]]:
+    # 全部依赖关系 (job_id, depends_on_job_id)
+    return [tuple(row) for row in db.execute(
+        select(models.JobDependency.job_id, models.JobDependency.depends_on_job_id))]
+
+
+def _has_predecessors(db: Session, job_id: str) -> bool:
+    return db.execute(
+        select(models.JobDependency.id).where(models.JobDependency.job_id == job_id).limit(1)
+    ).first() is not None
+
+
+def _reset_lease(job: models.ScheduledJob) -> None:
+    # 重新安排执行时间：作废正在执行的租约，执行完成时的回写因令牌不符被丢弃，任务按新的时间领取
+    job.fencing_token = (job.fencing_token or 0) + 1
+    job.lease_owner = None
+    job.lease_expires_at = None
+
+
+class SchedulerRuntime:
+    """
+    多个进程共同调度 scheduled_job 中的任务，不需要选主：
+
+    - 每个进程的最小堆调度器（job_scheduler.py）只用于在任务到期时唤醒领取线程，数据库中的
+      next_run_time 才是准确的执行时间；
+    - 领取：SELECT ... FOR UPDATE SKIP LOCKED 取出到期且没有有效租约的任务（其他进程正在领取的行直接跳过），
+      写入本进程的租约（lease_owner、lease_expires_at）并把令牌 fencing_token 加1；
+    - 执行完成后按 job_id 和令牌回写下一次执行时间并释放租约，令牌不符（租约已过期被其他进程重新领取，
+      或任务被修改）的回写不生效；
+    - 执行中的任务定期续约；进程崩溃后租约过期，任务由其他进程重新领取，这一次执行会重新执行。
+
+    领取的任务和立即执行的任务都交给执行层（job_executor.py），每次执行的记录与执行结果一起批量写入 job_executions。
+
+    有后继任务的任务执行成功后，在下一轮领取中开始一次依赖执行（job_dag.py）：后继任务不领取租约，
+    由本进程在前置任务完成时直接交给执行层；本进程崩溃时未完成的依赖执行不会由其他进程接手。
+
+    Args:
+        max_workers: 执行 thread 任务的线程数
+        process_workers: 执行 process 任务的进程数
+        queue_size: 排队等待执行的任务数上限
+        worker_id: 写入 lease_owner 的进程标识，默认为 主机名:进程号:随机串
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, process_workers: int = PROCESS_WORKERS,
+                 queue_size: int = QUEUE_SIZE, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.capacity = max_workers + process_workers
+        self.scheduler = JobScheduler(self._due)
+        self.executor = JobExecutor(max_workers, process_workers, queue_size)
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        # 已领取未完成的任务：job_id -> 令牌
+        self._claimed: Dict[str, int] = {}
+        # 等待回写的执行结果：job_id -> (令牌, 下一次执行时间, 状态)
+        self._completions: Dict[str, Tuple[int, datetime, str]] = {}
+        # 等待写入的执行记录
+        self._executions: List[dict] = []
+        # 有后继任务的任务（load、poll 时读取），这些任务执行成功后开始依赖执行
+        self._upstream: Set[str] = set()
+        # 等待开始依赖执行的根任务，进行中的依赖执行，等待写入的依赖执行结果
+        self._dag_roots: List[JobRun] = []
+        self._dags: Dict[int, DagRun] = {}
+        self._dag_results: List[dict] = []
+        self._renewed_at = 0.0
+        self._lags = deque(maxlen=LAG_SAMPLES)
+        self.claimed = 0
+        self.completed = 0
+        self.fenced = 0
+        self._watermark: Optional[datetime] = None
+        self.loaded = False
+
+    def _due(self, spec: JobSpec, scheduled_at: float, following: Optional[float]) -> None:
+        # 调度线程中调用：有任务到期，唤醒领取线程
+        self._wake.set()
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """
+        启动执行层、调度器和领取线程
+        """
+        self._session_factory = session_factory
+        self._stopping = False
+        self.executor.start()
+        self.scheduler.start()
+        self._thread = threading.Thread(target=self._claim_loop, name="job-claimer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止领取和执行，回写执行结果；已领取尚未执行完的任务释放租约
+        """
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.scheduler.stop()
+        self.executor.stop()
+        if self._session_factory is not None:
+            db = self._session_factory()
+            try:
+                self.flush(db)
+            except Exception as e:
+                logger.error(f"回写定时任务执行结果失败: {str(e)}")
+            finally:
+                db.close()
+
+    def _claim_loop(self) -> None:
+        while not self._stopping:
+            self._wake.wait(CLAIM_INTERVAL)
+            self._wake.clear()
+            if self._stopping:
+                return
+            db = self._session_factory()
+            try:
+                while self.claim(db) > 0:
+                    pass
+            except Exception as e:
+                logger.error(f"领取定时任务失败: {str(e)}")
+            finally:
+                db.close()
+
+    def claim(self, db: Session) -> int:
+        """
+        一轮领取：在同一个事务中回写已完成任务的执行结果和执行记录、按需续约、领取到期任务，提交后把领取的任务
+        交给执行层；返回领取的任务数，已领取未完成的任务达到上限或执行层队列已满时不领取
+        """
+        with self._lock:
+            pending, self._completions = self._completions, {}
+            executions, self._executions = self._executions, []
+            roots, self._dag_roots = self._dag_roots, []
+            results, self._dag_results = self._dag_results, []
+            limit = min(self.capacity * CLAIM_AHEAD - len(self._claimed), self.executor.free_slots())
+        try:
+            updated = self._write_completions(db, pending)
+            self._write_executions(db, executions)
+            self._write_dag_results(db, results)
+            if time.monotonic() - self._renewed_at >= LEASE_SECONDS / 3:
+                self._renew(db)
+            dags = self._start_dags(db, roots) if roots else []
+            claimed = self._claim(db, limit) if limit > 0 else []
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._requeue(pending, executions, roots, results)
+            raise
+        self._count_completions(len(pending), updated)
+        with self._lock:
+            self._dags.update((dag.run_id, dag) for dag in dags)
+        for dag in dags:
+            self._advance(dag)
+        with self._lock:
+            for run, _, token in claimed:
+                self._claimed[run.job_id] = token
+            self.claimed += len(claimed)
+        for run, spec, token in claimed:
+            run.on_done = lambda run, spec=spec, token=token: self._finished(run, spec, token)
+            try:
+                self.executor.submit(run)
+            except (QueueFullError, ExecutorStoppedError) as e:
+                # 立即执行的任务占满了队列，或正在停止：释放租约，下一次执行时间不变
+                logger.warning(f"任务 {run.job_id} 未能进入执行队列: {str(e)}")
+                self._complete(run.job_id, token, run.scheduled_at, "active")
+        return len(claimed)
+
+    def _claim(self, db: Session, limit: int) -> List[Tuple[JobRun, JobSpec, int]]:
+        job = models.ScheduledJob
+        now = datetime.now()
+        claimable = and_(job.status == "active", job.next_run_time <= now,
+                         or_(job.lease_expires_at.is_(None), job.lease_expires_at < now))
+        ids = db.execute(
+            select(job.id).where(claimable).order_by(job.next_run_time).limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            return []
+        # MySQL 的 DATETIME 不保存小数秒，按整秒比较才能认出本次领取的行
+        expires = (now + timedelta(seconds=LEASE_SECONDS)).replace(microsecond=0)
+        # 再次检查条件：不支持 SKIP LOCKED 的数据库（SQLite）上两个进程可能取到同一批行，只有一个能写入租约
+        db.execute(
+            update(job).where(job.id.in_(ids), claimable)
+            .values(lease_owner=self.worker_id, lease_expires_at=expires, fencing_token=job.fencing_token + 1,
+                    updated_at=job.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.execute(
+            select(job).where(job.id.in_(ids), job.lease_owner == self.worker_id, job.lease_expires_at == expires)
+        ).scalars().all()
+        claimed = []
+        for row in rows:
+            try:
+                spec = _to_spec(row)
+                run = JobRun(spec.job_id, spec.job_function, spec.args, spec.kwargs, priority=row.priority,
+                             timeout=_timeout_of(row), trigger="scheduled", scheduled_at=row.next_run_time)
+                claimed.append((run, spec, row.fencing_token))
+            except ValueError as e:
+                logger.error(f"任务 {row.job_id} 定义无效，标记为 error: {str(e)}")
+                with self._lock:
+                    self._completions[row.job_id] = (row.fencing_token, row.next_run_time, "error")
+        return claimed
+
+    def _finished(self, run: JobRun, spec: JobSpec, token: int) -> None:
+        # 执行层的回调：记录执行，计算下一次执行时间
+        self._record(run)
+        if run.status == "cancelled":
+            # 停止时尚未执行完：释放租约，下一次执行时间不变，由其他进程领取
+            self._complete(run.job_id, token, run.scheduled_at, "active")
+            return
+        with self._lock:
+            self._lags.append(run.started_at - _timestamp(run.scheduled_at))
+        if run.status == "success":
+            self._queue_dag(run)
+        following = spec.following(_timestamp(run.scheduled_at), time.time())
+        if following is None:
+            self._complete(run.job_id, token, run.scheduled_at, "completed")
+        else:
+            self._complete(run.job_id, token, _datetime(following), "active")
+
+    def _queue_dag(self, run: JobRun) -> None:
+        # 有后继任务的任务执行成功：唤醒领取线程开始依赖执行
+        if run.job_id not in self._upstream:
+            return
+        with self._lock:
+            self._dag_roots.append(run)
+        self._wake.set()
+
+    def _start_dags(self, db: Session, roots: List[JobRun]) -> List[DagRun]:
+        # 在领取事务中为每个根任务写入一条 job_dag_runs，读取其全部后继任务
+        edges = _edges(db)
+        successors = successors_of(edges)
+        with self._lock:
+            busy = {dag.root for dag in self._dags.values()}
+        dags = []
+        for root in roots:
+            nodes = descendants(successors, root.job_id)
+            if not nodes:
+                continue
+            if root.job_id in busy:
+                logger.warning(f"任务 {root.job_id} 的上一次依赖执行尚未结束，本次不执行后继任务")
+                continue
+            members = nodes | {root.job_id}
+            jobs = {job.job_id: _params(job) for job in db.execute(
+                select(models.ScheduledJob).where(models.ScheduledJob.job_id.in_(nodes),
+                                                  models.ScheduledJob.status == "active")).scalars()}
+            record = models.JobDagRun(root_job_id=root.job_id, trigger=root.trigger, worker_id=self.worker_id,
+                                      status="running", started_at=_datetime(root.started_at),
+                                      jobs_total=len(members))
+            db.add(record)
+            db.flush()
+            try:
+                dag = DagRun(record.id, root.job_id, (root.started_at, root.finished_at),
+                             [edge for edge in edges if edge[0] in members and edge[1] in members],
+                             jobs, DAG_PARALLELISM)
+            except ValueError as e:
+                # 多个进程同时添加依赖时可能成环
+                logger.error(f"任务 {root.job_id} 的后继任务无法执行: {str(e)}")
+                record.status = "failed"
+                record.finished_at = record.started_at
+                continue
+            busy.add(root.job_id)
+            dags.append(dag)
+        return dags
+
+    def _advance(self, dag: DagRun) -> None:
+        # 把就绪的后继任务交给执行层；全部结束时记下依赖执行的结果，在下一轮领取时写入
+        with self._lock:
+            ready = dag.take()
+            if dag.done:
+                del self._dags[dag.run_id]
+                report = dag.report()
+                report.update(id=dag.run_id, finished_at=_datetime(report["finished_at"]))
+                self._dag_results.append(report)
+                logger.info(f"任务 {dag.root} 的依赖执行 {dag.run_id} 结束（{report['status']}），"
+                            f"耗时 {report['makespan_ms']:.0f}ms，关键路径 {report['critical_path']} "
+                            f"{report['critical_path_ms']:.0f}ms")
+        for job_id in ready:
+            job_function, args, kwargs, priority, timeout = dag.jobs[job_id]
+            run = JobRun(job_id, job_function, args, kwargs, priority=priority, timeout=timeout, trigger="dependency",
+                         on_done=lambda run, dag=dag: self._dag_job_finished(dag, run))
+            try:
+                self.executor.submit(run)
+            except (QueueFullError, ExecutorStoppedError) as e:
+                logger.warning(f"任务 {job_id} 未能进入执行队列: {str(e)}")
+                run.status, run.error, run.finished_at = "cancelled", str(e), time.time()
+                self._dag_job_finished(dag, run)
+
+    def _dag_job_finished(self, dag: DagRun, run: JobRun) -> None:
+        # 执行层的回调：前置任务完成后立即开始就绪的后继任务
+        self._record(run, dag.run_id)
+        with self._lock:
+            dag.finish(run.job_id, run.status, run.started_at, run.finished_at)
+        self._advance(dag)
+
+    def _record(self, run: JobRun, dag_run_id: Optional[int] = None) -> None:
+        result = None
+        if run.result is not None:
+            result = json.dumps(run.result, ensure_ascii=False, default=str)[:RESULT_MAX_LENGTH]
+        execution = {
+            "job_id": run.job_id,
+            "job_function": run.job_function,
+            "trigger": run.trigger,
+            "executor": run.executor,
+            "worker_id": self.worker_id,
+            "scheduled_at": run.scheduled_at,
+            "queued_at": _datetime(run.queued_at),
+            "started_at": _datetime(run.started_at) if run.started_at is not None else None,
+            "finished_at": _datetime(run.finished_at),
+            "queue_wait_ms": round(run.queue_wait * 1000, 3),
+            "run_ms": round(run.duration * 1000, 3),
+            "status": run.status,
+            "result": result,
+            "error": run.error,
+            "dag_run_id": dag_run_id,
+        }
+        with self._lock:
+            self._executions.append(execution)
+
+    def _complete(self, job_id: str, token: int, next_run_time: datetime, status: str) -> None:
+        with self._lock:
+            self._completions[job_id] = (token, next_run_time, status)
+            self._claimed.pop(job_id, None)
+            # 已领取的任务剩下不到执行能力（线程数加进程数）时才唤醒领取线程，执行结果攒成一批回写，一轮领取一批
+            running_low = len(self._claimed) <= self.capacity
+        if running_low:
+            self._wake.set()
+
+    def flush(self, db: Session) -> int:
+        """
+        回写已完成任务的执行结果并释放租约，写入执行记录和依赖执行的结果，返回回写的任务数；
+        尚未开始的依赖执行不再开始
+        """
+        with self._lock:
+            pending, self._completions = self._completions, {}
+            executions, self._executions = self._executions, []
+            results, self._dag_results = self._dag_results, []
+            roots, self._dag_roots = self._dag_roots, []
+        if roots:
+            logger.warning(f"停止调度，{len(roots)} 个任务的后继任务未执行")
+        try:
+            updated = self._write_completions(db, pending)
+            self._write_executions(db, executions)
+            self._write_dag_results(db, results)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._requeue(pending, executions, (), results)
+            raise
+        self._count_completions(len(pending), updated)
+        return len(pending)
+
+    def _write_completions(self, db: Session, pending: Dict[str, Tuple[int, datetime, str]]) -> int:
+        # 按 job_id 和令牌回写下一次执行时间、状态并清空租约，返回实际更新的行数
+        if not pending:
+            return 0
+        table = models.ScheduledJob.__table__
+        # updated_at 显式赋为原值：MySQL 不自动更新（ON UPDATE CURRENT_TIMESTAMP），
+        # 各进程的增量读取不会把调度产生的回写当作任务修改；执行期间被暂停的任务保持暂停
+        stmt = (
+            update(table)
+            .where(table.c.job_id == bindparam("b_job_id"), table.c.fencing_token == bindparam("b_token"))
+            .values(next_run_time=bindparam("b_next_run_time"),
+                    status=case((table.c.status == "active", bindparam("b_status")), else_=table.c.status),
+                    lease_owner=None, lease_expires_at=None, updated_at=table.c.updated_at)
+        )
+        rows = [{"b_job_id": job_id, "b_token": token, "b_next_run_time": next_run_time, "b_status": status}
+                for job_id, (token, next_run_time, status) in pending.items()]
+        updated = 0
+        for begin in range(0, len(rows), FLUSH_CHUNK_SIZE):
+            updated += db.execute(stmt, rows[begin:begin + FLUSH_CHUNK_SIZE]).rowcount
+        return updated
+
+    def _write_executions(self, db: Session, executions: List[dict]) -> None:
+        table = models.JobExecution.__table__
+        for begin in range(0, len(executions), FLUSH_CHUNK_SIZE):
+            db.execute(insert(table), executions[begin:begin + FLUSH_CHUNK_SIZE])
+
+    def _write_dag_results(self, db: Session, results: List[dict]) -> None:
+        table = models.JobDagRun.__table__
+        for result in results:
+            values = dict(result)
+            run_id = values.pop("id")
+            db.execute(update(table).where(table.c.id == run_id).values(**values))
+
+    def _requeue(self, pending: Dict[str, Tuple[int, datetime, str]], executions: List[dict],
+                 roots: List[JobRun] = (), results: List[dict] = ()) -> None:
+        # 回写失败：放回待回写的执行结果、执行记录、依赖执行，下一轮重试（期间又有新结果的以新结果为准）
+        with self._lock:
+            for job_id, value in pending.items():
+                self._completions.setdefault(job_id, value)
+            self._executions[:0] = executions
+            self._dag_roots[:0] = roots
+            self._dag_results[:0] = results
+
+    def _count_completions(self, written: int, updated: int) -> None:
+        with self._lock:
+            self.completed += updated
+            self.fenced += written - updated
+        if updated < written:
+            logger.warning(f"{written - updated} 个任务的租约已失效（过期后被重新领取或任务已修改），执行结果未回写")
+
+    def _renew(self, db: Session) -> None:
+        # 延长执行中任务的租约
+        self._renewed_at = time.monotonic()
+        with self._lock:
+            claimed = list(self._claimed.items())
+        if not claimed:
+            return
+        table = models.ScheduledJob.__table__
+        expires = (datetime.now() + timedelta(seconds=LEASE_SECONDS)).replace(microsecond=0)
+        stmt = (
+            update(table)
+            .where(table.c.job_id == bindparam("b_job_id"), table.c.fencing_token == bindparam("b_token"))
+            .values(lease_expires_at=expires, updated_at=table.c.updated_at)
+        )
+        for begin in range(0, len(claimed), FLUSH_CHUNK_SIZE):
+            db.execute(stmt, [{"b_job_id": job_id, "b_token": token}
+                              for job_id, token in claimed[begin:begin + FLUSH_CHUNK_SIZE]])
+
+    def execute_now(self, run: JobRun, with_dependents: bool = False) -> None:
+        """
+        立即执行一次任务：不领取租约，不影响调度，执行记录的 trigger 为 manual
+
+        Args:
+            with_dependents: 执行成功后是否执行其后继任务
+
+        Raises:
+            QueueFullError: 执行层队列已满
+            ExecutorStoppedError: 本进程没有启动调度（SCHEDULER_ENABLED=false）
+        """
+        def on_done(run: JobRun) -> None:
+            self._record(run)
+            if with_dependents and run.status == "success":
+                self._queue_dag(run)
+
+        run.on_done = on_done
+        self.executor.submit(run)
+
+    def load_upstream(self, db: Session) -> None:
+        """
+        读取有后继任务的任务
+        """
+        self._upstream = set(db.execute(select(models.JobDependency.depends_on_job_id).distinct()).scalars())
+
+    def load(self, db: Session) -> None:
+        """
+        读取全部活跃任务，替换调度器中的任务
+        """
+        started_at = datetime.now()
+        jobs = db.execute(
+            select(models.ScheduledJob).where(models.ScheduledJob.status == "active",
+                                              models.ScheduledJob.next_run_time.is_not(None))
+        ).scalars()
+        specs = []
+        for job in jobs:
+            try:
+                specs.append(_to_spec(job))
+            except ValueError as e:
+                logger.error(f"任务 {job.job_id} 定义无效，未加入调度: {str(e)}")
+        self.scheduler.load(specs)
+        self.load_upstream(db)
+        self._watermark = started_at
+        self.loaded = True
+        logger.info(f"已加载 {len(specs)} 个定时任务")
+
+    def poll(self, db: Session) -> None:
+        """
+        读取其他进程修改过的任务
+        """
+        if not self.loaded:
+            self.load(db)
+            return
+        since = self._watermark - timedelta(seconds=POLL_OVERLAP_SECONDS)
+        polled_at = datetime.now()
+        for job in db.execute(select(models.ScheduledJob).where(models.ScheduledJob.updated_at > since)).scalars():
+            self.apply(job)
+        self.load_upstream(db)
+        self._watermark = polled_at
+
+    def reconcile(self, db: Session) -> None:
+        """
+        移除数据库中已删除或不再活跃的任务（增量读取看不到其他进程删除的行）
+        """
+        active = set(db.execute(
+            select(models.ScheduledJob.job_id).where(models.ScheduledJob.status == "active")
+        ).scalars())
+        for job_id in self.scheduler.job_ids():
+            if job_id not in active:
+                self.scheduler.remove(job_id)
+
+    def apply(self, job: models.ScheduledJob, reschedule: bool = False) -> None:
+        """
+        按任务的当前状态更新调度器
+
+        Args:
+            reschedule: 为假且 cron 表达式、间隔没有变化时，保留调度器中的下一次执行时间
+                （数据库中的值可能尚未回写，按数据库的值会提前唤醒）
+        """
+        if job.status != "active" or job.next_run_time is None:
+            self.scheduler.remove(job.job_id)
+            return
+        current = self.scheduler.get(job.job_id)
+        if current is not None and current.definition == _definition(job):
+            return
+        try:
+            spec = _to_spec(job)
+        except ValueError as e:
+            logger.error(f"任务 {job.job_id} 定义无效，未加入调度: {str(e)}")
+            return
+        if (not reschedule and current is not None and (spec.cron or spec.interval)
+                and (current.cron, current.interval) == (spec.cron, spec.interval)):
+            spec.next_run = current.next_run
+        self.scheduler.upsert(spec)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+            stats = {
+                "worker_id": self.worker_id,
+                "claimed": self.claimed,
+                "completed": self.completed,
+                # 回写时令牌不符的次数
+                "fenced": self.fenced,
+                "in_flight": len(self._claimed),
+                "dag_runs": len(self._dags),
+            }
+
+        def percentile(p):
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))] * 1000, 3) if lags else None
+
+        # 开始执行时间与 next_run_time 之差（毫秒），包括领取和在执行层排队的时间
+        stats.update(run_lag_ms_p50=percentile(0.5), run_lag_ms_p99=percentile(0.99))
+        stats["executor"] = self.executor.stats()
+        return stats
+
+
+# 进程内唯一的调度器
+runtime = SchedulerRuntime()
+
+
+def get_job(db: Session, job_id: str) -> Optional[models.ScheduledJob]:
+    return db.execute(
+        select(models.ScheduledJob).where(models.ScheduledJob.job_id == job_id)
+    ).scalar_one_or_none()
+
+
+def get_jobs(db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 100
+             ) -> List[models.ScheduledJob]:
+    stmt = select(models.ScheduledJob).order_by(models.ScheduledJob.id)
+    if status is not None:
+        stmt = stmt.where(models.ScheduledJob.status == status)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def _saved(db: Session, job: models.ScheduledJob, reschedule: bool = True) -> models.ScheduledJob:
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise DuplicateJobError(job.job_id)
+    db.refresh(job)
+    runtime.apply(job, reschedule=reschedule)
+    return job
+
+
+def create_job(db: Session, job: schemas.JobCreate) -> models.ScheduledJob:
+    """
+    Raises:
+        ValueError: job_function 未登记、cron 表达式无效、job_id 重复或前置任务不存在
+    """
+    _check_function(job.job_function)
+    job_id = job.job_id or str(uuid.uuid4())
+    for depends_on in job.depends_on:
+        if depends_on == job_id:
+            raise ValueError(f"Job {job_id} cannot depend on itself")
+        if get_job(db, depends_on) is None:
+            raise ValueError(f"Unknown dependency: {depends_on}")
+    now = datetime.now()
+    next_run_time = None
+    if job.cron_expression or job.interval_seconds or job.next_run_time is not None:
+        next_run_time = _first_run(job.cron_expression, job.interval_seconds, job.next_run_time, now)
+    db_job = models.ScheduledJob(
+        job_id=job_id,
+        job_name=job.job_name,
+        job_function=job.job_function,
+        cron_expression=job.cron_expression or None,
+        interval_seconds=job.interval_seconds,
+        job_args=json.dumps(job.job_args, ensure_ascii=False),
+        job_kwargs=json.dumps(job.job_kwargs, ensure_ascii=False),
+        # 有前置任务时不按时间执行
+        next_run_time=next_run_time if not job.depends_on else None,
+        priority=job.priority,
+        timeout_seconds=job.timeout_seconds,
+        status="active",
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(db_job)
+    for depends_on in dict.fromkeys(job.depends_on):
+        db.add(models.JobDependency(job_id=job_id, depends_on_job_id=depends_on, created_at=now))
+    db_job = _saved(db, db_job)
+    if job.depends_on:
+        runtime.load_upstream(db)
+    return db_job
+
+
+def update_job(db: Session, job_id: str, job: schemas.JobUpdate) -> Optional[models.ScheduledJob]:
+    """
+    修改任务；修改了执行时间相关的字段时重新计算下一次执行时间（有前置任务时仍不按时间执行）
+
+    Raises:
+        ValueError: job_function 未登记、cron 表达式无效或 cron 与间隔同时设置
+    """
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    changes = job.model_dump(exclude_unset=True)
+    for key in ("job_args", "job_kwargs"):
+        if key in changes:
+            changes[key] = json.dumps(changes[key] if changes[key] is not None else
+                                      ([] if key == "job_args" else {}), ensure_ascii=False)
+    if "priority" in changes and changes["priority"] is None:
+        del changes["priority"]
+    for key, value in changes.items():
+        setattr(db_job, key, value)
+    _check_function(db_job.job_function)
+    if db_job.cron_expression and db_job.interval_seconds:
+        db.rollback()
+        raise ValueError("cron_expression and interval_seconds are mutually exclusive")
+    reschedule = bool({"cron_expression", "interval_seconds", "next_run_time"} & changes.keys())
+    if reschedule:
+        if _has_predecessors(db, job_id):
+            # 有前置任务时不按时间执行，只校验 cron 表达式
+            if db_job.cron_expression:
+                compile_cron(db_job.cron_expression)
+            db_job.next_run_time = None
+        else:
+            if not db_job.cron_expression and not db_job.interval_seconds and db_job.next_run_time is None:
+                db.rollback()
+                raise ValueError("one-off jobs require next_run_time")
+            db_job.next_run_time = _first_run(db_job.cron_expression, db_job.interval_seconds,
+                                              changes.get("next_run_time"), datetime.now())
+        _reset_lease(db_job)
+    db_job.updated_at = datetime.now()
+    return _saved(db, db_job, reschedule=reschedule)
+
+
+def delete_job(db: Session, job_id: str) -> Optional[models.ScheduledJob]:
+    """
+    删除任务及其依赖关系；后继任务没有其他前置任务时恢复按时间执行
+    """
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    dependencies = models.JobDependency.__table__
+    dependents = list(db.execute(
+        select(dependencies.c.job_id).where(dependencies.c.depends_on_job_id == job_id)).scalars())
+    db.execute(dependencies.delete().where(or_(dependencies.c.job_id == job_id,
+                                               dependencies.c.depends_on_job_id == job_id)))
+    db.delete(db_job)
+    restored = [job for job in (_restore_schedule(db, dependent) for dependent in dependents) if job is not None]
+    db.commit()
+    runtime.scheduler.remove(job_id)
+    for job in restored:
+        runtime.apply(job, reschedule=True)
+    runtime.load_upstream(db)
+    return db_job
+
+
+def _restore_schedule(db: Session, job_id: str) -> Optional[models.ScheduledJob]:
+    # 删除依赖后没有前置任务了：cron、间隔任务从当前时间重新计算下一次执行时间；一次性任务需要修改 next_run_time 才会执行
+    job = get_job(db, job_id)
+    if job is None or _has_predecessors(db, job_id):
+        return None
+    now = datetime.now()
+    if job.cron_expression or job.interval_seconds:
+        job.next_run_time = _first_run(job.cron_expression, job.interval_seconds, None, now)
+        _reset_lease(job)
+    job.updated_at = now
+    return job
+
+
+def set_job_status(db: Session, job_id: str, status: str) -> Optional[models.ScheduledJob]:
+    """
+    暂停（paused）或恢复（active）任务；恢复时从当前时间重新计算下一次执行时间（有前置任务的任务除外）
+    """
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    now = datetime.now()
+    if status == "active" and db_job.status != "active":
+        if (db_job.cron_expression or db_job.interval_seconds) and not _has_predecessors(db, job_id):
+            db_job.next_run_time = _first_run(db_job.cron_expression, db_job.interval_seconds, None, now)
+            _reset_lease(db_job)
+    db_job.status = status
+    db_job.updated_at = now
+    return _saved(db, db_job)
+
+
+def execute_job(db_job: models.ScheduledJob, priority: Optional[int] = None, with_dependents: bool = False) -> None:
+    """
+    立即执行一次任务，不影响之后的调度
+
+    Args:
+        priority: 本次执行的优先级，默认为任务的优先级
+        with_dependents: 执行成功后是否按依赖关系执行其全部后继任务
+
+    Raises:
+        ValueError: job_function 未登记
+        QueueFullError: 执行层队列已满
+        ExecutorStoppedError: 本进程没有启动调度
+    """
+    _check_function(db_job.job_function)
+    runtime.execute_now(JobRun(
+        db_job.job_id,
+        db_job.job_function,
+        json.loads(db_job.job_args) if db_job.job_args else [],
+        json.loads(db_job.job_kwargs) if db_job.job_kwargs else {},
+        priority=db_job.priority if priority is None else priority,
+        timeout=_timeout_of(db_job),
+        trigger="manual",
+    ), with_dependents=with_dependents)
+
+
+def get_executions(db: Session, job_id: Optional[str] = None, status: Optional[str] = None,
+                   since: Optional[datetime] = None, dag_run_id: Optional[int] = None, skip: int = 0,
+                   limit: int = 100) -> List[models.JobExecution]:
+    """
+    查询执行记录，新的在前；本进程尚未回写的记录要等下一轮领取（最多 CLAIM_INTERVAL 秒）后才能查到
+    """
+    stmt = select(models.JobExecution).order_by(models.JobExecution.id.desc())
+    if job_id is not None:
+        stmt = stmt.where(models.JobExecution.job_id == job_id)
+    if status is not None:
+        stmt = stmt.where(models.JobExecution.status == status)
+    if since is not None:
+        stmt = stmt.where(models.JobExecution.queued_at >= since)
+    if dag_run_id is not None:
+        stmt = stmt.where(models.JobExecution.dag_run_id == dag_run_id)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def get_dependencies(db: Session, job_id: str) -> Optional[dict]:
+    if get_job(db, job_id) is None:
+        return None
+    dependencies = models.JobDependency.__table__
+    return {
+        "job_id": job_id,
+        "depends_on": sorted(db.execute(
+            select(dependencies.c.depends_on_job_id).where(dependencies.c.job_id == job_id)).scalars()),
+        "dependents": sorted(db.execute(
+            select(dependencies.c.job_id).where(dependencies.c.depends_on_job_id == job_id)).scalars()),
+    }
+
+
+def add_dependency(db: Session, job_id: str, depends_on: str) -> Optional[dict]:
+    """
+    添加依赖：job_id 在 depends_on 执行成功后执行，不再按时间执行
+
+    Returns:
+        job_id 的依赖关系，任务不存在时返回 None
+
+    Raises:
+        ValueError: 前置任务不存在、依赖已存在或添加后成环
+    """
+    db_job = get_job(db, job_id)
+    if db_job is None:
+        return None
+    if get_job(db, depends_on) is None:
+        raise ValueError(f"Unknown dependency: {depends_on}")
+    edges = _edges(db)
+    if (job_id, depends_on) in edges:
+        raise ValueError(f"Job {job_id} already depends on {depends_on}")
+    if creates_cycle(successors_of(edges), job_id, depends_on):
+        raise ValueError(f"Dependency {job_id} -> {depends_on} would create a cycle")
+    now = datetime.now()
+    db.add(models.JobDependency(job_id=job_id, depends_on_job_id=depends_on, created_at=now))
+    if db_job.next_run_time is not None:
+        db_job.next_run_time = None
+        _reset_lease(db_job)
+    db_job.updated_at = now
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(f"Job {job_id} already depends on {depends_on}")
+    db.refresh(db_job)
+    runtime.apply(db_job)
+    runtime.load_upstream(db)
+    return get_dependencies(db, job_id)
+
+
+def remove_dependency(db: Session, job_id: str, depends_on: str) -> Optional[dict]:
+    """
+    删除依赖；job_id 没有其他前置任务时恢复按时间执行
+
+    Returns:
+        job_id 的依赖关系，依赖不存在时返回 None
+    """
+    dependencies = models.JobDependency.__table__
+    deleted = db.execute(dependencies.delete().where(dependencies.c.job_id == job_id,
+                                                     dependencies.c.depends_on_job_id == depends_on)).rowcount
+    if not deleted:
+        db.rollback()
+        return None
+    restored = _restore_schedule(db, job_id)
+    db.commit()
+    if restored is not None:
+        runtime.apply(restored, reschedule=True)
+    runtime.load_upstream(db)
+    return get_dependencies(db, job_id)
+
+
+def get_dag(db: Session) -> dict:
+    """
+    全部依赖关系按层拓扑排序
+
+    Raises:
+        ValueError: 依赖关系成环（多个进程同时添加依赖时可能发生）
+    """
+    edges = _edges(db)
+    nodes = {job_id for edge in edges for job_id in edge}
+    return {
+        "levels": topological_levels(nodes, edges),
+        "edges": [{"job_id": job_id, "depends_on": depends_on} for job_id, depends_on in sorted(edges)],
+    }
+
+
+def get_dag_runs(db: Session, root_job_id: Optional[str] = None, status: Optional[str] = None,
+                 skip: int = 0, limit: int = 100) -> List[models.JobDagRun]:
+    """
+    查询依赖执行，新的在前；结束的依赖执行要等下一轮领取后才会更新
+    """
+    stmt = select(models.JobDagRun).order_by(models.JobDagRun.id.desc())
+    if root_job_id is not None:
+        stmt = stmt.where(models.JobDagRun.root_job_id == root_job_id)
+    if status is not None:
+        stmt = stmt.where(models.JobDagRun.status == status)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+服务间调用客户端
+
+各服务之间通过 HTTP 接口互相调用。目标服务与调用方在同一进程内（单进程合并部署，
+见 monolith.py）时，请求直接交给目标服务的 ASGI 应用处理，不经过网络和端口；
+否则发送到 <服务名>_URL 环境变量或 localhost:<默认端口> 对应的地址；设置了 <服务名>_UDS 时经该 Unix 套接字发送。
+
+用法：
+    from backend.service_client import service_client
+
+    # async def 路由中
+    response = await service_client.arequest('material_svc', 'GET', '/api/v1/materials')
+    # def 路由或脚本中
+    response = service_client.request('material_svc', 'GET', '/api/v1/materials')
+"""
+import os
+import asyncio
+import threading
+
+import httpx
+
+# 与 main.py 中 SERVICES 的端口保持一致
+DEFAULT_SERVICE_PORTS = {
+    'plan_svc': 8001,
+    'order_svc': 8002,
+    'approval_svc': 8003,
+    'inventory_svc': 8004,
+    'material_svc': 8005,
+    'config_svc': 8006,
+    'scheduler_svc': 8007,
+    'shift_svc': 8008,
+}
+
+DEFAULT_TIMEOUT = float(os.environ.get('SERVICE_CALL_TIMEOUT', 10))
+
+
+class ServiceClient:
+    """
+    服务间调用客户端，自动选择进程内调用或 HTTP 调用
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._local_apps = {}
+        self._lock = threading.Lock()
+        # Unix 套接字路径（TCP 为 None）-> 同步 HTTP 客户端
+        self._http = {}
+
+    def register_local(self, service_name, app):
+        """
+        登记与调用方在同一进程内的服务，之后对该服务的调用直接在进程内处理
+
+        Args:
+            service_name: 服务名称
+            app: 该服务的 ASGI 应用
+        """
+        with self._lock:
+            self._local_apps[service_name] = app
+
+    def unregister_local(self, service_name):
+        with self._lock:
+            self._local_apps.pop(service_name, None)
+
+    def is_local(self, service_name):
+        return service_name in self._local_apps
+
+    def base_url(self, service_name):
+        """
+        获取服务的 HTTP 地址，可通过 <服务名>_URL 环境变量覆盖（如 PLAN_SVC_URL）
+        """
+        url = os.environ.get(f"{service_name.upper()}_URL")
+        if url:
+            return url.rstrip('/')
+        if service_name not in DEFAULT_SERVICE_PORTS:
+            raise ValueError(f"未知服务: {service_name}")
+        return f"http://localhost:{DEFAULT_SERVICE_PORTS[service_name]}"
+
+    def uds_path(self, service_name):
+        """
+        服务监听的 Unix 套接字路径（<服务名>_UDS 环境变量，如 PLAN_SVC_UDS），未设置时返回 None
+        """
+        return os.environ.get(f"{service_name.upper()}_UDS") or None
+
+    async def arequest(self, service_name, method, path, **kwargs):
+        """
+        异步调用指定服务的接口
+
+        Args:
+            service_name: 服务名称
+            method: HTTP 方法
+            path: 接口路径，如 /api/v1/plans
+            **kwargs: 传给 httpx 的参数（params、json 等）
+
+        Returns:
+            httpx.Response: 响应对象
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        app = self._local_apps.get(service_name)
+        if app is not None:
+            # ASGITransport 不触发 lifespan，合并部署时由 monolith.py 统一管理
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url=f"http://{service_name}") as client:
+                return await client.request(method, path, **kwargs)
+        uds = self.uds_path(service_name)
+        transport = httpx.AsyncHTTPTransport(uds=uds) if uds else None
+        async with httpx.AsyncClient(base_url=self.base_url(service_name), transport=transport) as client:
+            return await client.request(method, path, **kwargs)
+
+    def request(self, service_name, method, path, **kwargs):
+        """
+        同步调用指定服务的接口，参数同 arequest
+        """
+        if self.is_local(service_name):
+            try:
+                # def 路由运行在 AnyIO 工作线程中，交回所在的事件循环执行
+                from anyio.from_thread import run
+                return run(lambda: self.arequest(service_name, method, path, **kwargs))
+            except RuntimeError:
+                # 不在事件循环的工作线程中（如脚本），临时创建事件循环
+                return asyncio.run(self.arequest(service_name, method, path, **kwargs))
+
+        kwargs.setdefault('timeout', self.timeout)
+        uds = self.uds_path(service_name)
+        client = self._http.get(uds)
+        if client is None:
+            with self._lock:
+                client = self._http.get(uds)
+                if client is None:
+                    client = self._http[uds] = httpx.Client(transport=httpx.HTTPTransport(uds=uds) if uds else None)
+        return client.request(method, self.base_url(service_name) + path, **kwargs)
+
+
+# 进程内唯一的客户端实例
+service_client = ServiceClient()
@@ -0,0 +1,113 @@
+"""
+班次服务数据库迁移，由 db_migrate.py 在部署时执行
+
+已发布的版本不要修改，表结构变更请新增版本。
+"""
+from sqlalchemy import (
+    MetaData, Table, Column, BigInteger, Date, DateTime, Float, Index, Integer, String, Text, UniqueConstraint,
+)
+
+from db_migrate import Migration
+
+
+def _create_rosters(conn):
+    # 版本1的表结构，与当时的 models 一致
+    metadata = MetaData()
+    Table(
+        "rosters", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(100), nullable=False),
+        Column("start_date", Date, nullable=False),
+        Column("days", Integer, nullable=False),
+        Column("shifts", Text, nullable=False),
+        Column("min_rest_hours", Float, nullable=False),
+        Column("required", Integer, nullable=False),
+        Column("assigned", Integer, nullable=False),
+        Column("solve_ms", Float),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        Index("ix_rosters_start_date", "start_date"),
+    )
+    Table(
+        "roster_requirements", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("roster_id", Integer, nullable=False),
+        Column("work_date", Date, nullable=False),
+        Column("shift_code", String(20), nullable=False),
+        Column("line", String(50), nullable=False),
+        Column("skill", String(50), nullable=False),
+        Column("headcount", Integer, nullable=False),
+        UniqueConstraint("roster_id", "work_date", "shift_code", "line", "skill",
+                         name="uq_roster_requirements_slot"),
+    )
+    Table(
+        "roster_workers", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("roster_id", Integer, nullable=False),
+        Column("worker_id", String(36), nullable=False),
+        Column("skills", String(500), nullable=False),
+        Column("max_shifts", Integer, nullable=False),
+        Column("unavailable", Text),
+        UniqueConstraint("roster_id", "worker_id", name="uq_roster_workers_roster_id_worker_id"),
+    )
+    Table(
+        "roster_assignments", metadata,
+        Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+        Column("roster_id", Integer, nullable=False),
+        Column("worker_id", String(36), nullable=False),
+        Column("work_date", Date, nullable=False),
+        Column("shift_code", String(20), nullable=False),
+        Column("line", String(50), nullable=False),
+        Column("skill", String(50), nullable=False),
+        Index("ix_roster_assignments_roster_id_work_date", "roster_id", "work_date"),
+        Index("ix_roster_assignments_roster_id_worker_id", "roster_id", "worker_id"),
+    )
+    metadata.create_all(conn)
+
+
+def _create_attendance(conn):
+    # 版本2的表结构，与当时的 models 一致
+    metadata = MetaData()
+    Table(
+        "attendance_events", metadata,
+        Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+        Column("worker_id", String(36), nullable=False),
+        Column("event_time", DateTime, nullable=False),
+        Column("event_type", String(3), nullable=False),
+        Column("device", String(50)),
+        Column("created_at", DateTime),
+        UniqueConstraint("worker_id", "event_time", "event_type", name="uq_attendance_events_punch"),
+        Index("ix_attendance_events_event_time", "event_time"),
+    )
+    Table(
+        "attendance_daily", metadata,
+        Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+        Column("worker_id", String(36), nullable=False),
+        Column("work_date", Date, nullable=False),
+        Column("roster_id", Integer),
+        Column("shift_code", String(20)),
+        Column("line", String(50)),
+        Column("scheduled_start", DateTime),
+        Column("scheduled_end", DateTime),
+        Column("first_in", DateTime),
+        Column("last_out", DateTime),
+        Column("punches", Integer, nullable=False),
+        Column("worked_minutes", Integer, nullable=False),
+        Column("late_minutes", Integer, nullable=False),
+        Column("early_leave_minutes", Integer, nullable=False),
+        Column("overtime_minutes", Integer, nullable=False),
+        Column("status", String(20), nullable=False),
+        Column("updated_at", DateTime),
+        Index("ix_attendance_daily_work_date_worker_id", "work_date", "worker_id"),
+    )
+    metadata.create_all(conn)
+
+
+MIGRATIONS = [
+    Migration(1, "create rosters, roster_requirements, roster_workers and roster_assignments", [
+        _create_rosters,
+    ]),
+    Migration(2, "create attendance_events and attendance_daily", [
+        _create_attendance,
+    ]),
+]
@@ -0,0 +1,147 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, Index, Integer, String, Text, UniqueConstraint
+
+from backend.shift_svc.database import Base
+
+# SQLite 只有 INTEGER PRIMARY KEY 才会自增
+AssignmentId = BigInteger().with_variant(Integer, "sqlite")
+AttendanceId = BigInteger().with_variant(Integer, "sqlite")
+
+
+# 排班计划：从 start_date 开始 days 天，shifts 为班次定义的 JSON 文本
+# （[{"code", "name", "start_time", "end_time"}]），需求、员工和排班结果见下面三张表
+class Roster(Base):
+    __tablename__ = "rosters"
+    __table_args__ = (
+        Index("ix_rosters_start_date", "start_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    start_date = Column(Date, nullable=False)
+    days = Column(Integer, nullable=False)
+    shifts = Column(Text, nullable=False)
+    # 相邻两天的两个班之间最少休息的小时数
+    min_rest_hours = Column(Float, nullable=False)
+    # 需求总人次、已排人次
+    required = Column(Integer, nullable=False)
+    assigned = Column(Integer, nullable=False)
+    # 最近一次求解（生成或缺勤补缺）的耗时
+    solve_ms = Column(Float)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<Roster(id={self.id}, name='{self.name}')>"
+
+
+# 每天每个班次、每条产线、每种技能需要的人数
+class RosterRequirement(Base):
+    __tablename__ = "roster_requirements"
+    __table_args__ = (
+        UniqueConstraint("roster_id", "work_date", "shift_code", "line", "skill",
+                         name="uq_roster_requirements_slot"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    roster_id = Column(Integer, nullable=False)
+    work_date = Column(Date, nullable=False)
+    shift_code = Column(String(20), nullable=False)
+    line = Column(String(50), nullable=False)
+    skill = Column(String(50), nullable=False)
+    headcount = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<RosterRequirement(roster_id={self.roster_id}, work_date={self.work_date}, line='{self.line}')>"
+
+
+# 参与排班的员工：skills 为逗号分隔的技能，unavailable 为不可上班时间的 JSON 文本
+# （["2024-06-03", "2024-06-04/N"]，只有日期表示整天，日期/班次 表示当天该班次）
+class RosterWorker(Base):
+    __tablename__ = "roster_workers"
+    __table_args__ = (
+        UniqueConstraint("roster_id", "worker_id", name="uq_roster_workers_roster_id_worker_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    roster_id = Column(Integer, nullable=False)
+    worker_id = Column(String(36), nullable=False)
+    skills = Column(String(500), nullable=False)
+    # 排班期内最多的班数
+    max_shifts = Column(Integer, nullable=False)
+    unavailable = Column(Text)
+
+    def __repr__(self):
+        return f"<RosterWorker(roster_id={self.roster_id}, worker_id='{self.worker_id}')>"
+
+
+# 排班结果：员工在某天上某个班，在哪条产线做哪种技能的工作
+class RosterAssignment(Base):
+    __tablename__ = "roster_assignments"
+    __table_args__ = (
+        Index("ix_roster_assignments_roster_id_work_date", "roster_id", "work_date"),
+        Index("ix_roster_assignments_roster_id_worker_id", "roster_id", "worker_id"),
+    )
+
+    id = Column(AssignmentId, primary_key=True)
+    roster_id = Column(Integer, nullable=False)
+    worker_id = Column(String(36), nullable=False)
+    work_date = Column(Date, nullable=False)
+    shift_code = Column(String(20), nullable=False)
+    line = Column(String(50), nullable=False)
+    skill = Column(String(50), nullable=False)
+
+    def __repr__(self):
+        return f"<RosterAssignment(worker_id='{self.worker_id}', work_date={self.work_date}, shift_code='{self.shift_code}')>"
+
+
+# 打卡记录：event_type 为 in（上班卡）或 out（下班卡），event_time 为本地时间；
+# 同一员工同一时间的同类打卡只保存一条，重复导入时跳过
+class AttendanceEvent(Base):
+    __tablename__ = "attendance_events"
+    __table_args__ = (
+        UniqueConstraint("worker_id", "event_time", "event_type", name="uq_attendance_events_punch"),
+        Index("ix_attendance_events_event_time", "event_time"),
+    )
+
+    id = Column(AttendanceId, primary_key=True)
+    worker_id = Column(String(36), nullable=False)
+    event_time = Column(DateTime, nullable=False)
+    event_type = Column(String(3), nullable=False)
+    # 考勤机编号
+    device = Column(String(50))
+    created_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<AttendanceEvent(worker_id='{self.worker_id}', event_time={self.event_time}, event_type='{self.event_type}')>"
+
+
+# 每日考勤汇总：每个排班一行（没有打卡的为缺勤），没有排班但有打卡的每人每天一行（shift_code 为空），
+# 由打卡记录和排班结果计算得到（见 services/attendance_service.py），月报等报表只读这张表
+class AttendanceDaily(Base):
+    __tablename__ = "attendance_daily"
+    __table_args__ = (
+        Index("ix_attendance_daily_work_date_worker_id", "work_date", "worker_id"),
+    )
+
+    id = Column(AttendanceId, primary_key=True)
+    worker_id = Column(String(36), nullable=False)
+    work_date = Column(Date, nullable=False)
+    roster_id = Column(Integer)
+    shift_code = Column(String(20))
+    line = Column(String(50))
+    scheduled_start = Column(DateTime)
+    scheduled_end = Column(DateTime)
+    first_in = Column(DateTime)
+    last_out = Column(DateTime)
+    punches = Column(Integer, nullable=False)
+    # 出勤、迟到、早退、加班的分钟数
+    worked_minutes = Column(Integer, nullable=False)
+    late_minutes = Column(Integer, nullable=False)
+    early_leave_minutes = Column(Integer, nullable=False)
+    overtime_minutes = Column(Integer, nullable=False)
+    # present、incomplete（缺上班或下班卡）、absent、unscheduled
+    status = Column(String(20), nullable=False)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<AttendanceDaily(worker_id='{self.worker_id}', work_date={self.work_date}, status='{self.status}')>"
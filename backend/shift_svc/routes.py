@@ -1,5 +1,132 @@
-from fastapi import APIRouter
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+from backend.shift_svc.schemas import (
+    AbsenceCreate, AttendanceDay, AttendanceEvent, AttendanceImportResult, AttendanceRollup, Roster,
+    RosterAssignment, RosterChange, RosterCreate, RosterResult, ShiftCoverage, Shortfall, WorkerAttendanceSummary,
+)
+from backend.shift_svc.services import attendance_service, roster_service
+from backend.shift_svc.database import SessionLocal, get_db, get_read_db
 
 router = APIRouter()
 
-# 在此处添加路由
\ No newline at end of file
+@router.get("/ping")
+def ping():
+    return {"msg": "shift_svc pong"}
+
+
+roster_router = APIRouter(
+    prefix="/api/v1/rosters",
+    tags=["rosters"],
+)
+
+@roster_router.get("/", response_model=List[Roster])
+def read_rosters(skip: int = 0, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_read_db)):
+    return roster_service.get_rosters(db, skip=skip, limit=limit)
+
+# 按班次定义、各产线的技能需求和员工可上班时间生成排班计划，在时间预算内求解
+@roster_router.post("/", response_model=RosterResult)
+def create_roster(roster: RosterCreate, db: Session = Depends(get_db)):
+    try:
+        return roster_service.create_roster(db, roster)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@roster_router.get("/{roster_id}", response_model=Roster)
+def read_roster(roster_id: int, db: Session = Depends(get_read_db)):
+    db_roster = roster_service.get_roster(db, roster_id)
+    if db_roster is None:
+        raise HTTPException(status_code=404, detail="Roster not found")
+    return db_roster
+
+@roster_router.get("/{roster_id}/assignments", response_model=List[RosterAssignment])
+def read_assignments(roster_id: int, work_date: Optional[date] = None, worker_id: Optional[str] = None,
+                     line: Optional[str] = None, skip: int = 0, limit: int = Query(1000, ge=1, le=10000),
+                     db: Session = Depends(get_read_db)):
+    return roster_service.get_assignments(db, roster_id, work_date=work_date, worker_id=worker_id, line=line,
+                                          skip=skip, limit=limit)
+
+@roster_router.get("/{roster_id}/shortfalls", response_model=List[Shortfall])
+def read_shortfalls(roster_id: int, work_date: Optional[date] = None, db: Session = Depends(get_read_db)):
+    return roster_service.get_shortfalls(db, roster_id, work_date=work_date)
+
+# 员工缺勤：撤下其在这些日期的班并补缺，只返回增减的排班
+@roster_router.post("/{roster_id}/absences", response_model=RosterChange)
+def create_absence(roster_id: int, absence: AbsenceCreate, db: Session = Depends(get_db)):
+    try:
+        change = roster_service.record_absence(db, roster_id, absence)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if change is None:
+        raise HTTPException(status_code=404, detail="Roster not found")
+    return change
+
+
+attendance_router = APIRouter(
+    prefix="/api/v1/attendance",
+    tags=["attendance"],
+)
+
+# 导入打卡记录：请求体为 CSV（text/csv）或 NDJSON（application/x-ndjson）文件内容，按行流式读取，
+# 每批一个事务；CSV 表头缺少必需的列或文件不是 UTF-8 编码时返回400，此前已写入的批次保留
+@attendance_router.post("/import", response_model=AttendanceImportResult)
+async def import_attendance(request: Request, format: Optional[str] = Query(None, pattern="^(csv|ndjson)$")):
+    file_format = format
+    if file_format is None:
+        content_type = request.headers.get("content-type", "")
+        file_format = "ndjson" if "ndjson" in content_type or "json" in content_type else "csv"
+    # 请求体在处理函数中逐块读取，数据库操作在线程池中进行，因此自行管理会话生命周期
+    db = SessionLocal()
+    try:
+        importer = attendance_service.AttendanceImporter(db, file_format)
+        async for lines in attendance_service.iter_line_batches(request.stream()):
+            await run_in_threadpool(importer.add, lines)
+        return await run_in_threadpool(importer.finish)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        db.close()
+
+@attendance_router.get("/events", response_model=List[AttendanceEvent])
+def read_events(worker_id: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                skip: int = 0, limit: int = Query(1000, ge=1, le=10000), db: Session = Depends(get_read_db)):
+    return attendance_service.get_events(db, worker_id=worker_id, start=start, end=end, skip=skip, limit=limit)
+
+@attendance_router.get("/daily", response_model=List[AttendanceDay])
+def read_daily(start_date: date, end_date: date, worker_id: Optional[str] = None,
+               status: Optional[str] = Query(None, pattern="^(present|incomplete|absent|unscheduled)$"),
+               skip: int = 0, limit: int = Query(1000, ge=1, le=10000), db: Session = Depends(get_read_db)):
+    return attendance_service.get_daily(db, start_date, end_date, worker_id=worker_id, status=status,
+                                        skip=skip, limit=limit)
+
+# 重新计算每日考勤汇总，排班计划生成或缺勤补缺后对涉及的日期调用
+@attendance_router.post("/daily/rebuild", response_model=AttendanceRollup)
+def rebuild_daily(start_date: date, end_date: date, db: Session = Depends(get_db)):
+    started_at = datetime.now()
+    try:
+        rows = attendance_service.rebuild_daily(db, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AttendanceRollup(start_date=start_date, end_date=end_date, rows=rows,
+                            elapsed_ms=round((datetime.now() - started_at).total_seconds() * 1000, 3))
+
+# 按员工汇总出勤天数、迟到、早退、加班（如月报），只读每日考勤汇总
+@attendance_router.get("/reports/workers", response_model=List[WorkerAttendanceSummary])
+def read_worker_report(start_date: date, end_date: date, worker_id: Optional[str] = None,
+                       db: Session = Depends(get_read_db)):
+    try:
+        return attendance_service.get_worker_summary(db, start_date, end_date, worker_id=worker_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# 每天每个班次的排班人数与实际出勤人数
+@attendance_router.get("/reports/coverage", response_model=List[ShiftCoverage])
+def read_coverage_report(start_date: date, end_date: date, shift_code: Optional[str] = None, by_line: bool = False,
+                         db: Session = Depends(get_read_db)):
+    try:
+        return attendance_service.get_coverage(db, start_date, end_date, shift_code=shift_code, by_line=by_line)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
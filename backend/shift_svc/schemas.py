@@ -0,0 +1,197 @@
+import json
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import date, datetime, time
+from typing import Dict, List, Optional
+
+class ShiftDefinition(BaseModel):
+    code: str = Field(..., min_length=1, max_length=20)
+    name: Optional[str] = Field(None, max_length=50)
+    start_time: time
+    # 不晚于 start_time 时为跨夜班次，在次日结束
+    end_time: time
+
+class StaffingRequirement(BaseModel):
+    work_date: date
+    shift_code: str = Field(..., min_length=1, max_length=20)
+    line: str = Field(..., min_length=1, max_length=50)
+    skill: str = Field(..., min_length=1, max_length=50)
+    headcount: int = Field(..., ge=1, le=1000)
+
+class Unavailability(BaseModel):
+    work_date: date
+    # 为空时整天不可上班
+    shift_code: Optional[str] = Field(None, max_length=20)
+
+class WorkerAvailability(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=36)
+    skills: List[str] = Field(..., min_length=1)
+    # 排班期内最多的班数
+    max_shifts: int = Field(5, ge=0, le=31)
+    unavailable: List[Unavailability] = []
+
+class RosterCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    start_date: date
+    days: int = Field(7, ge=1, le=31)
+    shifts: List[ShiftDefinition] = Field(..., min_length=1, max_length=10)
+    # 每天每个班次、每条产线、每种技能需要的人数，通常由 plan_svc 的生产计划换算得到
+    requirements: List[StaffingRequirement] = Field(..., min_length=1)
+    workers: List[WorkerAvailability] = Field(..., min_length=1)
+    # 相邻两天的两个班之间最少休息的小时数
+    min_rest_hours: float = Field(11, ge=0, le=24)
+    # 求解的时间预算（毫秒），为空时使用 ROSTER_TIME_BUDGET_MS
+    time_budget_ms: Optional[int] = Field(None, ge=100, le=60000)
+
+    @model_validator(mode="after")
+    def check_codes(self):
+        codes = [shift.code for shift in self.shifts]
+        if len(set(codes)) != len(codes):
+            raise ValueError("shift codes must be unique")
+        worker_ids = [worker.worker_id for worker in self.workers]
+        if len(set(worker_ids)) != len(worker_ids):
+            raise ValueError("worker_id must be unique")
+        return self
+
+class Shortfall(BaseModel):
+    work_date: date
+    shift_code: str
+    line: str
+    skill: str
+    headcount: int
+    missing: int
+
+class Roster(BaseModel):
+    id: int
+    name: str
+    start_date: date
+    days: int
+    shifts: List[ShiftDefinition]
+    min_rest_hours: float
+    required: int
+    assigned: int
+    solve_ms: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("shifts", mode="before")
+    @classmethod
+    def parse_shifts(cls, value):
+        # 数据库中保存为 JSON 文本
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
+
+class RosterResult(BaseModel):
+    roster: Roster
+    # 缺人的需求
+    shortfalls: List[Shortfall]
+    # 已排班的员工中班数最少、最多的
+    min_shifts: int
+    max_shifts: int
+    # 各阶段耗时（毫秒）：construct_ms、repair_ms、balance_ms、solve_ms
+    timings: Dict[str, float]
+
+class RosterAssignment(BaseModel):
+    worker_id: str
+    work_date: date
+    shift_code: str
+    line: str
+    skill: str
+
+    class Config:
+        from_attributes = True
+
+class AbsenceCreate(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=36)
+    dates: List[date] = Field(..., min_length=1, max_length=31)
+    time_budget_ms: Optional[int] = Field(None, ge=100, le=60000)
+
+class RosterChange(BaseModel):
+    roster_id: int
+    worker_id: str
+    added: List[RosterAssignment]
+    removed: List[RosterAssignment]
+    # 补缺后仍缺人的需求（只列缺勤日期的）
+    shortfalls: List[Shortfall]
+    solve_ms: float
+
+class AttendanceImportError(BaseModel):
+    # 行号从1开始，CSV 的表头为第1行
+    line: int
+    detail: str
+
+class AttendanceImportResult(BaseModel):
+    rows: int
+    accepted: int
+    # 已导入过的打卡（同一员工、时间、类型），跳过
+    duplicates: int
+    rejected: int
+    # 最多列出前 100 条
+    errors: List[AttendanceImportError] = []
+    # 重新计算了每日考勤汇总的日期范围（含两端）和行数
+    rollup_start: Optional[date] = None
+    rollup_end: Optional[date] = None
+    rollup_rows: int = 0
+    elapsed_ms: float
+
+class AttendanceEvent(BaseModel):
+    worker_id: str
+    event_time: datetime
+    event_type: str
+    device: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class AttendanceDay(BaseModel):
+    worker_id: str
+    work_date: date
+    roster_id: Optional[int] = None
+    shift_code: Optional[str] = None
+    line: Optional[str] = None
+    scheduled_start: Optional[datetime] = None
+    scheduled_end: Optional[datetime] = None
+    first_in: Optional[datetime] = None
+    last_out: Optional[datetime] = None
+    punches: int
+    worked_minutes: int
+    late_minutes: int
+    early_leave_minutes: int
+    overtime_minutes: int
+    status: str
+
+    class Config:
+        from_attributes = True
+
+class AttendanceRollup(BaseModel):
+    start_date: date
+    end_date: date
+    rows: int
+    elapsed_ms: float
+
+class WorkerAttendanceSummary(BaseModel):
+    worker_id: str
+    scheduled_days: int
+    present_days: int
+    absent_days: int
+    # 缺上班或下班卡的排班数
+    incomplete_days: int
+    late_days: int
+    unscheduled_days: int
+    worked_minutes: int
+    late_minutes: int
+    early_leave_minutes: int
+    overtime_minutes: int
+
+class ShiftCoverage(BaseModel):
+    work_date: date
+    shift_code: str
+    # by_line 时按产线分别统计
+    line: Optional[str] = None
+    scheduled: int
+    # 有打卡（含缺上班或下班卡）的人数
+    attended: int
+    absent: int
+    late: int
+    coverage: float
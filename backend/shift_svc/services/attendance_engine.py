@@ -0,0 +1,161 @@
+"""
+考勤统计核心
+
+全部计算在 NumPy 数组上完成，不逐条循环：
+- 打卡记录是 (员工编号, 时间, 上/下班) 三个等长数组，排班是 (员工编号, 日期, 开始时间, 结束时间, 班次) 五个等长数组，
+  时间为自 1970-01-01 起的分钟数，日期为自 1970-01-01 起的天数，员工编号为 0..n-1 的整数；
+- 打卡归属：排班按 (员工, 开始时间) 排序，每条打卡用 searchsorted 找到同一员工开始时间在其前、后的两个班，
+  落在某个班的 [开始 - early_window, 结束 + late_window] 内即归属该班（两个都符合时上班卡归后一个、下班卡归前一个；
+  下班卡打在前一个班的前半段且在再前一个班的范围内时归再前一个班），都不符合的按 (员工, 打卡日期) 归为计划外出勤；
+- 每个班（或计划外的一天）取最早的上班卡、最晚的下班卡，计算出勤、迟到、早退和加班分钟数；
+- 报表按员工或 (日期, 班次) 分组，用 np.unique + np.bincount 汇总。
+"""
+import numpy as np
+from typing import Dict, NamedTuple, Tuple
+
+# 没有打卡时间
+NO_TIME = -1
+# 上班卡、下班卡
+PUNCH_IN, PUNCH_OUT = 0, 1
+# 每天的出勤状态：按时完整打卡（可能迟到、早退）、缺上班或下班卡、排了班但没有打卡、没有排班但有打卡
+PRESENT, INCOMPLETE, ABSENT, UNSCHEDULED = 0, 1, 2, 3
+STATUS_NAMES = ("present", "incomplete", "absent", "unscheduled")
+
+MINUTES_PER_DAY = 1440
+
+
+class Punches(NamedTuple):
+    worker: np.ndarray
+    time: np.ndarray
+    kind: np.ndarray
+
+
+class Shifts(NamedTuple):
+    worker: np.ndarray
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    # 班次在调用方班次列表中的下标，调用方据此对应到班次编码、产线等
+    shift: np.ndarray
+
+
+class DailyAttendance(NamedTuple):
+    worker: np.ndarray
+    day: np.ndarray
+    # 对应 Shifts 的下标，计划外出勤为 -1
+    shift: np.ndarray
+    first_in: np.ndarray
+    last_out: np.ndarray
+    punches: np.ndarray
+    worked: np.ndarray
+    late: np.ndarray
+    early_leave: np.ndarray
+    overtime: np.ndarray
+    status: np.ndarray
+
+
+def match_punches(punches: Punches, shifts: Shifts, early_window: int, late_window: int) -> np.ndarray:
+    """
+    把每条打卡归属到排班
+
+    Returns:
+        每条打卡所属排班在 shifts 中的下标，不属于任何排班时为 -1
+    """
+    count = len(punches.time)
+    matched = np.full(count, -1, dtype=np.int64)
+    if count == 0 or len(shifts.start) == 0:
+        return matched
+    # (员工, 时间) 合成一个键后排序，同一员工的排班按开始时间连续排列
+    span = int(max(punches.time.max(), shifts.end.max()) + late_window + 1)
+    order = np.lexsort((shifts.start, shifts.worker))
+    workers, starts, ends = shifts.worker[order], shifts.start[order], shifts.end[order]
+    position = np.searchsorted(workers * span + starts, punches.worker * span + punches.time, side="right")
+
+    following = np.minimum(position, len(order) - 1)
+    following_ok = (position < len(order)) & (workers[following] == punches.worker) \
+        & (punches.time >= starts[following] - early_window)
+    preceding = np.maximum(position - 1, 0)
+    preceding_same = (position > 0) & (workers[preceding] == punches.worker)
+    preceding_ok = preceding_same & (punches.time <= ends[preceding] + late_window)
+    # 两个班间隔很短时，打在后一个班前半段的下班卡更可能是前一个班加班后下班
+    earlier = np.maximum(position - 2, 0)
+    earlier_ok = preceding_same & (position > 1) & (workers[earlier] == punches.worker) \
+        & (punches.kind == PUNCH_OUT) & (punches.time <= ends[earlier] + late_window) \
+        & (punches.time < (starts[preceding] + ends[preceding]) // 2)
+
+    use_following = following_ok & (~preceding_ok | (punches.kind == PUNCH_IN))
+    use_earlier = earlier_ok & ~use_following
+    use_preceding = preceding_ok & ~use_following & ~use_earlier
+    matched[use_following] = order[following[use_following]]
+    matched[use_preceding] = order[preceding[use_preceding]]
+    matched[use_earlier] = order[earlier[use_earlier]]
+    return matched
+
+
+def daily_attendance(punches: Punches, shifts: Shifts, early_window: int, late_window: int,
+                     late_grace: int = 0, overtime_min: int = 0) -> DailyAttendance:
+    """
+    每个排班一行（没有打卡的为缺勤），计划外出勤每个 (员工, 日期) 一行
+
+    Args:
+        early_window: 班次开始前多少分钟内的打卡归属该班
+        late_window: 班次结束后多少分钟内的打卡归属该班
+        late_grace: 迟到不超过该分钟数时不计迟到
+        overtime_min: 班次结束后加班不足该分钟数时不计加班
+    """
+    matched = match_punches(punches, shifts, early_window, late_window)
+    scheduled_count = len(shifts.start)
+
+    # 计划外的打卡按 (员工, 日期) 分组，组号排在全部排班之后
+    extra = matched < 0
+    extra_keys = punches.worker[extra] * (punches.time.max(initial=0) // MINUTES_PER_DAY + 1) \
+        + punches.time[extra] // MINUTES_PER_DAY
+    extra_unique, extra_index, extra_inverse = np.unique(extra_keys, return_index=True, return_inverse=True)
+    group = matched.copy()
+    group[extra] = scheduled_count + extra_inverse
+    groups = scheduled_count + len(extra_unique)
+
+    first_in = np.full(groups, np.iinfo(np.int64).max, dtype=np.int64)
+    is_in = punches.kind == PUNCH_IN
+    np.minimum.at(first_in, group[is_in], punches.time[is_in])
+    first_in[first_in == np.iinfo(np.int64).max] = NO_TIME
+    last_out = np.full(groups, NO_TIME, dtype=np.int64)
+    np.maximum.at(last_out, group[~is_in], punches.time[~is_in])
+    counts = np.bincount(group, minlength=groups)
+
+    extra_rows = np.flatnonzero(extra)[extra_index]
+    worker = np.concatenate([shifts.worker, punches.worker[extra_rows]]).astype(np.int64)
+    day = np.concatenate([shifts.day, punches.time[extra_rows] // MINUTES_PER_DAY]).astype(np.int64)
+    shift = np.concatenate([np.arange(scheduled_count), np.full(len(extra_unique), -1)]).astype(np.int64)
+    start = np.concatenate([shifts.start, np.full(len(extra_unique), NO_TIME)]).astype(np.int64)
+    end = np.concatenate([shifts.end, np.full(len(extra_unique), NO_TIME)]).astype(np.int64)
+    scheduled = shift >= 0
+
+    has_in = first_in != NO_TIME
+    has_out = last_out != NO_TIME
+    complete = has_in & has_out & (last_out > first_in)
+    worked = np.where(complete, last_out - first_in, 0)
+    late = np.where(scheduled & has_in, np.maximum(first_in - start, 0), 0)
+    late[late <= late_grace] = 0
+    early_leave = np.where(scheduled & has_out, np.maximum(end - last_out, 0), 0)
+    overtime = np.where(scheduled, np.where(has_out, np.maximum(last_out - end, 0), 0), worked)
+    overtime[scheduled & (overtime < overtime_min)] = 0
+
+    status = np.where(complete, PRESENT, INCOMPLETE)
+    status[scheduled & (counts == 0)] = ABSENT
+    status[~scheduled & complete] = UNSCHEDULED
+    return DailyAttendance(worker, day, shift, first_in, last_out, counts.astype(np.int64), worked, late,
+                           early_leave, overtime, status.astype(np.int64))
+
+
+def group_totals(keys: np.ndarray, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    按键分组求和
+
+    Returns:
+        排序后的不重复键，以及每列各组的合计（与键一一对应）
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    totals = {name: np.bincount(inverse, weights=column, minlength=len(unique)).astype(np.int64)
+              for name, column in columns.items()}
+    return unique, totals
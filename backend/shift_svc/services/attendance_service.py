@@ -0,0 +1,501 @@
+"""
+考勤记录与统计
+
+- 导入：CSV 或 NDJSON 的打卡记录按行流式读取，每批（IMPORT_BATCH_SIZE 行）校验后在一个事务中写入，
+  不合法的行只在结果中报告，已导入过的打卡跳过，因此中断后可以重新导入同一文件；
+  全部写入后重新计算涉及日期的每日考勤汇总；
+- 每日考勤汇总（attendance_daily）：按周读取打卡记录和排班结果的列（不构造 ORM 对象），
+  用 attendance_engine.py 在 NumPy 数组上计算迟到、早退、加班和出勤状态后整周替换；
+- 报表只读每日考勤汇总，按员工或 (日期, 班次) 在 NumPy 数组上分组汇总，一个月的报表只需读取 员工数 × 天数 行。
+"""
+import os
+import csv
+import json
+import time
+import codecs
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models import models
+from .attendance_engine import (
+    ABSENT, INCOMPLETE, MINUTES_PER_DAY, NO_TIME, PRESENT, PUNCH_IN, PUNCH_OUT, STATUS_NAMES,
+    Punches, Shifts, daily_attendance, group_totals,
+)
+from .roster_service import _chunks, _minutes
+
+logger = logging.getLogger(__name__)
+
+# 班次开始前多少分钟内的打卡归属该班
+ATTENDANCE_EARLY_WINDOW_MINUTES = int(os.environ.get("ATTENDANCE_EARLY_WINDOW_MINUTES", 120))
+# 班次结束后多少分钟内的打卡归属该班（超过的视为计划外出勤）
+ATTENDANCE_LATE_WINDOW_MINUTES = int(os.environ.get("ATTENDANCE_LATE_WINDOW_MINUTES", 360))
+# 迟到不超过该分钟数时不计迟到
+ATTENDANCE_LATE_GRACE_MINUTES = int(os.environ.get("ATTENDANCE_LATE_GRACE_MINUTES", 5))
+# 班次结束后加班不足该分钟数时不计加班
+ATTENDANCE_OVERTIME_MIN_MINUTES = int(os.environ.get("ATTENDANCE_OVERTIME_MIN_MINUTES", 30))
+
+# 导入时每批的行数，每批一个事务
+IMPORT_BATCH_SIZE = 5000
+# 导入结果中最多列出的错误数
+MAX_REPORTED_ERRORS = 100
+# 每次重新计算每日考勤汇总的天数，限制一次读入内存的打卡记录数
+ROLLUP_BLOCK_DAYS = 7
+# 报表和重新计算最多的天数
+MAX_REPORT_DAYS = 366
+
+CSV_COLUMNS = ("worker_id", "event_time", "event_type")
+EVENT_TYPES = {"in": PUNCH_IN, "out": PUNCH_OUT}
+EPOCH = date(1970, 1, 1)
+
+
+async def iter_line_batches(chunks: AsyncIterator[bytes], batch_size: int = IMPORT_BATCH_SIZE):
+    """
+    把请求体的字节流切分成行，每 batch_size 行产出一批，不把整个文件读入内存
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    lines: List[str] = []
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        lines.extend(complete)
+        if len(lines) >= batch_size:
+            yield lines
+            lines = []
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        lines.append(pending)
+    if lines:
+        yield lines
+
+
+class AttendanceImporter:
+    """
+    逐批导入打卡记录。CSV 第一行为表头，需包含 worker_id、event_time、event_type 列，可选 device 列；
+    NDJSON 每行一个对象，字段相同。event_time 为本地时间（如 2024-06-03 07:58:00），event_type 为 in 或 out。
+    """
+
+    def __init__(self, db: Session, file_format: str):
+        self.db = db
+        self.file_format = file_format
+        self.columns: Optional[Dict[str, int]] = None
+        self.line_no = 0
+        self.rows = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self.first_time: Optional[datetime] = None
+        self.last_time: Optional[datetime] = None
+        self.started_at = time.perf_counter()
+
+    def _reject(self, line: int, detail: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+    def _header(self, text: str) -> None:
+        names = [name.strip().lower() for name in next(csv.reader([text]))]
+        missing = [name for name in CSV_COLUMNS if name not in names]
+        if missing:
+            raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+        self.columns = {name: names.index(name) for name in (*CSV_COLUMNS, "device") if name in names}
+
+    def _fields(self, text: str) -> Tuple[str, str, str, Optional[str]]:
+        if self.file_format == "csv":
+            values = next(csv.reader([text]))
+            if len(values) <= max(self.columns[name] for name in CSV_COLUMNS):
+                raise ValueError("Too few columns")
+            item = {name: values[i] if i < len(values) else None for name, i in self.columns.items()}
+        else:
+            try:
+                item = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON: {e.msg}")
+            if not isinstance(item, dict):
+                raise ValueError("Each line must be a JSON object")
+        worker_id = str(item.get("worker_id") or "").strip()
+        if not 0 < len(worker_id) <= 36:
+            raise ValueError("worker_id must be 1 to 36 characters")
+        event_type = str(item.get("event_type") or "").strip().lower()
+        if event_type not in EVENT_TYPES:
+            raise ValueError("event_type must be 'in' or 'out'")
+        device = item.get("device")
+        if device is not None:
+            device = str(device).strip()[:50] or None
+        return worker_id, str(item.get("event_time") or "").strip(), event_type, device
+
+    @staticmethod
+    def _parse_times(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        整批解析时间，有不合法的值时逐个解析找出
+
+        Returns:
+            解析出的时间（datetime64[s]），以及每个值是否合法
+        """
+        try:
+            return np.array(values, dtype="datetime64[s]"), np.ones(len(values), dtype=bool)
+        except ValueError:
+            parsed = np.empty(len(values), dtype="datetime64[s]")
+            valid = np.ones(len(values), dtype=bool)
+            for i, value in enumerate(values):
+                try:
+                    parsed[i] = np.datetime64(value, "s")
+                except ValueError:
+                    valid[i] = False
+            return parsed, valid
+
+    def add(self, lines: List[str]) -> None:
+        """
+        导入一批行，在一个事务中写入
+
+        Raises:
+            ValueError: CSV 表头缺少必需的列
+        """
+        parsed: List[Tuple[int, str, str, str, Optional[str]]] = []
+        for text in lines:
+            self.line_no += 1
+            text = text.rstrip("\r")
+            if not text.strip():
+                continue
+            if self.file_format == "csv" and self.columns is None:
+                self._header(text)
+                continue
+            self.rows += 1
+            try:
+                parsed.append((self.line_no, *self._fields(text)))
+            except ValueError as e:
+                self._reject(self.line_no, str(e))
+        if not parsed:
+            return
+
+        times, valid = self._parse_times([row[2] for row in parsed])
+        valid &= ~np.isnat(times)
+        for i in np.flatnonzero(~valid):
+            self._reject(parsed[i][0], "event_time must be a date and time, e.g. 2024-06-03 07:58:00")
+        # datetime64[us] 转为 object 时得到 datetime
+        event_times = times.astype("datetime64[us]").astype(object)
+        now = datetime.now()
+        rows: Dict[tuple, dict] = {}
+        for i in np.flatnonzero(valid):
+            _, worker_id, _, event_type, device = parsed[i]
+            key = (worker_id, event_times[i], event_type)
+            if key in rows:
+                self.duplicates += 1
+                continue
+            rows[key] = {"worker_id": worker_id, "event_time": event_times[i], "event_type": event_type,
+                         "device": device, "created_at": now}
+        if not rows:
+            return
+        self._insert(rows)
+        batch_first, batch_last = min(key[1] for key in rows), max(key[1] for key in rows)
+        self.first_time = batch_first if self.first_time is None else min(self.first_time, batch_first)
+        self.last_time = batch_last if self.last_time is None else max(self.last_time, batch_last)
+
+    def _insert(self, rows: Dict[tuple, dict]) -> None:
+        try:
+            with self.db.begin_nested():
+                self.db.execute(insert(models.AttendanceEvent.__table__), list(rows.values()))
+        except IntegrityError:
+            # 有已导入过的打卡时先查出这些打卡，只写入新的
+            table = models.AttendanceEvent
+            existing = set(self.db.execute(
+                select(table.worker_id, table.event_time, table.event_type).where(
+                    table.worker_id.in_({key[0] for key in rows}),
+                    table.event_time.between(min(key[1] for key in rows), max(key[1] for key in rows)),
+                )
+            ).tuples())
+            fresh = [row for key, row in rows.items() if key not in existing]
+            self.duplicates += len(rows) - len(fresh)
+            if fresh:
+                with self.db.begin_nested():
+                    self.db.execute(insert(table.__table__), fresh)
+            rows = fresh
+        self.db.commit()
+        self.accepted += len(rows)
+
+    def finish(self) -> dict:
+        """
+        重新计算导入涉及日期的每日考勤汇总
+
+        Returns:
+            AttendanceImportResult 的字段
+        """
+        if self.file_format == "csv" and self.columns is None and self.line_no:
+            raise ValueError("CSV header is missing")
+        result = {"rows": self.rows, "accepted": self.accepted, "duplicates": self.duplicates,
+                  "rejected": self.rejected, "errors": sorted(self.errors, key=lambda error: error["line"])}
+        if self.first_time is not None:
+            # 前一天的夜班可能在当天下班
+            result["rollup_start"] = self.first_time.date() - timedelta(days=1)
+            result["rollup_end"] = self.last_time.date()
+            result["rollup_rows"] = rebuild_daily(self.db, result["rollup_start"], result["rollup_end"])
+        result["elapsed_ms"] = round((time.perf_counter() - self.started_at) * 1000, 3)
+        logger.info(f"导入打卡记录 {self.rows} 行：写入 {self.accepted}，重复 {self.duplicates}，"
+                    f"不合法 {self.rejected}，耗时 {result['elapsed_ms']:.0f}ms")
+        return result
+
+
+def _check_range(start_date: date, end_date: date) -> None:
+    if end_date < start_date:
+        raise ValueError("end_date must not be earlier than start_date")
+    if (end_date - start_date).days >= MAX_REPORT_DAYS:
+        raise ValueError(f"Date range must not exceed {MAX_REPORT_DAYS} days")
+
+
+def _epoch_days(values) -> np.ndarray:
+    return np.array(values, dtype="datetime64[D]").astype(np.int64)
+
+
+def _datetimes(minutes: np.ndarray) -> list:
+    # 分钟数转为 datetime，NO_TIME 转为 None
+    converted = minutes.astype("datetime64[m]").astype("datetime64[us]").astype(object)
+    return np.where(minutes == NO_TIME, None, converted).tolist()
+
+
+def _load_schedule(db: Session, first: date, last: date) -> Dict[Tuple[str, date], tuple]:
+    """
+    读取 [first, last] 的排班结果；同一员工同一天在多个排班计划中有班时以最新的排班计划为准
+
+    Returns:
+        (worker_id, work_date) -> (roster_id, shift_code, line, 开始分钟, 结束分钟)，跨夜班次的结束分钟已加一天
+    """
+    table = models.RosterAssignment
+    rows = db.execute(
+        select(table.roster_id, table.worker_id, table.work_date, table.shift_code, table.line)
+        .where(table.work_date.between(first, last)).order_by(table.roster_id)
+    ).all()
+    shift_times: Dict[int, Dict[str, Tuple[int, int]]] = {}
+    roster_ids = {row.roster_id for row in rows}
+    for roster_id, shifts in db.execute(
+        select(models.Roster.id, models.Roster.shifts).where(models.Roster.id.in_(roster_ids))
+    ) if roster_ids else ():
+        times = {}
+        for shift in json.loads(shifts):
+            start, end = _minutes(shift["start_time"]), _minutes(shift["end_time"])
+            times[shift["code"]] = (start, end if end > start else end + MINUTES_PER_DAY)
+        shift_times[roster_id] = times
+    schedule = {}
+    for roster_id, worker_id, work_date, shift_code, line in rows:
+        times = shift_times.get(roster_id, {}).get(shift_code)
+        if times is not None:
+            schedule[(worker_id, work_date)] = (roster_id, shift_code, line, *times)
+    return schedule
+
+
+def _rebuild_block(db: Session, first: date, last: date) -> int:
+    # 相邻两天的排班和打卡也读入，使跨夜班次和提前打卡归属正确，结果只保留 [first, last]
+    schedule = _load_schedule(db, first - timedelta(days=1), last + timedelta(days=1))
+    events = models.AttendanceEvent
+    punches = db.execute(
+        select(events.worker_id, events.event_time, events.event_type).where(
+            events.event_time >= datetime.combine(first - timedelta(days=1), datetime.min.time()),
+            events.event_time < datetime.combine(last + timedelta(days=2), datetime.min.time()),
+        )
+    ).all()
+    punch_workers, punch_times, punch_types = zip(*punches) if punches else ((), (), ())
+    schedule_keys = list(schedule)
+    schedule_values = list(schedule.values())
+
+    worker_ids, worker_index = np.unique(
+        np.array([*punch_workers, *(key[0] for key in schedule_keys)], dtype=object).astype(str),
+        return_inverse=True,
+    )
+    shift_days = _epoch_days([key[1] for key in schedule_keys])
+    shift_starts = np.array([value[3] for value in schedule_values], dtype=np.int64)
+    shift_ends = np.array([value[4] for value in schedule_values], dtype=np.int64)
+    result = daily_attendance(
+        Punches(
+            worker_index[:len(punches)].astype(np.int64),
+            np.array(punch_times, dtype="datetime64[m]").astype(np.int64),
+            np.array([EVENT_TYPES[value] for value in punch_types], dtype=np.int64),
+        ),
+        Shifts(
+            worker_index[len(punches):].astype(np.int64),
+            shift_days,
+            shift_days * MINUTES_PER_DAY + shift_starts,
+            shift_days * MINUTES_PER_DAY + shift_ends,
+            np.arange(len(schedule_keys), dtype=np.int64),
+        ),
+        ATTENDANCE_EARLY_WINDOW_MINUTES, ATTENDANCE_LATE_WINDOW_MINUTES,
+        ATTENDANCE_LATE_GRACE_MINUTES, ATTENDANCE_OVERTIME_MIN_MINUTES,
+    )
+
+    keep = (result.day >= (first - EPOCH).days) & (result.day <= (last - EPOCH).days)
+    columns = {name: getattr(result, name)[keep] for name in result._fields}
+    # 计划外出勤的 shift 为 -1，取到末尾追加的 NO_TIME
+    start = np.append(shift_days * MINUTES_PER_DAY + shift_starts, NO_TIME)[columns["shift"]]
+    end = np.append(shift_days * MINUTES_PER_DAY + shift_ends, NO_TIME)[columns["shift"]]
+    work_dates = columns["day"].astype("datetime64[D]").astype(object).tolist()
+    now = datetime.now()
+    rows = []
+    for i, (worker, shift, scheduled_start, scheduled_end, first_in, last_out) in enumerate(zip(
+        worker_ids[columns["worker"]].tolist(), columns["shift"].tolist(), _datetimes(start), _datetimes(end),
+        _datetimes(columns["first_in"]), _datetimes(columns["last_out"]),
+    )):
+        roster_id, shift_code, line = schedule_values[shift][:3] if shift >= 0 else (None, None, None)
+        rows.append({
+            "worker_id": worker, "work_date": work_dates[i], "roster_id": roster_id, "shift_code": shift_code,
+            "line": line, "scheduled_start": scheduled_start, "scheduled_end": scheduled_end,
+            "first_in": first_in, "last_out": last_out, "punches": int(columns["punches"][i]),
+            "worked_minutes": int(columns["worked"][i]), "late_minutes": int(columns["late"][i]),
+            "early_leave_minutes": int(columns["early_leave"][i]), "overtime_minutes": int(columns["overtime"][i]),
+            "status": STATUS_NAMES[columns["status"][i]], "updated_at": now,
+        })
+
+    db.execute(delete(models.AttendanceDaily).where(models.AttendanceDaily.work_date.between(first, last)))
+    for chunk in _chunks(rows):
+        db.execute(insert(models.AttendanceDaily.__table__), chunk)
+    db.commit()
+    return len(rows)
+
+
+def rebuild_daily(db: Session, start_date: date, end_date: date) -> int:
+    """
+    重新计算 [start_date, end_date] 的每日考勤汇总，每 ROLLUP_BLOCK_DAYS 天一个事务；
+    排班计划生成或缺勤补缺后也需要对涉及的日期重新计算
+
+    Returns:
+        写入的行数
+
+    Raises:
+        ValueError: 日期范围不合法
+    """
+    _check_range(start_date, end_date)
+    started_at = time.perf_counter()
+    total = 0
+    first = start_date
+    while first <= end_date:
+        last = min(first + timedelta(days=ROLLUP_BLOCK_DAYS - 1), end_date)
+        total += _rebuild_block(db, first, last)
+        first = last + timedelta(days=1)
+    logger.info(f"每日考勤汇总已重新计算：{start_date} ~ {end_date}，{total} 行，"
+                f"耗时 {(time.perf_counter() - started_at) * 1000:.0f}ms")
+    return total
+
+
+def get_events(db: Session, worker_id: Optional[str] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, skip: int = 0, limit: int = 1000) -> List[models.AttendanceEvent]:
+    table = models.AttendanceEvent
+    stmt = select(table).order_by(table.event_time, table.id)
+    if worker_id is not None:
+        stmt = stmt.where(table.worker_id == worker_id)
+    if start is not None:
+        stmt = stmt.where(table.event_time >= start)
+    if end is not None:
+        stmt = stmt.where(table.event_time < end)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def get_daily(db: Session, start_date: date, end_date: date, worker_id: Optional[str] = None,
+              status: Optional[str] = None, skip: int = 0, limit: int = 1000) -> List[models.AttendanceDaily]:
+    table = models.AttendanceDaily
+    stmt = select(table).where(table.work_date.between(start_date, end_date)) \
+        .order_by(table.work_date, table.worker_id, table.scheduled_start)
+    if worker_id is not None:
+        stmt = stmt.where(table.worker_id == worker_id)
+    if status is not None:
+        stmt = stmt.where(table.status == status)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def _daily_columns(db: Session, columns: list, start_date: date, end_date: date, *conditions) -> List[np.ndarray]:
+    # 只读取需要的列，按列转为数组
+    _check_range(start_date, end_date)
+    rows = db.execute(
+        select(*columns).where(models.AttendanceDaily.work_date.between(start_date, end_date), *conditions)
+    ).all()
+    if not rows:
+        return [np.empty(0) for _ in columns]
+    return [np.array(column) for column in zip(*rows)]
+
+
+def get_worker_summary(db: Session, start_date: date, end_date: date,
+                       worker_id: Optional[str] = None) -> List[dict]:
+    """
+    按员工汇总出勤天数、迟到、早退、加班和出勤分钟数
+
+    Raises:
+        ValueError: 日期范围不合法
+    """
+    table = models.AttendanceDaily
+    conditions = [table.worker_id == worker_id] if worker_id is not None else []
+    workers, shift_codes, statuses, worked, late, early_leave, overtime = _daily_columns(
+        db, [table.worker_id, table.shift_code, table.status, table.worked_minutes, table.late_minutes,
+             table.early_leave_minutes, table.overtime_minutes], start_date, end_date, *conditions,
+    )
+    if len(workers) == 0:
+        return []
+    scheduled = np.array([code is not None for code in shift_codes], dtype=bool)
+    attended = scheduled & np.isin(statuses, [STATUS_NAMES[PRESENT], STATUS_NAMES[INCOMPLETE]])
+    worker_ids, index = np.unique(workers.astype(str), return_inverse=True)
+    _, totals = group_totals(index, {
+        "scheduled_days": scheduled,
+        "present_days": attended,
+        "absent_days": statuses == STATUS_NAMES[ABSENT],
+        "incomplete_days": scheduled & (statuses == STATUS_NAMES[INCOMPLETE]),
+        "late_days": late > 0,
+        "unscheduled_days": ~scheduled,
+        "worked_minutes": worked,
+        "late_minutes": late,
+        "early_leave_minutes": early_leave,
+        "overtime_minutes": overtime,
+    })
+    return [{"worker_id": worker, **{name: int(values[i]) for name, values in totals.items()}}
+            for i, worker in enumerate(worker_ids.tolist())]
+
+
+def get_coverage(db: Session, start_date: date, end_date: date, shift_code: Optional[str] = None,
+                 by_line: bool = False) -> List[dict]:
+    """
+    每天每个班次（by_line 时每条产线）排班人数、实际出勤人数、缺勤人数和迟到人数
+
+    Raises:
+        ValueError: 日期范围不合法
+    """
+    table = models.AttendanceDaily
+    conditions = [table.shift_code.is_not(None)]
+    if shift_code is not None:
+        conditions.append(table.shift_code == shift_code)
+    work_dates, shift_codes, lines, statuses, late = _daily_columns(
+        db, [table.work_date, table.shift_code, table.line, table.status, table.late_minutes],
+        start_date, end_date, *conditions,
+    )
+    if len(work_dates) == 0:
+        return []
+    days = _epoch_days(work_dates) - (start_date - EPOCH).days
+    codes, code_index = np.unique(shift_codes.astype(str), return_inverse=True)
+    if by_line:
+        line_names, line_index = np.unique([line or "" for line in lines], return_inverse=True)
+    else:
+        line_names, line_index = np.array([""]), np.zeros(len(days), dtype=np.int64)
+    keys = (days * len(codes) + code_index) * len(line_names) + line_index
+    attended = np.isin(statuses, [STATUS_NAMES[PRESENT], STATUS_NAMES[INCOMPLETE]])
+    unique, totals = group_totals(keys, {
+        "scheduled": np.ones(len(keys)),
+        "attended": attended,
+        "absent": statuses == STATUS_NAMES[ABSENT],
+        "late": late > 0,
+    })
+    result = []
+    for i, key in enumerate(unique.tolist()):
+        day, line = divmod(key, len(line_names))
+        day, code = divmod(day, len(codes))
+        scheduled = int(totals["scheduled"][i])
+        result.append({
+            "work_date": start_date + timedelta(days=day),
+            "shift_code": str(codes[code]),
+            "line": (str(line_names[line]) or None) if by_line else None,
+            "scheduled": scheduled,
+            "attended": int(totals["attended"][i]),
+            "absent": int(totals["absent"][i]),
+            "late": int(totals["late"][i]),
+            "coverage": round(int(totals["attended"][i]) / scheduled, 4),
+        })
+    return result
@@ -0,0 +1,319 @@
+"""
+排班计划
+
+- 生成：校验班次、需求和员工，在时间预算内求解（见 roster_solver.py），把需求、员工和排班结果写入数据库；
+- 缺勤补缺：按数据库中的需求、员工和排班结果重建求解器的状态，撤下缺勤员工在这些日期的班并补缺，
+  只写入增减的排班，其他人的排班不变。
+"""
+import os
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+
+from ..models import models
+from .. import schemas
+from .roster_solver import Requirement, RosterProblem, RosterSolver, ShiftDef
+
+logger = logging.getLogger(__name__)
+
+# 请求没有指定时的求解时间预算（毫秒）
+ROSTER_TIME_BUDGET_MS = int(os.environ.get("ROSTER_TIME_BUDGET_MS", 5000))
+# 写入需求、员工、排班时每条 INSERT 的行数
+INSERT_CHUNK_SIZE = 5000
+
+# (work_date, shift_code, line, skill, headcount)
+RequirementRow = Tuple[date, str, str, str, int]
+# (worker_id, 技能列表, max_shifts, 不可上班时间列表)，不可上班时间为 "日期" 或 "日期/班次"
+WorkerRow = Tuple[str, List[str], int, List[str]]
+
+
+def _minutes(value) -> int:
+    if isinstance(value, str):
+        value = time.fromisoformat(value)
+    return value.hour * 60 + value.minute
+
+
+def _unavailable_key(work_date: date, shift_code: Optional[str]) -> str:
+    return work_date.isoformat() if shift_code is None else f"{work_date.isoformat()}/{shift_code}"
+
+
+def _chunks(rows: list):
+    for begin in range(0, len(rows), INSERT_CHUNK_SIZE):
+        yield rows[begin:begin + INSERT_CHUNK_SIZE]
+
+
+def _build(start_date: date, days: int, shifts: List[dict], requirements: List[RequirementRow],
+           workers: List[WorkerRow], min_rest_hours: float) -> RosterProblem:
+    """
+    Raises:
+        ValueError: 需求的日期不在排班期内，或需求、不可上班时间引用了未定义的班次
+    """
+    shift_index = {shift["code"]: i for i, shift in enumerate(shifts)}
+
+    def day_of(work_date: date) -> int:
+        return (work_date - start_date).days
+
+    converted = []
+    for work_date, shift_code, line, skill, headcount in requirements:
+        day = day_of(work_date)
+        if not 0 <= day < days:
+            raise ValueError(f"Requirement date {work_date} is outside the roster period")
+        if shift_code not in shift_index:
+            raise ValueError(f"Unknown shift_code: {shift_code}")
+        converted.append(Requirement(day, shift_index[shift_code], line, skill, headcount))
+    unavailable = []
+    for worker_id, _, _, keys in workers:
+        slots = set()
+        for key in keys:
+            work_date, _, shift_code = key.partition("/")
+            day = day_of(date.fromisoformat(work_date))
+            if not 0 <= day < days:
+                continue
+            if shift_code and shift_code not in shift_index:
+                raise ValueError(f"Unknown shift_code: {shift_code}")
+            slots.add((day, shift_index[shift_code] if shift_code else None))
+        unavailable.append(slots)
+    return RosterProblem(
+        days=days,
+        shifts=[ShiftDef(shift["code"], _minutes(shift["start_time"]), _minutes(shift["end_time"])) for shift in shifts],
+        worker_ids=[worker[0] for worker in workers],
+        skills=[worker[1] for worker in workers],
+        max_shifts=[worker[2] for worker in workers],
+        unavailable=unavailable,
+        requirements=converted,
+        min_rest=round(min_rest_hours * 60),
+    )
+
+
+def _assignment_row(problem: RosterProblem, start_date: date, roster_id: int, w: int, r: int) -> dict:
+    requirement = problem.requirements[r]
+    return {
+        "roster_id": roster_id,
+        "worker_id": problem.worker_ids[w],
+        "work_date": start_date + timedelta(days=requirement.day),
+        "shift_code": problem.shifts[requirement.shift].code,
+        "line": requirement.line,
+        "skill": requirement.skill,
+    }
+
+
+def _shortfall(problem: RosterProblem, start_date: date, r: int, missing: int) -> dict:
+    requirement = problem.requirements[r]
+    return {
+        "work_date": start_date + timedelta(days=requirement.day),
+        "shift_code": problem.shifts[requirement.shift].code,
+        "line": requirement.line,
+        "skill": requirement.skill,
+        "headcount": requirement.headcount,
+        "missing": missing,
+    }
+
+
+def _budget(time_budget_ms: Optional[int]) -> float:
+    return (time_budget_ms or ROSTER_TIME_BUDGET_MS) / 1000.0
+
+
+def create_roster(db: Session, roster: schemas.RosterCreate) -> dict:
+    """
+    生成排班计划
+
+    Returns:
+        RosterResult 的字段
+
+    Raises:
+        ValueError: 需求的日期不在排班期内，或引用了未定义的班次
+    """
+    shifts = [{"code": shift.code, "name": shift.name, "start_time": shift.start_time.isoformat(),
+               "end_time": shift.end_time.isoformat()} for shift in roster.shifts]
+    requirements = [(item.work_date, item.shift_code, item.line, item.skill, item.headcount)
+                    for item in roster.requirements]
+    workers = [(worker.worker_id, sorted(set(worker.skills)), worker.max_shifts,
+                sorted({_unavailable_key(item.work_date, item.shift_code) for item in worker.unavailable}))
+               for worker in roster.workers]
+    problem = _build(roster.start_date, roster.days, shifts, requirements, workers, roster.min_rest_hours)
+    if len({requirement[:4] for requirement in problem.requirements}) != len(problem.requirements):
+        raise ValueError("Duplicate requirement for the same date, shift, line and skill")
+    solver = RosterSolver(problem)
+    timings = solver.solve(_budget(roster.time_budget_ms))
+    assignments = solver.assignments()
+
+    now = datetime.now()
+    db_roster = models.Roster(
+        name=roster.name,
+        start_date=roster.start_date,
+        days=roster.days,
+        shifts=json.dumps(shifts, ensure_ascii=False),
+        min_rest_hours=roster.min_rest_hours,
+        required=sum(requirement.headcount for requirement in problem.requirements),
+        assigned=len(assignments),
+        solve_ms=timings["solve_ms"],
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(db_roster)
+    db.flush()
+    roster_id = db_roster.id
+    requirement_rows = [{"roster_id": roster_id, "work_date": work_date, "shift_code": shift_code, "line": line,
+                         "skill": skill, "headcount": headcount}
+                        for work_date, shift_code, line, skill, headcount in requirements]
+    worker_rows = [{"roster_id": roster_id, "worker_id": worker_id, "skills": ",".join(skills),
+                    "max_shifts": max_shifts, "unavailable": json.dumps(keys)}
+                   for worker_id, skills, max_shifts, keys in workers]
+    assignment_rows = [_assignment_row(problem, roster.start_date, roster_id, w, r) for w, r in assignments]
+    for table, rows in ((models.RosterRequirement, requirement_rows), (models.RosterWorker, worker_rows),
+                        (models.RosterAssignment, assignment_rows)):
+        for chunk in _chunks(rows):
+            db.execute(insert(table), chunk)
+    db.commit()
+    db.refresh(db_roster)
+
+    low, high = solver.load_range()
+    shortfalls = solver.shortfalls()
+    logger.info(f"排班计划 {roster_id} 已生成：{len(assignments)}/{db_roster.required} 人次，"
+                f"缺人需求 {len(shortfalls)} 个，耗时 {timings['solve_ms']:.0f}ms")
+    return {
+        "roster": db_roster,
+        "shortfalls": [_shortfall(problem, roster.start_date, r, missing) for r, missing in shortfalls],
+        "min_shifts": low,
+        "max_shifts": high,
+        "timings": timings,
+    }
+
+
+def get_roster(db: Session, roster_id: int) -> Optional[models.Roster]:
+    return db.get(models.Roster, roster_id)
+
+
+def get_rosters(db: Session, skip: int = 0, limit: int = 100) -> List[models.Roster]:
+    stmt = select(models.Roster).order_by(models.Roster.id.desc())
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def get_assignments(db: Session, roster_id: int, work_date: Optional[date] = None, worker_id: Optional[str] = None,
+                    line: Optional[str] = None, skip: int = 0, limit: int = 1000) -> List[models.RosterAssignment]:
+    table = models.RosterAssignment
+    stmt = select(table).where(table.roster_id == roster_id).order_by(table.work_date, table.shift_code,
+                                                                      table.line, table.worker_id)
+    if work_date is not None:
+        stmt = stmt.where(table.work_date == work_date)
+    if worker_id is not None:
+        stmt = stmt.where(table.worker_id == worker_id)
+    if line is not None:
+        stmt = stmt.where(table.line == line)
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+
+def get_shortfalls(db: Session, roster_id: int, work_date: Optional[date] = None) -> List[dict]:
+    """
+    缺人的需求：需求人数与已排人数之差
+    """
+    requirement, assignment = models.RosterRequirement, models.RosterAssignment
+    counts = (
+        select(assignment.work_date, assignment.shift_code, assignment.line, assignment.skill,
+               func.count().label("assigned"))
+        .where(assignment.roster_id == roster_id)
+        .group_by(assignment.work_date, assignment.shift_code, assignment.line, assignment.skill)
+        .subquery()
+    )
+    stmt = (
+        select(requirement, func.coalesce(counts.c.assigned, 0))
+        .outerjoin(counts, and_(counts.c.work_date == requirement.work_date,
+                                counts.c.shift_code == requirement.shift_code,
+                                counts.c.line == requirement.line, counts.c.skill == requirement.skill))
+        .where(requirement.roster_id == roster_id,
+               func.coalesce(counts.c.assigned, 0) < requirement.headcount)
+        .order_by(requirement.work_date, requirement.shift_code, requirement.line, requirement.skill)
+    )
+    if work_date is not None:
+        stmt = stmt.where(requirement.work_date == work_date)
+    return [{"work_date": row.work_date, "shift_code": row.shift_code, "line": row.line, "skill": row.skill,
+             "headcount": row.headcount, "missing": row.headcount - assigned}
+            for row, assigned in db.execute(stmt)]
+
+
+def record_absence(db: Session, roster_id: int, absence: schemas.AbsenceCreate) -> Optional[dict]:
+    """
+    员工缺勤：撤下其在这些日期的班，在时间预算内补缺，其他人的排班尽量不变
+
+    Returns:
+        RosterChange 的字段，排班计划不存在时返回 None
+
+    Raises:
+        ValueError: 员工不在该排班计划中，或日期不在排班期内
+    """
+    # 锁定排班计划，同一计划的补缺依次进行
+    db_roster = db.execute(
+        select(models.Roster).where(models.Roster.id == roster_id).with_for_update()
+    ).scalar_one_or_none()
+    if db_roster is None:
+        return None
+    started_at = datetime.now()
+    days = sorted({(work_date - db_roster.start_date).days for work_date in absence.dates})
+    if days[0] < 0 or days[-1] >= db_roster.days:
+        db.rollback()
+        raise ValueError("Absence dates must be within the roster period")
+    requirements = db.execute(
+        select(models.RosterRequirement).where(models.RosterRequirement.roster_id == roster_id)
+        .order_by(models.RosterRequirement.id)
+    ).scalars().all()
+    workers = db.execute(
+        select(models.RosterWorker).where(models.RosterWorker.roster_id == roster_id).order_by(models.RosterWorker.id)
+    ).scalars().all()
+    worker_index = {worker.worker_id: w for w, worker in enumerate(workers)}
+    if absence.worker_id not in worker_index:
+        db.rollback()
+        raise ValueError(f"Worker {absence.worker_id} is not in roster {roster_id}")
+    problem = _build(
+        db_roster.start_date, db_roster.days, json.loads(db_roster.shifts),
+        [(item.work_date, item.shift_code, item.line, item.skill, item.headcount) for item in requirements],
+        [(worker.worker_id, worker.skills.split(","), worker.max_shifts, json.loads(worker.unavailable or "[]"))
+         for worker in workers],
+        db_roster.min_rest_hours,
+    )
+    requirement_index = {(item.work_date, item.shift_code, item.line, item.skill): r
+                         for r, item in enumerate(requirements)}
+    # (员工, 需求) -> 排班行 id
+    assignment_ids: Dict[Tuple[int, int], int] = {}
+    for row in db.execute(
+        select(models.RosterAssignment).where(models.RosterAssignment.roster_id == roster_id)
+    ).scalars():
+        r = requirement_index.get((row.work_date, row.shift_code, row.line, row.skill))
+        if r is not None and row.worker_id in worker_index:
+            assignment_ids[(worker_index[row.worker_id], r)] = row.id
+    solver = RosterSolver(problem)
+    solver.load(assignment_ids)
+
+    w = worker_index[absence.worker_id]
+    added, removed = solver.absence(w, days, _budget(absence.time_budget_ms))
+    added_rows = [_assignment_row(problem, db_roster.start_date, roster_id, *key) for key in added]
+    removed_rows = [_assignment_row(problem, db_roster.start_date, roster_id, *key) for key in removed]
+    removed_ids = [assignment_ids[key] for key in removed]
+    for chunk in _chunks(removed_ids):
+        db.execute(delete(models.RosterAssignment).where(models.RosterAssignment.id.in_(chunk)))
+    for chunk in _chunks(added_rows):
+        db.execute(insert(models.RosterAssignment), chunk)
+    worker = workers[w]
+    keys = set(json.loads(worker.unavailable or "[]"))
+    keys.update(_unavailable_key(work_date, None) for work_date in absence.dates)
+    worker.unavailable = json.dumps(sorted(keys))
+    solve_ms = round((datetime.now() - started_at).total_seconds() * 1000, 3)
+    db_roster.assigned += len(added) - len(removed)
+    db_roster.solve_ms = solve_ms
+    db_roster.updated_at = datetime.now()
+    db.commit()
+
+    absent_days = set(days)
+    logger.info(f"排班计划 {roster_id}：员工 {absence.worker_id} 缺勤 {len(days)} 天，"
+                f"新增 {len(added)}、撤下 {len(removed)} 个班")
+    return {
+        "roster_id": roster_id,
+        "worker_id": absence.worker_id,
+        "added": added_rows,
+        "removed": removed_rows,
+        "shortfalls": [_shortfall(problem, db_roster.start_date, r, missing) for r, missing in solver.shortfalls()
+                       if problem.requirements[r].day in absent_days],
+        "solve_ms": solve_ms,
+    }
@@ -0,0 +1,412 @@
+"""
+排班求解核心
+
+问题：排班期内每天每个班次、每条产线、每种技能需要若干人；每名员工有若干技能，有不可上班的日期（或某天的某个班次），
+排班期内最多上 max_shifts 个班；每人每天最多一个班，相邻两天的两个班之间至少休息 min_rest 分钟（如夜班后不能接次日早班）。
+
+员工编号为 0..n-1，一组员工用 Python 整数的二进制位表示（位集），一次按位运算即可得到某个需求当前可以安排的全部员工：
+    候选 = 有该技能 & 该班次可上班 & 当天未排班 & 未因休息间隔被排除 & 班数未满
+求解分三步：
+1. 约束传播加构造：每次取候选人数与缺口之差最小的需求（最受约束的先排，候选不足的需求先确定缺口），
+   从候选中按已排班数从少到多、技能从少到多选人；每排一个班即更新当天、相邻两天和班数的位集，其他需求的候选随之收缩；
+2. 局部搜索补缺：缺人的需求从已排其他班的员工中换人（被换下的班由空闲员工接替），
+   或把班数已满、因休息间隔被排除的员工的另一个班交给空闲员工后再安排；
+3. 局部搜索均衡：班数最多的员工的班交给班数至少少2的员工，直到无法改进。
+第2、3步在时间预算内进行，超时即返回当前结果。
+
+员工临时缺勤时（absence）只撤下其在这些日期的班并补缺，其他人的排班尽量不变，返回增减的排班。
+"""
+import heapq
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 局部搜索中一次补缺最多尝试的候选员工数
+MAX_SWAP_CANDIDATES = 200
+
+
+class ShiftDef(NamedTuple):
+    code: str
+    # 开始、结束时间（当天0点起的分钟数），结束不晚于开始时为跨夜班次
+    start: int
+    end: int
+
+
+class Requirement(NamedTuple):
+    day: int
+    shift: int
+    line: str
+    skill: str
+    headcount: int
+
+
+class RosterProblem:
+    """
+    Args:
+        days: 排班天数
+        shifts: 班次
+        worker_ids: 员工ID，下标即员工编号
+        skills: 各员工的技能
+        max_shifts: 各员工排班期内最多的班数
+        unavailable: 各员工不可上班的 (天, 班次)，班次为 None 表示整天
+        requirements: 需求
+        min_rest: 相邻两天的两个班之间最少休息的分钟数
+    """
+
+    def __init__(self, days: int, shifts: List[ShiftDef], worker_ids: List[str], skills: List[Iterable[str]],
+                 max_shifts: List[int], unavailable: List[Iterable[Tuple[int, Optional[int]]]],
+                 requirements: List[Requirement], min_rest: int):
+        self.days = days
+        self.shifts = shifts
+        self.worker_ids = worker_ids
+        self.skills = [set(worker_skills) for worker_skills in skills]
+        self.max_shifts = max_shifts
+        self.unavailable = [set(slots) for slots in unavailable]
+        self.requirements = requirements
+        self.min_rest = min_rest
+
+
+def _bits(mask: int):
+    # 从低到高逐个取出置位的员工编号
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _count(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class RosterSolver:
+    """
+    排班求解器，不加锁，不能在多个线程中同时使用
+
+    Args:
+        problem: 排班问题
+    """
+
+    def __init__(self, problem: RosterProblem):
+        self.problem = problem
+        days, shift_count = problem.days, len(problem.shifts)
+        size = len(problem.worker_ids)
+        everyone = (1 << size) - 1
+        self._skill_masks: Dict[str, int] = {}
+        for w, worker_skills in enumerate(problem.skills):
+            for skill in worker_skills:
+                self._skill_masks[skill] = self._skill_masks.get(skill, 0) | (1 << w)
+        self._available = [[everyone] * shift_count for _ in range(days)]
+        for w, slots in enumerate(problem.unavailable):
+            for day, shift in slots:
+                self._mark_unavailable(w, day, shift)
+        # 技能少的员工可替代的需求少，同等班数时先安排
+        by_count: Dict[int, int] = {}
+        for w, worker_skills in enumerate(problem.skills):
+            by_count[len(worker_skills)] = by_count.get(len(worker_skills), 0) | (1 << w)
+        self._tiers: List[int] = [by_count[count] for count in sorted(by_count)]
+        # 相邻两天不能连上的班次：前一天的班次 -> 后一天的班次，后一天的班次 -> 前一天的班次
+        self._next_conflicts = [[] for _ in range(shift_count)]
+        self._prev_conflicts = [[] for _ in range(shift_count)]
+        for s1, first in enumerate(problem.shifts):
+            first_end = first.end if first.end > first.start else first.end + 1440
+            for s2, second in enumerate(problem.shifts):
+                if 1440 + second.start - first_end < problem.min_rest:
+                    self._next_conflicts[s1].append(s2)
+                    self._prev_conflicts[s2].append(s1)
+        self._busy = [0] * days
+        self._blocked = [[0] * shift_count for _ in range(days)]
+        self._load = [0] * size
+        self._load_masks = [0] * (max(problem.max_shifts, default=0) + 1)
+        self._load_masks[0] = everyone
+        self._open = 0
+        for w, limit in enumerate(problem.max_shifts):
+            if limit > 0:
+                self._open |= 1 << w
+        # 员工 -> 每天安排的需求下标，-1 表示当天不上班
+        self._at = [[-1] * days for _ in range(size)]
+        self._slots: List[Set[int]] = [set() for _ in problem.requirements]
+        # 记录排班增减，用于计算缺勤补缺的变化
+        self._log: Optional[List[Tuple[int, int, int]]] = None
+        self.moves = 0
+
+    def _mark_unavailable(self, w: int, day: int, shift: Optional[int]) -> None:
+        shifts = range(len(self.problem.shifts)) if shift is None else (shift,)
+        for s in shifts:
+            self._available[day][s] &= ~(1 << w)
+
+    def domain(self, r: int) -> int:
+        """
+        需求 r 当前可以安排的员工
+        """
+        day, shift, _, skill, _ = self.problem.requirements[r]
+        return (self._skill_masks.get(skill, 0) & self._available[day][shift] & ~self._busy[day]
+                & ~self._blocked[day][shift] & self._open)
+
+    def missing(self, r: int) -> int:
+        return self.problem.requirements[r].headcount - len(self._slots[r])
+
+    def assign(self, w: int, r: int) -> None:
+        day, shift = self.problem.requirements[r][:2]
+        bit = 1 << w
+        self._at[w][day] = r
+        self._slots[r].add(w)
+        self._busy[day] |= bit
+        if day + 1 < self.problem.days:
+            for s in self._next_conflicts[shift]:
+                self._blocked[day + 1][s] |= bit
+        if day > 0:
+            for s in self._prev_conflicts[shift]:
+                self._blocked[day - 1][s] |= bit
+        self._set_load(w, self._load[w] + 1)
+        if self._log is not None:
+            self._log.append((1, w, r))
+
+    def unassign(self, w: int, r: int) -> None:
+        day = self.problem.requirements[r].day
+        self._at[w][day] = -1
+        self._slots[r].discard(w)
+        self._busy[day] &= ~(1 << w)
+        if day + 1 < self.problem.days:
+            self._refresh_blocked(w, day + 1)
+        if day > 0:
+            self._refresh_blocked(w, day - 1)
+        self._set_load(w, self._load[w] - 1)
+        if self._log is not None:
+            self._log.append((-1, w, r))
+
+    def _refresh_blocked(self, w: int, day: int) -> None:
+        # 按前后两天的排班重新计算员工 w 在 day 各班次是否因休息间隔被排除
+        bit = 1 << w
+        blocked = set()
+        if day > 0 and self._at[w][day - 1] >= 0:
+            blocked.update(self._next_conflicts[self.problem.requirements[self._at[w][day - 1]].shift])
+        if day + 1 < self.problem.days and self._at[w][day + 1] >= 0:
+            blocked.update(self._prev_conflicts[self.problem.requirements[self._at[w][day + 1]].shift])
+        for s in range(len(self.problem.shifts)):
+            if s in blocked:
+                self._blocked[day][s] |= bit
+            else:
+                self._blocked[day][s] &= ~bit
+
+    def _set_load(self, w: int, load: int) -> None:
+        bit = 1 << w
+        self._load_masks[self._load[w]] &= ~bit
+        self._load_masks[load] |= bit
+        self._load[w] = load
+        if load < self.problem.max_shifts[w]:
+            self._open |= bit
+        else:
+            self._open &= ~bit
+
+    def _pick(self, candidates: int, n: int, max_load: Optional[int] = None) -> List[int]:
+        # 从候选中按已排班数从少到多、技能从少到多取 n 人
+        picked: List[int] = []
+        for load, load_mask in enumerate(self._load_masks):
+            if max_load is not None and load > max_load:
+                break
+            at_load = candidates & load_mask
+            if not at_load:
+                continue
+            for tier in self._tiers:
+                for w in _bits(at_load & tier):
+                    picked.append(w)
+                    if len(picked) == n:
+                        return picked
+        return picked
+
+    def construct(self) -> None:
+        """
+        约束传播加构造：每次处理候选人数与缺口之差最小的需求
+        """
+        requirements = self.problem.requirements
+        heap = [(_count(self.domain(r)) - self.missing(r), r) for r in range(len(requirements))
+                if self.missing(r) > 0]
+        heapq.heapify(heap)
+        while heap:
+            _, r = heapq.heappop(heap)
+            need = self.missing(r)
+            if need <= 0:
+                continue
+            candidates = self.domain(r)
+            slack = _count(candidates) - need
+            # 其他需求的排班使候选减少后，先处理此时更受约束的需求
+            if heap and slack > heap[0][0]:
+                heapq.heappush(heap, (slack, r))
+                continue
+            for w in self._pick(candidates, need):
+                self.assign(w, r)
+
+    def repair(self, deadline: float, requirements: Optional[Iterable[int]] = None) -> None:
+        """
+        局部搜索补缺，直到没有缺人的需求、无法再补或超过 deadline（perf_counter 时间）
+        """
+        targets = [r for r in (requirements if requirements is not None else range(len(self._slots)))
+                   if self.missing(r) > 0]
+        for r in sorted(targets, key=lambda r: self.problem.requirements[r][:2]):
+            while self.missing(r) > 0 and time.perf_counter() < deadline:
+                candidates = self.domain(r)
+                if candidates:
+                    for w in self._pick(candidates, self.missing(r)):
+                        self.assign(w, r)
+                    continue
+                if not (self._swap_in(r) or self._release(r)):
+                    break
+
+    def _backfill(self, r: int, exclude: int) -> Optional[int]:
+        # 找一名空闲员工接替需求 r 的一个班
+        candidates = self.domain(r) & ~(1 << exclude)
+        picked = self._pick(candidates, 1)
+        return picked[0] if picked else None
+
+    def _swap_in(self, r: int) -> bool:
+        # 当天已排其他班的员工换到需求 r，原来的班由空闲员工接替
+        day, shift, _, skill, _ = self.problem.requirements[r]
+        candidates = (self._skill_masks.get(skill, 0) & self._available[day][shift] & self._busy[day]
+                      & ~self._blocked[day][shift])
+        for tried, w in enumerate(_bits(candidates)):
+            if tried >= MAX_SWAP_CANDIDATES:
+                break
+            current = self._at[w][day]
+            if current == r:
+                continue
+            # 换到需求 r 的班次后与前后两天的休息间隔已由 _blocked 排除
+            f = self._backfill(current, w)
+            if f is None:
+                continue
+            self.unassign(w, current)
+            self.assign(f, current)
+            self.assign(w, r)
+            self.moves += 1
+            return True
+        return False
+
+    def _release(self, r: int) -> bool:
+        # 班数已满或因休息间隔被排除的员工：把其另一个班交给空闲员工后安排到需求 r
+        day, shift, _, skill, _ = self.problem.requirements[r]
+        candidates = (self._skill_masks.get(skill, 0) & self._available[day][shift] & ~self._busy[day]
+                      & (~self._open | self._blocked[day][shift]))
+        for tried, w in enumerate(_bits(candidates)):
+            if tried >= MAX_SWAP_CANDIDATES:
+                break
+            bit = 1 << w
+            if self._blocked[day][shift] & bit:
+                # 只需移走相邻两天的班
+                days = [d for d in (day - 1, day + 1) if 0 <= d < self.problem.days and self._at[w][d] >= 0]
+            else:
+                days = [d for d in range(self.problem.days) if self._at[w][d] >= 0]
+            moved = []
+            for d in days:
+                current = self._at[w][d]
+                f = self._backfill(current, w)
+                if f is None:
+                    continue
+                self.unassign(w, current)
+                self.assign(f, current)
+                moved.append((w, f, current))
+                if self.domain(r) & bit:
+                    self.assign(w, r)
+                    self.moves += 1
+                    return True
+            # 没能腾出：撤销本次移动
+            for w_, f, current in reversed(moved):
+                self.unassign(f, current)
+                self.assign(w_, current)
+        return False
+
+    def balance(self, deadline: float) -> None:
+        """
+        局部搜索均衡：班数最多的员工的班交给班数至少少2的员工，直到无法改进或超过 deadline
+        """
+        while time.perf_counter() < deadline:
+            top = max((load for load, mask in enumerate(self._load_masks) if mask), default=0)
+            if top < 2:
+                return
+            improved = False
+            for w in _bits(self._load_masks[top]):
+                if time.perf_counter() >= deadline:
+                    return
+                for r in self._at[w]:
+                    if r < 0:
+                        continue
+                    picked = self._pick(self.domain(r), 1, max_load=top - 2)
+                    if picked:
+                        self.unassign(w, r)
+                        self.assign(picked[0], r)
+                        self.moves += 1
+                        improved = True
+                        break
+            if not improved:
+                return
+
+    def solve(self, budget: float) -> Dict[str, float]:
+        """
+        求解：构造后在时间预算内补缺、均衡
+
+        Args:
+            budget: 时间预算（秒），构造阶段总会完成
+
+        Returns:
+            各阶段耗时（毫秒）
+        """
+        started = time.perf_counter()
+        deadline = started + budget
+        self.construct()
+        constructed = time.perf_counter()
+        self.repair(deadline)
+        repaired = time.perf_counter()
+        self.balance(deadline)
+        finished = time.perf_counter()
+        return {
+            "construct_ms": round((constructed - started) * 1000, 3),
+            "repair_ms": round((repaired - constructed) * 1000, 3),
+            "balance_ms": round((finished - repaired) * 1000, 3),
+            "solve_ms": round((finished - started) * 1000, 3),
+        }
+
+    def load(self, assignments: Iterable[Tuple[int, int]]) -> None:
+        """
+        载入已有的排班 (员工, 需求)，不检查约束
+        """
+        for w, r in assignments:
+            self.assign(w, r)
+
+    def absence(self, w: int, days: Iterable[int], budget: float) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """
+        员工 w 在 days 缺勤：撤下这些日期的班，在时间预算内补缺，其他人的排班尽量不变
+
+        Returns:
+            (新增的 (员工, 需求)，撤下的 (员工, 需求))
+        """
+        deadline = time.perf_counter() + budget
+        self._log = []
+        vacated = []
+        for day in days:
+            self._mark_unavailable(w, day, None)
+            self.problem.unavailable[w].add((day, None))
+            r = self._at[w][day]
+            if r >= 0:
+                self.unassign(w, r)
+                vacated.append(r)
+        self.repair(deadline, vacated)
+        net: Dict[Tuple[int, int], int] = {}
+        for sign, worker, r in self._log:
+            net[(worker, r)] = net.get((worker, r), 0) + sign
+        self._log = None
+        added = [key for key, value in net.items() if value > 0]
+        removed = [key for key, value in net.items() if value < 0]
+        return added, removed
+
+    def assignments(self) -> List[Tuple[int, int]]:
+        """
+        全部排班 (员工, 需求)
+        """
+        return [(w, r) for r, workers in enumerate(self._slots) for w in sorted(workers)]
+
+    def shortfalls(self) -> List[Tuple[int, int]]:
+        """
+        缺人的需求 (需求, 缺少人数)
+        """
+        return [(r, self.missing(r)) for r in range(len(self._slots)) if self.missing(r) > 0]
+
+    def load_range(self) -> Tuple[int, int]:
+        loads = [load for w, load in enumerate(self._load) if self.problem.max_shifts[w] > 0]
+        return (min(loads), max(loads)) if loads else (0, 0)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+热备进程入口
+
+由 main.py 在 --standby 模式下启动：预先导入服务应用并建立数据库连接，然后阻塞等待
+标准输入上的接管指令（serve）。收到指令后在从启动器继承的监听套接字上开始提供服务；
+标准输入被关闭时直接退出。
+
+--workers 大于1时接管后按该数量启动 uvicorn 工作进程，与主进程的生产模式一致。工作进程（spawn 启动）
+各自重新导入代码，启动期间到达的连接在继承的监听队列中等待。
+
+用法：
+    python -m backend.standby backend.config_svc.app:app --fd 5 [--workers 2]
+"""
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+# 设置项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+import uvicorn
+from uvicorn.importer import import_from_string
+from uvicorn.supervisors import Multiprocess
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('standby')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="mERP 服务热备进程")
+    parser.add_argument('app', help="应用路径，如 backend.config_svc.app:app")
+    parser.add_argument('--fd', type=int, required=True, help="继承的监听套接字文件描述符")
+    parser.add_argument('--limit-concurrency', type=int, default=None)
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--workers', type=int, default=1, help="接管后的工作进程数")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    主函数，预热后等待接管指令
+    """
+    args = parse_args(argv)
+    app = import_from_string(args.app)
+    try:
+        from db_config import warm_up_engines
+        warm_up_engines()
+    except ImportError:
+        pass
+    logger.info(f"热备进程已就绪: {args.app}")
+
+    try:
+        command = sys.stdin.readline().strip()
+    except KeyboardInterrupt:
+        return
+    if command != 'serve':
+        logger.info("未收到接管指令，热备进程退出")
+        return
+
+    if args.workers > 1:
+        logger.info(f"热备进程开始接管: {args.app}，启动 {args.workers} 个工作进程")
+        # 多个工作进程须以导入路径创建应用
+        config = uvicorn.Config(args.app, fd=args.fd, workers=args.workers,
+                                limit_concurrency=args.limit_concurrency, backlog=args.backlog)
+        Multiprocess(config, sockets=[config.bind_socket()]).run()
+        return
+
+    logger.info(f"热备进程开始接管: {args.app}")
+    config = uvicorn.Config(app, fd=args.fd, limit_concurrency=args.limit_concurrency, backlog=args.backlog)
+    uvicorn.Server(config).run()
+
+
+if __name__ == '__main__':
+    main()
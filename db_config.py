@@ -7,7 +7,9 @@
 修改此文件中的配置后，所有服务和脚本将自动使用新的数据库连接信息。
 """
 import os
+import time
 import logging
+import threading
 
 # 配置日志
 logger = logging.getLogger('db_config')
@@ -42,4 +44,274 @@ def log_db_info():
 
 # 获取特定服务的数据库名
 def get_service_db_name(service_name):
-    return SERVICE_DB_NAMES.get(service_name, DEFAULT_DB_NAME)
\ No newline at end of file
+    return SERVICE_DB_NAMES.get(service_name, DEFAULT_DB_NAME)
+
+# ---------------------------------------------------------------------------
+# 数据库引擎工厂
+# SQLAlchemy 在函数内按需导入，启动脚本和初始化脚本导入本文件时不依赖它
+# ---------------------------------------------------------------------------
+
+# 连接池配置，可通过 <服务名>_DB_POOL_SIZE 等环境变量按服务覆盖（如 PLAN_SVC_DB_POOL_SIZE）
+DB_POOL_SIZE = int(get_env('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(get_env('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = float(get_env('DB_POOL_TIMEOUT', 30))
+# 必须小于 MySQL 的 wait_timeout，避免使用已被服务端关闭的连接
+DB_POOL_RECYCLE = int(get_env('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = get_env('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# 只读副本，未配置时读请求使用主库
+DB_REPLICA_HOST = get_env('DB_REPLICA_HOST')
+DB_REPLICA_PORT = int(get_env('DB_REPLICA_PORT', DB_PORT))
+
+# 单进程合并部署（backend/monolith.py）时，所有服务共用一个连接池，
+# 通过 schema_translate_map 把各服务的表映射到各自的数据库
+DB_SHARED_POOL = get_env('DB_SHARED_POOL', 'false').lower() in ('1', 'true', 'yes')
+SHARED_POOL_NAME = 'shared'
+
+# 同步驱动与异步驱动的对应关系
+ASYNC_DRIVERS = {
+    'mysql+pymysql': 'mysql+aiomysql',
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+_pool_stats = {}
+
+
+def _service_env(service_name, key, default=None):
+    return get_env(f"{service_name.upper()}_{key}", get_env(key, default))
+
+
+def get_pool_config(service_name):
+    """
+    获取指定服务的连接池参数
+    """
+    return {
+        'pool_size': int(_service_env(service_name, 'DB_POOL_SIZE', DB_POOL_SIZE)),
+        'max_overflow': int(_service_env(service_name, 'DB_MAX_OVERFLOW', DB_MAX_OVERFLOW)),
+        'pool_timeout': float(_service_env(service_name, 'DB_POOL_TIMEOUT', DB_POOL_TIMEOUT)),
+        'pool_recycle': int(_service_env(service_name, 'DB_POOL_RECYCLE', DB_POOL_RECYCLE)),
+        'pool_pre_ping': str(_service_env(service_name, 'DB_POOL_PRE_PING', DB_POOL_PRE_PING)).lower() in ('1', 'true', 'yes'),
+    }
+
+
+def get_database_url(service_name, replica=False, is_async=False):
+    """
+    获取指定服务的数据库连接URL
+
+    优先使用 <服务名>_DATABASE_URL / <服务名>_DATABASE_REPLICA_URL 环境变量（如 SQLite 开发库），
+    否则根据 DB_HOST 等配置拼接 MySQL 连接URL。
+    """
+    url = get_env(f"{service_name.upper()}_DATABASE_URL")
+    if replica:
+        url = get_env(f"{service_name.upper()}_DATABASE_REPLICA_URL") or (url if not DB_REPLICA_HOST else None)
+    if not url:
+        host, port = (DB_REPLICA_HOST, DB_REPLICA_PORT) if replica and DB_REPLICA_HOST else (DB_HOST, DB_PORT)
+        db_name = get_env(f"{service_name.upper()}_DB_NAME", get_service_db_name(service_name))
+        url = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{host}:{port}/{db_name}"
+    if is_async:
+        from sqlalchemy.engine import make_url
+        parsed = make_url(url)
+        url = parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)).render_as_string(hide_password=False)
+    return url
+
+
+class PoolWaitStats:
+    """
+    连接池取连接（checkout）等待时间统计，用于按服务调整连接池大小
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    # 在真正从连接池取连接的 _do_get 外层计时
+    _merp_stats = None
+
+    def _do_get(self):
+        begin = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            if self._merp_stats is not None:
+                self._merp_stats.record(time.perf_counter() - begin, timed_out=True)
+            raise
+        if self._merp_stats is not None:
+            self._merp_stats.record(time.perf_counter() - begin)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._merp_stats = self._merp_stats
+        return pool
+
+
+_timed_pool_classes = {}
+
+
+def _timed_pool_class(base):
+    cls = _timed_pool_classes.get(base)
+    if cls is None:
+        cls = type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {})
+        _timed_pool_classes[base] = cls
+    return cls
+
+
+def _build_engine(service_name, replica, is_async):
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+    url = get_database_url(service_name, replica=replica, is_async=is_async)
+    kwargs = {}
+    if make_url(url).get_backend_name() == 'sqlite':
+        kwargs['connect_args'] = {'check_same_thread': False}
+    else:
+        kwargs.update(get_pool_config(service_name))
+        kwargs['poolclass'] = _timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool)
+
+    if is_async:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        engine = create_async_engine(url, **kwargs)
+        pool = engine.sync_engine.pool
+    else:
+        engine = create_engine(url, **kwargs)
+        pool = engine.pool
+
+    stats = PoolWaitStats()
+    pool._merp_stats = stats
+    _pool_stats[(service_name, 'replica' if replica else 'primary', 'async' if is_async else 'sync')] = (pool, stats)
+    return engine
+
+
+def _uses_shared_pool(service_name):
+    # 单独配置了连接URL的服务（如 SQLite 开发库）不参与共享
+    return (
+        DB_SHARED_POOL
+        and service_name != SHARED_POOL_NAME
+        and not get_env(f"{service_name.upper()}_DATABASE_URL")
+        and not get_env(f"{service_name.upper()}_DATABASE_REPLICA_URL")
+    )
+
+
+def _cached_engine(service_name, replica, is_async):
+    if _uses_shared_pool(service_name):
+        # 共享引擎连接默认库，各服务的表通过 schema_translate_map 加上数据库名前缀；
+        # execution_options 返回的引擎与共享引擎共用同一个连接池
+        db_name = get_env(f"{service_name.upper()}_DB_NAME", get_service_db_name(service_name))
+        shared = _cached_engine(SHARED_POOL_NAME, replica, is_async)
+        return shared.execution_options(schema_translate_map={None: db_name})
+
+    # 只读副本与主库URL相同时共用主库引擎
+    if replica and get_database_url(service_name, replica=True) == get_database_url(service_name):
+        replica = False
+    key = (service_name, replica, is_async)
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = _build_engine(service_name, replica, is_async)
+                _engines[key] = engine
+    return engine
+
+
+def get_engine(service_name, replica=False):
+    """
+    获取指定服务的同步数据库引擎，每个进程每个服务只创建一次
+
+    Args:
+        service_name: 服务名称
+        replica: 是否使用只读副本（未配置副本时返回主库引擎）
+    """
+    return _cached_engine(service_name, replica, False)
+
+
+def get_async_engine(service_name, replica=False):
+    """
+    获取指定服务的异步数据库引擎，每个进程每个服务只创建一次
+    """
+    return _cached_engine(service_name, replica, True)
+
+
+def warm_up_engines():
+    """
+    为本进程已创建的同步引擎预先建立连接（供热备进程在接管前使用）
+
+    异步引擎的连接与事件循环绑定，无法提前建立，跳过。
+    """
+    for (service_name, replica, is_async), engine in list(_engines.items()):
+        if is_async:
+            continue
+        try:
+            with engine.connect():
+                pass
+        except Exception as e:
+            logger.warning(f"服务 {service_name} 预先建立数据库连接失败: {str(e)}")
+
+
+def get_sessionmaker(service_name, replica=False):
+    from sqlalchemy.orm import sessionmaker
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine(service_name, replica=replica))
+
+
+def get_async_sessionmaker(service_name, replica=False):
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    return async_sessionmaker(
+        get_async_engine(service_name, replica=replica),
+        autoflush=False,
+        expire_on_commit=False,
+        class_=AsyncSession,
+    )
+
+
+def get_pool_stats(service_name=None):
+    """
+    获取连接池状态与取连接等待时间统计
+
+    Args:
+        service_name: 服务名称，为空时返回本进程内所有服务的统计；
+            启用共享连接池时同时返回共享连接池的统计
+    """
+    from sqlalchemy.pool import QueuePool
+
+    result = {}
+    for (name, role, kind), (pool, stats) in list(_pool_stats.items()):
+        if service_name is not None and name not in (service_name, SHARED_POOL_NAME):
+            continue
+        entry = stats.snapshot()
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'checked_in': pool.checkedin(),
+            })
+        result[f"{name}.{role}.{kind}"] = entry
+    return result
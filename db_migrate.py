@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数据库迁移工具
+
+各服务的表结构以带版本号的迁移定义在 backend/<服务名>/migrations.py 的 MIGRATIONS 列表中，
+由本工具在部署时（scripts/init_db.py、backend/main.py 启动前或手动执行）按版本顺序执行一次：
+- 每个服务数据库中的 schema_version 表记录已执行的版本，已执行的版本直接跳过；
+- MySQL 下执行前通过 GET_LOCK 获取按数据库命名的锁，多台机器同时部署时只有一个执行；
+- 服务启动时不再检查或创建表结构。
+
+用法：
+    python db_migrate.py                 # 迁移全部服务
+    python db_migrate.py plan_svc        # 只迁移指定服务
+    python db_migrate.py --status        # 查看各服务当前版本
+"""
+import sys
+import time
+import hashlib
+import inspect
+import logging
+import argparse
+import importlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from db_config import SERVICE_DB_NAMES, get_database_url, get_service_db_name
+
+# 配置日志
+logger = logging.getLogger('db_migrate')
+
+VERSION_TABLE = 'schema_version'
+LOCK_TIMEOUT = 60
+
+# 一个版本的迁移：steps 中每一项是 SQL 字符串或接收数据库连接的函数
+Migration = namedtuple('Migration', ['version', 'description', 'steps'])
+
+
+def current_timestamp_default(conn, on_update=False):
+    """
+    迁移中建表时 TIMESTAMP 列的服务端默认值。MySQL 下 on_update 为 True 时更新行也会刷新该列
+    （ON UPDATE CURRENT_TIMESTAMP），SQLite 不支持，只设置默认值
+    """
+    from sqlalchemy import text
+    if on_update and conn.dialect.name == 'mysql':
+        return text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    return text("CURRENT_TIMESTAMP")
+
+
+def load_migrations(service_name):
+    """
+    读取服务的迁移定义
+
+    Returns:
+        list: 按版本号排序的 Migration 列表，服务没有 migrations.py 时返回空列表
+
+    Raises:
+        ValueError: 版本号重复
+    """
+    try:
+        module = importlib.import_module(f"backend.{service_name}.migrations")
+    except ModuleNotFoundError as e:
+        if e.name != f"backend.{service_name}.migrations":
+            raise
+        return []
+    migrations = sorted(module.MIGRATIONS, key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"服务 {service_name} 的迁移版本号重复: {versions}")
+    return migrations
+
+
+def migration_checksum(migration):
+    """
+    计算迁移内容的校验和，用于发现已执行的迁移被修改
+    """
+    digest = hashlib.sha256()
+    for step in migration.steps:
+        text = ' '.join(step.split()) if isinstance(step, str) else inspect.getsource(step)
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _version_table():
+    from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, func
+    return Table(
+        VERSION_TABLE, MetaData(),
+        Column('version', Integer, primary_key=True, autoincrement=False),
+        Column('description', String(255)),
+        Column('checksum', String(64)),
+        Column('applied_at', DateTime, server_default=func.now()),
+    )
+
+
+def _acquire_lock(conn, lock_name):
+    from sqlalchemy import text
+    if conn.dialect.name != 'mysql':
+        return  # SQLite 开发库只在本机使用，写操作本身是串行的
+    acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                            {"name": lock_name, "timeout": LOCK_TIMEOUT}).scalar()
+    if acquired != 1:
+        raise RuntimeError(f"{LOCK_TIMEOUT} 秒内未获取到迁移锁 {lock_name}，可能有其他部署正在执行迁移")
+
+
+def _release_lock(conn, lock_name):
+    from sqlalchemy import text
+    if conn.dialect.name == 'mysql':
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": lock_name})
+
+
+def _applied_versions(conn, table):
+    from sqlalchemy import select
+    return {row.version: row.checksum for row in conn.execute(select(table.c.version, table.c.checksum))}
+
+
+def migrate(service_name, url=None, target=None):
+    """
+    执行服务尚未执行的迁移
+
+    Args:
+        service_name: 服务名称
+        url: 数据库连接URL，为空时使用 db_config.get_database_url(service_name)
+        target: 迁移到的最高版本，为空时迁移到最新版本
+
+    Returns:
+        list: 本次执行的版本号列表
+    """
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    migrations = load_migrations(service_name)
+    if not migrations:
+        return []
+
+    engine = create_engine(url or get_database_url(service_name), poolclass=NullPool)
+    lock_name = f"merp_migrate_{get_service_db_name(service_name)}"
+    table = _version_table()
+    executed = []
+    try:
+        with engine.connect() as conn:
+            _acquire_lock(conn, lock_name)
+            try:
+                table.create(conn, checkfirst=True)
+                conn.commit()
+                applied = _applied_versions(conn, table)
+                for migration in migrations:
+                    checksum = migration_checksum(migration)
+                    if migration.version in applied:
+                        if applied[migration.version] != checksum:
+                            logger.warning(f"服务 {service_name} 已执行的迁移版本 {migration.version} 内容已被修改，"
+                                           f"不会重新执行，请新增版本")
+                        continue
+                    if target is not None and migration.version > target:
+                        break
+                    logger.info(f"服务 {service_name} 执行迁移 {migration.version}: {migration.description}")
+                    # MySQL 的 DDL 会隐式提交，版本记录紧跟在每个版本之后写入
+                    for step in migration.steps:
+                        if isinstance(step, str):
+                            conn.execute(text(step))
+                        else:
+                            step(conn)
+                    conn.execute(table.insert().values(
+                        version=migration.version,
+                        description=migration.description,
+                        checksum=checksum,
+                    ))
+                    conn.commit()
+                    executed.append(migration.version)
+            finally:
+                conn.rollback()
+                _release_lock(conn, lock_name)
+                conn.commit()
+    finally:
+        engine.dispose()
+    return executed
+
+
+def current_version(service_name, url=None):
+    """
+    获取服务数据库当前的迁移版本，未执行过迁移时返回0
+    """
+    from sqlalchemy import create_engine, func, inspect as sa_inspect, select
+    from sqlalchemy.pool import NullPool
+
+    engine = create_engine(url or get_database_url(service_name), poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            if not sa_inspect(conn).has_table(VERSION_TABLE):
+                return 0
+            table = _version_table()
+            return conn.execute(select(func.coalesce(func.max(table.c.version), 0))).scalar()
+    finally:
+        engine.dispose()
+
+
+def _timed_migrate(service_name):
+    begin = time.perf_counter()
+    try:
+        return migrate(service_name), time.perf_counter() - begin, None
+    except Exception as e:
+        return None, time.perf_counter() - begin, e
+
+
+def migrate_all(service_names=None, workers=8):
+    """
+    并行迁移多个服务（各服务使用独立的数据库，互不影响）
+
+    Args:
+        service_names: 服务名称列表，为空时迁移全部服务
+        workers: 并行线程数
+
+    Returns:
+        dict: 服务名称 -> (执行的版本列表或None, 耗时秒数, 异常或None)
+    """
+    service_names = list(SERVICE_DB_NAMES if service_names is None else service_names)
+    if not service_names:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(min(workers, len(service_names)), 1),
+                            thread_name_prefix='migrate') as executor:
+        futures = {name: executor.submit(_timed_migrate, name) for name in service_names}
+        results = {name: future.result() for name, future in futures.items()}
+
+    for name, (executed, elapsed, error) in results.items():
+        if error is not None:
+            logger.error(f"服务 {name} 迁移失败（{elapsed * 1000:.1f}ms）: {str(error)}")
+        elif executed:
+            logger.info(f"服务 {name} 迁移完成，执行版本 {executed}（{elapsed * 1000:.1f}ms）")
+        else:
+            logger.info(f"服务 {name} 已是最新版本（{elapsed * 1000:.1f}ms）")
+    return results
+
+
+def main(argv=None):
+    """
+    主函数，解析参数并执行迁移
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+    parser = argparse.ArgumentParser(description="执行 mERP 各服务的数据库迁移")
+    parser.add_argument('services', nargs='*', help="服务名称，默认全部服务")
+    parser.add_argument('--status', action='store_true', help="只显示各服务当前版本")
+    args = parser.parse_args(argv)
+
+    service_names = args.services or list(SERVICE_DB_NAMES)
+    if args.status:
+        for name in service_names:
+            latest = max((migration.version for migration in load_migrations(name)), default=0)
+            try:
+                logger.info(f"{name}: 当前版本 {current_version(name)}，最新版本 {latest}")
+            except Exception as e:
+                logger.error(f"{name}: 无法读取当前版本: {str(e)}")
+        return 0
+
+    results = migrate_all(service_names)
+    return 1 if any(error is not None for _, _, error in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
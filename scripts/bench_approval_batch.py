@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+审批服务批量审批性能测试脚本
+
+创建一个多步审批流程并提交一批审批（默认5000个），对比两种同意方式的耗时和执行的 SQL 语句数：
+- single: 每个实例一次请求、一个事务（相当于逐个调用 POST /api/v1/approvals/{id}/approve）
+- batch: 每次最多 --batch 个实例（POST /api/v1/approvals/batch，approval_service.batch_decide）
+
+之后用批量审批把全部实例审批到结束，统计读取待审批列表（每页100条）的延迟。
+
+默认使用临时 SQLite 数据库；通过 --url 指定 MySQL 测试库（会重建审批服务的表）。
+--rtt-ms 在每条语句和提交前注入耗时，模拟应用与数据库之间的网络往返，逐个审批时每个实例都要付出多次往返。
+
+--verify 检查每轮结束后实例状态、待审批箱和审批记录一致：待审批箱中的行与待审批的实例一一对应且步骤相同，
+审批记录条数与操作次数一致。
+
+依赖：pip install "SQLAlchemy[asyncio]"
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.approval_svc import schemas
+from backend.approval_svc.models.models import ApprovalAction, ApprovalInbox, ApprovalInstance, Base
+from backend.approval_svc.services import approval_service
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_approval_batch')
+logging.getLogger('backend.approval_svc.services.approval_service').setLevel(logging.WARNING)
+
+MODES = ('single', 'batch')
+
+
+class StatementCounter:
+    def __init__(self, engine, rtt_ms):
+        self.count = 0
+        self.rtt = rtt_ms / 1000.0
+        event.listen(engine, "before_cursor_execute", self._statement)
+        event.listen(engine, "commit", self._round_trip)
+
+    def _statement(self, *args, **kwargs):
+        self.count += 1
+        self._round_trip()
+
+    def _round_trip(self, *args, **kwargs):
+        if self.rtt > 0:
+            time.sleep(self.rtt)
+
+
+def prepare(SessionLocal, engine, args):
+    """
+    重建表，创建流程并提交审批
+
+    Returns:
+        (流程, 实例ID列表)
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        workflow = approval_service.create_workflow(db, schemas.WorkflowCreate(
+            workflow_name="bench",
+            steps=[schemas.StepCreate(step_name=f"第{i + 1}步", approver_role=f"role{i + 1}")
+                   for i in range(args.steps)],
+        ))
+        ids = []
+        for begin in range(0, args.instances, approval_service.MAX_BATCH_SIZE):
+            items = [schemas.ApprovalSubmit(workflow_id=workflow.id, business_type="bench", business_id=f"B{i:08d}",
+                                            title=f"测试审批 {i}", requester_id="bench")
+                     for i in range(begin, min(begin + approval_service.MAX_BATCH_SIZE, args.instances))]
+            ids.extend(item.id for item in approval_service.submit(db, items).succeeded)
+        return workflow, ids
+    finally:
+        db.close()
+
+
+def approve(SessionLocal, ids, role, size):
+    """
+    按 size 个一批同意，返回失败的个数
+    """
+    failed = 0
+    db = SessionLocal()
+    try:
+        for begin in range(0, len(ids), size):
+            result = approval_service.batch_decide(db, schemas.BatchDecision(
+                action="approve", instance_ids=ids[begin:begin + size], actor_id="bench", approver_role=role,
+            ))
+            failed += len(result.errors)
+    finally:
+        db.close()
+    return failed
+
+
+def check(engine, expected_actions):
+    """
+    检查实例、待审批箱和审批记录一致，返回发现的问题列表
+    """
+    problems = []
+    with engine.connect() as conn:
+        pending = dict(conn.execute(
+            select(ApprovalInstance.id, ApprovalInstance.current_step_id).where(ApprovalInstance.status == "pending")
+        ).all())
+        inbox = dict(conn.execute(select(ApprovalInbox.instance_id, ApprovalInbox.step_id)).all())
+        actions = conn.execute(select(func.count()).select_from(ApprovalAction)).scalar_one()
+    if pending != inbox:
+        problems.append(f"待审批的实例 {len(pending)} 个，待审批箱 {len(inbox)} 行，"
+                        f"不一致的 {len(set(pending.items()) ^ set(inbox.items()))} 个")
+    if actions != expected_actions:
+        problems.append(f"审批记录 {actions} 条，预期 {expected_actions} 条")
+    return problems
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="approval_svc 批量审批性能测试")
+    parser.add_argument("--instances", type=int, default=5000, help="审批实例数量")
+    parser.add_argument("--steps", type=int, default=3, help="流程的步骤数")
+    parser.add_argument("--batch", type=int, default=500, help="批量审批每次的实例数（最多1000）")
+    parser.add_argument("--rtt-ms", type=float, default=0, help="每条语句和提交前注入的耗时（毫秒）")
+    parser.add_argument("--url", help="数据库 URL，默认使用临时 SQLite 数据库")
+    parser.add_argument("--verify", action="store_true", help="检查实例、待审批箱和审批记录一致")
+    args = parser.parse_args()
+    if args.steps < 2:
+        parser.error("--steps 至少为2")
+
+    tmpdir = None
+    url = args.url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(tmpdir.name, 'bench_approval.db')}"
+    engine = create_engine(url)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = StatementCounter(engine, args.rtt_ms)
+    problems = []
+
+    try:
+        for mode in MODES:
+            workflow, ids = prepare(SessionLocal, engine, args)
+            counter.count = 0
+            begin = time.perf_counter()
+            failed = approve(SessionLocal, ids, workflow.steps[0].approver_role, 1 if mode == 'single' else args.batch)
+            elapsed = time.perf_counter() - begin
+            logger.info(f"{mode}: 同意 {len(ids)} 个实例（失败 {failed}），耗时={elapsed * 1000:.0f}ms，"
+                        f"每个实例 {elapsed * 1e6 / len(ids):.0f}us，SQL 语句 {counter.count} 条")
+            if args.verify:
+                problems += [f"{mode}: {problem}" for problem in check(engine, len(ids) * 2)]
+
+        # 最后一轮的实例继续批量审批到结束，并统计读取待审批列表的延迟
+        latencies = []
+        db = SessionLocal()
+        try:
+            for step in workflow.steps[1:]:
+                for _ in range(50):
+                    started = time.perf_counter()
+                    approval_service.get_inbox(db, step.approver_role, limit=100)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                db.rollback()
+                approve(SessionLocal, ids, step.approver_role, args.batch)
+        finally:
+            db.close()
+        logger.info(f"待审批列表（每页100条）：p50={statistics.median(latencies):.2f}ms, 最大={max(latencies):.2f}ms")
+        if args.verify:
+            problems += [f"审批结束后: {problem}" for problem in check(engine, len(ids) * (args.steps + 1))]
+            with engine.connect() as conn:
+                approved = conn.execute(select(func.count()).select_from(ApprovalInstance)
+                                        .where(ApprovalInstance.status == "approved")).scalar_one()
+            if approved != len(ids):
+                problems.append(f"审批通过 {approved} 个，预期 {len(ids)} 个")
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    if args.verify:
+        if problems:
+            for problem in problems:
+                logger.error(problem)
+            sys.exit(1)
+        logger.info("检查通过：实例、待审批箱和审批记录一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+考勤统计性能测试脚本
+
+不连接数据库，随机生成一个月的排班（默认5000个员工，每人每天一个早、中、夜班之一，约1/7的天休息）和打卡记录
+（约3%缺勤、5%迟到、10%加班、2%缺下班卡，另有重复打卡和休息日的计划外出勤），直接调用班次服务的考勤统计核心
+（shift_svc/services/attendance_engine.py），统计：
+- 打卡归属排班并计算每日考勤（迟到、早退、加班、出勤状态）的耗时，按周分块与整月一次计算两种方式；
+- 由每日考勤汇总生成按员工的月报、按 (日期, 班次) 的出勤覆盖报表的耗时。
+
+--verify 检查缺勤、迟到、加班、计划外出勤的人次与生成数据时设置的一致，按周分块与整月一次计算的行数一致。
+
+依赖：pip install numpy
+"""
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.shift_svc.services.attendance_engine import (
+    ABSENT, MINUTES_PER_DAY, PUNCH_IN, PUNCH_OUT, Punches, Shifts, daily_attendance, group_totals,
+)
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_attendance')
+
+# 早、中、夜班的开始时间（分钟），每班8小时
+SHIFT_STARTS = np.array([6 * 60, 14 * 60, 22 * 60])
+SHIFT_MINUTES = 8 * 60
+FIRST_DAY = 19875  # 2024-06-01
+
+
+def build_month(workers, days, rng):
+    """
+    生成排班和打卡记录
+
+    Returns:
+        (Shifts, Punches, 期望的缺勤、迟到、加班、计划外出勤人次)
+    """
+    all_workers = np.repeat(np.arange(workers), days)
+    all_days = np.tile(np.arange(days), workers) + FIRST_DAY
+    working = rng.random(len(all_workers)) >= 1 / 7
+    worker, day = all_workers[working], all_days[working]
+    code = rng.integers(0, len(SHIFT_STARTS), len(worker))
+    start = day * MINUTES_PER_DAY + SHIFT_STARTS[code]
+    shifts = Shifts(worker, day, start, start + SHIFT_MINUTES, code)
+
+    count = len(worker)
+    absent = rng.random(count) < 0.03
+    late = ~absent & (rng.random(count) < 0.05)
+    overtime = ~absent & (rng.random(count) < 0.10)
+    missing_out = ~absent & (rng.random(count) < 0.02)
+    clock_in = start - rng.integers(0, 15, count) + np.where(late, rng.integers(20, 60, count), 0)
+    clock_out = start + SHIFT_MINUTES + rng.integers(0, 10, count) + np.where(overtime, rng.integers(30, 180, count), 0)
+    has_in, has_out = ~absent, ~absent & ~missing_out
+    # 约5%的人重复打上班卡；约10%的休息日来厂（13:00~16:00），不在任何班的打卡范围内，为计划外出勤
+    repeat = has_in & (rng.random(count) < 0.05)
+    rest = np.flatnonzero(~working)
+    extra = rng.choice(rest, len(rest) // 10, replace=False)
+    extra_worker = all_workers[extra]
+    extra_in = all_days[extra] * MINUTES_PER_DAY + 13 * 60
+    punches = Punches(
+        np.concatenate([worker[has_in], worker[repeat], extra_worker, worker[has_out], extra_worker]),
+        np.concatenate([clock_in[has_in], clock_in[repeat] + 1, extra_in, clock_out[has_out], extra_in + 180]),
+        np.concatenate([np.full(has_in.sum() + repeat.sum() + len(extra), PUNCH_IN),
+                        np.full(has_out.sum() + len(extra), PUNCH_OUT)]),
+    )
+    order = rng.permutation(len(punches.time))
+    punches = Punches(*(column[order] for column in punches))
+    return shifts, punches, (int(absent.sum()), int(late.sum()), int((overtime & has_out).sum()), len(extra))
+
+
+def select_days(shifts, punches, first, last):
+    # 与 attendance_service 按周计算相同：多读前后一天的排班和打卡，结果只保留 [first, last]
+    in_shifts = (shifts.day >= first - 1) & (shifts.day <= last + 1)
+    in_punches = (punches.time >= (first - 1) * MINUTES_PER_DAY) & (punches.time < (last + 2) * MINUTES_PER_DAY)
+    return Shifts(*(column[in_shifts] for column in shifts)), Punches(*(column[in_punches] for column in punches))
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="shift_svc 考勤统计性能测试")
+    parser.add_argument("--workers", type=int, default=5000, help="员工数量")
+    parser.add_argument("--days", type=int, default=30, help="天数")
+    parser.add_argument("--block-days", type=int, default=7, help="按周分块计算时每块的天数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", action="store_true", help="检查缺勤、迟到、加班人次与生成的数据一致")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    shifts, punches, expected = build_month(args.workers, args.days, rng)
+    logger.info(f"员工={args.workers}, 天数={args.days}, 排班={len(shifts.start)}, 打卡={len(punches.time)}")
+
+    begin = time.perf_counter()
+    month = daily_attendance(punches, shifts, 120, 360, 5, 30)
+    logger.info(f"整月一次计算：每日考勤={len(month.worker)} 行, 耗时={(time.perf_counter() - begin) * 1000:.0f}ms")
+
+    begin = time.perf_counter()
+    rows = 0
+    for first in range(FIRST_DAY, FIRST_DAY + args.days, args.block_days):
+        last = min(first + args.block_days - 1, FIRST_DAY + args.days - 1)
+        block_shifts, block_punches = select_days(shifts, punches, first, last)
+        block = daily_attendance(block_punches, block_shifts, 120, 360, 5, 30)
+        rows += int(((block.day >= first) & (block.day <= last)).sum())
+    logger.info(f"按{args.block_days}天分块计算：每日考勤={rows} 行, 耗时={(time.perf_counter() - begin) * 1000:.0f}ms")
+
+    scheduled = month.shift >= 0
+    begin = time.perf_counter()
+    workers, totals = group_totals(month.worker, {
+        "scheduled_days": scheduled, "absent_days": month.status == ABSENT, "late_days": month.late > 0,
+        "worked_minutes": month.worked, "overtime_minutes": month.overtime,
+    })
+    worker_ms = (time.perf_counter() - begin) * 1000
+    begin = time.perf_counter()
+    keys = month.day[scheduled] * len(SHIFT_STARTS) + shifts.shift[month.shift[scheduled]]
+    slots, coverage = group_totals(keys, {"scheduled": np.ones(len(keys)),
+                                          "attended": month.status[scheduled] != ABSENT})
+    coverage_ms = (time.perf_counter() - begin) * 1000
+    logger.info(f"月报：员工={len(workers)}, 耗时={worker_ms:.1f}ms；出勤覆盖：(日期, 班次)={len(slots)}, "
+                f"平均覆盖率={coverage['attended'].sum() / coverage['scheduled'].sum():.3f}, 耗时={coverage_ms:.1f}ms")
+
+    if args.verify:
+        actual = (int(totals["absent_days"].sum()), int(totals["late_days"].sum()),
+                  int(((month.overtime > 0) & scheduled).sum()), int((~scheduled).sum()))
+        logger.info(f"缺勤/迟到/加班/计划外出勤 人次：期望={expected}, 实际={actual}, "
+                    f"整月与分块行数{'一致' if rows == len(month.worker) else '不一致'}")
+        if actual != expected or rows != len(month.worker):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
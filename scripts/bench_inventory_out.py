@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+库存服务热门物料并发出库测试脚本
+
+模拟多个拣货员同时对同一个物料出库，对比三种出库方式的吞吐量和延迟，并检查没有超卖：
+- locked: 先 SELECT ... FOR UPDATE 锁定库存行，再写回扣减后的数量
+- conditional: 条件更新 UPDATE ... WHERE quantity >= :n（inventory_service.stock_out）
+- coalesced: 同一库存行上的并发请求合并提交（StockOutCoalescer）
+
+默认使用临时 SQLite 数据库（每个事务以 BEGIN IMMEDIATE 开始，相当于锁定整个库）；
+通过 --url 指定 MySQL 测试库时使用真实的行锁。--rtt-ms 在每条语句和提交前注入耗时，
+模拟应用与数据库之间的网络往返，持锁期间的往返次数越多，热点行上的排队越严重。
+
+检查项：结存 = 初始库存 - 成功出库合计，且不为负；流水条数与成功次数一致；版本号没有重复。
+
+依赖：pip install fastapi "SQLAlchemy[asyncio]"
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.inventory_svc import schemas
+from backend.inventory_svc.models.models import Base, Inventory, InventoryTransaction
+from backend.inventory_svc.services import inventory_service
+from backend.inventory_svc.services.stock_coalescer import StockOutCoalescer
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_inventory_out')
+
+MODES = ('locked', 'conditional', 'coalesced')
+MATERIAL_ID = 'bench-material'
+WAREHOUSE_ID = 'bench-warehouse'
+
+
+def build_engine(url, pickers, rtt_ms):
+    """
+    创建测试用数据库引擎，连接数与拣货员数相同，避免在连接池上排队
+    """
+    if url.startswith('sqlite'):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 60},
+                               pool_size=pickers, max_overflow=0)
+
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_begin(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        engine = create_engine(url, pool_size=pickers, max_overflow=0)
+
+    if rtt_ms > 0:
+        def _round_trip(*args, **kwargs):
+            time.sleep(rtt_ms / 1000.0)
+        event.listen(engine, "before_cursor_execute", _round_trip)
+        event.listen(engine, "commit", _round_trip)
+    return engine
+
+
+def reset(engine, stock):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Inventory.__table__.insert().values(
+            material_id=MATERIAL_ID, warehouse_id=WAREHOUSE_ID, batch_no='', quantity=stock, version=0,
+        ))
+
+
+def verify(engine, stock, succeeded_quantity, succeeded):
+    """
+    检查结存与流水是否一致，返回发现的问题列表
+    """
+    problems = []
+    with engine.connect() as conn:
+        quantity = conn.execute(select(Inventory.quantity)).scalar_one()
+        count, total, versions = conn.execute(select(
+            func.count(), func.coalesce(func.sum(InventoryTransaction.quantity), 0),
+            func.count(func.distinct(InventoryTransaction.balance_version)),
+        )).one()
+    if quantity < 0:
+        problems.append(f"结存为负: {quantity}")
+    if abs(float(quantity) - (stock - succeeded_quantity)) > 1e-6:
+        problems.append(f"结存 {quantity} 与预期 {stock - succeeded_quantity} 不符")
+    if count != succeeded or abs(float(total) + succeeded_quantity) > 1e-6:
+        problems.append(f"流水 {count} 条合计 {total}，预期 {succeeded} 条合计 {-succeeded_quantity}")
+    if versions != count:
+        problems.append(f"流水版本号重复: {count} 条流水只有 {versions} 个版本号")
+    return problems
+
+
+def run_mode(mode, engine, args):
+    """
+    运行一种出库方式，返回 (成功次数, 库存不足次数, 错误次数, 耗时秒数, 延迟列表 ms)
+    """
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    coalescer = StockOutCoalescer(SessionLocal, window=args.window_ms / 1000) if mode == 'coalesced' else None
+    request = schemas.StockOut(material_id=MATERIAL_ID, warehouse_id=WAREHOUSE_ID, quantity=args.quantity)
+
+    def pick():
+        if coalescer is not None:
+            return coalescer.submit(request)
+        db = SessionLocal()
+        try:
+            if mode == 'conditional':
+                return inventory_service.stock_out(db, request)
+            # 合并一个请求的批次即为先锁定再写回的出库方式
+            outcome = inventory_service.stock_out_batch(db, [request])[0]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        finally:
+            db.close()
+
+    def picker():
+        outcomes = []
+        for _ in range(args.picks):
+            begin = time.perf_counter()
+            try:
+                pick()
+                status = 'ok'
+            except inventory_service.InsufficientStockError:
+                status = 'insufficient'
+            except Exception as e:
+                logger.debug(f"出库失败: {str(e)}")
+                status = 'error'
+            outcomes.append((status, (time.perf_counter() - begin) * 1000))
+        return outcomes
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.pickers) as executor:
+        results = [outcome for future in [executor.submit(picker) for _ in range(args.pickers)]
+                   for outcome in future.result()]
+    elapsed = time.perf_counter() - begin
+
+    counts = {status: sum(1 for s, _ in results if s == status) for status in ('ok', 'insufficient', 'error')}
+    return counts['ok'], counts['insufficient'], counts['error'], elapsed, [latency for _, latency in results]
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    """
+    主函数，解析参数并依次运行各出库方式
+    """
+    parser = argparse.ArgumentParser(description="inventory_svc 热门物料并发出库测试")
+    parser.add_argument("--url", help="测试数据库URL（会删除并重建库存表），默认使用临时 SQLite 数据库")
+    parser.add_argument("--pickers", type=int, default=200, help="并发拣货员数")
+    parser.add_argument("--picks", type=int, default=5, help="每个拣货员的出库次数")
+    parser.add_argument("--quantity", type=float, default=1, help="每次出库数量")
+    parser.add_argument("--stock", type=float, help="初始库存，默认为全部出库数量的90%%，用于检查库存不足的处理")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="每条语句注入的网络往返耗时（毫秒）")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="合并出库时首个请求的等待时间（毫秒）")
+    parser.add_argument("--modes", default=','.join(MODES), help="要运行的出库方式，逗号分隔")
+    args = parser.parse_args()
+
+    stock = args.stock if args.stock is not None else args.pickers * args.picks * args.quantity * 0.9
+    logger.info(f"拣货员={args.pickers}, 每人出库={args.picks}次x{args.quantity}, 初始库存={stock}, "
+                f"往返耗时={args.rtt_ms}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench_inventory.db')}"
+        engine = build_engine(url, args.pickers, args.rtt_ms)
+        failed = False
+        try:
+            for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+                if mode not in MODES:
+                    parser.error(f"未知的出库方式: {mode}")
+                reset(engine, stock)
+                ok, insufficient, errors, elapsed, latencies = run_mode(mode, engine, args)
+                problems = verify(engine, stock, ok * args.quantity, ok)
+                failed = failed or bool(problems) or errors > 0
+                logger.info(
+                    f"{mode:>11}: {len(latencies) / elapsed:8.1f} 次/秒, 成功={ok}, 库存不足={insufficient}, "
+                    f"错误={errors}, p50={statistics.median(latencies):.1f}ms, "
+                    f"p99={_percentile(latencies, 99):.1f}ms, 检查={'通过' if not problems else '; '.join(problems)}"
+                )
+        finally:
+            engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
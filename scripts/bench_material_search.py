@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+物料搜索索引性能测试脚本
+
+随机生成物料（编码、中文名称、规格），不连接数据库，直接建立 material_svc 的进程内搜索索引，
+统计建立耗时、内存占用（--trace-memory），以及编码前缀、名称单字、名称双字、规格等查询的延迟。
+
+依赖：pip install fastapi SQLAlchemy
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+import statistics
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from collections import namedtuple
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.material_svc.services.material_index import MaterialIndex
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_material_search')
+
+Row = namedtuple('Row', ['id', 'code', 'name', 'spec', 'unit', 'updated_at', 'deleted_at'])
+
+PREFIXES = ['不锈钢', '碳钢', '铝合金', '镀锌', '黄铜', '尼龙', '高强度', '内六角', '外六角', '十字']
+NOUNS = ['螺栓', '螺母', '垫片', '板材', '管件', '法兰', '轴承', '弹簧', '铆钉', '销轴', '电机', '阀门',
+         '密封圈', '支架', '齿轮', '链条', '皮带', '钢丝绳', '接头', '线缆']
+SUFFIXES = ['', '组件', '套装', '总成', '(国标)', '(加厚)']
+SPECS = ['M{}x{}', 'Φ{}x{}', '{}mm x {}mm', 'DN{}-PN{}', '{}kW-{}极']
+
+
+def generate(count, seed):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(count):
+        name = f"{rng.choice(PREFIXES)}{rng.choice(NOUNS)}{rng.choice(SUFFIXES)}"
+        spec = rng.choice(SPECS).format(rng.randint(2, 200), rng.randint(2, 400))
+        yield Row(f"id-{i}", f"{rng.choice('ABCDEFGH')}{i:07d}", name, spec, '个', now, None)
+
+
+def measure(index, queries, limit):
+    latencies = []
+    for query in queries:
+        begin = time.perf_counter()
+        index.search(query, limit=limit)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], latencies[-1]
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="material_svc 物料搜索索引性能测试")
+    parser.add_argument("--materials", type=int, default=500000, help="物料数量")
+    parser.add_argument("--queries", type=int, default=2000, help="每类查询的次数")
+    parser.add_argument("--limit", type=int, default=20, help="每次查询返回的条数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true", help="统计索引占用的内存（建立索引会慢数倍）")
+    args = parser.parse_args()
+
+    index = MaterialIndex()
+    if args.trace_memory:
+        tracemalloc.start()
+    begin = time.perf_counter()
+    index.build(generate(args.materials, args.seed))
+    build_seconds = time.perf_counter() - begin
+    logger.info(f"物料={args.materials}, 建立索引耗时={build_seconds:.1f}s")
+    if args.trace_memory:
+        logger.info(f"索引内存约 {tracemalloc.get_traced_memory()[0] / 1024 / 1024:.0f}MB")
+        tracemalloc.stop()
+
+    rng = random.Random(args.seed + 1)
+    words = PREFIXES + NOUNS
+    groups = {
+        '编码前缀': [f"{rng.choice('ABCDEFGH')}{rng.randint(0, 99):02d}" for _ in range(args.queries)],
+        '名称单字': [rng.choice(rng.choice(words)) for _ in range(args.queries)],
+        '名称词语': [rng.choice(words) for _ in range(args.queries)],
+        '名称组合': [f"{rng.choice(PREFIXES)}{rng.choice(NOUNS)}" for _ in range(args.queries)],
+        '规格': [f"M{rng.randint(2, 200)}x" for _ in range(args.queries)],
+        '无结果': [f"无此物料{i}" for i in range(args.queries)],
+    }
+    for label, queries in groups.items():
+        p50, p99, worst = measure(index, queries, args.limit)
+        logger.info(f"{label}: p50={p50:.3f}ms, p99={p99:.3f}ms, max={worst:.3f}ms")
+
+    # 修改已有物料后再查询，确认增量更新的开销
+    begin = time.perf_counter()
+    for row in generate(1000, args.seed + 2):
+        index.upsert(row._replace(id=f"id-{rng.randrange(args.materials)}", updated_at=datetime.now()))
+    logger.info(f"增量更新1000个物料耗时={(time.perf_counter() - begin) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
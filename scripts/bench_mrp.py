@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+物料需求计划计算性能测试脚本
+
+随机生成多层物料清单（产品 -> 子装配 -> 零件 -> 原材料）、生产计划、现有库存和在途到货，
+不连接数据库和其他服务，直接调用 material_svc 的计算核心（services/mrp_engine.py）：
+- 全量计算全部计划的耗时；
+- 修改少量计划后增量计算的耗时，并与全量重算的结果比较（--verify）。
+
+依赖：pip install numpy fastapi SQLAlchemy
+"""
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.material_svc.services.mrp_engine import BomStructure, plan_orders, select_entries, concat_entries
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_mrp')
+
+# 各层物料占全部物料的比例和每个物料的下级物料数
+LAYERS = [(0.025, 6), (0.1, 4), (0.275, 3), (0.6, 0)]
+
+
+def build_structure(materials, rng):
+    sizes = [int(materials * share) for share, _ in LAYERS]
+    sizes[-1] = materials - sum(sizes[:-1])
+    starts = np.cumsum([0] + sizes)
+    parents, children = [], []
+    for layer, (_, fan_out) in enumerate(LAYERS):
+        if not fan_out:
+            continue
+        layer_parents = np.repeat(np.arange(starts[layer], starts[layer + 1]), fan_out)
+        # 下级物料取自下面各层，多数在紧邻的下一层
+        lower = rng.integers(starts[layer + 1], np.where(rng.random(len(layer_parents)) < 0.8,
+                                                         starts[layer + 2], materials))
+        parents.append(layer_parents)
+        children.append(lower)
+    parents, children = np.concatenate(parents), np.concatenate(children)
+    # 去掉重复的 (上级, 下级)
+    _, unique = np.unique(parents * materials + children, return_index=True)
+    parents, children = parents[unique], children[unique]
+    quantities = rng.integers(1, 5, len(parents)).astype(float)
+    lead_times = rng.integers(0, 10, materials)
+    structure = BomStructure([f"m{i}" for i in range(materials)], lead_times, parents, children, quantities)
+    return structure, sizes[0]
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="material_svc 物料需求计划计算性能测试")
+    parser.add_argument("--materials", type=int, default=200000, help="物料数量")
+    parser.add_argument("--plans", type=int, default=50000, help="计划数量")
+    parser.add_argument("--buckets", type=int, default=90, help="时间段个数（天）")
+    parser.add_argument("--changed", type=int, default=100, help="增量计算时修改的计划数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", action="store_true", help="增量计算的结果与全量重算比较")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    begin = time.perf_counter()
+    structure, products = build_structure(args.materials, rng)
+    logger.info(f"物料={structure.size}, 物料清单明细={len(structure.edge_parent)}, 最大低层码={structure.max_level}, "
+                f"建立结构耗时={time.perf_counter() - begin:.2f}s")
+
+    demand = (rng.integers(0, products, args.plans), rng.integers(0, args.buckets, args.plans),
+              rng.integers(1, 100, args.plans).astype(float))
+    on_hand = rng.integers(0, 2000, structure.size).astype(float)
+    receipt_count = structure.size // 10
+    receipts = (rng.integers(0, structure.size, receipt_count), rng.integers(0, args.buckets, receipt_count),
+                rng.integers(1, 500, receipt_count).astype(float))
+
+    begin = time.perf_counter()
+    orders = plan_orders(structure, args.buckets, 1, demand, on_hand, receipts)
+    logger.info(f"全量计算：计划={args.plans}, 计划订单={len(orders[0])}, 耗时={time.perf_counter() - begin:.2f}s")
+
+    changed = rng.choice(args.plans, args.changed, replace=False)
+    new_demand = tuple(column.copy() for column in demand)
+    new_demand[2][changed] = rng.integers(1, 100, args.changed)
+    begin = time.perf_counter()
+    affected = structure.descendants(demand[0][changed])
+    kept = select_entries(orders, ~affected[orders[0]])
+    incremental = concat_entries(kept, plan_orders(structure, args.buckets, 1, new_demand, on_hand, receipts,
+                                                   affected=affected, kept_orders=kept))
+    logger.info(f"增量计算：修改计划={args.changed}, 重算物料={int(affected.sum())}, "
+                f"耗时={time.perf_counter() - begin:.2f}s")
+
+    if args.verify:
+        full = plan_orders(structure, args.buckets, 1, new_demand, on_hand, receipts)
+        order = np.lexsort((incremental[1], incremental[0]))
+        expected = np.lexsort((full[1], full[0]))
+        same = (len(order) == len(expected)
+                and all(np.array_equal(incremental[i][order], full[i][expected]) for i in (0, 1))
+                and np.allclose(incremental[2][order], full[2][expected]))
+        logger.info(f"增量计算结果与全量重算{'一致' if same else '不一致'}")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+计划服务同步/异步数据库访问吞吐量对比脚本
+
+使用本地 SQLite（同步：pysqlite，异步：aiosqlite）代替 MySQL，分别构建
+同步 def 路由和 async def 路由，在相同并发客户端数下对比吞吐量和延迟。
+通过 --latency-ms 在每次查询中注入数据库端耗时，模拟慢查询。
+同步路由受线程池（默认40个线程）限制，吞吐量上限约为 40 / 查询耗时；
+注入耗时很小时两者都受 CPU 限制，差别不明显。
+
+依赖：pip install fastapi httpx "SQLAlchemy[asyncio]" aiosqlite
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI, Depends
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.plan_svc.models.models import Base, Plan
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_plan_db')
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    # 注册 sleep_ms() SQL 函数，让延迟发生在数据库驱动线程中而不是事件循环里
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000.0) or 0)
+
+
+def build_apps(db_path, pool_size, latency_ms):
+    """
+    构建同步与异步两个 FastAPI 应用，返回 (sync_app, async_app, 清理函数)
+    """
+    sync_engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    event.listen(sync_engine, "connect", _register_sleep)
+    event.listen(async_engine.sync_engine, "connect", _register_sleep)
+
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    sync_app = FastAPI()
+    async_app = FastAPI()
+
+    @sync_app.get("/plans/{plan_id}")
+    def read_plan_sync(plan_id: int, db: Session = Depends(get_db)):
+        db.execute(text("SELECT sleep_ms(:ms)"), {"ms": latency_ms})
+        plan = db.get(Plan, plan_id)
+        return {"id": plan.id, "name": plan.name}
+
+    @async_app.get("/plans/{plan_id}")
+    async def read_plan_async(plan_id: int, db: AsyncSession = Depends(get_async_db)):
+        await db.execute(text("SELECT sleep_ms(:ms)"), {"ms": latency_ms})
+        plan = await db.get(Plan, plan_id)
+        return {"id": plan.id, "name": plan.name}
+
+    async def dispose():
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+    return sync_app, async_app, dispose
+
+
+def seed(db_path, rows):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(Plan.__table__.insert(), [
+            {
+                "name": f"plan-{i}",
+                "product_name": f"product-{i % 50}",
+                "start_time": start + timedelta(hours=i),
+                "end_time": start + timedelta(hours=i + 8),
+                "quantity": float(i),
+            }
+            for i in range(rows)
+        ])
+    engine.dispose()
+
+
+async def run_load(app, requests_total, concurrency, rows):
+    """
+    以固定并发数发送请求，返回 (吞吐量 req/s, 延迟列表 ms)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                begin = time.perf_counter()
+                response = await client.get(f"/plans/{i % rows + 1}")
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - begin) * 1000)
+
+        begin = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests_total)))
+        elapsed = time.perf_counter() - begin
+
+    return requests_total / elapsed, latencies
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench_plan.db")
+        seed(db_path, args.rows)
+        sync_app, async_app, dispose = build_apps(db_path, args.concurrency, args.latency_ms)
+        try:
+            for label, app in (("sync", sync_app), ("async", async_app)):
+                # 预热：先建立连接池中的全部连接，避免把建连耗时计入结果
+                await run_load(app, args.concurrency, args.concurrency, args.rows)
+                throughput, latencies = await run_load(app, args.requests, args.concurrency, args.rows)
+                logger.info(
+                    f"{label:>5}: {throughput:8.1f} req/s, "
+                    f"p50={statistics.median(latencies):.1f}ms, p99={_percentile(latencies, 99):.1f}ms"
+                )
+        finally:
+            await dispose()
+
+
+def main():
+    """
+    主函数，解析参数并运行对比测试
+    """
+    parser = argparse.ArgumentParser(description="plan_svc 同步/异步数据库访问吞吐量对比")
+    parser.add_argument("--concurrency", type=int, default=500, help="并发客户端数")
+    parser.add_argument("--requests", type=int, default=5000, help="请求总数")
+    parser.add_argument("--rows", type=int, default=10000, help="预置计划行数")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="每次查询注入的数据库端耗时（毫秒）")
+    args = parser.parse_args()
+
+    logger.info(
+        f"并发={args.concurrency}, 请求数={args.requests}, 注入延迟={args.latency_ms}ms"
+    )
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
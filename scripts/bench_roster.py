@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+排班求解性能测试脚本
+
+不连接数据库，随机生成员工（默认2000人，每人1~3种技能，约20%的人有一天不可上班）和
+每天3个班次（早、中、夜）、每条产线3种技能的需求，直接调用班次服务的排班求解器（shift_svc/services/roster_solver.py），
+统计：
+- 需求人次、已排人次、缺人人次和员工班数的最小/最大值；
+- 构造、修复、均衡各阶段的耗时；
+- 随机抽取 --absences 个员工各缺勤3天，逐个增量补缺的耗时 p50/最大值。
+
+--verify 检查排班结果满足技能、可上班时间、每天最多一个班、相邻两天的休息时间和最多班数的约束。
+
+依赖：pip install fastapi SQLAlchemy
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+from pathlib import Path
+from collections import Counter
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.shift_svc.services.roster_solver import Requirement, RosterProblem, RosterSolver, ShiftDef
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_roster')
+
+SHIFTS = [ShiftDef("M", 6 * 60, 14 * 60), ShiftDef("A", 14 * 60, 22 * 60), ShiftDef("N", 22 * 60, 6 * 60)]
+SKILLS = ["weld", "assy", "qc", "fork", "paint"]
+
+
+def build_problem(workers, days, lines, max_shifts, rng):
+    skills = [rng.sample(SKILLS, rng.choice([1, 1, 2, 3])) for _ in range(workers)]
+    unavailable = [{(rng.randrange(days), None)} if rng.random() < 0.2 else set() for _ in range(workers)]
+    requirements = []
+    for day in range(days):
+        for shift in range(len(SHIFTS)):
+            for line in range(lines):
+                for skill in rng.sample(SKILLS, 3):
+                    headcount = rng.randint(5, 16) if shift < 2 else rng.randint(3, 7)
+                    requirements.append(Requirement(day, shift, f"L{line}", skill, headcount))
+    return RosterProblem(days, SHIFTS, [f"W{i:05d}" for i in range(workers)], skills, [max_shifts] * workers,
+                         unavailable, requirements, 11 * 60)
+
+
+def verify(problem, assignments):
+    """
+    检查排班结果满足全部约束，返回违反约束的说明，没有时返回空列表
+    """
+    errors = []
+    at = {}
+    for w, r in assignments:
+        requirement = problem.requirements[r]
+        if requirement.skill not in problem.skills[w]:
+            errors.append(f"{problem.worker_ids[w]} 没有技能 {requirement.skill}")
+        if {(requirement.day, None), (requirement.day, requirement.shift)} & problem.unavailable[w]:
+            errors.append(f"{problem.worker_ids[w]} 第{requirement.day}天不可上班")
+        if (w, requirement.day) in at:
+            errors.append(f"{problem.worker_ids[w]} 第{requirement.day}天有两个班")
+        at[(w, requirement.day)] = requirement.shift
+    for (w, day), shift in at.items():
+        following = at.get((w, day + 1))
+        if following is None:
+            continue
+        end = SHIFTS[shift].end + (1440 if SHIFTS[shift].end <= SHIFTS[shift].start else 0)
+        if 1440 + SHIFTS[following].start - end < problem.min_rest:
+            errors.append(f"{problem.worker_ids[w]} 第{day}、{day + 1}天之间休息不足")
+    for w, count in Counter(w for w, _ in assignments).items():
+        if count > problem.max_shifts[w]:
+            errors.append(f"{problem.worker_ids[w]} 排了{count}个班")
+    return errors
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="shift_svc 排班求解性能测试")
+    parser.add_argument("--workers", type=int, default=2000, help="员工数量")
+    parser.add_argument("--days", type=int, default=7, help="排班天数")
+    parser.add_argument("--lines", type=int, default=20, help="产线数量")
+    parser.add_argument("--max-shifts", type=int, default=6, help="每人最多的班数")
+    parser.add_argument("--budget-ms", type=int, default=5000, help="求解的时间预算（毫秒）")
+    parser.add_argument("--absences", type=int, default=50, help="增量补缺的次数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", action="store_true", help="检查排班结果满足全部约束")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    problem = build_problem(args.workers, args.days, args.lines, args.max_shifts, rng)
+    required = sum(requirement.headcount for requirement in problem.requirements)
+    begin = time.perf_counter()
+    solver = RosterSolver(problem)
+    setup = time.perf_counter() - begin
+    timings = solver.solve(args.budget_ms / 1000.0)
+    low, high = solver.load_range()
+    logger.info(f"员工={args.workers}, 需求={len(problem.requirements)}, 需求人次={required}, "
+                f"可排人次={args.workers * args.max_shifts}, 建立约束耗时={setup * 1000:.0f}ms")
+    logger.info(f"已排人次={len(solver.assignments())}, 缺人人次={sum(m for _, m in solver.shortfalls())}, "
+                f"员工班数={low}~{high}, 耗时(ms): " + ", ".join(f"{k}={v:.0f}" for k, v in timings.items()))
+
+    elapsed = []
+    for _ in range(args.absences):
+        w = rng.choice(solver.assignments())[0]
+        begin = time.perf_counter()
+        solver.absence(w, rng.sample(range(args.days), min(3, args.days)), args.budget_ms / 1000.0)
+        elapsed.append((time.perf_counter() - begin) * 1000)
+    if elapsed:
+        elapsed.sort()
+        logger.info(f"增量补缺={len(elapsed)}次, 缺人人次={sum(m for _, m in solver.shortfalls())}, "
+                    f"耗时(ms): p50={elapsed[len(elapsed) // 2]:.2f}, 最大={elapsed[-1]:.2f}")
+
+    if args.verify:
+        errors = verify(problem, solver.assignments())
+        for error in errors[:20]:
+            logger.error(error)
+        logger.info(f"约束检查{'通过' if not errors else f'失败：{len(errors)} 处违反'}")
+        if errors:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+定时任务调度性能测试脚本
+
+不连接数据库，直接在进程内的调度器（scheduler_svc/services/job_scheduler.py）中加载大量任务：
+间隔任务（1~600秒）和 cron 任务（分钟字段各不相同的表达式）混合，首次执行时间随机分散，
+任务到期时只记录调度延迟（不执行任何操作），运行一段时间后统计：
+- 加载任务和编译 cron 表达式的耗时；
+- 调度延迟（实际分派时间与计划执行时间之差）的 p50/p99/最大值；
+- 调度线程之外的 CPU 占用（主线程只 sleep，进程 CPU 时间基本都是调度线程的）。
+
+--monolith 改为检查单进程合并部署（monolith.py）下 process 方式的任务：在本进程内用 uvicorn 运行只挂载审批服务的
+合并应用，执行进程（spawn 启动，没有进程内的服务）中的任务经 service_client 调用审批服务的 /ping，须能返回结果；
+加 --uds 时合并应用只监听 Unix 套接字（与 main.py --monolith --uds-dir 一致）。
+
+依赖：pip install fastapi SQLAlchemy（--monolith 还需要 uvicorn）
+"""
+import os
+import sys
+import time
+import random
+import socket
+import tempfile
+import logging
+import argparse
+import threading
+from pathlib import Path
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+from backend.scheduler_svc.services.cron import compile_cron
+from backend.scheduler_svc.jobs import tasks
+from backend.scheduler_svc.services.job_executor import JobExecutor, JobRun
+from backend.scheduler_svc.services.job_scheduler import JobScheduler, JobSpec
+from backend.service_client import service_client
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_scheduler')
+
+MONOLITH_SERVICE = 'approval_svc'
+
+
+# 执行进程以 spawn 启动时会重新执行本脚本的模块级代码，因此合并部署检查用的任务在这里登记
+@tasks.job_function("bench_monolith_ping", executor="process", timeout=30)
+def monolith_ping(service_name):
+    response = service_client.request(service_name, 'GET', '/ping')
+    response.raise_for_status()
+    return response.json()
+
+
+def build_jobs(count, cron_share, rng, now):
+    specs = []
+    for i in range(count):
+        if rng.random() < cron_share:
+            expression = f"{rng.randrange(60)}/{rng.choice([1, 2, 5, 15])} * * * *"
+            cron = compile_cron(expression)
+            specs.append(JobSpec(f"job-{i}", "noop", [], {}, cron, None, cron.next_after(now)))
+        else:
+            interval = rng.choice([1, 5, 10, 30, 60, 300, 600])
+            specs.append(JobSpec(f"job-{i}", "noop", [], {}, None, interval, now + rng.random() * interval))
+    return specs
+
+
+def check_monolith(uds_dir=None):
+    """
+    在合并部署中执行一个 process 任务，返回发现的问题列表
+
+    Args:
+        uds_dir: 合并应用监听 Unix 套接字时套接字所在的目录，为空时监听随机端口
+    """
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    # 与 main.py --monolith 启动时一致，合并应用按 SERVICE_PORT、SERVICE_UDS 设置执行进程访问各服务的地址
+    os.environ['SERVICE_PORT'] = str(port)
+    uds = os.path.join(uds_dir, 'monolith.sock') if uds_dir else None
+    if uds:
+        os.environ['SERVICE_UDS'] = uds
+    os.environ['MONOLITH_SERVICES'] = MONOLITH_SERVICE
+    from backend import monolith
+
+    listen = {'uds': uds} if uds else {'host': 'localhost', 'port': port}
+    server = uvicorn.Server(uvicorn.Config(monolith.app, lifespan='off', log_level='warning', **listen))
+    thread = threading.Thread(target=server.run, name="monolith", daemon=True)
+    thread.start()
+    executor = JobExecutor(thread_workers=0, process_workers=1, queue_size=1)
+    done = threading.Event()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                return [f"合并应用未能在{f'Unix套接字 {uds}' if uds else f'端口 {port}'}启动"]
+            time.sleep(0.05)
+        executor.start()
+        run = JobRun("monolith-check", "bench_monolith_ping", [MONOLITH_SERVICE], {}, 5, 30, "manual",
+                     on_done=lambda _: done.set())
+        executor.submit(run)
+        if not done.wait(60):
+            return ["process 任务60秒内未完成"]
+    finally:
+        executor.stop()
+        server.should_exit = True
+        thread.join(10)
+    logger.info(f"合并部署: process 任务 {run.status}，执行 {run.duration * 1000:.0f}ms，"
+                f"{MONOLITH_SERVICE.upper()}_URL={os.environ.get(f'{MONOLITH_SERVICE.upper()}_URL')}，"
+                f"{MONOLITH_SERVICE.upper()}_UDS={os.environ.get(f'{MONOLITH_SERVICE.upper()}_UDS')}")
+    if run.status != "success":
+        return [f"process 任务执行{run.status}: {run.error}"]
+    return []
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="scheduler_svc 定时任务调度性能测试")
+    parser.add_argument("--jobs", type=int, default=100000, help="任务数量")
+    parser.add_argument("--cron-share", type=float, default=0.3, help="cron 任务所占比例")
+    parser.add_argument("--duration", type=float, default=30, help="运行时间（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--monolith", action="store_true",
+                        help="只检查合并部署下 process 任务能否调用进程内的服务")
+    parser.add_argument("--uds", action="store_true", help="与 --monolith 一起使用，合并应用只监听 Unix 套接字")
+    args = parser.parse_args()
+
+    if args.monolith:
+        if args.uds:
+            with tempfile.TemporaryDirectory() as uds_dir:
+                problems = check_monolith(uds_dir)
+        else:
+            problems = check_monolith()
+        for problem in problems:
+            logger.error(problem)
+        if problems:
+            sys.exit(1)
+        logger.info("检查通过：执行进程可以经 HTTP 调用合并应用中的服务")
+        return
+
+    rng = random.Random(args.seed)
+    lags = []
+    started = [float("inf")]
+    overdue = [0]
+
+    def dispatch(spec, scheduled_at, following):
+        # 加载期间已到期的任务在启动时补执行，不计入调度延迟
+        if scheduled_at < started[0]:
+            overdue[0] += 1
+        else:
+            lags.append(time.time() - scheduled_at)
+
+    begin = time.perf_counter()
+    specs = build_jobs(args.jobs, args.cron_share, rng, time.time())
+    scheduler = JobScheduler(dispatch)
+    scheduler.load(specs)
+    logger.info(f"任务={args.jobs}, 加载耗时={time.perf_counter() - begin:.2f}s")
+
+    cpu_begin = time.process_time()
+    started[0] = time.time()
+    scheduler.start()
+    time.sleep(args.duration)
+    scheduler.stop()
+    cpu = time.process_time() - cpu_begin
+
+    lags.sort()
+
+    def percentile(p):
+        return lags[min(len(lags) - 1, int(len(lags) * p))] * 1000 if lags else 0.0
+
+    logger.info(f"运行={args.duration:.0f}s, 分派={len(lags)}（{len(lags) / args.duration:.0f}/s）, "
+                f"启动时补执行={overdue[0]}, "
+                f"调度线程 CPU 占用={cpu / args.duration:.1%}, 堆大小={scheduler.stats()['heap_size']}")
+    logger.info(f"调度延迟(ms): p50={percentile(0.5):.3f}, p99={percentile(0.99):.3f}, "
+                f"p99.9={percentile(0.999):.3f}, 最大={percentile(1):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+调度服务多进程领取任务测试脚本
+
+启动多个 worker 进程（每个进程一个 scheduler_svc 的 SchedulerRuntime，见 services/job_service.py），
+对同一个数据库中的一批一次性任务按租约领取并执行，任务执行时 sleep --job-ms 毫秒模拟调用其他服务。
+worker 数依次为 1、2、4……直到 --workers，每轮重建任务表，统计：
+- 吞吐量（任务数 / 从任务激活到全部完成的时间）及相对1个 worker 的加速比，低于 worker 数 × --min-efficiency 时报错；
+- 每次执行都记录到各 worker 自己的文件中，检查每个任务恰好执行一次。
+
+--crash 时在最后一轮完成约30%后强制结束第一个 worker：它持有租约的任务在租约过期（--lease 秒）后
+由其他 worker 重新领取，检查全部任务最终完成，重复执行只出现在被结束的 worker 领取过的任务上。
+
+默认使用临时 SQLite 数据库（每个事务以 BEGIN IMMEDIATE 开始，不支持 SKIP LOCKED，领取靠条件更新保证不重复）；
+通过 --url 指定 MySQL 测试库时使用 SELECT ... FOR UPDATE SKIP LOCKED（会重建 scheduled_job 表）。
+
+依赖：pip install fastapi SQLAlchemy
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from collections import Counter
+
+from sqlalchemy import create_engine, event, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+# 添加项目根目录到PYTHONPATH
+root_dir = str(Path(__file__).parent.parent)
+sys.path.append(root_dir)
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger('bench_scheduler_claim')
+
+JOB_FUNCTION = 'bench_sleep'
+
+
+def build_engine(url, pool_size):
+    if url.startswith('sqlite'):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 60},
+                               pool_size=pool_size, max_overflow=0)
+
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_begin(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+            dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        engine = create_engine(url, pool_size=pool_size, max_overflow=0)
+    return engine
+
+
+def reset(engine, jobs):
+    """
+    重建任务表，写入 jobs 个暂停状态的一次性任务，参数为任务序号
+    """
+    from backend.scheduler_svc.models.models import Base, ScheduledJob
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(ScheduledJob.__table__.insert(), [
+            {"job_id": f"bench-{i}", "job_name": f"bench {i}", "job_function": JOB_FUNCTION,
+             "job_args": json.dumps([i]), "job_kwargs": "{}", "next_run_time": now, "status": "paused",
+             "fencing_token": 0, "created_at": now, "updated_at": now}
+            for i in range(jobs)
+        ])
+
+
+def worker(index, url, threads, job_ms, log_path, ready, stop_path):
+    """
+    worker 进程：领取并执行任务，每次执行写一行任务序号到 log_path，stop_path 出现后停止
+    """
+    from backend.scheduler_svc.jobs import tasks
+    from backend.scheduler_svc.services.job_service import SchedulerRuntime
+
+    log = open(log_path, "a", buffering=1)
+
+    def bench_sleep(number):
+        log.write(f"{number}\n")
+        time.sleep(job_ms / 1000.0)
+
+    tasks.JOB_FUNCTIONS[JOB_FUNCTION] = bench_sleep
+    engine = build_engine(url, pool_size=4)
+    runtime = SchedulerRuntime(max_workers=threads, worker_id=f"worker-{index}")
+    runtime.start(sessionmaker(bind=engine))
+    ready.put(index)
+    # 用文件而不是 multiprocessing.Event 通知停止：强制结束的进程可能正在等待 Event，set() 会一直阻塞
+    while not os.path.exists(stop_path):
+        time.sleep(0.1)
+    runtime.stop()
+    log.close()
+
+
+def read_dispatches(log_path):
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path) as f:
+        return [int(line) for line in f if line.strip()]
+
+
+def run_round(url, engine, workers, args, work_dir, crash):
+    from backend.scheduler_svc.models.models import ScheduledJob
+
+    reset(engine, args.jobs)
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    stop_path = os.path.join(work_dir, f"stop-{workers}")
+    log_paths = [os.path.join(work_dir, f"dispatch-{workers}-{i}.log") for i in range(workers)]
+    processes = [context.Process(target=worker, args=(i, url, args.threads, args.job_ms, log_paths[i], ready, stop_path))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=120)
+
+    with engine.begin() as conn:
+        conn.execute(update(ScheduledJob).values(status="active", next_run_time=datetime.now()))
+    begin = time.perf_counter()
+    crashed = False
+    deadline = begin + args.timeout
+    while True:
+        with engine.connect() as conn:
+            done = conn.execute(select(func.count()).where(ScheduledJob.status == "completed")).scalar_one()
+        if done >= args.jobs or time.perf_counter() > deadline:
+            break
+        if crash and not crashed and done >= args.jobs * 0.3:
+            os.kill(processes[0].pid, signal.SIGKILL)
+            crashed = True
+            logger.info(f"已强制结束 worker-0（完成 {done}/{args.jobs}）")
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - begin
+
+    open(stop_path, "w").close()
+    for process in processes:
+        process.join(timeout=60)
+    with engine.connect() as conn:
+        reclaimed = conn.execute(select(func.count()).where(ScheduledJob.fencing_token > 1)).scalar_one()
+
+    per_worker = [read_dispatches(path) for path in log_paths]
+    counts = Counter(number for dispatches in per_worker for number in dispatches)
+    problems = []
+    if done < args.jobs:
+        problems.append(f"超时：只完成 {done}/{args.jobs} 个任务")
+    missing = args.jobs - len(counts)
+    if missing:
+        problems.append(f"{missing} 个任务没有执行")
+    duplicated = {number for number, count in counts.items() if count > 1}
+    if crash:
+        # 被结束的 worker 执行过的任务在租约过期后会由其他 worker 再执行一次，其他任务不能重复
+        duplicated -= set(per_worker[0])
+    if duplicated:
+        problems.append(f"{len(duplicated)} 个任务重复执行，如 {sorted(duplicated)[:5]}")
+    shares = "/".join(str(len(dispatches)) for dispatches in per_worker)
+    return args.jobs / elapsed, elapsed, shares, reclaimed, problems
+
+
+def main():
+    """
+    主函数，解析参数并运行测试
+    """
+    parser = argparse.ArgumentParser(description="scheduler_svc 多进程领取任务测试")
+    parser.add_argument("--url", help="数据库URL，默认使用临时 SQLite 数据库")
+    parser.add_argument("--workers", type=int, default=4, help="最多的 worker 进程数")
+    parser.add_argument("--threads", type=int, default=8, help="每个 worker 执行任务的线程数")
+    parser.add_argument("--jobs", type=int, default=3000, help="任务数")
+    parser.add_argument("--job-ms", type=float, default=50, help="每个任务的执行时间（毫秒）")
+    parser.add_argument("--lease", type=float, default=3, help="租约时长（秒）")
+    parser.add_argument("--timeout", type=float, default=300, help="每轮最长等待时间（秒）")
+    parser.add_argument("--min-efficiency", type=float, default=0.75,
+                        help="加速比至少为 worker 数的该倍数；任务很短时 SQLite 的整库写锁会先成为瓶颈")
+    parser.add_argument("--crash", action="store_true", help="最后一轮中途强制结束一个 worker")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_scheduler_claim_")
+    url = args.url or f"sqlite:///{os.path.join(work_dir, 'scheduler.db')}"
+    # worker 进程导入 job_service 时读取
+    os.environ["SCHEDULER_SVC_DATABASE_URL"] = url
+    os.environ["SCHEDULER_LEASE_SECONDS"] = str(args.lease)
+    os.environ["SCHEDULER_CLAIM_INTERVAL"] = "0.05"
+    engine = build_engine(url, pool_size=2)
+
+    rounds = []
+    workers = 1
+    while workers <= args.workers:
+        rounds.append(workers)
+        workers *= 2
+    if rounds[-1] != args.workers:
+        rounds.append(args.workers)
+
+    failed = False
+    baseline = None
+    for workers in rounds:
+        crash = args.crash and workers == rounds[-1] and workers > 1
+        throughput, elapsed, shares, reclaimed, problems = run_round(url, engine, workers, args, work_dir, crash)
+        baseline = baseline or throughput
+        if not crash and throughput / baseline < workers * args.min_efficiency:
+            problems.append(f"加速比 {throughput / baseline:.2f} 低于 {workers * args.min_efficiency:.2f}"
+                            f"（{workers} 个 worker × {args.min_efficiency}）")
+        logger.info(f"worker={workers}{'（中途结束1个）' if crash else ''}: 耗时={elapsed:.2f}s, "
+                    f"吞吐量={throughput:.0f}/s, 加速比={throughput / baseline:.2f}, "
+                    f"各 worker 执行数={shares}, 重新领取={reclaimed}")
+        for problem in problems:
+            logger.error(problem)
+        failed = failed or bool(problems)
+    if failed:
+        logger.info(f"检查未通过，各 worker 的执行记录在 {work_dir}")
+        sys.exit(1)
+    logger.info("每个任务恰好执行一次，吞吐量随 worker 数线性增加")
+    engine.dispose()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,11 +3,12 @@
 """
 初始化 MySQL 数据库结构脚本
 
-该脚本用于创建mERP系统所需的所有数据库，并进行基本初始化。
+该脚本用于创建mERP系统所需的所有数据库，并执行各服务的数据库迁移（见根目录 db_migrate.py）。
 脚本会根据main.py中定义的SERVICE_DB_NAMES创建对应的数据库。
 """
 import os
 import sys
+import time
 import pymysql
 from pathlib import Path
 import logging
@@ -72,173 +73,133 @@ if not DB_PASSWORD:
     logger.info("未设置数据库密码，请输入MySQL密码（如无密码请直接回车）:")
     DB_PASSWORD = getpass.getpass("MySQL密码: ")
 
-# 基本表结构定义
-BASIC_TABLES = {
-    # 配置服务基本表结构
-    'merp_config_svc': [
-        """
-        CREATE TABLE IF NOT EXISTS system_config (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            config_key VARCHAR(100) NOT NULL,
-            config_value TEXT,
-            description VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            UNIQUE KEY (config_key)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """,
-    ],
-    
-    # 审批服务基本表结构
-    'merp_approval_svc': [
-        """
-        CREATE TABLE IF NOT EXISTS approval_workflow (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            workflow_name VARCHAR(100) NOT NULL,
-            description TEXT,
-            status ENUM('active', 'inactive') DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS approval_step (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            workflow_id INT NOT NULL,
-            step_name VARCHAR(100) NOT NULL,
-            step_order INT NOT NULL,
-            approver_role VARCHAR(50) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            FOREIGN KEY (workflow_id) REFERENCES approval_workflow(id) ON DELETE CASCADE
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """,
-    ],
-    
-    # 调度服务基本表结构
-    'merp_scheduler_svc': [
-        """
-        CREATE TABLE IF NOT EXISTS scheduled_job (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            job_id VARCHAR(100) NOT NULL,
-            job_name VARCHAR(100) NOT NULL,
-            job_function VARCHAR(100) NOT NULL,
-            cron_expression VARCHAR(100),
-            interval_seconds INT,
-            job_args TEXT,
-            job_kwargs TEXT,
-            next_run_time TIMESTAMP NULL,
-            status ENUM('active', 'paused', 'completed', 'error') DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            UNIQUE KEY (job_id)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """,
-    ],
-    
-    # 其他服务的基本表结构可以根据需要添加
-}
+# 并行执行迁移的线程数
+INIT_DB_WORKERS = int(os.environ.get('INIT_DB_WORKERS', 8))
+
+
+def _connect(**kwargs):
+    return pymysql.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        **kwargs
+    )
+
+
+def _log_operational_error(e):
+    error_code = e.args[0]
+    if error_code == 1045:  # 访问被拒绝
+        logger.error(f"数据库访问被拒绝: 用户名或密码错误 (用户: {DB_USER}@{DB_HOST})")
+        logger.info("请检查环境变量 DB_USER 和 DB_PASSWORD 是否正确设置")
+    elif error_code == 2003:  # 无法连接到MySQL服务器
+        logger.error(f"无法连接到MySQL服务器: {DB_HOST}:{DB_PORT}")
+        logger.info("请确保MySQL服务已启动且可以访问")
+    else:
+        logger.error(f"数据库操作错误: {str(e)}")
 
 
-def create_database(db_name):
+def create_database(db_name, conn=None):
     """
     创建数据库
     
     Args:
         db_name: 数据库名称
+        conn: 已建立的服务器连接，为空时临时建立连接
         
     Returns:
         bool: 是否成功创建数据库
     """
+    own_conn = conn is None
     try:
         # 连接MySQL服务器
-        conn = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        cursor = conn.cursor()
-        
-        # 创建数据库
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name} DEFAULT CHARSET utf8mb4;")
+        if own_conn:
+            conn = _connect()
+        with conn.cursor() as cursor:
+            # 创建数据库
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name} DEFAULT CHARSET utf8mb4;")
         conn.commit()
         
         logger.info(f"数据库 {db_name} 创建成功")
-        
-        cursor.close()
-        conn.close()
         return True
     except pymysql.err.OperationalError as e:
-        error_code = e.args[0]
-        if error_code == 1045:  # 访问被拒绝
-            logger.error(f"数据库访问被拒绝: 用户名或密码错误 (用户: {DB_USER}@{DB_HOST})")
-            logger.info("请检查环境变量 DB_USER 和 DB_PASSWORD 是否正确设置")
-        elif error_code == 2003:  # 无法连接到MySQL服务器
-            logger.error(f"无法连接到MySQL服务器: {DB_HOST}:{DB_PORT}")
-            logger.info("请确保MySQL服务已启动且可以访问")
-        else:
-            logger.error(f"数据库操作错误: {str(e)}")
+        _log_operational_error(e)
         return False
     except Exception as e:
         logger.error(f"创建数据库 {db_name} 失败: {str(e)}")
         return False
+    finally:
+        if own_conn and conn is not None:
+            conn.close()
 
 
-def initialize_database(db_name):
+def create_databases(db_names):
     """
-    初始化数据库表结构
-    
+    使用同一个服务器连接创建所有数据库
+
     Args:
-        db_name: 数据库名称
+        db_names: 数据库名称列表
+
+    Returns:
+        dict: 创建成功的数据库名称 -> 耗时（秒）
     """
-    if db_name not in BASIC_TABLES:
-        logger.info(f"数据库 {db_name} 没有预定义的表结构，跳过初始化")
-        return
-    
     try:
-        # 连接到指定数据库
-        conn = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=db_name
-        )
-        cursor = conn.cursor()
-        
-        # 创建表
-        for table_sql in BASIC_TABLES[db_name]:
-            cursor.execute(table_sql)
-            logger.info(f"在数据库 {db_name} 中执行SQL: {table_sql[:60]}...")
-        
-        conn.commit()
-        logger.info(f"数据库 {db_name} 表结构初始化完成")
-        
-        cursor.close()
+        conn = _connect()
+    except pymysql.err.OperationalError as e:
+        _log_operational_error(e)
+        return {}
+
+    created = {}
+    try:
+        for db_name in db_names:
+            begin = time.perf_counter()
+            if create_database(db_name, conn):
+                created[db_name] = time.perf_counter() - begin
+    finally:
         conn.close()
-    except Exception as e:
-        logger.error(f"初始化数据库 {db_name} 表结构失败: {str(e)}")
+    return created
 
 
 def main():
     """
-    主函数，创建并初始化所有数据库
+    主函数，创建所有数据库并执行各服务的数据库迁移
     """
     logger.info("开始初始化数据库...")
+    begin = time.perf_counter()
     
-    # 首先创建默认数据库
-    if create_database(DEFAULT_DB_NAME):
-        initialize_database(DEFAULT_DB_NAME)
+    # 默认数据库在前，然后是各个服务的数据库
+    db_names = [DEFAULT_DB_NAME] + [name for name in SERVICE_DB_NAMES.values() if name != DEFAULT_DB_NAME]
+    created = create_databases(db_names)
     
-    # 然后创建各个服务的数据库
+    # 表结构由各服务的迁移定义（backend/<服务名>/migrations.py），并行执行
+    services = [name for name, db_name in SERVICE_DB_NAMES.items() if db_name in created]
+    try:
+        import db_config
+        from db_migrate import migrate_all
+        db_config.DB_PASSWORD = DB_PASSWORD  # 可能是交互输入的密码
+        results = migrate_all(services, workers=INIT_DB_WORKERS)
+    except ImportError as e:
+        logger.warning(f"无法导入迁移工具，跳过表结构初始化（请安装 SQLAlchemy 后执行 python db_migrate.py）: {str(e)}")
+        results = {}
+    
+    # 输出各数据库耗时
+    logger.info("各数据库耗时:")
     for service_name, db_name in SERVICE_DB_NAMES.items():
-        logger.info(f"正在为服务 {service_name} 创建数据库 {db_name}...")
-        if create_database(db_name):
-            initialize_database(db_name)
+        if db_name not in created:
+            logger.warning(f"  {db_name}: 创建失败")
+            continue
+        if service_name not in results:
+            logger.info(f"  {db_name}: 创建 {created[db_name] * 1000:.1f}ms")
+            continue
+        executed, elapsed, error = results[service_name]
+        if error is not None:
+            logger.warning(f"  {db_name}: 创建 {created[db_name] * 1000:.1f}ms, 迁移失败")
+        else:
+            logger.info(f"  {db_name}: 创建 {created[db_name] * 1000:.1f}ms, 迁移 {elapsed * 1000:.1f}ms"
+                        f"（执行版本 {executed or '无'}）")
     
-    logger.info("数据库初始化完成")
+    logger.info(f"数据库初始化完成，总耗时 {time.perf_counter() - begin:.2f} 秒")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()